@@ -0,0 +1,241 @@
+# Aplicación FIFO de pagos a cuentas de cobro
+# - Cada pago de un pensionado se aplica a sus cuentas de cobro de la más antigua a la más
+#   reciente (periodo_inicio, consecutivo); dentro de cada cuenta primero intereses y luego
+#   capital, como calcular_distribucion_pago. Lo que sobra después de cubrir todas las cuentas
+#   queda como excedente (consecutivo NULL)
+# - El resultado se guarda en pago_aplicacion (pago_id, consecutivo, capital, interes): los
+#   reportes leen de ahí lo pagado por cuenta en vez de volver a cruzar pagos con periodos
+# - reaplicar_entidad recalcula el historial completo de una entidad en una pasada: dos
+#   consultas (cuentas y pagos), el cálculo en memoria y un reemplazo de sus filas en una
+#   transacción. Se corre después de anular cuentas o de cargas fuera de la aplicación
+#   (python -m app.cli reaplicar-pagos --nit ...)
+# - Las rutas que escriben pagos (registrar_pago, registrar_pago_masivo, importador de Excel,
+#   importar-pagos) llaman a reaplicar_pensionados con los pensionados que tocaron, dentro de
+#   su propia transacción, como refrescar_cartera
+# - Emitir una cuenta (generar_pdf_oficial) llama a reaplicar_cuenta en la misma transacción
+#   que registra la cuenta, así una cuenta nueva recibe los pagos que ya había
+# - Solo las cuentas vigentes reciben pagos: no ANULADAS y la última versión de cada
+#   (entidad, pensionado, periodo); una reemisión deja la anterior EMITIDA/CORREGIDA con
+#   version menor y no debe contarse dos veces
+# - saldos_cuentas es la lectura para reportes (Reportes y Seguimiento, cli saldos-cuentas)
+# - La tabla pago_aplicacion viene en scripts/init_db.sql; las bases existentes la reciben con
+#   `make db-migrar` (scripts/indices_aplicacion_pagos.sql) y luego `reaplicar-pagos` por entidad
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+logger = logging.getLogger(__name__)
+
+_CERO = Decimal('0.00')
+
+_PENSIONADOS_POR_LOTE = 1000
+
+_INSERTAR_APLICACION = text("""
+    INSERT INTO pago_aplicacion (
+        pago_id, pensionado_id, nit_entidad, consecutivo, fecha_pago, capital, interes
+    ) VALUES (
+        :pago_id, :pensionado_id, :nit_entidad, :consecutivo, :fecha_pago, :capital, :interes
+    )
+""")
+
+# Condición sobre cuenta_cobro cc: no anulada y sin una versión posterior del mismo periodo
+_CUENTA_VIGENTE = """
+    (cc.estado IS NULL OR cc.estado <> 'ANULADA')
+    AND NOT EXISTS (
+        SELECT 1 FROM cuenta_cobro nv
+        WHERE nv.nit_entidad = cc.nit_entidad
+          AND nv.pensionado_identificacion = cc.pensionado_identificacion
+          AND nv.periodo_inicio = cc.periodo_inicio
+          AND nv.periodo_fin = cc.periodo_fin
+          AND (nv.estado IS NULL OR nv.estado <> 'ANULADA')
+          AND (COALESCE(nv.version, 1) > COALESCE(cc.version, 1)
+               OR (COALESCE(nv.version, 1) = COALESCE(cc.version, 1) AND nv.consecutivo > cc.consecutivo))
+    )
+"""
+
+def aplicar_fifo(cuentas: list, pagos: list) -> list:
+    """
+    Aplica los pagos de un pensionado a sus cuentas, la más antigua primero.
+
+    Args:
+        cuentas: [{consecutivo, capital, interes}] de la más antigua a la más reciente
+        pagos: [{pago_id, fecha_pago, valor}] en el orden en que se aplican
+
+    Returns:
+        Lista de aplicaciones {pago_id, consecutivo, fecha_pago, capital, interes}; el
+        excedente de un pago sin cuentas pendientes va con consecutivo None
+    """
+    pendientes = [
+        [c['consecutivo'], Decimal(str(c.get('interes') or 0)), Decimal(str(c.get('capital') or 0))]
+        for c in cuentas
+    ]
+    aplicaciones = []
+    actual = 0
+    for pago in pagos:
+        restante = Decimal(str(pago['valor'] or 0))
+        while restante > 0 and actual < len(pendientes):
+            cuenta = pendientes[actual]
+            a_interes = min(restante, max(cuenta[1], _CERO))
+            restante -= a_interes
+            a_capital = min(restante, max(cuenta[2], _CERO))
+            restante -= a_capital
+            cuenta[1] -= a_interes
+            cuenta[2] -= a_capital
+            if a_interes or a_capital:
+                aplicaciones.append({'pago_id': pago['pago_id'], 'consecutivo': cuenta[0],
+                                     'fecha_pago': pago['fecha_pago'], 'capital': a_capital, 'interes': a_interes})
+            if cuenta[1] <= 0 and cuenta[2] <= 0:
+                actual += 1
+        if restante > 0:
+            aplicaciones.append({'pago_id': pago['pago_id'], 'consecutivo': None,
+                                 'fecha_pago': pago['fecha_pago'], 'capital': restante, 'interes': _CERO})
+    return aplicaciones
+
+
+def _aplicar(session, sql_cuentas, sql_pagos, parametros: dict) -> tuple:
+    """Lee cuentas y pagos con las consultas dadas y aplica FIFO por pensionado.
+
+    Ambas consultas devuelven nit_entidad; las cuentas además pensionado_identificacion,
+    consecutivo, total_capital y total_intereses, y los pagos identificacion, pensionado_id,
+    pago_id, fecha_pago y valor. Devuelve ({(nit, identificación, pensionado_id): pagos}, filas).
+    """
+    cuentas = defaultdict(list)
+    for fila in session.execute(sql_cuentas, parametros):
+        cuentas[(fila.nit_entidad, str(fila.pensionado_identificacion))].append(
+            {'consecutivo': fila.consecutivo, 'capital': fila.total_capital, 'interes': fila.total_intereses}
+        )
+
+    pagos = defaultdict(list)
+    for fila in session.execute(sql_pagos, parametros):
+        pagos[(fila.nit_entidad, str(fila.identificacion), fila.pensionado_id)].append(
+            {'pago_id': fila.pago_id, 'fecha_pago': fila.fecha_pago, 'valor': fila.valor}
+        )
+
+    filas = []
+    for (nit, identificacion, pensionado_id), lista in pagos.items():
+        for aplicacion in aplicar_fifo(cuentas.get((nit, identificacion), []), lista):
+            filas.append({**aplicacion, 'pensionado_id': pensionado_id, 'nit_entidad': nit})
+    return pagos, filas
+
+
+def reaplicar_pensionados(session, pensionado_ids) -> int:
+    """Recalcula pago_aplicacion de los pensionados dados. No confirma: corre en la
+    transacción de quien escribió los pagos. Devuelve las aplicaciones insertadas."""
+    ids = sorted({int(i) for i in pensionado_ids if i is not None})
+    sql_cuentas = text(f"""
+        SELECT cc.nit_entidad, cc.pensionado_identificacion, cc.consecutivo, cc.total_capital, cc.total_intereses
+        FROM pensionado pen
+        JOIN cuenta_cobro cc ON cc.pensionado_identificacion = pen.identificacion AND cc.nit_entidad = pen.nit_entidad
+        WHERE pen.pensionado_id IN :ids AND {_CUENTA_VIGENTE}
+        ORDER BY cc.pensionado_identificacion, cc.periodo_inicio, cc.consecutivo
+    """).bindparams(bindparam("ids", expanding=True))
+    sql_pagos = text("""
+        SELECT pen.nit_entidad, pen.identificacion, pg.pensionado_id, pg.pago_id, pg.fecha_pago, pg.valor
+        FROM pago pg
+        JOIN pensionado pen ON pen.pensionado_id = pg.pensionado_id
+        WHERE pg.pensionado_id IN :ids
+        ORDER BY pg.pensionado_id, pg.fecha_pago, pg.pago_id
+    """).bindparams(bindparam("ids", expanding=True))
+    borrar = text("DELETE FROM pago_aplicacion WHERE pensionado_id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    aplicaciones = 0
+    for inicio in range(0, len(ids), _PENSIONADOS_POR_LOTE):
+        lote = ids[inicio:inicio + _PENSIONADOS_POR_LOTE]
+        _, filas = _aplicar(session, sql_cuentas, sql_pagos, {"ids": lote})
+        session.execute(borrar, {"ids": lote})
+        if filas:
+            session.execute(_INSERTAR_APLICACION, filas)
+        aplicaciones += len(filas)
+    return aplicaciones
+
+
+def reaplicar_cuenta(session, entidad_nit: str, identificacion) -> int:
+    """Recalcula pago_aplicacion del pensionado al que se le acaba de emitir una cuenta.
+    No confirma: corre en la transacción que registra la cuenta."""
+    ids = session.execute(
+        text("SELECT pensionado_id FROM pensionado WHERE identificacion = :identificacion AND nit_entidad = :nit"),
+        {"identificacion": str(identificacion), "nit": entidad_nit},
+    ).scalars().all()
+    return reaplicar_pensionados(session, ids) if ids else 0
+
+
+def reaplicar_entidad(session, entidad_nit: str) -> dict:
+    """
+    Recalcula pago_aplicacion para todos los pagos de la entidad en una transacción.
+
+    Returns:
+        Resumen {pagos, aplicaciones, capital, interes, excedente}
+    """
+    try:
+        pagos, filas = _aplicar(session, text(f"""
+            SELECT cc.nit_entidad, cc.pensionado_identificacion, cc.consecutivo, cc.total_capital, cc.total_intereses
+            FROM cuenta_cobro cc
+            WHERE cc.nit_entidad = :nit AND {_CUENTA_VIGENTE}
+            ORDER BY cc.pensionado_identificacion, cc.periodo_inicio, cc.consecutivo
+        """), text("""
+            SELECT pen.nit_entidad, pen.identificacion, pg.pensionado_id, pg.pago_id, pg.fecha_pago, pg.valor
+            FROM pago pg
+            JOIN pensionado pen ON pen.pensionado_id = pg.pensionado_id
+            WHERE pen.nit_entidad = :nit
+            ORDER BY pg.pensionado_id, pg.fecha_pago, pg.pago_id
+        """), {"nit": entidad_nit})
+
+        session.execute(text("DELETE FROM pago_aplicacion WHERE nit_entidad = :nit"), {"nit": entidad_nit})
+        if filas:
+            session.execute(_INSERTAR_APLICACION, filas)
+        session.commit()
+    except Exception as e:
+        logger.error(f"Error reaplicando pagos de la entidad {entidad_nit}: {e}")
+        session.rollback()
+        raise
+
+    resumen = {
+        'pagos': sum(len(lista) for lista in pagos.values()),
+        'aplicaciones': len(filas),
+        'capital': sum((f['capital'] for f in filas if f['consecutivo'] is not None), _CERO),
+        'interes': sum((f['interes'] for f in filas), _CERO),
+        'excedente': sum((f['capital'] for f in filas if f['consecutivo'] is None), _CERO),
+    }
+    logger.info(f"Pagos reaplicados para {entidad_nit}: {resumen['pagos']} pagos, "
+                f"{resumen['aplicaciones']} aplicaciones, excedente=${resumen['excedente']:.2f}")
+    return resumen
+
+
+def saldos_cuentas(session, entidad_nit: str, identificacion: str = None) -> list:
+    """
+    Estado de cada cuenta de cobro vigente de la entidad según pago_aplicacion: liquidado,
+    pagado (capital e interés) y saldo.
+    """
+    condiciones = ["cc.nit_entidad = :nit", _CUENTA_VIGENTE]
+    parametros = {"nit": entidad_nit}
+    if identificacion:
+        condiciones.append("cc.pensionado_identificacion = :identificacion")
+        parametros["identificacion"] = identificacion
+    filas = session.execute(text(f"""
+        SELECT
+            cc.consecutivo,
+            cc.pensionado_identificacion AS identificacion,
+            cc.pensionado_nombre AS nombre,
+            cc.periodo_inicio,
+            cc.periodo_fin,
+            COALESCE(cc.total_capital, 0) AS total_capital,
+            COALESCE(cc.total_intereses, 0) AS total_intereses,
+            COALESCE(a.capital, 0) AS capital_pagado,
+            COALESCE(a.interes, 0) AS interes_pagado,
+            COALESCE(cc.total_capital, 0) + COALESCE(cc.total_intereses, 0)
+                - COALESCE(a.capital, 0) - COALESCE(a.interes, 0) AS saldo
+        FROM cuenta_cobro cc
+        LEFT JOIN (
+            SELECT consecutivo, SUM(capital) AS capital, SUM(interes) AS interes
+            FROM pago_aplicacion
+            WHERE nit_entidad = :nit AND consecutivo IS NOT NULL
+            GROUP BY consecutivo
+        ) a ON a.consecutivo = cc.consecutivo
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY cc.pensionado_identificacion, cc.periodo_inicio, cc.consecutivo
+    """), parametros).fetchall()
+    return [dict(fila._mapping) for fila in filas]
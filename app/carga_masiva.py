@@ -0,0 +1,84 @@
+# Carga masiva por tablas temporales (importador de Excel, archivos de pagos)
+# - Cada hoja o archivo se normaliza a un DataFrame y se sube a una tabla TEMPORARY con
+#   INSERT de varias filas (un viaje a la BD por cada _FILAS_POR_INSERT filas)
+# - Luego se aplica a las tablas reales con pocas sentencias: INSERT ... SELECT ...
+#   ON DUPLICATE KEY UPDATE o UPDATE ... JOIN contra la tabla temporal
+# - Todo corre en la conexión de la sesión: las tablas temporales viven en esa conexión y
+#   la transacción la confirma quien llama
+
+import pandas as pd
+from sqlalchemy import text
+
+_FILAS_POR_INSERT = 1000
+
+
+def _valor(v):
+    """Valor de pandas/numpy a tipo de Python aceptado por el driver (NaN/NaT -> None)."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    if hasattr(v, 'item'):
+        return v.item()
+    return v
+
+
+def identificaciones(serie: pd.Series) -> pd.Series:
+    """Identificaciones como texto, igual que el import fila a fila: números a entero sin
+    decimales (12345678.0 -> '12345678'), lo demás como viene."""
+    numeros = pd.to_numeric(serie, errors='coerce')
+    salida = serie.astype(object).where(serie.notna(), None)
+    salida = salida.map(lambda v: None if v is None else str(v))
+    enteros = numeros.notna() & numeros.abs().lt(2 ** 63)
+    salida[enteros] = numeros[enteros].astype('int64').astype(str)
+    return salida
+
+
+def mapa_ids(session) -> dict:
+    """{identificacion: pensionado_id} de todos los pensionados (para resolver los bloques)."""
+    return dict(session.execute(text("SELECT identificacion, pensionado_id FROM pensionado")).fetchall())
+
+
+def crear_temporal(session, nombre: str, columnas: dict, clave: tuple = ()):
+    """Crea (o recrea) la tabla temporal `nombre` con {columna: tipo SQL} y clave primaria
+    opcional (índice para los JOIN contra la tabla real)."""
+    definicion = ", ".join(f"{c} {t}" for c, t in columnas.items())
+    if clave:
+        definicion += f", PRIMARY KEY ({', '.join(clave)})"
+    session.execute(text(f"DROP TEMPORARY TABLE IF EXISTS {nombre}"))
+    session.execute(text(f"CREATE TEMPORARY TABLE {nombre} ({definicion})"))
+
+
+def insertar_filas(session, tabla: str, df: pd.DataFrame, reemplazar: bool = False) -> int:
+    """Inserta las filas de `df` (columnas = columnas de la tabla) con INSERT de varias filas.
+
+    Con `reemplazar` usa REPLACE: una fila con la clave de otra ya subida la sustituye (la
+    última gana también entre bloques distintos de una misma hoja).
+    """
+    columnas = list(df.columns)
+    filas = list(df.itertuples(index=False, name=None))
+    verbo = "REPLACE" if reemplazar else "INSERT"
+    for inicio in range(0, len(filas), _FILAS_POR_INSERT):
+        lote = filas[inicio:inicio + _FILAS_POR_INSERT]
+        valores = ", ".join(
+            "(" + ", ".join(f":{c}_{i}" for c in columnas) + ")" for i in range(len(lote))
+        )
+        params = {f"{c}_{i}": _valor(v) for i, fila in enumerate(lote) for c, v in zip(columnas, fila)}
+        session.execute(text(f"{verbo} INTO {tabla} ({', '.join(columnas)}) VALUES {valores}"), params)
+    return len(filas)
+
+
+def subir(session, nombre: str, columnas: dict, df: pd.DataFrame, clave: tuple = ()) -> int:
+    """Crea la tabla temporal `nombre` y sube `df` (solo las columnas declaradas)."""
+    crear_temporal(session, nombre, columnas, clave)
+    return insertar_filas(session, nombre, df[list(columnas)])
+
+
+def subir_bloques(session, nombre: str, columnas: dict, bloques, clave: tuple = ()) -> int:
+    """Como `subir`, pero con un iterable de DataFrames (lectura por bloques): solo un bloque
+    en memoria a la vez. Con clave, la última fila de cada clave gana entre bloques."""
+    crear_temporal(session, nombre, columnas, clave)
+    total = 0
+    for df in bloques:
+        total += insertar_filas(session, nombre, df[list(columnas)], reemplazar=bool(clave))
+    return total
@@ -0,0 +1,221 @@
+# Estado de cartera materializado (cartera_estado)
+# - Una fila por liquidacion_detalle con lo liquidado, lo pagado en el periodo, el saldo, los
+#   intereses de mora (saldo x DTF del periodo) y el estado: 'En mora', 'Al día' o 'Pagada'.
+#   Es lo que antes calculaba la vista v_estado_cartera en cada consulta (agrupando pago por
+#   detalle); la vista ahora solo lee esta tabla (scripts/vista_estado_cartera.sql)
+# - Las rutas que escriben detalles de liquidación o pagos (crear_detalle_liquidacion,
+#   registrar_pago, registrar_pago_masivo, importador de Excel, importar-pagos) llaman a
+#   refrescar_cartera con los pensionados que tocaron, dentro de su propia transacción: se
+#   borran y se vuelven a calcular solo sus filas
+# - El estado depende también de la fecha (un periodo 'Al día' pasa a 'En mora' cuando se
+#   acaba su mes): estado e intereses_mora guardados son los del día en que se escribió la
+#   fila. Los lectores (obtener_cartera, resumen_cartera y la vista) los recalculan contra el
+#   mes actual desde saldo_pendiente, periodo y tasa_dtf; lo guardado solo sirve para filtrar
+#   por el índice. actualizar_vencidas lo pone al día y actualizar_tasas aplica una DTF nueva,
+#   ninguno recalcula pagos
+# - reconstruir_cartera rehace la tabla (o una entidad): carga inicial, reparación o corrida
+#   diaria (python -m app.cli refrescar-cartera [--nit ...] [--solo-vencidas])
+# - La tabla viene en scripts/init_db.sql; las bases existentes la reciben con `make db-migrar`
+#   (scripts/tabla_cartera_estado.sql) y luego refrescar-cartera para llenarla
+
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, text
+
+_PENSIONADOS_POR_LOTE = 1000
+
+
+def _mes_actual(hoy: date = None) -> date:
+    return (hoy or date.today()).replace(day=1)
+
+
+# Mismas reglas que tenía v_estado_cartera; pagado = pagos del pensionado con fecha_pago igual
+# al periodo del detalle. {filtro_detalle}/{filtro_pago} acotan a los pensionados a refrescar
+_INSERTAR_CARTERA = """
+    INSERT INTO cartera_estado (
+        detalle_id, liquidacion_id, nit_entidad, entidad, pensionado_id, identificacion, pensionado,
+        periodo, valor_liquidado, valor_pagado, saldo_pendiente, tasa_dtf, intereses_mora, estado,
+        fecha_actualizacion
+    )
+    SELECT
+        ld.detalle_id, ld.liquidacion_id, COALESCE(l.identificacion, p.nit_entidad), l.nombre,
+        p.pensionado_id, p.identificacion, p.nombre, ld.periodo,
+        ld.capital + ld.interes,
+        COALESCE(pg.pagado, 0),
+        ld.capital + ld.interes - COALESCE(pg.pagado, 0),
+        dt.tasa,
+        CASE
+            WHEN ld.capital + ld.interes - COALESCE(pg.pagado, 0) > 0 AND ld.periodo < :mes_actual
+                THEN ROUND((ld.capital + ld.interes - COALESCE(pg.pagado, 0)) * COALESCE(dt.tasa, 0), 2)
+            ELSE 0
+        END,
+        CASE
+            WHEN ld.capital + ld.interes - COALESCE(pg.pagado, 0) > 0 AND ld.periodo < :mes_actual THEN 'En mora'
+            WHEN ld.capital + ld.interes - COALESCE(pg.pagado, 0) <= 0 THEN 'Pagada'
+            ELSE 'Al día'
+        END,
+        :ahora
+    FROM liquidacion_detalle ld
+    JOIN liquidacion l ON l.liquidacion_id = ld.liquidacion_id
+    JOIN pensionado p ON p.pensionado_id = ld.pensionado_id
+    LEFT JOIN (
+        SELECT pensionado_id, fecha_pago, SUM(valor) AS pagado
+        FROM pago
+        {filtro_pago}
+        GROUP BY pensionado_id, fecha_pago
+    ) pg ON pg.pensionado_id = ld.pensionado_id AND pg.fecha_pago = ld.periodo
+    LEFT JOIN dtf_mensual dt ON dt.periodo = ld.periodo
+    {filtro_detalle}
+"""
+
+
+def pensionados_tabla(session, tabla: str) -> set:
+    """pensionado_id distintos de una tabla temporal (tmp_pago, tmp_pago_archivo...)."""
+    return {fila[0] for fila in session.execute(text(f"SELECT DISTINCT pensionado_id FROM {tabla}"))}
+
+
+def refrescar_cartera(session, pensionado_ids, hoy: date = None) -> int:
+    """Recalcula las filas de cartera_estado de los pensionados dados. No confirma: corre en
+    la transacción de quien escribió los detalles o pagos. Devuelve las filas insertadas."""
+    ids = sorted({int(i) for i in pensionado_ids if i is not None})
+    parametros = {"mes_actual": _mes_actual(hoy), "ahora": datetime.now()}
+    insertar = text(_INSERTAR_CARTERA.format(
+        filtro_pago="WHERE pensionado_id IN :ids",
+        filtro_detalle="WHERE ld.pensionado_id IN :ids",
+    )).bindparams(bindparam("ids", expanding=True))
+    borrar = text("DELETE FROM cartera_estado WHERE pensionado_id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    filas = 0
+    for inicio in range(0, len(ids), _PENSIONADOS_POR_LOTE):
+        lote = ids[inicio:inicio + _PENSIONADOS_POR_LOTE]
+        session.execute(borrar, {"ids": lote})
+        filas += session.execute(insertar, {**parametros, "ids": lote}).rowcount
+    return filas
+
+
+def actualizar_vencidas(session, hoy: date = None) -> int:
+    """Pasa a 'En mora' los periodos 'Al día' cuyo mes ya terminó (con sus intereses de mora).
+    No confirma."""
+    return session.execute(text("""
+        UPDATE cartera_estado
+        SET estado = 'En mora',
+            intereses_mora = ROUND(saldo_pendiente * COALESCE(tasa_dtf, 0), 2),
+            fecha_actualizacion = :ahora
+        WHERE estado = 'Al día' AND periodo < :mes_actual
+    """), {"mes_actual": _mes_actual(hoy), "ahora": datetime.now()}).rowcount
+
+
+def actualizar_tasas(session, periodos) -> int:
+    """Aplica a cartera_estado las tasas de dtf_mensual de los periodos dados (recién
+    escritas en la misma transacción). No confirma."""
+    periodos = sorted(set(periodos))
+    if not periodos:
+        return 0
+    return session.execute(text("""
+        UPDATE cartera_estado
+        SET tasa_dtf = (SELECT d.tasa FROM dtf_mensual d WHERE d.periodo = cartera_estado.periodo),
+            intereses_mora = CASE
+                WHEN estado = 'En mora' THEN ROUND(saldo_pendiente * COALESCE(
+                    (SELECT d.tasa FROM dtf_mensual d WHERE d.periodo = cartera_estado.periodo), 0), 2)
+                ELSE 0
+            END,
+            fecha_actualizacion = :ahora
+        WHERE periodo IN :periodos
+    """).bindparams(bindparam("periodos", expanding=True)),
+        {"periodos": periodos, "ahora": datetime.now()}).rowcount
+
+
+def reconstruir_cartera(session, entidad_nit: str = None, hoy: date = None) -> int:
+    """Rehace cartera_estado desde liquidacion_detalle y pago (todas las entidades o una);
+    devuelve las filas."""
+    parametros = {"nit": entidad_nit, "mes_actual": _mes_actual(hoy), "ahora": datetime.now()}
+    if entidad_nit:
+        filtro_pago = "WHERE pensionado_id IN (SELECT pensionado_id FROM pensionado WHERE nit_entidad = :nit)"
+        filtro_detalle = "WHERE COALESCE(l.identificacion, p.nit_entidad) = :nit"
+        borrar = "DELETE FROM cartera_estado WHERE nit_entidad = :nit"
+    else:
+        filtro_pago = filtro_detalle = ""
+        borrar = "DELETE FROM cartera_estado"
+    try:
+        session.execute(text(borrar), parametros)
+        filas = session.execute(text(_INSERTAR_CARTERA.format(
+            filtro_pago=filtro_pago, filtro_detalle=filtro_detalle,
+        )), parametros).rowcount
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return filas
+
+
+# Estado e intereses de mora a la fecha, desde las columnas que no dependen de ella (mismas
+# reglas que _INSERTAR_CARTERA)
+_ESTADO_ACTUAL = """
+    CASE
+        WHEN saldo_pendiente > 0 AND periodo < :mes_actual THEN 'En mora'
+        WHEN saldo_pendiente <= 0 THEN 'Pagada'
+        ELSE 'Al día'
+    END
+"""
+_MORA_ACTUAL = """
+    CASE
+        WHEN saldo_pendiente > 0 AND periodo < :mes_actual THEN ROUND(saldo_pendiente * COALESCE(tasa_dtf, 0), 2)
+        ELSE 0
+    END
+"""
+
+# Filtro por estado a la fecha sobre el índice (nit_entidad, estado, periodo): 'Pagada' no
+# depende de la fecha; un periodo con saldo guardado como 'Al día' puede estar ya en mora
+_FILTRO_ESTADO = {
+    'En mora': "estado IN ('En mora', 'Al día') AND periodo < :mes_actual",
+    'Al día': "estado IN ('En mora', 'Al día') AND periodo >= :mes_actual",
+    'Pagada': "estado = 'Pagada'",
+}
+
+
+def obtener_cartera(session, entidad_nit: str, estado: str = None, periodo_desde: date = None,
+                    periodo_hasta: date = None, limite: int = 1000, hoy: date = None) -> list:
+    """Filas de cartera_estado de la entidad (rango del índice nit_entidad, estado, periodo),
+    con estado e intereses de mora a la fecha."""
+    condiciones = ["nit_entidad = :nit"]
+    parametros = {"nit": entidad_nit, "limite": limite, "mes_actual": _mes_actual(hoy)}
+    if estado:
+        condiciones.append(_FILTRO_ESTADO.get(estado, "estado = :estado"))
+        parametros["estado"] = estado
+    if periodo_desde:
+        condiciones.append("periodo >= :desde")
+        parametros["desde"] = periodo_desde
+    if periodo_hasta:
+        condiciones.append("periodo <= :hasta")
+        parametros["hasta"] = periodo_hasta
+    filas = session.execute(text(f"""
+        SELECT detalle_id, liquidacion_id, identificacion, pensionado, periodo, valor_liquidado,
+               valor_pagado, saldo_pendiente, tasa_dtf, {_MORA_ACTUAL} AS intereses_mora,
+               {_ESTADO_ACTUAL} AS estado
+        FROM cartera_estado
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY periodo, identificacion
+        LIMIT :limite
+    """), parametros).fetchall()
+    return [dict(fila._mapping) for fila in filas]
+
+
+def resumen_cartera(session, entidad_nit: str, hoy: date = None) -> dict:
+    """Totales de la cartera de la entidad por estado a la fecha."""
+    filas = session.execute(text(f"""
+        SELECT estado, COUNT(*), COALESCE(SUM(valor_liquidado), 0), COALESCE(SUM(valor_pagado), 0),
+               COALESCE(SUM(saldo_pendiente), 0), COALESCE(SUM(intereses_mora), 0)
+        FROM (
+            SELECT valor_liquidado, valor_pagado, saldo_pendiente,
+                   {_MORA_ACTUAL} AS intereses_mora, {_ESTADO_ACTUAL} AS estado
+            FROM cartera_estado
+            WHERE nit_entidad = :nit
+        ) c
+        GROUP BY estado
+    """), {"nit": entidad_nit, "mes_actual": _mes_actual(hoy)}).fetchall()
+    return {
+        estado: {'registros': int(n), 'valor_liquidado': liquidado, 'valor_pagado': pagado,
+                 'saldo_pendiente': saldo, 'intereses_mora': mora}
+        for estado, n, liquidado, pagado, saldo, mora in filas
+    }
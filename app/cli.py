@@ -1,22 +1,61 @@
 # CLI con argparse para importar, generar liquidación y exportar PDF
 
 # Objetivo (Copilot): CLI simple con comandos:
-# - importar-excel
+# - importar-excel [ruta.xlsx] [--bloque 5000] [--completo] [--borrar-bajas] [--fila-a-fila]
+# - importar-pagos pagos_banco.csv [--bloque 100000] [--separador ';']   (también .parquet)
+# - reaplicar-pagos --nit 800103913   (aplicación FIFO de pagos a cuentas de cobro)
+# - saldos-cuentas --nit 800103913 [--identificacion 123]   (pagado y saldo por cuenta, desde pago_aplicacion)
+# - reconstruir-resumen-pagos [--nit 800103913]   (rehace pago_resumen_mensual y pago_resumen_pensionado desde pago)
+# - refrescar-cartera [--nit 800103913] [--solo-vencidas]   (rehace cartera_estado / pasa a mora lo vencido)
 # - generar-liq --entidad NIT --desde 2022-10 --hasta 2025-09
 # - pdf --liquidacion-id 123 --out out/CCP-2025-09-0001.pdf
+# - trabajador --procesos 2   (ejecuta los trabajos encolados desde la UI)
+# - encolar-lote --nit 800103913 --nit 860000000 --fecha-corte 2025-08-31 --bloque 50
 import argparse
 from app.db import get_session
-from app.importer_excel import cargar_excel_a_bd
+from app.importer_excel import EXCEL_PATH, TAM_BLOQUE_EXCEL, cargar_excel_a_bd, cargar_excel_a_bd_masivo
 from app.liquidar import generar_liquidacion_completa
 from app.pdf import generar_pdf_completo
 from datetime import datetime
 
 def main():
+    from app.zip_manifiesto import usar_pdf_binario
+    usar_pdf_binario()
     parser = argparse.ArgumentParser("Liquidaciones CLI")
     sub = parser.add_subparsers(dest="cmd")
 
     # importar-excel
-    sub.add_parser("importar-excel")
+    p_imp = sub.add_parser("importar-excel")
+    p_imp.add_argument("ruta", nargs="?", default=EXCEL_PATH)   # libro .xlsx a importar
+    p_imp.add_argument("--bloque", type=int, default=TAM_BLOQUE_EXCEL)   # filas leídas por bloque
+    p_imp.add_argument("--completo", action="store_true")      # reaplicar todas las filas, no solo las que cambiaron
+    p_imp.add_argument("--borrar-bajas", action="store_true")  # borrar pagos que ya no están en el libro
+    p_imp.add_argument("--fila-a-fila", action="store_true")   # import anterior (una consulta por fila)
+
+    # importar-pagos (archivos de pagos de los bancos: identificacion, fecha, valor, observaciones)
+    p_pag = sub.add_parser("importar-pagos")
+    p_pag.add_argument("ruta")                                  # .csv o .parquet
+    p_pag.add_argument("--bloque", type=int, default=100_000)   # filas leídas por bloque
+    p_pag.add_argument("--separador")                           # CSV: por defecto se detecta (',' o ';')
+    p_pag.add_argument("--encoding", default="utf-8-sig")
+
+    # reaplicar-pagos (recalcula pago_aplicacion de las entidades)
+    p_apl = sub.add_parser("reaplicar-pagos")
+    p_apl.add_argument("--nit", action="append", required=True)   # repetir para varias entidades
+
+    # saldos-cuentas (lo pagado y el saldo de cada cuenta vigente según pago_aplicacion)
+    p_sal = sub.add_parser("saldos-cuentas")
+    p_sal.add_argument("--nit", required=True)
+    p_sal.add_argument("--identificacion")   # solo las cuentas de un pensionado
+
+    # reconstruir-resumen-pagos (carga inicial o reparación de pago_resumen_mensual y pago_resumen_pensionado)
+    p_res = sub.add_parser("reconstruir-resumen-pagos")
+    p_res.add_argument("--nit")   # por defecto todas las entidades
+
+    # refrescar-cartera (carga inicial o reparación de cartera_estado; --solo-vencidas para la corrida diaria)
+    p_car = sub.add_parser("refrescar-cartera")
+    p_car.add_argument("--nit")   # por defecto todas las entidades
+    p_car.add_argument("--solo-vencidas", action="store_true")   # solo pasar a 'En mora' los periodos vencidos
 
     # generar-liq
     p_gen = sub.add_parser("generar-liq")
@@ -29,13 +68,87 @@ def main():
     p_pdf.add_argument("--liquidacion-id", required=True, type=int)
     p_pdf.add_argument("--out", required=True)
 
+    # trabajador
+    p_trab = sub.add_parser("trabajador")
+    p_trab.add_argument("--procesos", type=int, default=1)
+    p_trab.add_argument("--intervalo", type=float, default=2.0)      # segundos entre consultas a la cola
+    p_trab.add_argument("--una-vez", action="store_true")            # salir cuando la cola quede vacía
+
+    # encolar-lote (ZIP masivo repartido en items que drenan los trabajadores de varias máquinas)
+    p_lote = sub.add_parser("encolar-lote")
+    p_lote.add_argument("--nit", action="append", required=True)   # repetir para varias entidades
+    p_lote.add_argument("--fecha-corte", required=True)            # YYYY-MM-DD
+    p_lote.add_argument("--bloque", type=int, default=50)           # pensionados por item de render
+    p_lote.add_argument("--motor", default="canvas")
+    p_lote.add_argument("--no-corregir", action="store_true")       # emitir consecutivos nuevos
+
     args = parser.parse_args()
 
     if args.cmd == "importar-excel":
         session = get_session()
-        cargar_excel_a_bd(session)
-        print("Importación de Excel completada.")
-        session.close()
+        try:
+            if args.fila_a_fila:
+                cargar_excel_a_bd(session, args.ruta)
+            else:
+                cargar_excel_a_bd_masivo(session, args.ruta, args.bloque, args.completo, args.borrar_bajas)
+            print("Importación de Excel completada.")
+        finally:
+            session.close()
+    elif args.cmd == "importar-pagos":
+        from app.importer_pagos import importar_archivo_pagos
+        session = get_session()
+        try:
+            r = importar_archivo_pagos(session, args.ruta, args.bloque, args.separador, args.encoding)
+            print(f"✅ Pagos importados de {args.ruta}: {r['nuevos']} nuevos de {r['leidas']} filas leídas.")
+            print(f"   Ya existían: {r['duplicados']} | Repetidas en el archivo: {r['repetidas_en_archivo']} | "
+                  f"Pensionado desconocido: {r['desconocidos']} | Fecha o valor inválido: {r['invalidas']}")
+        finally:
+            session.close()
+    elif args.cmd == "reaplicar-pagos":
+        from app.aplicacion_pagos import reaplicar_entidad
+        session = get_session()
+        try:
+            for nit in args.nit:
+                r = reaplicar_entidad(session, nit)
+                print(f"✅ {nit}: {r['pagos']} pagos en {r['aplicaciones']} aplicaciones | "
+                      f"Capital ${float(r['capital']):,.2f} | Interés ${float(r['interes']):,.2f} | "
+                      f"Excedente ${float(r['excedente']):,.2f}")
+        finally:
+            session.close()
+    elif args.cmd == "saldos-cuentas":
+        from app.aplicacion_pagos import saldos_cuentas
+        session = get_session()
+        try:
+            filas = saldos_cuentas(session, args.nit, args.identificacion)
+            for f in filas:
+                print(f"{f['consecutivo']:>8} {f['identificacion']:>15} {f['periodo_inicio']} a {f['periodo_fin']} | "
+                      f"Liquidado ${float(f['total_capital'] + f['total_intereses']):,.2f} | "
+                      f"Pagado ${float(f['capital_pagado'] + f['interes_pagado']):,.2f} | Saldo ${float(f['saldo']):,.2f}")
+            saldo = sum(float(f['saldo']) for f in filas)
+            print(f"✅ {args.nit}: {len(filas)} cuentas | Saldo total ${saldo:,.2f}")
+        finally:
+            session.close()
+    elif args.cmd == "reconstruir-resumen-pagos":
+        from app.resumen_pagos import reconstruir_resumen
+        session = get_session()
+        try:
+            filas = reconstruir_resumen(session, args.nit)
+            print(f"✅ Resumen de pagos reconstruido{' para ' + args.nit if args.nit else ''}: {filas} meses.")
+        finally:
+            session.close()
+    elif args.cmd == "refrescar-cartera":
+        from app.cartera import actualizar_vencidas, reconstruir_cartera
+        session = get_session()
+        try:
+            if args.solo_vencidas:
+                filas = actualizar_vencidas(session)
+                session.commit()
+                print(f"✅ Cartera actualizada: {filas} periodos pasaron a mora.")
+            else:
+                filas = reconstruir_cartera(session, args.nit)
+                print(f"✅ Cartera reconstruida{' para ' + args.nit if args.nit else ''}: {filas} periodos.")
+        finally:
+            session.close()
     elif args.cmd == "generar-liq":
         session = get_session()
         try:
@@ -56,6 +169,28 @@ def main():
             print("Use 'generar-liq' y luego 'app.pdf.generar_pdf_completo' con la data retornada en un script dedicado.")
         finally:
             session.close()
+    elif args.cmd == "trabajador":
+        from app.trabajos import iniciar_trabajadores
+        print(f"Trabajadores iniciados: {args.procesos} (Ctrl+C para detener)")
+        iniciar_trabajadores(args.procesos, args.intervalo, args.una_vez)
+    elif args.cmd == "encolar-lote":
+        from sqlalchemy import text
+        from app.cola_distribuida import encolar_lote
+        session = get_session()
+        try:
+            entidades = []
+            for nit in args.nit:
+                fila = session.execute(text("SELECT nombre FROM entidad WHERE nit = :nit"), {"nit": nit}).fetchone()
+                if fila is None:
+                    print(f"❌ Entidad no encontrada: {nit}")
+                    return
+                entidades.append((nit, fila[0]))
+        finally:
+            session.close()
+        fecha_corte = datetime.strptime(args.fecha_corte, "%Y-%m-%d").date()
+        trabajo_id = encolar_lote(entidades, fecha_corte, corregir=not args.no_corregir,
+                                  motor=args.motor, tam_bloque=args.bloque)
+        print(f"📦 Lote {trabajo_id} encolado: {len(entidades)} entidad(es). Inicie trabajadores con 'trabajador --procesos N'.")
 
 if __name__ == "__main__":
     main()
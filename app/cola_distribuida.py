@@ -0,0 +1,408 @@
+# Lotes distribuidos: ZIP masivo repartido en unidades de trabajo que drenan N trabajadores
+# en M máquinas (python -m app.cli trabajador en cada una, contra la misma BD MySQL)
+# - Un lote es un `trabajo` (tipo lote_distribuido) con items en `trabajo_item`, en tres etapas:
+#     liquidacion (por entidad): liquida cuentas y totales, escribe el consolidado y crea un
+#                                item de render por bloque de pensionados
+#     render (por bloque):       PDFs individuales del bloque, escritos en la carpeta del lote
+#     archivo (por entidad):     arma el ZIP (README, consolidado, PDFs, MANIFEST.json) cuando
+#                                terminó el último bloque
+# - Reclamo con SELECT ... FOR UPDATE SKIP LOCKED en MySQL (cada trabajador salta las filas que
+#   otro está tomando); en SQLite, UPDATE condicionado como en app.trabajos
+#   (scripts/verificar_cola_mysql.py lo comprueba con dos procesos contra MySQL)
+# - Cada item reclamado queda arrendado ARRIENDO_SEGUNDOS; un hilo de latido renueva el
+#   arriendo mientras se ejecuta. Si el trabajador muere, el arriendo vence y otro lo retoma
+#   (hasta _MAX_INTENTOS veces)
+# - Terminar un item es condicional a seguir siendo su dueño: un trabajador que perdió el
+#   arriendo no pisa el resultado del que lo retomó
+# - La carpeta del lote (reportes_liquidacion/.lotes) debe ser compartida entre máquinas
+# - Relojes de las máquinas sincronizados (NTP): arriendos y latidos usan la hora local
+# - La tabla trabajo_item no se crea al arrancar: viene en scripts/init_db.sql y las bases
+#   existentes la reciben con `make db-migrar` (scripts/tabla_trabajo.sql)
+
+import json
+import os
+import shutil
+import traceback
+import zipfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.db import engine, get_session
+from app.models import Trabajo, TrabajoItem
+from app.trabajos import EN_CURSO, FALLIDO, PENDIENTE, TERMINADO, _Latido, _fecha
+from app.zip_lote import DIR_REPORTES, ruta_zip_entidad
+
+TIPO_LOTE = 'lote_distribuido'
+DIR_LOTES = os.path.join(DIR_REPORTES, '.lotes')
+
+ARRIENDO_SEGUNDOS = 120
+_INTERVALO_LATIDO = 20.0
+_MAX_INTENTOS = 3
+TAM_BLOQUE = 50
+
+
+class ArriendoPerdido(RuntimeError):
+    """El arriendo del item venció y otro trabajador lo tomó."""
+
+
+def _bloqueo() -> str:
+    return " FOR UPDATE SKIP LOCKED" if engine.dialect.name == 'mysql' else ""
+
+
+def _dir_entidad(trabajo_id: int, nit: str) -> str:
+    return os.path.join(DIR_LOTES, str(trabajo_id), str(nit))
+
+
+def _escribir_atomico(ruta: str, contenido: bytes):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def _nuevo_item(s, trabajo_id: int, etapa: str, clave: str, nit: str, parametros: dict):
+    s.add(TrabajoItem(
+        trabajo_id=trabajo_id, etapa=etapa, clave=clave, nit_entidad=str(nit),
+        parametros=json.dumps(parametros, default=str), estado=PENDIENTE,
+        intentos=0, pendientes=0, fecha_creacion=datetime.now(),
+    ))
+
+
+# --- Encolar ---
+
+def encolar_lote(entidades: list, fecha_corte, corregir: bool = True, motor: str = 'canvas',
+                 tam_bloque: int = TAM_BLOQUE) -> int:
+    """Crea un lote distribuido para `entidades` [(nit, nombre), ...] y devuelve el id del trabajo.
+
+    Con `corregir=True` (recomendado) reintentar un bloque reutiliza los consecutivos ya
+    asignados en lugar de emitir cuentas nuevas.
+    """
+    entidades = [(str(nit), nombre) for nit, nombre in entidades]
+    parametros = {
+        'entidades': entidades,
+        'fecha_corte': _fecha(fecha_corte).isoformat(),
+        'corregir': bool(corregir),
+        'motor': motor,
+        'tam_bloque': max(1, int(tam_bloque)),
+    }
+    with get_session() as s:
+        trabajo = Trabajo(
+            tipo=TIPO_LOTE,
+            parametros=json.dumps(parametros),
+            estado=EN_CURSO,  # lo avanzan los items; la cola de trabajos completos no lo toma
+            hechas=0,
+            total=len(entidades),  # items creados; crece a medida que cada etapa crea sucesores
+            mensaje='En cola',
+            fecha_creacion=datetime.now(),
+            fecha_inicio=datetime.now(),
+        )
+        s.add(trabajo)
+        s.flush()
+        for nit, nombre in entidades:
+            _nuevo_item(s, trabajo.trabajo_id, 'liquidacion', nit, nit, {'nit': nit, 'nombre': nombre})
+        s.commit()
+        return trabajo.trabajo_id
+
+
+# --- Reclamo, latido y cierre ---
+
+def _fallar_vencidos(s, ahora: datetime):
+    """Items cuyo arriendo venció sin intentos restantes: fallan junto con su lote."""
+    vencidos = s.execute(text(
+        "SELECT item_id, trabajo_id, trabajador FROM trabajo_item "
+        "WHERE estado = :c AND arriendo_hasta < :ahora AND intentos >= :max"
+    ), {"c": EN_CURSO, "ahora": ahora, "max": _MAX_INTENTOS}).fetchall()
+    for item_id, trabajo_id, trabajador in vencidos:
+        _fallar(s, item_id, trabajo_id, "Arriendo vencido sin intentos restantes", None, trabajador=trabajador)
+
+
+def tomar_item(nombre_trabajador: str) -> TrabajoItem | None:
+    """Reclama el item disponible más antiguo (pendiente o con arriendo vencido)."""
+    with get_session() as s:
+        ahora = datetime.now()
+        _fallar_vencidos(s, ahora)
+        s.commit()
+        condicion = ("(estado = :p OR (estado = :c AND arriendo_hasta < :ahora)) AND intentos < :max")
+        params = {"p": PENDIENTE, "c": EN_CURSO, "ahora": ahora, "max": _MAX_INTENTOS}
+        candidatos = s.execute(text(
+            f"SELECT item_id FROM trabajo_item WHERE {condicion} ORDER BY item_id "
+            f"LIMIT {1 if _bloqueo() else 10}{_bloqueo()}"
+        ), params).scalars().all()
+        for item_id in candidatos:
+            res = s.execute(text(
+                "UPDATE trabajo_item SET estado = :c, trabajador = :w, intentos = intentos + 1, "
+                "fecha_inicio = :ahora, latido = :ahora, arriendo_hasta = :hasta, error = NULL "
+                f"WHERE item_id = :id AND {condicion}"
+            ), {**params, "w": nombre_trabajador, "hasta": ahora + timedelta(seconds=ARRIENDO_SEGUNDOS), "id": item_id})
+            s.commit()
+            if res.rowcount == 1:
+                item = s.get(TrabajoItem, item_id)
+                s.expunge(item)
+                return item
+    return None
+
+
+def _fallar(s, item_id: int, trabajo_id: int, mensaje: str, error: str | None,
+            trabajador: str | None = None) -> bool:
+    """Falla el item y cancela su lote. Con `trabajador`, solo si el item sigue siendo suyo y
+    EN_CURSO: quien perdió el arriendo no cancela el lote del trabajador que lo retomó.
+    Devuelve False si no falló nada."""
+    ahora = datetime.now()
+    condicion = "item_id = :id" + (" AND trabajador = :w AND estado = :c" if trabajador else "")
+    res = s.execute(text(
+        f"UPDATE trabajo_item SET estado = :f, error = :e, fecha_fin = :ahora WHERE {condicion}"
+    ), {"f": FALLIDO, "e": error or mensaje, "ahora": ahora, "id": item_id, "w": trabajador, "c": EN_CURSO})
+    if res.rowcount != 1:
+        return False
+    # El resto del lote se cancela: sin ese item no hay ZIP completo de la entidad
+    s.execute(text(
+        "UPDATE trabajo_item SET estado = :f, error = 'Lote cancelado', fecha_fin = :ahora "
+        "WHERE trabajo_id = :t AND estado = :p"
+    ), {"f": FALLIDO, "ahora": ahora, "t": trabajo_id, "p": PENDIENTE})
+    s.execute(text(
+        "UPDATE trabajo SET estado = :f, mensaje = :m, error = :e, fecha_fin = :ahora WHERE trabajo_id = :t"
+    ), {"f": FALLIDO, "m": mensaje[:255], "e": error, "ahora": ahora, "t": trabajo_id})
+    return True
+
+
+def _terminar(item: TrabajoItem, resultado: dict, sucesores: list) -> bool:
+    """Cierra el item, crea sus sucesores y suma el avance del lote en una transacción.
+
+    Devuelve False si el item ya no era de este trabajador (arriendo perdido) o si un sucesor
+    chocó con la clave única (el item queda FALLIDO).
+    """
+    ahora = datetime.now()
+    p = json.loads(item.parametros)
+    with get_session() as s:
+        # El item de liquidación guarda cuántos bloques de render quedan por terminar
+        res = s.execute(text(
+            "UPDATE trabajo_item SET estado = :t, resultado = :r, fecha_fin = :ahora, pendientes = :n "
+            "WHERE item_id = :id AND trabajador = :w AND estado = :c"
+        ), {"t": TERMINADO, "r": json.dumps(resultado, default=str), "ahora": ahora,
+            "n": sum(1 for etapa, *_ in sucesores if etapa == 'render'),
+            "id": item.item_id, "w": item.trabajador, "c": EN_CURSO})
+        if res.rowcount != 1:
+            s.rollback()
+            return False
+
+        if item.etapa == 'render':
+            # El UPDATE bloquea la fila del item de liquidación: solo el último bloque en
+            # terminar ve el contador en cero y crea el item de archivo
+            padre = {"t": item.trabajo_id, "e": 'liquidacion', "k": item.nit_entidad}
+            s.execute(text(
+                "UPDATE trabajo_item SET pendientes = pendientes - 1 "
+                "WHERE trabajo_id = :t AND etapa = :e AND clave = :k"
+            ), padre)
+            quedan = s.execute(text(
+                "SELECT pendientes FROM trabajo_item WHERE trabajo_id = :t AND etapa = :e AND clave = :k"
+            ), padre).scalar()
+            if quedan == 0:
+                sucesores = sucesores + [('archivo', item.nit_entidad, {'nit': p['nit'], 'nombre': p['nombre']})]
+
+        try:
+            for etapa, clave, parametros in sucesores:
+                _nuevo_item(s, item.trabajo_id, etapa, clave, item.nit_entidad, parametros)
+            s.flush()
+        except IntegrityError as e:
+            # Ya existe un sucesor con la misma clave: cerrar el item duplicaría trabajo. Se
+            # revierte todo y el item falla (con su lote) en lugar de quedar EN_CURSO hasta
+            # que venza el arriendo y otro trabajador repita el mismo choque
+            s.rollback()
+            _fallar(s, item.item_id, item.trabajo_id, f"{item.etapa} {item.clave}: sucesor duplicado"[:255],
+                    str(e.orig), trabajador=item.trabajador)
+            s.commit()
+            return False
+
+        s.execute(text(
+            "UPDATE trabajo SET hechas = hechas + 1, total = total + :n, mensaje = :m WHERE trabajo_id = :t"
+        ), {"n": len(sucesores), "m": f"{item.etapa} {item.clave} terminado", "t": item.trabajo_id})
+        if item.etapa == 'archivo':
+            s.execute(text("UPDATE trabajo SET resultado_ruta = :r WHERE trabajo_id = :t"),
+                      {"r": resultado['ruta'], "t": item.trabajo_id})
+        hechas, total = s.execute(text(
+            "SELECT hechas, total FROM trabajo WHERE trabajo_id = :t"
+        ), {"t": item.trabajo_id}).one()
+        if hechas >= total:
+            zips = s.execute(text(
+                "SELECT COUNT(*) FROM trabajo_item WHERE trabajo_id = :t AND etapa = 'archivo'"
+            ), {"t": item.trabajo_id}).scalar()
+            # Con varias entidades no hay un único archivo: los ZIPs quedan en sus carpetas
+            s.execute(text(
+                "UPDATE trabajo SET estado = :e, mensaje = :m, fecha_fin = :ahora"
+                f"{'' if zips == 1 else ', resultado_ruta = NULL'} WHERE trabajo_id = :t"
+            ), {"e": TERMINADO, "m": f"{zips} ZIP(s) generados en {DIR_REPORTES}", "ahora": ahora, "t": item.trabajo_id})
+        s.commit()
+    return True
+
+
+# --- Etapas ---
+# Cada una recibe (item, parametros del lote, parametros del item, avance) y devuelve
+# (resultado, sucesores); sucesores = [(etapa, clave, parametros), ...]. avance() debe
+# llamarse seguido: interrumpe la etapa si el arriendo se perdió
+
+def _etapa_liquidacion(item, lote: dict, p: dict, avance):
+    from app.paquete_entidad import _completar_totales_cuentas, construir_todas_cuentas_min, escribir_pdf_consolidado
+    fecha_corte = _fecha(lote['fecha_corte'])
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte)
+    finally:
+        session.close()
+    _completar_totales_cuentas(todas, fecha_corte)
+    avance()
+
+    carpeta = _dir_entidad(item.trabajo_id, p['nit'])
+    os.makedirs(carpeta, exist_ok=True)
+    tmp = os.path.join(carpeta, f"consolidado.pdf.{os.getpid()}.tmp")
+    nombre_consolidado = escribir_pdf_consolidado(tmp, p['nit'], p['nombre'], todas, fecha_corte)
+    os.replace(tmp, os.path.join(carpeta, 'consolidado.pdf'))
+
+    ids = [str(x['pensionado']['cedula']) for x in todas]
+    tam = lote['tam_bloque']
+    bloques = [ids[i:i + tam] for i in range(0, len(ids), tam)]
+    resultado = {
+        'consolidado': nombre_consolidado,
+        'pensionados': len(ids),
+        'cuentas': sum(len(x['cuentas']) for x in todas),
+    }
+    sucesores = [('render', f"{p['nit']}:{k}", {**p, 'bloque': k, 'identificaciones': b}) for k, b in enumerate(bloques)]
+    if not bloques:
+        # Sin pensionados no hay bloques: se archiva de una vez
+        sucesores.append(('archivo', p['nit'], p))
+    return resultado, sucesores
+
+
+def _etapa_render(item, lote: dict, p: dict, avance):
+    from generar_pdf_oficial import OpcionesRender
+    from app.contexto_render import obtener_contexto
+    from app.paquete_entidad import construir_todas_cuentas_min, renderizar_cuentas
+    from app.pdf_cache import CachePDF
+    from app.render_canvas import PlantillasCuentaCobro
+
+    fecha_corte = _fecha(lote['fecha_corte'])
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte, identificaciones=p['identificaciones'])
+    finally:
+        session.close()
+
+    carpeta = os.path.join(_dir_entidad(item.trabajo_id, p['nit']), 'pdfs')
+    archivos = []
+
+    def _a_disco(carpeta_pensionado, nombre_archivo, contenido, meta):
+        relativa = os.path.join(carpeta_pensionado, str(meta['periodo_inicio'].year), nombre_archivo)
+        _escribir_atomico(os.path.join(carpeta, relativa), contenido)
+        archivos.append({'ruta': relativa, 'meta': meta})
+        return relativa
+
+    motor = lote.get('motor', 'canvas')
+    opciones = OpcionesRender(
+        correccion=bool(lote.get('corregir', True)),
+        fecha_corte=fecha_corte,
+        destino=_a_disco,
+        motor=motor,
+        cache=CachePDF(),
+        plantillas=PlantillasCuentaCobro(obtener_contexto()) if motor == 'canvas' else None,
+    )
+    errores = []
+    renderizar_cuentas(p['nit'], p['nombre'], todas, opciones, errores, lambda hechas, total: avance())
+    return {'archivos': archivos, 'errores': errores}, []
+
+
+def _etapa_archivo(item, lote: dict, p: dict, avance):
+    from app.paquete_entidad import carpeta_zip_entidad, generar_readme_texto
+    from app.zip_manifiesto import ZipConManifiesto
+
+    fecha_corte = _fecha(lote['fecha_corte'])
+    with get_session() as s:
+        filas = s.execute(text(
+            "SELECT etapa, resultado FROM trabajo_item WHERE trabajo_id = :t AND nit_entidad = :n "
+            "AND etapa IN ('liquidacion', 'render') ORDER BY item_id"
+        ), {"t": item.trabajo_id, "n": p['nit']}).fetchall()
+    liquidacion = next(json.loads(r) for e, r in filas if e == 'liquidacion')
+    bloques = [json.loads(r) for e, r in filas if e == 'render']
+
+    carpeta = _dir_entidad(item.trabajo_id, p['nit'])
+    top_dir = carpeta_zip_entidad(p['nit'], p['nombre'])
+    ruta = ruta_zip_entidad(p['nit'], p['nombre'], fecha_corte)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    errores = [e for b in bloques for e in b['errores']]
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zip_archivo, ZipConManifiesto(zip_archivo) as zf:
+        zf.writestr(f"{top_dir}/README.txt", generar_readme_texto(
+            p['nit'], liquidacion['pensionados'], liquidacion['cuentas'], p['nombre']))
+        zf.write(os.path.join(carpeta, 'consolidado.pdf'), f"{top_dir}/{liquidacion['consolidado']}")
+        for b in bloques:
+            for a in b['archivos']:
+                zf.write(os.path.join(carpeta, 'pdfs', a['ruta']), f"{top_dir}/{a['ruta']}", meta=a['meta'])
+                avance()
+        if errores:
+            zf.writestr(f"{top_dir}/error_log.txt", "".join(errores))
+        zf.escribir_manifiesto(f"{top_dir}/MANIFEST.json", nit=p['nit'], nombre=p['nombre'],
+                               fecha_corte=fecha_corte.isoformat())
+    os.replace(tmp, ruta)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(carpeta))
+    except OSError:
+        pass  # otras entidades del lote siguen en curso
+    return {'ruta': ruta, 'bytes': os.path.getsize(ruta), 'errores': len(errores)}, []
+
+
+ETAPAS = {
+    'liquidacion': _etapa_liquidacion,
+    'render': _etapa_render,
+    'archivo': _etapa_archivo,
+}
+
+
+def ejecutar_item(item: TrabajoItem):
+    """Ejecuta un item ya reclamado con latido de arriendo; deja su estado final en la BD."""
+    latido = _Latido(
+        f"latido-{item.item_id}",
+        "UPDATE trabajo_item SET latido = :ahora, arriendo_hasta = :hasta "
+        "WHERE item_id = :id AND trabajador = :w AND estado = :c",
+        {"id": item.item_id, "w": item.trabajador, "c": EN_CURSO},
+        _INTERVALO_LATIDO, ARRIENDO_SEGUNDOS,
+    )
+    latido.start()
+
+    def avance():
+        if latido.perdido:
+            raise ArriendoPerdido(f"Item {item.item_id}: arriendo perdido")
+
+    try:
+        with get_session() as s:
+            lote = json.loads(s.get(Trabajo, item.trabajo_id).parametros)
+        resultado, sucesores = ETAPAS[item.etapa](item, lote, json.loads(item.parametros), avance)
+        _terminar(item, resultado, sucesores)
+    except ArriendoPerdido:
+        pass
+    except Exception as e:
+        with get_session() as s:
+            if item.intentos >= _MAX_INTENTOS:
+                _fallar(s, item.item_id, item.trabajo_id, f"{item.etapa} {item.clave}: {e}"[:255],
+                        traceback.format_exc(), trabajador=item.trabajador)
+            else:
+                # Vuelve a la cola para otro intento (en este u otro trabajador)
+                s.execute(text(
+                    "UPDATE trabajo_item SET estado = :p, error = :e, trabajador = NULL, arriendo_hasta = NULL "
+                    "WHERE item_id = :id AND trabajador = :w AND estado = :c"
+                ), {"p": PENDIENTE, "e": traceback.format_exc(), "id": item.item_id, "w": item.trabajador, "c": EN_CURSO})
+            s.commit()
+    finally:
+        latido.parar()
+
+
+def avance_lote(trabajo_id: int) -> dict:
+    """Items del lote por etapa y estado: {'render': {'TERMINADO': 3, 'EN_CURSO': 2}, ...}."""
+    with get_session() as s:
+        filas = s.execute(text(
+            "SELECT etapa, estado, COUNT(*) FROM trabajo_item WHERE trabajo_id = :t GROUP BY etapa, estado"
+        ), {"t": trabajo_id}).fetchall()
+    resumen = {}
+    for etapa, estado, n in filas:
+        resumen.setdefault(etapa, {})[estado] = n
+    return resumen
@@ -0,0 +1,63 @@
+# Contadores compartidos en la base de datos (tabla contador)
+# - Una fila por contador. siguiente() la incrementa con UPDATE y lee el valor nuevo en la misma
+#   transacción: el bloqueo de fila serializa a los procesos (y máquinas) que piden un número a
+#   la vez, y cada uno recibe uno distinto
+# - CONSOLIDADO numera las cuentas de cobro consolidadas por entidad ("No." del PDF consolidado).
+#   Antes vivía en ultimo_consecutivo.txt en la carpeta de trabajo de cada proceso; si la fila
+#   aún no existe se crea continuando desde ese archivo (una sola vez)
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.db import get_session
+
+CONSOLIDADO = 'cuenta_consolidada'
+
+ARCHIVO_CONSOLIDADO = 'ultimo_consecutivo.txt'
+_INICIAL_CONSOLIDADO = 423
+
+
+def _valor_inicial(nombre: str) -> int:
+    if nombre != CONSOLIDADO:
+        return 0
+    try:
+        with open(ARCHIVO_CONSOLIDADO, 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except Exception:
+        return _INICIAL_CONSOLIDADO
+
+
+def siguiente(nombre: str, session=None) -> int:
+    """Incrementa el contador `nombre` y devuelve el valor nuevo.
+
+    Sin `session` usa una propia y confirma; con `session` corre en la transacción de quien
+    llama (el número queda reservado al confirmarla).
+    """
+    if session is None:
+        with get_session() as s:
+            valor = siguiente(nombre, s)
+            s.commit()
+            return valor
+    for _ in range(2):
+        if session.execute(text("UPDATE contador SET valor = valor + 1 WHERE nombre = :n"), {"n": nombre}).rowcount:
+            return session.execute(text("SELECT valor FROM contador WHERE nombre = :n"), {"n": nombre}).scalar()
+        # Primera vez: se crea la fila; si otro proceso la creó antes, se vuelve a incrementar
+        try:
+            with session.begin_nested():
+                session.execute(text("INSERT INTO contador (nombre, valor) VALUES (:n, :v)"),
+                                {"n": nombre, "v": _valor_inicial(nombre)})
+        except IntegrityError:
+            pass
+    raise RuntimeError(f"No se pudo incrementar el contador {nombre}")
+
+
+def valor_actual(session, nombre: str) -> int | None:
+    """Último número entregado por el contador, o None si nunca se usó."""
+    return session.execute(text("SELECT valor FROM contador WHERE nombre = :n"), {"n": nombre}).scalar()
+
+
+def reiniciar(session, nombre: str, valor: int = 0):
+    """Deja el contador en `valor` (el siguiente número será valor + 1). No confirma."""
+    if not session.execute(text("UPDATE contador SET valor = :v WHERE nombre = :n"),
+                           {"n": nombre, "v": valor}).rowcount:
+        session.execute(text("INSERT INTO contador (nombre, valor) VALUES (:n, :v)"), {"n": nombre, "v": valor})
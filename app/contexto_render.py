@@ -0,0 +1,270 @@
+# Contexto de render ReportLab compartido por los generadores de PDF
+# - Estilos (getSampleStyleSheet + ParagraphStyle), TableStyle y anchos de columna
+# Se construye una sola vez por proceso y se reutiliza en miles de documentos.
+
+from functools import lru_cache
+from types import SimpleNamespace
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm, inch
+from reportlab.platypus import TableStyle
+
+
+class ContextoRender:
+    """Objetos de layout inmutables para los PDFs de cuentas de cobro.
+
+    Todo lo que aquí se construye es de solo lectura durante el render, por lo que una
+    misma instancia puede compartirse entre hilos. Usar `obtener_contexto()` para la
+    instancia del proceso.
+    """
+
+    def __init__(self):
+        self.styles = getSampleStyleSheet()
+        self.oficial = self._contexto_oficial()
+        self.consolidado = self._contexto_consolidado()
+        self.consolidado_memoria = self._contexto_consolidado_memoria()
+
+    def _contexto_oficial(self) -> SimpleNamespace:
+        """Cuenta de cobro individual (generar_pdf_oficial)."""
+        normal = self.styles['Normal']
+        negrita_derecha = ParagraphStyle('TotalNum', parent=normal, fontName='Helvetica-Bold', fontSize=7, alignment=TA_RIGHT)
+        return SimpleNamespace(
+            # Estilo para encabezado y para cuenta de cobro (alineado a la derecha)
+            encabezado=ParagraphStyle('EncabezadoCustom', parent=normal, fontSize=12, spaceAfter=8,
+                                      alignment=TA_LEFT, textColor=colors.black, fontName='Helvetica-Bold'),
+            cuenta_cobro=ParagraphStyle('CuentaCobroCustom', parent=normal, fontSize=12, spaceAfter=8,
+                                        alignment=TA_RIGHT, textColor=colors.black, fontName='Helvetica-Bold'),
+            titulo_intereses=ParagraphStyle('TituloIntereses', parent=normal, fontSize=8, alignment=TA_CENTER,
+                                            fontName='Helvetica-Bold'),
+            # Cabeceras con texto ajustado y celdas de datos
+            header=ParagraphStyle('HeaderStyle', parent=normal, fontSize=7, fontName='Helvetica-Bold',
+                                  alignment=TA_CENTER, leading=8, spaceAfter=0, spaceBefore=0),
+            data_left=ParagraphStyle('DataLeft', parent=normal, fontSize=6, fontName='Helvetica', alignment=TA_LEFT, leading=7),
+            data_center=ParagraphStyle('DataCenter', parent=normal, fontSize=6, fontName='Helvetica', alignment=TA_CENTER, leading=7),
+            data_right=ParagraphStyle('DataRight', parent=normal, fontSize=6, fontName='Helvetica', alignment=TA_RIGHT, leading=7),
+            total_hdr=ParagraphStyle('TotalHdr', parent=normal, fontName='Helvetica-Bold', fontSize=7, alignment=TA_CENTER),
+            total_num=negrita_derecha,
+            tabla_encabezado=TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('LEFTPADDING', (0, 0), (-1, -1), 0),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+                ('TOPPADDING', (0, 0), (-1, -1), 0),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+            ]),
+            tabla_superior=TableStyle([
+                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('LEFTPADDING', (0, 0), (-1, -1), 4),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+                ('TOPPADDING', (0, 0), (-1, -1), 2),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ]),
+            tabla_resumen=TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('BACKGROUND', (2, 1), (2, 1), colors.green),  # Estado en posición 2
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 7),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 7),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('LEFTPADDING', (0, 0), (-1, -1), 3),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+                ('TOPPADDING', (0, 0), (-1, -1), 2),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ]),
+            tabla_intereses=TableStyle([
+                # Cabecera
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 4),
+                ('TOPPADDING', (0, 0), (-1, 0), 4),
+                # Datos
+                ('BACKGROUND', (0, 1), (-1, -2), colors.white),
+                ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
+                ('VALIGN', (0, 1), (-1, -2), 'MIDDLE'),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
+                # Fila de totales
+                ('BACKGROUND', (0, -1), (-1, -1), colors.white),
+                ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
+                ('VALIGN', (0, -1), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, -1), (-1, -1), 4),
+                ('BOTTOMPADDING', (0, -1), (-1, -1), 4),
+                # Bordes
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),
+                ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
+                # Padding general reducido
+                ('LEFTPADDING', (0, 0), (-1, -1), 2),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+                ('TOPPADDING', (0, 1), (-1, -2), 2),
+                ('BOTTOMPADDING', (0, 1), (-1, -2), 2),
+            ]),
+            anchos_encabezado=[7*cm, 7*cm],
+            # Ancho total de la tabla superior = ancho de las otras tablas (14cm)
+            anchos_superior=[3*cm, 11*cm],
+            anchos_resumen=[2.3*cm, 2.3*cm, 2.3*cm, 2.3*cm, 2.4*cm, 2.4*cm],
+            anchos_intereses=[2.5*cm, 2.5*cm, 1.2*cm, 1.8*cm, 2.3*cm, 2.7*cm],
+        )
+
+    def _contexto_consolidado(self) -> SimpleNamespace:
+        """Cuenta de cobro consolidada por entidad (generar_pdf_consolidado)."""
+        normal = self.styles['Normal']
+        tabla = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.8, colors.black),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.92, 0.92, 0.92)),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            # Encabezados
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 8.5),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            # Filas
+            ('FONTSIZE', (0, 1), (-1, -2), 8),
+            ('ALIGN', (0, 1), (0, -2), 'RIGHT'),   # Cédula
+            ('ALIGN', (1, 1), (1, -2), 'LEFT'),    # Nombres
+            ('ALIGN', (2, 1), (3, -2), 'CENTER'),  # Ingreso y Resolución
+            ('ALIGN', (4, 1), (-1, -2), 'RIGHT'),  # Valores y porcentajes
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.Color(0.97, 0.97, 0.97)]),
+            # Totales (última fila)
+            ('FONTNAME', (5, -1), (5, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (6, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (5, -1), (-1, -1), 9),
+            ('ALIGN', (6, -1), (-1, -1), 'RIGHT'),
+            # Padding fino
+            ('LEFTPADDING', (0, 0), (-1, -1), 2),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ])
+        return SimpleNamespace(
+            left_bold=ParagraphStyle('leftBold', parent=normal, fontName='Helvetica-Bold', alignment=TA_LEFT, fontSize=11),
+            right_bold=ParagraphStyle('rightBold', parent=normal, fontName='Helvetica-Bold', alignment=TA_RIGHT, fontSize=11),
+            center_title=ParagraphStyle('centerTitle', parent=self.styles['Heading1'], fontName='Helvetica-Bold',
+                                        alignment=TA_CENTER, fontSize=14, spaceAfter=4),
+            center=ParagraphStyle('center', parent=normal, alignment=TA_CENTER, fontSize=12, spaceAfter=2),
+            normal=ParagraphStyle('normal', parent=normal, fontSize=9, alignment=TA_LEFT, leading=12),
+            normal_bold=ParagraphStyle('normalBold', parent=normal, fontSize=9, alignment=TA_LEFT, leading=12,
+                                       fontName='Helvetica-Bold'),
+            header=ParagraphStyle('header', parent=normal, fontName='Helvetica-Bold', alignment=TA_CENTER, fontSize=8),
+            tabla_encabezado=TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('LEFTPADDING', (0, 0), (-1, -1), 0),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ]),
+            tabla=tabla,
+            # Páginas de un listado largo: fila "Subtotal" (penúltima) con el mismo formato que TOTAL
+            tabla_subtotales=TableStyle([
+                ('BACKGROUND', (0, -2), (-1, -2), colors.white),
+                ('FONTNAME', (5, -2), (-1, -2), 'Helvetica-Bold'),
+                ('FONTSIZE', (5, -2), (-1, -2), 9),
+                ('ALIGN', (5, -2), (5, -2), 'LEFT'),
+            ], parent=tabla),
+            anchos_encabezado=[8*cm, 8*cm],
+            # Ajuste fino de anchos (suman ~19cm para márgenes de 1cm a cada lado)
+            anchos=[2.0*cm, 4.2*cm, 1.8*cm, 2.0*cm, 1.5*cm, 2.0*cm, 2.0*cm, 1.8*cm, 1.7*cm],
+        )
+
+    def _contexto_consolidado_memoria(self) -> SimpleNamespace:
+        """PDF consolidado del botón "📄 PDF Consolidado" (app.paquete_entidad.generar_pdf_consolidado_en_memoria)."""
+        normal = self.styles['Normal']
+        small_right = ParagraphStyle('SmallRight', parent=normal, fontSize=8, alignment=TA_RIGHT)
+        small_center = ParagraphStyle('SmallCenter', parent=normal, fontSize=8, alignment=TA_CENTER)
+        light_header = colors.Color(0.94, 0.94, 0.94)
+        light_row = colors.Color(0.985, 0.985, 0.985)
+        tabla_pensionados = TableStyle([
+            # Encabezado gris claro, tipografía consistente y centrado
+            ('BACKGROUND', (0, 0), (-1, 0), light_header),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 8.5),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+            # Filas: tamaño discreto, alineaciones refinadas como el ejemplo
+            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -2), 8),
+            ('ALIGN', (0, 1), (0, -2), 'RIGHT'),   # Cédula
+            ('ALIGN', (1, 1), (1, -2), 'LEFT'),    # Nombres
+            ('ALIGN', (2, 1), (3, -2), 'CENTER'),  # Ingreso nómina y Resolución
+            ('ALIGN', (4, 1), (-1, -2), 'RIGHT'),  # % y valores
+            ('VALIGN', (0, 1), (-1, -2), 'MIDDLE'),
+            # Alternancia muy sutil para elegancia (casi blanco)
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, light_row]),
+            # Fila de totales (última): énfasis en negrita y línea superior separadora
+            ('BACKGROUND', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (5, -1), (5, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (6, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (5, -1), (-1, -1), 9),
+            ('ALIGN', (6, -1), (-1, -1), 'RIGHT'),
+            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+            # Grid delgado y paddings ajustados
+            ('GRID', (0, 0), (-1, -1), 0.8, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('LEFTPADDING', (0, 0), (-1, -1), 2),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+        ])
+        return SimpleNamespace(
+            title=ParagraphStyle('CustomTitle', parent=self.styles['Heading1'], fontSize=16, spaceAfter=8,
+                                 alignment=TA_CENTER, fontName='Helvetica-Bold'),
+            normal=normal,
+            normal_left_bold=ParagraphStyle('NormalLeftBold', parent=normal, fontSize=10, alignment=TA_LEFT,
+                                            fontName='Helvetica-Bold'),
+            subtitle_pensionado=ParagraphStyle('SubPens', parent=self.styles['Heading2'], fontSize=12, spaceAfter=4,
+                                               alignment=TA_LEFT, fontName='Helvetica-Bold'),
+            small_right=small_right,
+            small_center=small_center,
+            small_bold_center=ParagraphStyle('SmallBoldCenter', parent=small_center, fontName='Helvetica-Bold'),
+            small_bold_right=ParagraphStyle('SmallBoldRight', parent=small_right, fontName='Helvetica-Bold'),
+            tabla_ciudad=TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 14),
+                ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+                ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]),
+            tabla_numero=TableStyle([
+                ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (1, 0), (1, 0), 14),
+                ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+            ]),
+            tabla_pensionados=tabla_pensionados,
+            # Páginas de un listado largo: fila "Subtotal" (penúltima) con el mismo formato que TOTAL
+            tabla_pensionados_subtotales=TableStyle([
+                ('BACKGROUND', (0, -2), (-1, -2), colors.white),
+                ('FONTNAME', (0, -2), (4, -2), 'Helvetica'),
+                ('FONTSIZE', (0, -2), (4, -2), 10),
+                ('ALIGN', (3, -2), (3, -2), 'LEFT'),
+                ('FONTNAME', (5, -2), (5, -2), 'Helvetica-Bold'),
+                ('FONTNAME', (6, -2), (-1, -2), 'Helvetica-Bold'),
+                ('FONTSIZE', (5, -2), (-1, -2), 9),
+                ('LINEABOVE', (0, -2), (-1, -2), 1, colors.black),
+            ], parent=tabla_pensionados),
+            tabla_detalle=TableStyle([
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 2),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ]),
+            anchos_ciudad=[4*inch, 3*inch],
+            # Pesos relativos por columna de la tabla de pensionados (proporciones estables)
+            pesos_pensionados=[1.0, 2.2, 0.8, 0.9, 0.6, 0.8, 0.8, 0.8, 0.8],
+            anchos_detalle=[0.5*inch, 1.2*inch, 1.2*inch, 1.1*inch, 1.2*inch],
+        )
+
+
+@lru_cache(maxsize=1)
+def obtener_contexto() -> ContextoRender:
+    """Retorna el ContextoRender del proceso (se construye en el primer uso)."""
+    return ContextoRender()
@@ -0,0 +1,140 @@
+# Corridas reanudables de generación masiva
+# - Cada corrida tiene un id (dado por quien la lanza o generado) y una fila por unidad terminada
+#   en `corrida_punto`: pensionado + periodo (ZIP masivo) o pensionado (lote --nit de
+#   generar_pdf_oficial), con su consecutivo, el archivo y sus metadatos
+# - Repetir la corrida con el mismo id omite lo que ya tiene punto de control; lo que quedó a
+#   medias reutiliza el consecutivo que alcanzó a registrar en cuenta_cobro
+#   (OpcionesRender.reusar_desde), de modo que reanudar no emite cuentas nuevas
+# - Archivo parcial: los PDFs de la corrida se acumulan en reportes_liquidacion/.corridas/<id>
+#   y el ZIP se arma al final desde ahí. Un ZIP al que se le estaba agregando cuando murió el
+#   proceso queda sin directorio central y no se puede reabrir; una carpeta sí
+# - Tablas corrida y corrida_punto: scripts/init_db.sql en bases nuevas, `make db-migrar`
+#   (scripts/tablas_corrida.sql) en las existentes
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.db import get_session
+from app.models import Corrida, CorridaPunto
+from app.zip_lote import DIR_REPORTES
+
+DIR_CORRIDAS = os.path.join(DIR_REPORTES, '.corridas')
+
+EN_CURSO = 'EN_CURSO'
+TERMINADA = 'TERMINADA'
+
+CLAVE_CONSOLIDADO = 'CONSOLIDADO'
+
+
+def nuevo_id(nit: str) -> str:
+    return f"{nit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+class PuntosControl:
+    """Puntos de control de una corrida: la crea si no existe o la retoma si ya existe.
+
+    `reanudada` indica si había una corrida previa con ese id; `inicio` es su fecha de inicio
+    original (para OpcionesRender.reusar_desde). Retomar una corrida TERMINADA es un error:
+    su carpeta parcial ya se borró.
+    """
+
+    def __init__(self, corrida_id: str, tipo: str, nit: str, parametros: dict | None = None,
+                 base_dir: str = DIR_CORRIDAS):
+        self.corrida_id = str(corrida_id)
+        self.carpeta = os.path.join(base_dir, self.corrida_id)
+        with get_session() as s:
+            corrida = s.get(Corrida, self.corrida_id)
+            if corrida is None:
+                corrida = Corrida(
+                    corrida_id=self.corrida_id,
+                    tipo=tipo,
+                    nit_entidad=str(nit),
+                    parametros=json.dumps(parametros or {}, default=str),
+                    estado=EN_CURSO,
+                    # Sin fracción: DATETIME de MySQL la redondea y reusar_desde compara contra ella
+                    fecha_inicio=datetime.now().replace(microsecond=0),
+                )
+                s.add(corrida)
+                s.commit()
+                self.reanudada = False
+            else:
+                if corrida.tipo != tipo or corrida.nit_entidad != str(nit):
+                    raise ValueError(f"La corrida {self.corrida_id} es de otro tipo o entidad "
+                                     f"({corrida.tipo}, NIT {corrida.nit_entidad})")
+                if corrida.estado == TERMINADA:
+                    raise ValueError(f"La corrida {self.corrida_id} ya terminó; use otro id")
+                self.reanudada = True
+            self.inicio = corrida.fecha_inicio
+            filas = s.execute(text(
+                "SELECT clave, consecutivo, archivo, meta FROM corrida_punto "
+                "WHERE corrida_id = :c ORDER BY orden"
+            ), {"c": self.corrida_id}).fetchall()
+        self._puntos = {
+            clave: {'clave': clave, 'consecutivo': consecutivo, 'archivo': archivo,
+                    'meta': json.loads(meta) if meta else None}
+            for clave, consecutivo, archivo, meta in filas
+        }
+
+    @staticmethod
+    def clave(identificacion, año: int | None = None, mes: int | None = None) -> str:
+        if año is None:
+            return str(identificacion)
+        return f"{identificacion}:{int(año):04d}-{int(mes):02d}"
+
+    def hecha(self, identificacion, año: int | None = None, mes: int | None = None) -> bool:
+        return self.clave(identificacion, año, mes) in self._puntos
+
+    def punto(self, clave: str) -> dict | None:
+        return self._puntos.get(clave)
+
+    def puntos(self) -> list:
+        """Puntos de control en el orden en que se registraron."""
+        return list(self._puntos.values())
+
+    def ruta(self, relativa: str) -> str:
+        return os.path.join(self.carpeta, relativa)
+
+    def guardar(self, relativa: str, contenido: bytes) -> str:
+        """Escribe un archivo del parcial (atómico: nunca queda uno a medias con el nombre final)."""
+        ruta = self.ruta(relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+        return ruta
+
+    def registrar(self, puntos: list):
+        """Registra en una transacción los puntos [{clave, consecutivo, archivo, meta}, ...]."""
+        nuevos = [p for p in puntos if p['clave'] not in self._puntos]
+        if not nuevos:
+            return
+        ahora = datetime.now()
+        orden = len(self._puntos)
+        with get_session() as s:
+            s.execute(text(
+                "INSERT INTO corrida_punto (corrida_id, clave, orden, consecutivo, archivo, meta, fecha) "
+                "VALUES (:c, :clave, :orden, :consecutivo, :archivo, :meta, :fecha)"
+            ), [
+                {"c": self.corrida_id, "clave": p['clave'], "orden": orden + i, "consecutivo": p.get('consecutivo'),
+                 "archivo": p.get('archivo'), "meta": json.dumps(p['meta'], default=str) if p.get('meta') else None,
+                 "fecha": ahora}
+                for i, p in enumerate(nuevos)
+            ])
+            s.commit()
+        for p in nuevos:
+            self._puntos[p['clave']] = {'clave': p['clave'], 'consecutivo': p.get('consecutivo'),
+                                        'archivo': p.get('archivo'), 'meta': p.get('meta')}
+
+    def terminar(self):
+        """Marca la corrida TERMINADA y borra su carpeta parcial."""
+        with get_session() as s:
+            s.execute(text(
+                "UPDATE corrida SET estado = :e, fecha_fin = :ahora WHERE corrida_id = :c"
+            ), {"e": TERMINADA, "ahora": datetime.now(), "c": self.corrida_id})
+            s.commit()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
@@ -4,19 +4,32 @@
 #   * pensionado (Identificacion, Nombre, Estado cartera, etc.)
 #   * DTF mensual (Tasa de Depósitos a Término Fijo (DTF) a 90 días, mensual)
 #   * IPC anual (Variación Anual del IPC)
+# - cargar_excel_a_bd: fila a fila con el ORM (una consulta por fila o por celda de PAGOS)
+# - cargar_excel_a_bd_masivo: cada hoja leída por bloques (openpyxl read_only, solo las columnas
+#   que se importan), normalizada, subida a una tabla temporal y aplicada con pocas sentencias
+#   por hoja (ver app/carga_masiva.py)
 
+import re
+from decimal import Decimal
+
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
+import openpyxl
+from app.aplicacion_pagos import reaplicar_pensionados
+from app.carga_masiva import identificaciones, mapa_ids, subir_bloques
+from app.cartera import actualizar_tasas, pensionados_tabla, refrescar_cartera
 from app.models import Pensionado, DtfMensual, IpcAnual, Pago
-from sqlalchemy import insert
-from datetime import datetime
+from app.resumen_pagos import mes_de, meses_tabla, refrescar_meses
+from sqlalchemy import bindparam, insert, text
+from datetime import date, datetime
 
 EXCEL_PATH = r"C:\Users\danie\OneDrive\Documentos\liquidaciones_project\PRUEBAS BASE DE DATOS.xlsx"
 HOJA_BASE = "a"
 
-def cargar_excel_a_bd(session):
+def cargar_excel_a_bd(session, ruta: str = EXCEL_PATH):
     # Solo actualizar campos res_no, reliqui y consulta de pensionado usando Identificacion
-    df = pd.read_excel(EXCEL_PATH, sheet_name='a')
+    df = pd.read_excel(ruta, sheet_name='a')
     actualizados = 0
     for _, row in df.iterrows():
         identificacion = None
@@ -41,31 +54,24 @@ def cargar_excel_a_bd(session):
     print(f"Actualizados {actualizados} pensionados con res_no, reliqui y consulta.")
     # Importar pagos mensuales desde hoja 'PAGOS'
     try:
-        df_pagos = pd.read_excel(EXCEL_PATH, sheet_name='PAGOS')
-        # Detectar columnas de meses (todas las columnas excepto las primeras conocidas)
-        known_cols = {'Nombre', 'Identificacion', 'Empresa', 'NIT. ENTIDAD', 'Observaciones'}
-        meses_cols = [col for col in df_pagos.columns if col not in known_cols]
+        df_pagos = pd.read_excel(ruta, sheet_name='PAGOS')
+        # Columnas de meses -> fecha, interpretadas una sola vez para toda la hoja
+        meses_cols = mapa_meses(df_pagos.columns)
+        meses_tocados = set()
+        pensionados_tocados = set()
         for _, row in df_pagos.iterrows():
             identificacion = str(int(row['Identificacion'])) if not pd.isna(row['Identificacion']) else None
             pensionado = session.query(Pensionado).filter_by(identificacion=identificacion).first()
             if not pensionado:
                 continue
-            for col in meses_cols:
+            for col, fecha_pago in meses_cols.items():
                 valor = row.get(col)
                 if pd.notna(valor) and valor != 0:
-                    try:
-                        fecha_pago = pd.to_datetime(col, format='%B %Y', errors='coerce')
-                        if pd.isna(fecha_pago):
-                            fecha_pago = pd.to_datetime(col.title(), format='%B %Y', errors='coerce')
-                        if pd.isna(fecha_pago):
-                            continue
-                        fecha_pago = fecha_pago.replace(day=1)
-                    except Exception:
-                        continue
                     pago = session.query(Pago).filter_by(pensionado_id=pensionado.pensionado_id, fecha_pago=fecha_pago).first()
                     if not pago:
                         pago = Pago(
                             pensionado_id=pensionado.pensionado_id,
+                            nit_entidad=pensionado.nit_entidad,
                             fecha_pago=fecha_pago,
                             valor=valor,
                             observaciones=row.get('Observaciones')
@@ -74,6 +80,12 @@ def cargar_excel_a_bd(session):
                     else:
                         pago.valor = valor
                         pago.observaciones = row.get('Observaciones')
+                    meses_tocados.add(mes_de(pensionado.nit_entidad, fecha_pago))
+                    pensionados_tocados.add(pensionado.pensionado_id)
+        session.flush()
+        refrescar_meses(session, meses_tocados)
+        refrescar_cartera(session, pensionados_tocados)
+        reaplicar_pensionados(session, pensionados_tocados)
         session.commit()
         print("Pagos mensuales importados/actualizados.")
     except Exception as e:
@@ -81,7 +93,8 @@ def cargar_excel_a_bd(session):
 
     # Importar DTF mensual desde hoja 'DTF'
     try:
-        df_dtf = pd.read_excel(EXCEL_PATH, sheet_name='DTF')
+        df_dtf = pd.read_excel(ruta, sheet_name='DTF')
+        periodos_tocados = set()
         for _, row in df_dtf.iterrows():
             periodo = row.get('Fecha')
             tasa = row.get('Tasa de Depósitos a Término Fijo (DTF) a 90 días, mensual')
@@ -108,6 +121,9 @@ def cargar_excel_a_bd(session):
                     session.add(dtf)
                 else:
                     dtf.tasa = tasa
+                periodos_tocados.add(periodo)
+        session.flush()
+        actualizar_tasas(session, periodos_tocados)
         session.commit()
         print("DTF mensual importado/actualizado.")
     except Exception as e:
@@ -115,7 +131,7 @@ def cargar_excel_a_bd(session):
 
     # Importar IPC anual desde hoja 'IPC'
     try:
-        df_ipc = pd.read_excel(EXCEL_PATH, sheet_name='IPC')
+        df_ipc = pd.read_excel(ruta, sheet_name='IPC')
         for _, row in df_ipc.iterrows():
             anio = row.get('Año')
             ipc = row.get('Variación Anual del IPC')
@@ -137,6 +153,422 @@ def cargar_excel_a_bd(session):
     except Exception as e:
         print(f"No se pudo importar hoja 'IPC': {e}")
 
+# --- Importación masiva ---
+
+COLUMNAS_PAGOS_FIJAS = {'Nombre', 'Identificacion', 'Empresa', 'NIT. ENTIDAD', 'Observaciones'}
+COLUMNA_DTF = 'Tasa de Depósitos a Término Fijo (DTF) a 90 días, mensual'
+COLUMNA_IPC = 'Variación Anual del IPC'
+
+
+def _texto(v):
+    return None if pd.isna(v) else str(v)
+
+
+def _identificacion(v):
+    """Identificación como texto: 12345678.0 -> '12345678' (como el import fila a fila)."""
+    if pd.isna(v):
+        return None
+    try:
+        return str(int(v))
+    except Exception:
+        return str(v)
+
+
+def _tasa(v):
+    """Tasa como fracción: acepta coma decimal y porcentajes (10.5 -> 0.105)."""
+    try:
+        tasa = float(str(v).replace(',', '.'))
+    except Exception:
+        return None
+    return tasa / 100 if tasa > 1 else tasa
+
+
+def _fecha_dtf(v):
+    if isinstance(v, str):
+        for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(v, formato).date()
+            except ValueError:
+                pass
+        return None
+    if isinstance(v, datetime):  # incluye pd.Timestamp
+        return v.date()
+    return None if pd.isna(v) else v
+
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6, 'july': 7,
+    'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+_ENCABEZADO_MES = re.compile(r'^([a-záéíóúñ]+)\.?(?:\s+de\s+|[\s/-]+)(\d{4})$')
+
+
+def _fecha_columna(col):
+    """Primer día del mes de un encabezado de PAGOS; None si no es un mes.
+
+    Acepta meses en español o inglés ('Enero 2024', 'enero de 2024', 'January 2024',
+    'ENE-2024') y encabezados que Excel ya entregó como fecha.
+    """
+    if isinstance(col, (pd.Timestamp, datetime, date)):
+        return date(col.year, col.month, 1)
+    coincidencia = _ENCABEZADO_MES.match(str(col).strip().lower())
+    if not coincidencia:
+        return None
+    nombre, año = coincidencia.groups()
+    mes = MESES.get(nombre)
+    if mes is None and len(nombre) >= 3:
+        # Abreviaturas: 'ene', 'sept', 'dic', 'jan', 'aug'...
+        mes = next((m for n, m in MESES.items() if n.startswith(nombre)), None)
+    return date(int(año), mes, 1) if mes else None
+
+
+def mapa_meses(columnas) -> dict:
+    """{columna: primer día del mes} de los encabezados de PAGOS que son meses (una vez por hoja)."""
+    fechas = {col: _fecha_columna(col) for col in columnas if col not in COLUMNAS_PAGOS_FIJAS}
+    return {col: f for col, f in fechas.items() if f is not None}
+
+
+def normalizar_hoja_base(df: pd.DataFrame) -> pd.DataFrame:
+    """Hoja base -> (identificacion, res_no, reliqui, consulta); la última fila de cada
+    identificación gana, como en el import fila a fila."""
+    salida = pd.DataFrame({'identificacion': df['Identificacion'].map(_identificacion)})
+    for columna, origen in (('res_no', 'Res. No'), ('reliqui', 'Reliqui'), ('consulta', 'Consulta')):
+        salida[columna] = df[origen].map(_texto) if origen in df.columns else None
+    salida = salida[salida['identificacion'].notna()]
+    return salida.drop_duplicates('identificacion', keep='last')
+
+
+def normalizar_pagos(df: pd.DataFrame, ids: dict) -> pd.DataFrame:
+    """Hoja PAGOS (una columna por mes) -> (pensionado_id, fecha_pago, valor, observaciones).
+
+    `ids` = {identificacion: pensionado_id}; se omiten pensionados desconocidos y celdas
+    vacías o en cero. Los encabezados se interpretan una vez, los pensionados se resuelven
+    con un solo merge y la hoja se pasa a formato largo con melt.
+    """
+    columnas = ['pensionado_id', 'fecha_pago', 'valor', 'observaciones']
+    fechas = mapa_meses(df.columns)
+    if not fechas or df.empty:
+        return pd.DataFrame(columns=columnas)
+    ancho = df[list(fechas)].copy()
+    ancho['identificacion'] = identificaciones(df['Identificacion'])
+    ancho['observaciones'] = df['Observaciones'] if 'Observaciones' in df.columns else None
+    # El merge va antes del melt: resuelve cada fila de la hoja una vez (no cada celda) y
+    # descarta los pensionados desconocidos antes de multiplicar las filas por los meses.
+    # El merge interno conserva el orden de la hoja, así la última fila repetida sigue ganando
+    mapa = pd.DataFrame(list(ids.items()), columns=['identificacion', 'pensionado_id'])
+    ancho = ancho.merge(mapa, on='identificacion', how='inner')
+    largo = ancho.melt(id_vars=['pensionado_id', 'observaciones'], value_vars=list(fechas),
+                       var_name='columna', value_name='valor')
+    largo['valor'] = pd.to_numeric(largo['valor'], errors='coerce')
+    largo = largo[largo['valor'].notna() & largo['valor'].ne(0)]
+    largo['fecha_pago'] = largo['columna'].map(fechas)
+    salida = largo[columnas]
+    return salida.drop_duplicates(['pensionado_id', 'fecha_pago'], keep='last')
+
+
+def normalizar_dtf(df: pd.DataFrame) -> pd.DataFrame:
+    salida = pd.DataFrame({'periodo': df['Fecha'].map(_fecha_dtf), 'tasa': df[COLUMNA_DTF].map(_tasa)})
+    salida = salida.dropna()
+    return salida.drop_duplicates('periodo', keep='last')
+
+
+def normalizar_ipc(df: pd.DataFrame) -> pd.DataFrame:
+    salida = pd.DataFrame({'anio': pd.to_numeric(df['Año'], errors='coerce'), 'valor': df[COLUMNA_IPC].map(_tasa)})
+    salida = salida.dropna()
+    salida['anio'] = salida['anio'].astype(int)
+    return salida.drop_duplicates('anio', keep='last')
+
+
+# --- Lectura por streaming ---
+
+TAM_BLOQUE_EXCEL = 5000
+
+COLUMNAS_BASE = {'Identificacion', 'Res. No', 'Reliqui', 'Consulta'}
+COLUMNAS_DTF = {'Fecha', COLUMNA_DTF}
+COLUMNAS_IPC = {'Año', COLUMNA_IPC}
+
+
+def _columna_pagos(col) -> bool:
+    return col in ('Identificacion', 'Observaciones') or (
+        col not in COLUMNAS_PAGOS_FIJAS and _fecha_columna(col) is not None)
+
+
+def leer_hoja_por_bloques(libro, hoja: str, columnas, tam_bloque: int = TAM_BLOQUE_EXCEL):
+    """Recorre una hoja de un libro abierto con openpyxl en modo read_only y entrega
+    DataFrames de hasta `tam_bloque` filas con solo las columnas pedidas.
+
+    `columnas` es un conjunto de encabezados o una función encabezado -> bool. La primera
+    fila es el encabezado (como en pd.read_excel); las filas vacías se omiten.
+    """
+    filas = libro[hoja].iter_rows(values_only=True)
+    encabezado = next(filas, None) or ()
+    elegir = columnas if callable(columnas) else columnas.__contains__
+    indices = [i for i, col in enumerate(encabezado) if col is not None and elegir(col)]
+    nombres = [encabezado[i] for i in indices]
+    bloque = []
+    for fila in filas:
+        valores = tuple(fila[i] if i < len(fila) else None for i in indices)
+        if all(v is None for v in valores):
+            continue
+        bloque.append(valores)
+        if len(bloque) >= tam_bloque:
+            yield pd.DataFrame(bloque, columns=nombres)
+            bloque = []
+    if bloque or not nombres:
+        yield pd.DataFrame(bloque, columns=nombres)
+
+
+# --- Import incremental por huellas ---
+# Cada fila normalizada lleva una clave (identificación, pensionado|fecha, periodo, año) y una
+# huella: el hash de sus valores. importacion_huella guarda las del último import; antes de
+# aplicar una hoja se quitan de la tabla temporal las filas cuya huella no cambió, de modo que
+# los UPDATE/INSERT solo tocan altas y cambios. Un cambio hecho en la BD por otra vía no
+# cambia la huella: para reaplicar todo está `completo=True` (importar-excel --completo)
+# La tabla viene en scripts/init_db.sql; las bases existentes la reciben con `make db-migrar`
+# (scripts/tabla_importacion_huella.sql)
+
+
+_NULO_HUELLA = '\x00'
+
+
+def _valor_huella(v) -> str:
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return _NULO_HUELLA
+    if isinstance(v, (int, float, Decimal, np.number)) and not isinstance(v, bool):
+        return repr(float(v))
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return str(v)
+
+
+def _canonica(serie: pd.Series) -> pd.Series:
+    """Texto estable de una columna para la huella: el mismo valor da el mismo texto sin
+    importar el dtype con que pandas leyó su bloque (150000 en int64, 150000.0 en float64 o
+    Decimal('150000.00') -> '150000.0')."""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        numeros = serie.astype(float)
+        return numeros.map(repr).where(numeros.notna(), _NULO_HUELLA)
+    return serie.map(_valor_huella)
+
+
+def _con_huella(df: pd.DataFrame, clave: tuple, valores: tuple) -> pd.DataFrame:
+    """Agrega a las filas normalizadas su clave como texto y la huella de `valores`."""
+    df = df.copy()
+    df['clave'] = df[clave[0]].astype(str)
+    for columna in clave[1:]:
+        df['clave'] = df['clave'] + '|' + df[columna].astype(str)
+    canonicos = pd.DataFrame({c: _canonica(df[c]) for c in valores}, index=df.index)
+    df['huella'] = pd.util.hash_pandas_object(canonicos, index=False).to_numpy().view('int64')
+    return df
+
+
+def _subir_hoja(session, tabla: str, columnas: dict, bloques, clave: tuple, valores: tuple) -> int:
+    columnas = {**columnas, 'clave': 'VARCHAR(64) NOT NULL', 'huella': 'BIGINT NOT NULL'}
+    return subir_bloques(session, tabla, columnas,
+                         (_con_huella(df, clave, valores) for df in bloques), clave=('clave',))
+
+
+def _comparar(session, hoja: str, tabla: str, completo: bool) -> dict:
+    """Diferencias entre la tabla temporal y las huellas del import anterior. Si no es
+    `completo`, deja en la temporal solo las altas y los cambios."""
+    p = {"hoja": hoja}
+    total = session.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+    altas = session.execute(text(f"""
+        SELECT COUNT(*) FROM {tabla} t
+        LEFT JOIN importacion_huella h ON h.hoja = :hoja AND h.clave = t.clave
+        WHERE h.clave IS NULL
+    """), p).scalar()
+    sin_cambio = session.execute(text(f"""
+        SELECT COUNT(*) FROM {tabla} t
+        JOIN importacion_huella h ON h.hoja = :hoja AND h.clave = t.clave AND h.huella = t.huella
+    """), p).scalar()
+    bajas = [fila[0] for fila in session.execute(text(f"""
+        SELECT h.clave FROM importacion_huella h
+        LEFT JOIN {tabla} t ON t.clave = h.clave
+        WHERE h.hoja = :hoja AND t.clave IS NULL
+    """), p)]
+    if not completo:
+        session.execute(text(f"""
+            DELETE t FROM {tabla} t
+            JOIN importacion_huella h ON h.hoja = :hoja AND h.clave = t.clave AND h.huella = t.huella
+        """), p)
+    return {'altas': altas, 'cambios': total - altas - sin_cambio, 'bajas': bajas, 'sin_cambio': sin_cambio}
+
+
+def _guardar_huellas(session, hoja: str, tabla: str, diferencias: dict, aplicadas: str = ""):
+    """Deja en importacion_huella las huellas de esta importación (misma transacción que la hoja).
+
+    `aplicadas` es un JOIN que restringe a las filas que sí se aplicaron: una fila sin huella
+    vuelve a compararse como alta en el siguiente import.
+    """
+    ahora = datetime.now()
+    session.execute(text(f"""
+        INSERT INTO importacion_huella (hoja, clave, huella, fecha)
+        SELECT :hoja, t.clave, t.huella, :ahora FROM {tabla} t
+        {aplicadas}
+        ON DUPLICATE KEY UPDATE huella = t.huella, fecha = :ahora
+    """), {"hoja": hoja, "ahora": ahora})
+    if diferencias['bajas']:
+        session.execute(text("DELETE FROM importacion_huella WHERE hoja = :hoja AND clave = :clave"),
+                        [{"hoja": hoja, "clave": c} for c in diferencias['bajas']])
+
+
+def _aplicar_base(session, bloques, completo: bool = False) -> tuple:
+    _subir_hoja(session, 'tmp_pensionado_base', {
+        'identificacion': 'VARCHAR(30) NOT NULL',
+        'res_no': 'VARCHAR(100)',
+        'reliqui': 'VARCHAR(100)',
+        'consulta': 'VARCHAR(100)',
+    }, (normalizar_hoja_base(df) for df in bloques), ('identificacion',), ('res_no', 'reliqui', 'consulta'))
+    # Huellas de identificaciones sin pensionado (de imports anteriores o de pensionados
+    # borrados): no se aplicaron, así que no deben contar como 'sin cambio'
+    session.execute(text("""
+        DELETE FROM importacion_huella
+        WHERE hoja = :hoja
+          AND NOT EXISTS (SELECT 1 FROM pensionado p WHERE p.identificacion = importacion_huella.clave)
+    """), {"hoja": HOJA_BASE})
+    diferencias = _comparar(session, HOJA_BASE, 'tmp_pensionado_base', completo)
+    actualizados = session.execute(text("""
+        UPDATE pensionado p JOIN tmp_pensionado_base t ON t.identificacion = p.identificacion
+        SET p.res_no = t.res_no, p.reliqui = t.reliqui, p.consulta = t.consulta
+    """)).rowcount
+    _guardar_huellas(session, HOJA_BASE, 'tmp_pensionado_base', diferencias,
+                     aplicadas="JOIN pensionado p ON p.identificacion = t.identificacion")
+    return actualizados, diferencias
+
+
+def _aplicar_pagos(session, bloques, completo: bool = False, borrar_bajas: bool = False) -> tuple:
+    """Actualiza los pagos existentes del mismo pensionado y mes e inserta los nuevos.
+
+    Con `borrar_bajas` elimina de `pago` las celdas que venían en el import anterior y ya no
+    están en el libro (solo esas: los pagos registrados por otras vías no tienen huella).
+    """
+    ids = mapa_ids(session)
+    _subir_hoja(session, 'tmp_pago', {
+        'pensionado_id': 'BIGINT NOT NULL',
+        'fecha_pago': 'DATE NOT NULL',
+        'valor': 'DECIMAL(18,2) NOT NULL',
+        'observaciones': 'VARCHAR(255)',
+    }, (normalizar_pagos(df, ids) for df in bloques), ('pensionado_id', 'fecha_pago'), ('valor', 'observaciones'))
+    diferencias = _comparar(session, 'PAGOS', 'tmp_pago', completo)
+    actualizados = session.execute(text("""
+        UPDATE pago p JOIN tmp_pago t ON t.pensionado_id = p.pensionado_id AND t.fecha_pago = p.fecha_pago
+        SET p.valor = t.valor, p.observaciones = t.observaciones
+    """)).rowcount
+    nuevos = session.execute(text("""
+        INSERT INTO pago (pensionado_id, nit_entidad, fecha_pago, valor, observaciones)
+        SELECT t.pensionado_id, pen.nit_entidad, t.fecha_pago, t.valor, t.observaciones
+        FROM tmp_pago t JOIN pensionado pen ON pen.pensionado_id = t.pensionado_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM pago p WHERE p.pensionado_id = t.pensionado_id AND p.fecha_pago = t.fecha_pago
+        )
+    """)).rowcount
+    meses = meses_tabla(session, 'tmp_pago')
+    pensionados = pensionados_tabla(session, 'tmp_pago')
+    borrados = 0
+    if borrar_bajas and diferencias['bajas']:
+        bajas = [dict(zip(('pensionado_id', 'fecha_pago'), c.split('|', 1))) for c in diferencias['bajas']]
+        borrados = session.execute(text(
+            "DELETE FROM pago WHERE pensionado_id = :pensionado_id AND fecha_pago = :fecha_pago"
+        ), bajas).rowcount
+        nits = dict(session.execute(
+            text("SELECT pensionado_id, nit_entidad FROM pensionado WHERE pensionado_id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": sorted({int(b['pensionado_id']) for b in bajas})}
+        ).fetchall())
+        meses |= {mes_de(nits.get(int(b['pensionado_id'])), date.fromisoformat(b['fecha_pago'])) for b in bajas}
+        pensionados |= set(nits)
+    refrescar_meses(session, meses)
+    refrescar_cartera(session, pensionados)
+    reaplicar_pensionados(session, pensionados)
+    _guardar_huellas(session, 'PAGOS', 'tmp_pago', diferencias)
+    return (actualizados, nuevos, borrados), diferencias
+
+
+def _aplicar_dtf(session, bloques, completo: bool = False) -> tuple:
+    _subir_hoja(session, 'tmp_dtf', {'periodo': 'DATE NOT NULL', 'tasa': 'DECIMAL(9,6) NOT NULL'},
+                (normalizar_dtf(df) for df in bloques), ('periodo',), ('tasa',))
+    diferencias = _comparar(session, 'DTF', 'tmp_dtf', completo)
+    session.execute(text("""
+        INSERT INTO dtf_mensual (periodo, tasa) SELECT t.periodo, t.tasa FROM tmp_dtf t
+        ON DUPLICATE KEY UPDATE tasa = t.tasa
+    """))
+    actualizar_tasas(session, [fila[0] for fila in session.execute(text("SELECT periodo FROM tmp_dtf"))])
+    n = session.execute(text("SELECT COUNT(*) FROM tmp_dtf")).scalar()
+    _guardar_huellas(session, 'DTF', 'tmp_dtf', diferencias)
+    return n, diferencias
+
+
+def _aplicar_ipc(session, bloques, completo: bool = False) -> tuple:
+    _subir_hoja(session, 'tmp_ipc', {'anio': 'INT NOT NULL', 'valor': 'DECIMAL(9,6) NOT NULL'},
+                (normalizar_ipc(df) for df in bloques), ('anio',), ('valor',))
+    diferencias = _comparar(session, 'IPC', 'tmp_ipc', completo)
+    session.execute(text("""
+        INSERT INTO ipc_anual (anio, valor) SELECT t.anio, t.valor FROM tmp_ipc t
+        ON DUPLICATE KEY UPDATE valor = t.valor
+    """))
+    n = session.execute(text("SELECT COUNT(*) FROM tmp_ipc")).scalar()
+    _guardar_huellas(session, 'IPC', 'tmp_ipc', diferencias)
+    return n, diferencias
+
+
+def cargar_excel_a_bd_masivo(session, ruta: str = EXCEL_PATH, tam_bloque: int = TAM_BLOQUE_EXCEL,
+                             completo: bool = False, borrar_bajas: bool = False) -> dict:
+    """Importa el libro completo con carga masiva; cada hoja en su propia transacción.
+
+    El libro se lee con openpyxl en modo read_only: de cada hoja solo las columnas que se
+    importan y de a `tam_bloque` filas, que se normalizan y suben a la tabla temporal antes
+    de leer el siguiente bloque (memoria acotada aunque el libro sea grande).
+
+    Es incremental: solo se aplican las filas nuevas o cambiadas desde el último import
+    (`completo` reaplica todas). Las filas que desaparecieron del libro se informan; solo
+    se borran, y solo en PAGOS, con `borrar_bajas`.
+
+    Devuelve el resumen por hoja, con las diferencias en resumen['diferencias']. Igual que
+    el import fila a fila, una hoja que falla se informa y no impide importar las demás.
+    """
+    resumen = {'diferencias': {}}
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+
+    def _hoja(nombre, columnas, aplicar):
+        try:
+            resultado, diferencias = aplicar(leer_hoja_por_bloques(libro, nombre, columnas, tam_bloque))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"No se pudo importar hoja '{nombre}': {e}")
+            return None
+        resumen['diferencias'][nombre] = {**diferencias, 'bajas': len(diferencias['bajas'])}
+        print(f"Hoja '{nombre}': {diferencias['altas']} filas nuevas, {diferencias['cambios']} con cambios, "
+              f"{len(diferencias['bajas'])} eliminadas, {diferencias['sin_cambio']} sin cambios.")
+        return resultado
+
+    try:
+        resumen['pensionados'] = _hoja(HOJA_BASE, COLUMNAS_BASE, lambda b: _aplicar_base(session, b, completo))
+        if resumen['pensionados'] is not None:
+            print(f"Actualizados {resumen['pensionados']} pensionados con res_no, reliqui y consulta.")
+
+        pagos = _hoja('PAGOS', _columna_pagos, lambda b: _aplicar_pagos(session, b, completo, borrar_bajas))
+        if pagos is not None:
+            resumen['pagos_actualizados'], resumen['pagos_nuevos'], resumen['pagos_borrados'] = pagos
+            print(f"Pagos mensuales: {pagos[1]} nuevos, {pagos[0]} actualizados, {pagos[2]} borrados.")
+            if resumen['diferencias']['PAGOS']['bajas'] and not borrar_bajas:
+                print("Los pagos que ya no están en el libro se conservaron (use --borrar-bajas para eliminarlos).")
+
+        resumen['dtf'] = _hoja('DTF', COLUMNAS_DTF, lambda b: _aplicar_dtf(session, b, completo))
+        if resumen['dtf'] is not None:
+            print(f"DTF mensual importado/actualizado: {resumen['dtf']} periodos.")
+
+        resumen['ipc'] = _hoja('IPC', COLUMNAS_IPC, lambda b: _aplicar_ipc(session, b, completo))
+        if resumen['ipc'] is not None:
+            print(f"IPC anual importado/actualizado: {resumen['ipc']} años.")
+    finally:
+        libro.close()
+    return resumen
+
+
 if __name__ == "__main__":
     print("Este script está diseñado para ser usado desde la CLI principal con una sesión de BD.")
     print("Usa cargar_excel_a_bd(session) desde app/cli.py para importar los datos.")
@@ -0,0 +1,162 @@
+# Importación de archivos de pagos (CSV o Parquet) de los bancos
+# - Columnas: identificacion, fecha, valor, observaciones (opcional); encabezados sin
+#   distinguir mayúsculas. Solo se leen esas columnas y de a `tam_bloque` filas
+# - Cada bloque se normaliza (identificación como en el Excel, fecha AAAA-MM-DD o DD/MM/AAAA,
+#   valor con coma o punto decimal y separador de miles opcional) y se sube a una tabla
+#   temporal (ver app/carga_masiva.py)
+# - Al final un solo INSERT ... SELECT agrega los pagos que no existen ya en `pago` para el
+#   mismo pensionado y fecha y refresca pago_resumen_mensual, cartera_estado y
+#   pago_aplicacion; todo en una transacción
+
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.aplicacion_pagos import reaplicar_pensionados
+from app.carga_masiva import identificaciones, mapa_ids, subir_bloques
+from app.cartera import pensionados_tabla, refrescar_cartera
+from app.resumen_pagos import meses_tabla, refrescar_meses
+
+COLUMNAS_ARCHIVO_PAGOS = ('identificacion', 'fecha', 'valor', 'observaciones')
+TAM_BLOQUE_ARCHIVO = 100_000
+
+
+def _separador(ruta: str, encoding: str) -> str:
+    """',' o ';' según cuál aparezca más en el encabezado (los bancos exportan con ambos)."""
+    with open(ruta, encoding=encoding, errors='replace') as f:
+        encabezado = f.readline()
+    return ';' if encabezado.count(';') > encabezado.count(',') else ','
+
+
+def leer_archivo_por_bloques(ruta: str, tam_bloque: int = TAM_BLOQUE_ARCHIVO, separador: str | None = None,
+                             encoding: str = 'utf-8-sig'):
+    """DataFrames de hasta `tam_bloque` filas con las columnas de COLUMNAS_ARCHIVO_PAGOS
+    presentes en el archivo (nombres en minúscula). CSV se lee como texto: los tipos los
+    fija normalizar_archivo_pagos."""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Leer Parquet requiere pyarrow (pip install pyarrow)") from e
+        archivo = pq.ParquetFile(ruta)
+        columnas = [c for c in archivo.schema_arrow.names if c.strip().lower() in COLUMNAS_ARCHIVO_PAGOS]
+        for lote in archivo.iter_batches(batch_size=tam_bloque, columns=columnas):
+            df = lote.to_pandas()
+            df.columns = [c.strip().lower() for c in df.columns]
+            yield df
+    elif extension in ('.csv', '.txt'):
+        lector = pd.read_csv(
+            ruta, sep=separador or _separador(ruta, encoding), encoding=encoding, dtype=str,
+            usecols=lambda c: c.strip().lower() in COLUMNAS_ARCHIVO_PAGOS,
+            chunksize=tam_bloque, keep_default_na=False, na_values=[''],
+        )
+        with lector:
+            for df in lector:
+                df.columns = [c.strip().lower() for c in df.columns]
+                yield df
+    else:
+        raise ValueError(f"Formato no soportado: {extension or ruta} (use .csv o .parquet)")
+
+
+def _fechas(serie: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.date
+    texto = serie.astype(str).str.strip()
+    fechas = pd.to_datetime(texto, format='%Y-%m-%d', errors='coerce')
+    faltan = fechas.isna()
+    if faltan.any():
+        fechas[faltan] = pd.to_datetime(texto[faltan], format='%d/%m/%Y', errors='coerce')
+    return fechas.dt.date.where(fechas.notna(), None)
+
+
+# Formatos de valor aceptados. Los pagos tienen a lo sumo dos decimales: un separador seguido
+# de grupos de tres dígitos es de miles ('150.000' = 150000, '1.234.567,89', '1,234,567.89')
+_VALOR_SIMPLE = r'-?\d+(?:[.,]\d{1,2})?'
+_VALOR_MILES_PUNTO = r'-?\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?'
+_VALOR_MILES_COMA = r'-?\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?'
+
+
+def _valores(serie: pd.Series) -> pd.Series:
+    """Valores del archivo a número; los que no tienen un formato reconocible quedan en NaN
+    (filas inválidas), nunca se adivinan."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.strip().str.replace(' ', '', regex=False)
+    simple = texto.str.fullmatch(_VALOR_SIMPLE)
+    miles_punto = texto.str.fullmatch(_VALOR_MILES_PUNTO)
+    miles_coma = texto.str.fullmatch(_VALOR_MILES_COMA)
+    normalizado = texto.where(~simple, texto.str.replace(',', '.', regex=False))
+    normalizado = normalizado.where(
+        ~miles_punto, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    )
+    normalizado = normalizado.where(~miles_coma, texto.str.replace(',', '', regex=False))
+    return pd.to_numeric(normalizado.where(simple | miles_punto | miles_coma), errors='coerce')
+
+
+def normalizar_archivo_pagos(df: pd.DataFrame, ids: dict, conteo: dict) -> pd.DataFrame:
+    """Bloque del archivo -> (pensionado_id, fecha_pago, valor, observaciones).
+
+    Suma en `conteo` las filas leídas, las de pensionados desconocidos y las inválidas (sin
+    fecha o valor legibles, o con valor en cero). La última fila repetida del bloque gana.
+    """
+    faltantes = {'identificacion', 'fecha', 'valor'} - set(df.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(sorted(faltantes))}")
+    conteo['leidas'] += len(df)
+    bloque = pd.DataFrame({
+        'identificacion': identificaciones(df['identificacion']),
+        'fecha_pago': _fechas(df['fecha']),
+        'valor': _valores(df['valor']),
+        'observaciones': df['observaciones'].astype(object).where(df['observaciones'].notna(), None).map(
+            lambda v: None if v is None else str(v)[:255]
+        ) if 'observaciones' in df.columns else None,
+    })
+    mapa = pd.DataFrame(list(ids.items()), columns=['identificacion', 'pensionado_id'])
+    conocidos = bloque.merge(mapa, on='identificacion', how='inner')
+    conteo['desconocidos'] += len(bloque) - len(conocidos)
+    validos = conocidos[conocidos['fecha_pago'].notna() & conocidos['valor'].notna() & conocidos['valor'].ne(0)]
+    conteo['invalidas'] += len(conocidos) - len(validos)
+    conteo['validas'] += len(validos)
+    salida = validos[['pensionado_id', 'fecha_pago', 'valor', 'observaciones']]
+    return salida.drop_duplicates(['pensionado_id', 'fecha_pago'], keep='last')
+
+
+def importar_archivo_pagos(session, ruta: str, tam_bloque: int = TAM_BLOQUE_ARCHIVO,
+                           separador: str | None = None, encoding: str = 'utf-8-sig') -> dict:
+    """Importa un archivo de pagos en una transacción; devuelve el resumen de filas.
+
+    Los pagos que ya existen en `pago` para el mismo pensionado y fecha se omiten
+    (`duplicados`), de modo que volver a cargar el mismo archivo no duplica nada.
+    """
+    conteo = {'leidas': 0, 'desconocidos': 0, 'invalidas': 0, 'validas': 0}
+    try:
+        ids = mapa_ids(session)
+        subir_bloques(session, 'tmp_pago_archivo', {
+            'pensionado_id': 'BIGINT NOT NULL',
+            'fecha_pago': 'DATE NOT NULL',
+            'valor': 'DECIMAL(18,2) NOT NULL',
+            'observaciones': 'VARCHAR(255)',
+        }, (normalizar_archivo_pagos(df, ids, conteo)
+            for df in leer_archivo_por_bloques(ruta, tam_bloque, separador, encoding)),
+            clave=('pensionado_id', 'fecha_pago'))
+        unicas = session.execute(text("SELECT COUNT(*) FROM tmp_pago_archivo")).scalar()
+        nuevos = session.execute(text("""
+            INSERT INTO pago (pensionado_id, nit_entidad, fecha_pago, valor, observaciones)
+            SELECT t.pensionado_id, pen.nit_entidad, t.fecha_pago, t.valor, t.observaciones
+            FROM tmp_pago_archivo t JOIN pensionado pen ON pen.pensionado_id = t.pensionado_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM pago p WHERE p.pensionado_id = t.pensionado_id AND p.fecha_pago = t.fecha_pago
+            )
+        """)).rowcount
+        if nuevos:
+            refrescar_meses(session, meses_tabla(session, 'tmp_pago_archivo'))
+            pensionados = pensionados_tabla(session, 'tmp_pago_archivo')
+            refrescar_cartera(session, pensionados)
+            reaplicar_pensionados(session, pensionados)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return {**conteo, 'repetidas_en_archivo': conteo['validas'] - unicas, 'duplicados': unicas - nuevos, 'nuevos': nuevos}
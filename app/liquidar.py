@@ -10,6 +10,7 @@ from sqlalchemy import text
 from decimal import Decimal
 import logging
 from .calcular import calcular_liquidacion_pensionado, obtener_tasas_dtf_periodo, calcular_meses_entre_fechas
+from .cartera import refrescar_cartera
 from . import settings
 
 logger = logging.getLogger(__name__)
@@ -322,6 +323,7 @@ def crear_detalle_liquidacion(session, liquidacion_id: int, pensionado_id: int,
         )
         
         detalle_id = result.lastrowid
+        refrescar_cartera(session, [pensionado_id])
         session.commit()
         
         return detalle_id
@@ -0,0 +1,63 @@
+# Metadatos legibles por máquina dentro de los PDFs generados
+# - Cada PDF lleva en su diccionario Info la clave /CuentaCobro con un JSON (consecutivo, NIT,
+#   identificación, período y totales) escrito como cadena hexadecimal ASCII
+# - El Info del PDF no se comprime: se recupera buscando la clave en los bytes del archivo,
+#   sin parsear el PDF ni extraer texto (ver verificar_metadatos_pdf.py)
+
+import json
+import re
+
+from reportlab.pdfbase.pdfdoc import PDFInfo
+
+CLAVE_INFO = 'CuentaCobro'
+VERSION_METADATOS = 1
+
+_PATRON = re.compile(rb'/' + CLAVE_INFO.encode('ascii') + rb'\s*<([0-9A-Fa-f]*)>')
+
+
+def metadatos_cuenta(datos: dict, pagina: int | None = None) -> dict:
+    """Metadatos de una cuenta de cobro a partir de los datos del render."""
+    meta = {
+        'consecutivo': int(datos['consecutivo']),
+        'nit': str(datos['nit']),
+        'identificacion': str(datos['identificacion']),
+        'periodo_inicio': datos['periodo_inicio'].isoformat() if datos.get('periodo_inicio') else None,
+        'periodo_fin': datos['periodo_fin'].isoformat() if datos.get('periodo_fin') else None,
+        'total_capital': round(float(datos['total_capital']), 2),
+        'total_intereses': round(float(datos['total_intereses']), 2),
+        'total': round(float(datos['total']), 2),
+    }
+    if pagina is not None:
+        meta['pagina'] = pagina
+    return meta
+
+
+class _InfoConMetadatos(PDFInfo):
+    """PDFInfo de ReportLab con la clave adicional /CuentaCobro (atributo `_carga`)."""
+
+    def format(self, document):
+        texto = super().format(document)
+        fin = texto.rindex(b'>>')
+        extra = b'/' + CLAVE_INFO.encode('ascii') + b' <' + self._carga.encode('ascii').hex().encode('ascii') + b'> '
+        return texto[:fin] + extra + texto[fin:]
+
+
+def incrustar_metadatos(canv, cuentas: list):
+    """Escribe `cuentas` (lista de dicts de `metadatos_cuenta`) en el Info del PDF de `canv`.
+
+    Puede llamarse en cualquier momento antes de `canv.save()`; la última llamada gana.
+    """
+    carga = json.dumps({'version': VERSION_METADATOS, 'cuentas': cuentas},
+                       ensure_ascii=True, separators=(',', ':'), sort_keys=True)
+    info = canv._doc.info
+    # Se cambia la clase del mismo objeto: el documento puede tenerlo ya registrado
+    info.__class__ = _InfoConMetadatos
+    info._carga = carga
+
+
+def leer_metadatos(contenido: bytes) -> dict | None:
+    """Metadatos incrustados en los bytes de un PDF, o None si no los tiene."""
+    m = _PATRON.search(contenido)
+    if not m:
+        return None
+    return json.loads(bytes.fromhex(m.group(1).decode('ascii')).decode('ascii'))
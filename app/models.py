@@ -1,6 +1,6 @@
 # Objetivo (Copilot): definir modelos equivalentes a tablas del init_db.sql
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, BIGINT, VARCHAR, DATE, DATETIME, DECIMAL, Integer, Enum
+from sqlalchemy import Column, BIGINT, VARCHAR, DATE, DATETIME, DECIMAL, Integer, Enum, Text, Index, UniqueConstraint
 
 Base = declarative_base()
 
@@ -41,8 +41,14 @@ class Pensionado(Base):
 # Tabla de pagos mensuales por pensionado y periodo
 class Pago(Base):
     __tablename__ = "pago"
+    __table_args__ = (
+        # Historial paginado por (fecha_pago, pago_id): ver scripts/indices_pago_historial.sql
+        Index("ix_pago_pensionado_fecha", "pensionado_id", "fecha_pago", "pago_id"),
+        Index("ix_pago_entidad_fecha", "nit_entidad", "fecha_pago", "pago_id"),
+    )
     pago_id = Column(BIGINT, primary_key=True, autoincrement=True)
     pensionado_id = Column(BIGINT, nullable=False)
+    nit_entidad = Column(VARCHAR(30))  # copia de pensionado.nit_entidad al registrar el pago
     fecha_pago = Column(DATE, nullable=False)
     valor = Column(DECIMAL(18,2), nullable=False)
     observaciones = Column(VARCHAR(255))
@@ -87,6 +93,10 @@ class IpcAnual(Base):
 # Registro y trazabilidad de cuentas de cobro emitidas
 class CuentaCobro(Base):
     __tablename__ = "cuenta_cobro"
+    __table_args__ = (
+        # Cuentas de un pensionado al reaplicar sus pagos: ver scripts/indices_aplicacion_pagos.sql
+        Index("ix_cuenta_cobro_pensionado", "pensionado_identificacion", "nit_entidad"),
+    )
     cuenta_cobro_id = Column(BIGINT, primary_key=True, autoincrement=True)
     consecutivo = Column(Integer, nullable=False, unique=True)
     nit_entidad = Column(VARCHAR(30), nullable=False)
@@ -103,3 +113,152 @@ class CuentaCobro(Base):
     version = Column(Integer)
     fecha_creacion = Column(DATETIME)
     fecha_actualizacion = Column(DATETIME)
+
+# Cola de trabajos en segundo plano (ZIP masivo, PDF consolidado, PDF imprenta, PDFs por periodo)
+class Trabajo(Base):
+    __tablename__ = "trabajo"
+    # INTEGER en SQLite para que la cola también funcione con una BD local (autoincremento)
+    trabajo_id = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    tipo = Column(VARCHAR(40), nullable=False)
+    parametros = Column(Text, nullable=False)  # JSON
+    estado = Column(VARCHAR(20), nullable=False, index=True)  # PENDIENTE, EN_CURSO, TERMINADO, FALLIDO
+    hechas = Column(Integer)
+    total = Column(Integer)
+    mensaje = Column(VARCHAR(255))
+    resultado_ruta = Column(VARCHAR(500))
+    error = Column(Text)
+    trabajador = Column(VARCHAR(100))
+    latido = Column(DATETIME)  # última señal de vida del trabajador mientras está EN_CURSO
+    fecha_creacion = Column(DATETIME)
+    fecha_inicio = Column(DATETIME)
+    fecha_fin = Column(DATETIME)
+
+# Unidades de trabajo de un lote distribuido (ver app/cola_distribuida.py): etapa de
+# liquidación y de archivo por entidad, de render por bloque de pensionados
+class TrabajoItem(Base):
+    __tablename__ = "trabajo_item"
+    __table_args__ = (
+        UniqueConstraint("trabajo_id", "etapa", "clave", name="uq_trabajo_item_clave"),
+        Index("ix_trabajo_item_reclamo", "estado", "arriendo_hasta"),
+    )
+    item_id = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    trabajo_id = Column(BIGINT, nullable=False, index=True)
+    etapa = Column(VARCHAR(20), nullable=False)  # liquidacion, render, archivo
+    clave = Column(VARCHAR(60), nullable=False)  # NIT o NIT:bloque
+    nit_entidad = Column(VARCHAR(30), nullable=False)
+    parametros = Column(Text, nullable=False)  # JSON
+    estado = Column(VARCHAR(20), nullable=False)  # PENDIENTE, EN_CURSO, TERMINADO, FALLIDO
+    intentos = Column(Integer, nullable=False, default=0)
+    pendientes = Column(Integer, nullable=False, default=0)  # bloques de render sin terminar (item de liquidación)
+    trabajador = Column(VARCHAR(100))
+    arriendo_hasta = Column(DATETIME)
+    latido = Column(DATETIME)
+    resultado = Column(Text)  # JSON
+    error = Column(Text)
+    fecha_creacion = Column(DATETIME)
+    fecha_inicio = Column(DATETIME)
+    fecha_fin = Column(DATETIME)
+
+# Contadores compartidos entre procesos (ver app/contadores.py)
+class Contador(Base):
+    __tablename__ = "contador"
+    nombre = Column(VARCHAR(40), primary_key=True)
+    valor = Column(BIGINT, nullable=False)
+
+# Corridas reanudables de generación masiva y sus puntos de control (ver app/corridas.py)
+class Corrida(Base):
+    __tablename__ = "corrida"
+    corrida_id = Column(VARCHAR(64), primary_key=True)
+    tipo = Column(VARCHAR(40), nullable=False)  # zip_masivo, pdf_entidad
+    nit_entidad = Column(VARCHAR(30), nullable=False)
+    parametros = Column(Text)  # JSON
+    estado = Column(VARCHAR(20), nullable=False)  # EN_CURSO, TERMINADA
+    fecha_inicio = Column(DATETIME, nullable=False)
+    fecha_fin = Column(DATETIME)
+
+class CorridaPunto(Base):
+    __tablename__ = "corrida_punto"
+    corrida_id = Column(VARCHAR(64), primary_key=True)
+    clave = Column(VARCHAR(60), primary_key=True)  # identificación:AAAA-MM, identificación o CONSOLIDADO
+    orden = Column(Integer, nullable=False)
+    consecutivo = Column(Integer)
+    archivo = Column(VARCHAR(500))  # relativo a la carpeta de la corrida (o ruta final en disco)
+    meta = Column(Text)  # JSON
+    fecha = Column(DATETIME)
+
+class ImportacionHuella(Base):
+    __tablename__ = "importacion_huella"
+    hoja = Column(VARCHAR(20), primary_key=True)  # a, PAGOS, DTF, IPC
+    clave = Column(VARCHAR(64), primary_key=True)  # identificación, pensionado_id|AAAA-MM-DD, periodo o año
+    huella = Column(BIGINT, nullable=False)  # hash del contenido normalizado de la fila
+    fecha = Column(DATETIME, nullable=False)  # último import que la escribió
+
+# Aplicación de cada pago a las cuentas de cobro del pensionado, la más antigua primero
+# (ver app/aplicacion_pagos.py)
+class PagoAplicacion(Base):
+    __tablename__ = "pago_aplicacion"
+    __table_args__ = (
+        Index("ix_pago_aplicacion_cuenta", "nit_entidad", "consecutivo"),
+        Index("ix_pago_aplicacion_pensionado", "pensionado_id"),
+    )
+    aplicacion_id = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    pago_id = Column(BIGINT, nullable=False, index=True)
+    pensionado_id = Column(BIGINT, nullable=False)
+    nit_entidad = Column(VARCHAR(30), nullable=False)
+    consecutivo = Column(Integer)  # cuenta de cobro; NULL = excedente sin cuenta pendiente
+    fecha_pago = Column(DATE, nullable=False)
+    capital = Column(DECIMAL(18,2), nullable=False)
+    interes = Column(DECIMAL(18,2), nullable=False)
+
+# Resumen de pagos por entidad y mes, mantenido por las rutas que escriben en pago
+# (ver app/resumen_pagos.py)
+class PagoResumenMensual(Base):
+    __tablename__ = "pago_resumen_mensual"
+    nit_entidad = Column(VARCHAR(30), primary_key=True)
+    anio = Column(Integer, primary_key=True)
+    mes = Column(Integer, primary_key=True)
+    total_pagos = Column(Integer, nullable=False)
+    total_valor = Column(DECIMAL(18,2), nullable=False)
+    total_capital = Column(DECIMAL(18,2), nullable=False)
+    total_interes = Column(DECIMAL(18,2), nullable=False)
+    pensionados = Column(Integer, nullable=False)  # distintos en el mes (no se puede sumar entre meses)
+    fecha_primer_pago = Column(DATE)
+    fecha_ultimo_pago = Column(DATE)
+    fecha_actualizacion = Column(DATETIME)
+
+# Primer y último pago de cada pensionado por entidad, mantenido junto con pago_resumen_mensual:
+# cuenta los pensionados distintos de rangos abiertos sin recorrer pago (ver app/resumen_pagos.py)
+class PagoResumenPensionado(Base):
+    __tablename__ = "pago_resumen_pensionado"
+    __table_args__ = (
+        Index("ix_pago_resumen_pensionado_primero", "nit_entidad", "fecha_primer_pago"),
+        Index("ix_pago_resumen_pensionado_ultimo", "nit_entidad", "fecha_ultimo_pago"),
+    )
+    nit_entidad = Column(VARCHAR(30), primary_key=True)
+    pensionado_id = Column(BIGINT, primary_key=True, autoincrement=False)
+    fecha_primer_pago = Column(DATE, nullable=False)
+    fecha_ultimo_pago = Column(DATE, nullable=False)
+    fecha_actualizacion = Column(DATETIME)
+
+# Estado de cartera materializado: una fila por liquidacion_detalle, mantenida por las rutas que
+# escriben liquidaciones y pagos (ver app/cartera.py); v_estado_cartera lee de aquí
+class CarteraEstado(Base):
+    __tablename__ = "cartera_estado"
+    __table_args__ = (
+        Index("ix_cartera_estado_entidad", "nit_entidad", "estado", "periodo"),
+    )
+    detalle_id = Column(BIGINT, primary_key=True, autoincrement=False)
+    liquidacion_id = Column(BIGINT, nullable=False)
+    nit_entidad = Column(VARCHAR(30))
+    entidad = Column(VARCHAR(200))
+    pensionado_id = Column(BIGINT, nullable=False, index=True)
+    identificacion = Column(VARCHAR(30))
+    pensionado = Column(VARCHAR(200))
+    periodo = Column(DATE, nullable=False)
+    valor_liquidado = Column(DECIMAL(18,2), nullable=False)
+    valor_pagado = Column(DECIMAL(18,2), nullable=False)
+    saldo_pendiente = Column(DECIMAL(18,2), nullable=False)
+    tasa_dtf = Column(DECIMAL(9,6))
+    intereses_mora = Column(DECIMAL(18,2), nullable=False)
+    estado = Column(VARCHAR(20), nullable=False)  # En mora, Al día, Pagada
+    fecha_actualizacion = Column(DATETIME)
@@ -3,7 +3,12 @@
 # Si deseas orden capital->interés, aplícalo en tu lógica.
 
 from datetime import date, datetime
-from sqlalchemy import text
+import pandas as pd
+from sqlalchemy import bindparam, text
+from app.carga_masiva import subir
+from app.aplicacion_pagos import reaplicar_pensionados
+from app.cartera import refrescar_cartera
+from app.resumen_pagos import mes_de, refrescar_meses, resumen_entidad
 from decimal import Decimal, ROUND_DOWN
 import logging
 
@@ -28,7 +33,7 @@ def registrar_pago(session, pensionado_id: int, fecha_pago: date, valor_pagado:
         # Obtener información del pensionado
         pensionado = session.execute(
             text("""
-                SELECT identificacion, nombre, capital_pendiente, intereses_pendientes
+                SELECT identificacion, nombre, nit_entidad, capital_pendiente, intereses_pendientes
                 FROM pensionado 
                 WHERE pensionado_id = :pensionado_id
             """),
@@ -51,13 +56,14 @@ def registrar_pago(session, pensionado_id: int, fecha_pago: date, valor_pagado:
         result = session.execute(
             text("""
                 INSERT INTO pago (
-                    pensionado_id, fecha_pago, valor, capital, interes, observaciones
+                    pensionado_id, nit_entidad, fecha_pago, valor, capital, interes, observaciones
                 ) VALUES (
-                    :pensionado_id, :fecha_pago, :valor, :capital, :interes, :observaciones
+                    :pensionado_id, :nit_entidad, :fecha_pago, :valor, :capital, :interes, :observaciones
                 )
             """),
             {
                 "pensionado_id": pensionado_id,
+                "nit_entidad": pensionado.nit_entidad,
                 "fecha_pago": fecha_pago,
                 "valor": valor_decimal,
                 "capital": valor_capital,
@@ -72,6 +78,9 @@ def registrar_pago(session, pensionado_id: int, fecha_pago: date, valor_pagado:
         actualizar_saldos_pensionado(
             session, pensionado_id, valor_capital, valor_interes, fecha_pago
         )
+        refrescar_meses(session, [mes_de(pensionado.nit_entidad, fecha_pago)])
+        refrescar_cartera(session, [pensionado_id])
+        reaplicar_pensionados(session, [pensionado_id])
         
         session.commit()
         
@@ -148,7 +157,11 @@ def actualizar_saldos_pensionado(session, pensionado_id: int, abono_capital: Dec
 def registrar_pago_masivo(session, entidad_nit: str, fecha_pago: date, 
                          archivo_pagos: list, observaciones: str = None) -> dict:
     """
-    Registra múltiples pagos de una entidad desde un archivo o lista.
+    Registra múltiples pagos de una entidad desde un archivo o lista, en una transacción.
+    
+    Los saldos de todos los pensionados del lote se leen en una consulta, la distribución
+    (primero intereses, luego capital) se calcula en memoria en el orden de la lista, los
+    pagos se insertan con executemany y los saldos se actualizan con un solo UPDATE ... JOIN.
     
     Args:
         session: Sesión de SQLAlchemy
@@ -161,62 +174,118 @@ def registrar_pago_masivo(session, entidad_nit: str, fecha_pago: date,
         Diccionario con resumen del proceso
     """
     try:
-        pagos_exitosos = 0
         pagos_fallidos = 0
-        total_procesado = Decimal('0.00')
         errores = []
+        validos = []
         
         for item in archivo_pagos:
+            identificacion = item.get('identificacion')
             try:
-                identificacion = item.get('identificacion')
                 valor = Decimal(str(item.get('valor', 0)))
-                
-                if valor <= 0:
-                    errores.append(f"Identificación {identificacion}: Valor inválido")
-                    pagos_fallidos += 1
-                    continue
-                
-                # Buscar pensionado
-                pensionado = session.execute(
-                    text("""
-                        SELECT pensionado_id 
-                        FROM pensionado 
-                        WHERE identificacion = :identificacion 
-                          AND nit_entidad = :nit_entidad
-                    """),
-                    {"identificacion": identificacion, "nit_entidad": entidad_nit}
-                ).fetchone()
-                
-                if not pensionado:
-                    errores.append(f"Identificación {identificacion}: Pensionado no encontrado")
-                    pagos_fallidos += 1
-                    continue
-                
-                # Registrar pago individual
-                pago_id = registrar_pago(
-                    session, 
-                    pensionado.pensionado_id, 
-                    fecha_pago, 
-                    float(valor),
-                    f"{observaciones} - Lote masivo" if observaciones else "Pago masivo"
-                )
-                
-                pagos_exitosos += 1
-                total_procesado += valor
-                
             except Exception as e:
                 errores.append(f"Identificación {identificacion}: {str(e)}")
                 pagos_fallidos += 1
                 continue
+            if valor <= 0:
+                errores.append(f"Identificación {identificacion}: Valor inválido")
+                pagos_fallidos += 1
+                continue
+            validos.append((str(identificacion), valor))
+        
+        # Saldos de todos los pensionados del lote en una consulta
+        saldos = {}
+        if validos:
+            filas = session.execute(
+                text("""
+                    SELECT identificacion, pensionado_id, capital_pendiente, intereses_pendientes
+                    FROM pensionado 
+                    WHERE nit_entidad = :nit_entidad
+                      AND identificacion IN :identificaciones
+                """).bindparams(bindparam("identificaciones", expanding=True)),
+                {"nit_entidad": entidad_nit, "identificaciones": sorted({i for i, _ in validos})}
+            ).fetchall()
+            saldos = {
+                str(f.identificacion): {
+                    'pensionado_id': f.pensionado_id,
+                    'capital': Decimal(str(f.capital_pendiente or 0)),
+                    'interes': Decimal(str(f.intereses_pendientes or 0)),
+                    'abono_capital': Decimal('0.00'),
+                    'abono_interes': Decimal('0.00'),
+                }
+                for f in filas
+            }
+        
+        # Distribución en memoria; varios pagos del mismo pensionado se aplican en orden
+        # sobre el saldo que dejó el anterior (como GREATEST(0, ...) en la BD)
+        pagos = []
+        total_procesado = Decimal('0.00')
+        texto_observaciones = f"{observaciones} - Lote masivo" if observaciones else "Pago masivo"
+        for identificacion, valor in validos:
+            saldo = saldos.get(identificacion)
+            if saldo is None:
+                errores.append(f"Identificación {identificacion}: Pensionado no encontrado")
+                pagos_fallidos += 1
+                continue
+            valor_interes, valor_capital = calcular_distribucion_pago(valor, saldo['capital'], saldo['interes'])
+            saldo['interes'] = max(Decimal('0.00'), saldo['interes'] - valor_interes)
+            saldo['capital'] = max(Decimal('0.00'), saldo['capital'] - valor_capital)
+            saldo['abono_interes'] += valor_interes
+            saldo['abono_capital'] += valor_capital
+            pagos.append({
+                "pensionado_id": saldo['pensionado_id'],
+                "nit_entidad": entidad_nit,
+                "fecha_pago": fecha_pago,
+                "valor": valor,
+                "capital": valor_capital,
+                "interes": valor_interes,
+                "observaciones": texto_observaciones
+            })
+            total_procesado += valor
+        
+        if pagos:
+            session.execute(
+                text("""
+                    INSERT INTO pago (
+                        pensionado_id, nit_entidad, fecha_pago, valor, capital, interes, observaciones
+                    ) VALUES (
+                        :pensionado_id, :nit_entidad, :fecha_pago, :valor, :capital, :interes, :observaciones
+                    )
+                """),
+                pagos
+            )
+            abonos = pd.DataFrame(
+                [(s['pensionado_id'], s['abono_capital'], s['abono_interes'])
+                 for s in saldos.values() if s['abono_capital'] or s['abono_interes']],
+                columns=['pensionado_id', 'abono_capital', 'abono_interes']
+            )
+            subir(session, 'tmp_abono', {
+                'pensionado_id': 'BIGINT NOT NULL',
+                'abono_capital': 'DECIMAL(18,2) NOT NULL',
+                'abono_interes': 'DECIMAL(18,2) NOT NULL',
+            }, abonos, clave=('pensionado_id',))
+            session.execute(
+                text("""
+                    UPDATE pensionado p JOIN tmp_abono t ON t.pensionado_id = p.pensionado_id
+                    SET 
+                        p.capital_pendiente = GREATEST(0, p.capital_pendiente - t.abono_capital),
+                        p.intereses_pendientes = GREATEST(0, p.intereses_pendientes - t.abono_interes),
+                        p.ultima_fecha_pago = :fecha_pago
+                """),
+                {"fecha_pago": fecha_pago}
+            )
+            refrescar_meses(session, [mes_de(entidad_nit, fecha_pago)])
+            refrescar_cartera(session, {p['pensionado_id'] for p in pagos})
+            reaplicar_pensionados(session, {p['pensionado_id'] for p in pagos})
+        session.commit()
         
         resultado = {
-            'pagos_exitosos': pagos_exitosos,
+            'pagos_exitosos': len(pagos),
             'pagos_fallidos': pagos_fallidos,
             'total_procesado': float(total_procesado),
             'errores': errores
         }
         
-        logger.info(f"Procesamiento masivo completado: {pagos_exitosos} exitosos, "
+        logger.info(f"Procesamiento masivo completado: {len(pagos)} exitosos, "
                    f"{pagos_fallidos} fallidos, Total=${total_procesado:.2f}")
         
         return resultado
@@ -228,9 +297,14 @@ def registrar_pago_masivo(session, entidad_nit: str, fecha_pago: date,
 
 def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str = None, 
                            fecha_desde: date = None, fecha_hasta: date = None, 
-                           limite: int = 50) -> list:
+                           limite: int = 50, despues_de: tuple = None) -> list:
     """
-    Obtiene el historial de pagos con filtros opcionales.
+    Obtiene el historial de pagos con filtros opcionales, del más reciente al más antiguo.
+    
+    Paginación por llave (keyset): para la página siguiente se pasa en `despues_de` el
+    cursor (fecha_pago, pago_id) de la última fila recibida (ver cursor_historial). Cada
+    página recorre los índices (pensionado_id | nit_entidad, fecha_pago, pago_id) desde el
+    cursor, así que cuesta lo mismo la primera página que la última.
     """
     try:
         condiciones = []
@@ -241,7 +315,8 @@ def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str
             parametros["pensionado_id"] = pensionado_id
         
         if entidad_nit:
-            condiciones.append("pen.nit_entidad = :entidad_nit")
+            # nit_entidad copiado en pago: índice ix_pago_entidad_fecha sin pasar por pensionado
+            condiciones.append("p.nit_entidad = :entidad_nit")
             parametros["entidad_nit"] = entidad_nit
         
         if fecha_desde:
@@ -252,6 +327,12 @@ def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str
             condiciones.append("p.fecha_pago <= :fecha_hasta")
             parametros["fecha_hasta"] = fecha_hasta
         
+        if despues_de:
+            condiciones.append(
+                "(p.fecha_pago < :cursor_fecha OR (p.fecha_pago = :cursor_fecha AND p.pago_id < :cursor_id))"
+            )
+            parametros["cursor_fecha"], parametros["cursor_id"] = despues_de
+        
         where_clause = "WHERE " + " AND ".join(condiciones) if condiciones else ""
         
         query = f"""
@@ -260,7 +341,7 @@ def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str
                 p.pensionado_id,
                 pen.identificacion,
                 pen.nombre,
-                pen.nit_entidad,
+                p.nit_entidad,
                 p.fecha_pago,
                 p.valor,
                 p.capital,
@@ -270,7 +351,7 @@ def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str
             FROM pago p
             JOIN pensionado pen ON p.pensionado_id = pen.pensionado_id
             {where_clause}
-            ORDER BY p.fecha_pago DESC, p.fecha_creacion DESC
+            ORDER BY p.fecha_pago DESC, p.pago_id DESC
             LIMIT :limite
         """
         
@@ -284,53 +365,25 @@ def obtener_historial_pagos(session, pensionado_id: int = None, entidad_nit: str
         logger.error(f"Error obteniendo historial de pagos: {e}")
         return []
 
+def cursor_historial(pagina: list) -> tuple | None:
+    """
+    Cursor (fecha_pago, pago_id) para pedir la página siguiente a obtener_historial_pagos;
+    None si la página vino vacía.
+    """
+    if not pagina:
+        return None
+    return pagina[-1]['fecha_pago'], pagina[-1]['pago_id']
+
 def obtener_resumen_pagos_entidad(session, entidad_nit: str, 
                                  fecha_desde: date = None, fecha_hasta: date = None) -> dict:
     """
     Obtiene un resumen de pagos por entidad en un período.
+    
+    Lee pago_resumen_mensual (una fila por mes) y solo va a pago para los meses parciales
+    de los extremos del rango (ver app/resumen_pagos.py).
     """
     try:
-        condiciones = ["pen.nit_entidad = :entidad_nit"]
-        parametros = {"entidad_nit": entidad_nit}
-        
-        if fecha_desde:
-            condiciones.append("p.fecha_pago >= :fecha_desde")
-            parametros["fecha_desde"] = fecha_desde
-        
-        if fecha_hasta:
-            condiciones.append("p.fecha_pago <= :fecha_hasta")
-            parametros["fecha_hasta"] = fecha_hasta
-        
-        where_clause = "WHERE " + " AND ".join(condiciones)
-        
-        query = f"""
-            SELECT 
-                COUNT(*) as total_pagos,
-                SUM(p.valor) as total_valor,
-                SUM(p.capital) as total_capital,
-                SUM(p.interes) as total_interes,
-                COUNT(DISTINCT p.pensionado_id) as pensionados_pagaron,
-                MIN(p.fecha_pago) as fecha_primer_pago,
-                MAX(p.fecha_pago) as fecha_ultimo_pago
-            FROM pago p
-            JOIN pensionado pen ON p.pensionado_id = pen.pensionado_id
-            {where_clause}
-        """
-        
-        result = session.execute(text(query), parametros).fetchone()
-        
-        if result:
-            return dict(result._mapping)
-        else:
-            return {
-                'total_pagos': 0,
-                'total_valor': 0,
-                'total_capital': 0,
-                'total_interes': 0,
-                'pensionados_pagaron': 0,
-                'fecha_primer_pago': None,
-                'fecha_ultimo_pago': None
-            }
+        return resumen_entidad(session, entidad_nit, fecha_desde, fecha_hasta)
         
     except Exception as e:
         logger.error(f"Error obteniendo resumen de pagos: {e}")
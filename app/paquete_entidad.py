@@ -0,0 +1,975 @@
+# Paquete de liquidación por entidad (sin dependencias de Streamlit)
+# - PDF consolidado, README, ZIP masivo y PDF único para imprenta
+# - Vive fuera de app_ui.py para poder importarse desde procesos de trabajo (app.zip_lote)
+#   y desde la CLI sin ejecutar la interfaz
+
+from datetime import date
+
+# --- Utilidades: número a letras (es-CO) ---
+def numero_a_letras(n: int) -> str:
+    """Convierte un número entero a texto en español (simplificado para valores grandes)."""
+    unidades = (
+        "cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+        "diez", "once", "doce", "trece", "catorce", "quince", "dieciséis", "diecisiete", "dieciocho", "diecinueve",
+        "veinte", "veintiuno", "veintidós", "veintitrés", "veinticuatro", "veinticinco", "veintiséis", "veintisiete", "veintiocho", "veintinueve"
+    )
+    # Debe tener 10 entradas (índices 0..9) para evitar IndexError cuando d=9 (noventa)
+    # Notar que 10-29 se manejan en el bloque num < 30, pero dejamos 'diez' y 'veinte' por completitud
+    decenas = ("", "diez", "veinte", "treinta", "cuarenta", "cincuenta", "sesenta", "setenta", "ochenta", "noventa")
+    centenas = ("", "cien", "doscientos", "trescientos", "cuatrocientos", "quinientos", "seiscientos", "setecientos", "ochocientos", "novecientos")
+
+    def _decenas(num):
+        if num < 30:
+            return unidades[num]
+        d, u = divmod(num, 10)
+        if u == 0:
+            return decenas[d]
+        return f"{decenas[d]} y {unidades[u]}"
+
+    def _centenas(num):
+        if num < 100:
+            return _decenas(num)
+        c, r = divmod(num, 100)
+        if c == 1:
+            if r == 0:
+                return "cien"
+            return f"ciento {_decenas(r)}"
+        return f"{centenas[c]}" if r == 0 else f"{centenas[c]} {_decenas(r)}"
+
+    def _seccion(num, divisor, singular, plural):
+        c, r = divmod(num, divisor)
+        if c == 0:
+            return "", r
+        if c == 1:
+            return f"{singular}", r
+        return f"{numero_a_letras(c)} {plural}", r
+
+    if n == 0:
+        return "cero"
+    if n < 0:
+        return "menos " + numero_a_letras(-n)
+
+    resultado = []
+    millones, resto = _seccion(n, 1_000_000, "un millón", "millones")
+    if millones:
+        resultado.append(millones)
+    miles, resto = _seccion(resto, 1_000, "mil", "mil")
+    if miles:
+        resultado.append(miles)
+    if resto:
+        resultado.append(_centenas(resto))
+    return " ".join([p for p in resultado if p])
+
+
+def generar_pdf_consolidado_en_memoria(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date):
+    """
+    Genera el PDF consolidado EXACTAMENTE con la misma lógica/formatos del botón "📄 PDF Consolidado".
+    Devuelve una tupla (bytes_pdf, nombre_archivo).
+    """
+    import io
+    buffer = io.BytesIO()
+    pdf_name = escribir_pdf_consolidado(buffer, entidad_nit, entidad_nombre, todas_las_cuentas, fecha_corte)
+    pdf_data = buffer.getvalue()
+    buffer.close()
+    return pdf_data, pdf_name
+
+
+def escribir_pdf_consolidado(salida, entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date,
+                             anexo: bool = True, fusionado=None) -> str:
+    """
+    Escribe el PDF consolidado en `salida` (ruta de archivo o buffer) y devuelve el nombre del archivo.
+    Con `fusionado` (PDFFusionado) se escribe como portada del PDF único de la entidad;
+    `anexo=False` omite el detalle por pensionado.
+
+    El story se produce perezosamente: la tabla de pensionados sale en una tabla por página
+    (cabecera repetida, subtotal de la página y acumulado) y el anexo de cada pensionado se
+    arma cuando platypus llega a él, de modo que la memoria no crece con el tamaño de la entidad.
+    """
+    # Imports locales para evitar dependencias globales
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import inch
+    from app import contadores
+    from app.contexto_render import obtener_contexto
+    from app.pdf_paginado import FlowablesPerezosos, alto_flowables, alto_util, tablas_por_pagina
+    import calendar, itertools
+    from dateutil.relativedelta import relativedelta
+
+    doc = SimpleDocTemplate(salida, pagesize=letter,
+                            rightMargin=0.3*inch, leftMargin=0.3*inch,
+                            topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+    # Estilos y TableStyle compartidos (se construyen una vez por proceso)
+    est = obtener_contexto().consolidado_memoria
+    title_style = est.title
+    normal_style = est.normal
+    normal_left_bold = est.normal_left_bold
+
+    story = []
+
+    # Encabezado: ciudad y CUENTA DE COBRO + No.
+    story.append(Spacer(1, 0.5*inch))
+    header_line1 = Table([["BOGOTÁ, D.C.", "CUENTA DE COBRO"]], colWidths=est.anchos_ciudad)
+    header_line1.setStyle(est.tabla_ciudad)
+    story.append(header_line1)
+
+    # Número de cuenta: contador en la BD, único aunque varios procesos o máquinas generen a la vez
+    nuevo_consecutivo = contadores.siguiente(contadores.CONSOLIDADO)
+
+    numero_table = Table([["", f"No.  {nuevo_consecutivo}"]], colWidths=est.anchos_ciudad)
+    numero_table.setStyle(est.tabla_numero)
+    story.append(numero_table)
+
+    story.append(Spacer(1, 0.3*inch))
+
+    # Entidad acreedora (encabezado)
+    entidad_nombre_pdf = entidad_nombre
+    story.append(Paragraph(f"<b>{entidad_nombre_pdf.upper()}</b>", title_style))
+    story.append(Paragraph(f"<b>NIT: {entidad_nit}</b>", title_style))
+
+    story.append(Spacer(1, 0.4*inch))
+
+    # DEBE A: (mismo nombre/nit)
+    story.append(Paragraph("<b>DEBE A:</b>", title_style))
+    story.append(Spacer(1, 0.3*inch))
+    story.append(Paragraph(f"<b>{entidad_nombre_pdf.upper()}</b>", title_style))
+    story.append(Paragraph(f"<b>NIT: {entidad_nit}</b>", title_style))
+
+    # Totales consolidados (usando la misma suma que el botón)
+    total_consolidado_capital = 0.0
+    total_consolidado_intereses = 0.0
+    total_consolidado_total = 0.0
+    for p in todas_las_cuentas:
+        # Soportar estructura mínima (sin totales por cuenta)
+        capital_pensionado = sum(float(cuenta.get('capital_total', 0.0)) for cuenta in p.get('cuentas', []))
+        intereses_pensionado = sum(float(cuenta.get('intereses', 0.0)) for cuenta in p.get('cuentas', []))
+        total_pensionado = capital_pensionado + intereses_pensionado
+        total_consolidado_capital += capital_pensionado
+        total_consolidado_intereses += intereses_pensionado
+        total_consolidado_total += total_pensionado
+
+    story.append(Spacer(1, 0.3*inch))
+
+    # Valor en letras y numérico
+    valor_letras = numero_a_letras(int(total_consolidado_total))
+    story.append(Paragraph(f"<b>LA SUMA DE: {valor_letras.upper()} PESOS M/CTE</b>", normal_style))
+    story.append(Paragraph(f"<b>$ {total_consolidado_total:,.0f}</b>", normal_left_bold))
+
+    story.append(Spacer(1, 0.4*inch))
+
+    # Concepto con periodo de 30 meses (inicio-fin), meses en español
+    meses_es = {1:'enero',2:'febrero',3:'marzo',4:'abril',5:'mayo',6:'junio',7:'julio',8:'agosto',9:'septiembre',10:'octubre',11:'noviembre',12:'diciembre'}
+    _fecha_fin = date(fecha_corte.year, fecha_corte.month, 1)
+    _fecha_ini = _fecha_fin - relativedelta(months=29)
+    inicio_txt = f"01 de {meses_es[_fecha_ini.month].capitalize()} de {_fecha_ini.year}"
+    ultimo_dia = calendar.monthrange(_fecha_fin.year, _fecha_fin.month)[1]
+    fin_txt = f"{ultimo_dia} de {meses_es[_fecha_fin.month].capitalize()} de {_fecha_fin.year}"
+    concepto_text = (
+        "Por concepto de Cuotas Partes Pensionales sobre pagos realizados en la nómina de Pensionados del SENA "
+        f"a fecha de corte {inicio_txt} a corte de {fin_txt} por los pensionados que se relacionan a continuación:"
+    )
+    story.append(Paragraph(concepto_text, normal_style))
+    story.append(Spacer(1, 0.3*inch))
+
+    # Tabla principal
+    tabla_headers = [
+        'No. Cédula', 'Apellidos y Nombres', 'Ingreso\nNómina', 'RESOLUCIÓN\nNº', '% Cuota\nParte', 'Base\nCálculo\nCuota',
+        'Saldo\nCapital\nCausado', 'Intereses\nAcumulados', 'TOTAL\nDEUDA'
+    ]
+
+    def _filas_pensionados():
+        for p in todas_las_cuentas:
+            capital_pensionado = sum(float(cuenta.get('capital_total', 0.0)) for cuenta in p.get('cuentas', []))
+            intereses_pensionado = sum(float(cuenta.get('intereses', 0.0)) for cuenta in p.get('cuentas', []))
+            total_pensionado = capital_pensionado + intereses_pensionado
+            base_calc = float(p['pensionado'].get('base_calculo_cuota', 0.0))
+            nombre = p['pensionado']['nombre']
+            nombre_corto = nombre[:25] + '...' if len(nombre) > 25 else nombre
+            yield [
+                str(p['pensionado']['cedula']),
+                nombre_corto,
+                '1-may-08',
+                '3089 de 2007',
+                f"{float(p['pensionado']['porcentaje_cuota'])*100:.2f}%",
+                f"{base_calc:,.0f}",
+                f"{capital_pensionado:,.0f}",
+                f"{intereses_pensionado:,.0f}",
+                f"{total_pensionado:,.0f}"
+            ], (capital_pensionado, intereses_pensionado, total_pensionado)
+
+    def _fila_totales(etiqueta, sumas):
+        cap, inte, tot = sumas
+        return ['', '', '', etiqueta, '', '', f"{cap:,.0f}", f"{inte:,.0f}", f"{tot:,.0f}"]
+
+    # Ajuste de anchos: tomar como referencia el bloque de "valor en letras" (área de texto)
+    # Usamos un ancho objetivo ligeramente menor que el ancho util de la página para que no se vea desbordado.
+    try:
+        available_width = doc.width  # ancho útil (página - márgenes)
+    except Exception:
+        from reportlab.lib.pagesizes import letter as _letter
+        available_width = _letter[0] - (0.3*inch + 0.3*inch)
+    target_width = max(5.8*inch, available_width - 0.6*inch)  # ~0.3in de aire a cada lado respecto al texto
+
+    # Pesos relativos por columna (proporciones estables)
+    col_weights = est.pesos_pensionados
+    weights_sum = sum(col_weights)
+    col_widths = [w/weights_sum * target_width for w in col_weights]
+
+    # Una tabla por página con subtotales; el total general cierra la última
+    alto = alto_util(doc)
+    alto_primera = alto - alto_flowables(story, doc.width, alto)
+    tablas = tablas_por_pagina(tabla_headers, _filas_pensionados(), _fila_totales, 3, col_widths,
+                               est.tabla_pensionados, est.tabla_pensionados_subtotales,
+                               alto_primera, alto, hAlign='LEFT')
+
+    # Anexo por pensionado con detalle de las 30 cuentas
+    subtitle_pensionado = est.subtitle_pensionado
+    small_right = est.small_right
+    small_center = est.small_center
+
+    def _anexo():
+        for p in todas_las_cuentas:
+            yield PageBreak()
+            yield Paragraph(
+                f"Detalle de cuentas de cobro - {p['pensionado']['nombre']} (CC {p['pensionado']['cedula']})",
+                subtitle_pensionado
+            )
+
+            detalle_headers = [
+                Paragraph('#', small_center),
+                Paragraph('Período', small_center),
+                Paragraph('Capital Total', small_center),
+                Paragraph('Intereses', small_center),
+                Paragraph('Total Cuenta', small_center),
+            ]
+            detalle_data = [detalle_headers]
+
+            cuentas_ord = sorted(p['cuentas'], key=lambda c: (c['año'], c['mes']))
+            subtotal_capital = subtotal_intereses = subtotal_total = 0.0
+            for idx, cta in enumerate(cuentas_ord, start=1):
+                periodo_txt = f"{meses_es[cta['mes']].upper()} {cta['año']}"
+                cap = float(cta.get('capital_total', 0))
+                inte = float(cta.get('intereses', 0))
+                tot = float(cta.get('total_cuenta', cap + inte))
+                subtotal_capital += cap
+                subtotal_intereses += inte
+                subtotal_total += tot
+                detalle_data.append([
+                    Paragraph(f"{idx}", small_center),
+                    Paragraph(periodo_txt, small_center),
+                    Paragraph(f"${cap:,.2f}", small_right),
+                    Paragraph(f"${inte:,.2f}", small_right),
+                    Paragraph(f"${tot:,.2f}", small_right),
+                ])
+
+            detalle_data.append([
+                Paragraph('', small_center),
+                Paragraph('TOTAL', est.small_bold_center),
+                Paragraph(f"${subtotal_capital:,.2f}", est.small_bold_right),
+                Paragraph(f"${subtotal_intereses:,.2f}", est.small_bold_right),
+                Paragraph(f"${subtotal_total:,.2f}", est.small_bold_right),
+            ])
+
+            detalle_table = Table(detalle_data, colWidths=est.anchos_detalle, repeatRows=1)
+            detalle_table.setStyle(est.tabla_detalle)
+            yield detalle_table
+            yield Spacer(1, 0.25*inch)
+            yield Spacer(1, 0.1*inch)
+
+    # Construir PDF (el story se consume a medida que se genera) y retornar el nombre
+    flowables = FlowablesPerezosos(itertools.chain(story, tablas, _anexo() if anexo else ()))
+    if fusionado is not None:
+        fusionado.construir(doc, flowables, marcador=f"Consolidado {entidad_nombre_pdf.upper()}")
+    else:
+        doc.build(flowables)
+    return f"LIQUIDACION_CONSOLIDADA_{entidad_nit}_{fecha_corte.strftime('%Y%m%d')}.pdf"
+
+
+def generar_readme_texto(entidad_nit: str, total_pensionados: int, total_cuentas: int, entidad_nombre: str) -> str:
+    """Crea un README descriptivo para el ZIP exportado."""
+    hoy = date.today().strftime("%d/%m/%Y")
+    contenido = f"""
+    CUENTAS PARTES - PAQUETE DE LIQUIDACIÓN (30 MESES)
+    ==================================================
+
+    Entidad: {entidad_nombre} (NIT: {entidad_nit})
+    Fecha de generación: {hoy}
+
+    Contenido:
+    - CONSOLIDADO_GLOBAL.pdf (resumen ejecutivo y totales)
+    - PDFs individuales por pensionado (30 cuentas por persona)
+    - MANIFEST.json (SHA-256 y tamaño de cada archivo; totales por pensionado y entidad)
+
+    Alcance metodológico:
+    - Sistema de 30 cuentas independientes (mes vencido)
+    - Capital fijo por cuenta, sin capitalización entre meses
+    - Intereses por DTF mensual específica
+    - Primas en junio y diciembre según número de mesadas
+
+    Resumen del paquete:
+    - Pensionados incluidos: {total_pensionados}
+    - Total de cuentas independientes: {total_cuentas}
+
+    Observaciones:
+    - Septiembre no se factura en este corte; ventana: últimos 30 meses hasta agosto de 2025.
+    - Este paquete es de uso interno y soporte de cobro persuasivo.
+    """
+    return "\n".join(line.rstrip() for line in contenido.splitlines()).strip() + "\n"
+
+def generar_consolidado_global_texto(entidad_nit, entidad_nombre, todas_las_cuentas, total_capital, total_intereses, fecha_corte):
+    """Genera el contenido del consolidado global en formato texto"""
+    content = f"""
+╔══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╗
+║                                    CONSOLIDADO GLOBAL - LIQUIDACIÓN 30 CUENTAS INDEPENDIENTES                    ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                                                                                                  ║
+║  🏛️  ENTIDAD: {entidad_nombre:<70}                                        ║
+║  🆔  NIT: {entidad_nit:<77}                                        ║
+║  📅  FECHA LIQUIDACIÓN: {fecha_corte.strftime('%d/%m/%Y'):<65}                                        ║
+║  📊  PERÍODO: SEPTIEMBRE 2022 - FEBRERO 2025 (30 MESES EXACTOS)                                               ║
+║                                                                                                                  ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                           RESUMEN EJECUTIVO                                                      ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                                                                                                  ║
+║  👥  TOTAL PENSIONADOS: {len(todas_las_cuentas):<2}                                                                         ║
+║  📋  TOTAL CUENTAS INDEPENDIENTES: {sum(len(p['cuentas']) for p in todas_las_cuentas):<3}                                                         ║
+║  💰  CAPITAL TOTAL: ${float(total_capital):>15,.2f}                                                         ║
+║  📈  INTERESES TOTALES: ${float(total_intereses):>15,.2f}                                                         ║
+║  💯  GRAN TOTAL A COBRAR: ${float(total_capital + total_intereses):>15,.2f}                                                      ║
+║                                                                                                                  ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                        RANKING POR PENSIONADO                                                    ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+
+"""
+    
+    # Agregar ranking de pensionados
+    pensionados_ordenados = sorted(todas_las_cuentas, key=lambda x: float(x['total_pensionado']), reverse=True)
+    
+    for i, p in enumerate(pensionados_ordenados, 1):
+        porcentaje_del_total = (float(p['total_pensionado']) / float(total_capital + total_intereses)) * 100
+        content += f"  {i:2d}. {p['pensionado']['nombre']:<35} ${float(p['total_pensionado']):>15,.2f} ({porcentaje_del_total:5.1f}%)\n"
+    
+    content += f"""
+
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                          METODOLOGÍA APLICADA                                                    ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                                                                                                  ║
+║  📋  SISTEMA: 30 Cuentas de Cobro Independientes por Pensionado                                                ║
+║  💰  CAPITAL: Fijo por cuenta (sin capitalización entre cuentas)                                               ║
+║  📈  INTERESES: DTF mensual específica aplicada sobre capital fijo                                             ║
+║  🏛️  CONCEPTO: Mes vencido - Cuentas históricas desde su propio mes                                            ║
+║  🎁  PRIMAS: Incluidas en diciembre y junio según número de mesadas                                            ║
+║  ⚖️  MARCO LEGAL: Sistema Anti-Prescripción según Ley 1066 de 2006                                             ║
+║                                                                                                                  ║
+╚══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╝
+
+NOTA IMPORTANTE: Este consolidado representa la suma de {sum(len(p['cuentas']) for p in todas_las_cuentas)} cuentas de cobro independientes.
+Cada pensionado tiene exactamente 30 cuentas mensuales según prescripción vigente.
+
+Generado el {fecha_corte.strftime('%d/%m/%Y')} - Sistema Cuotas Partes v2.0
+"""
+    
+    return content
+
+def generar_resumen_pensionado_texto(pensionado_data):
+    """Genera el resumen individual de un pensionado"""
+    p = pensionado_data['pensionado']
+    
+    content = f"""
+╔══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╗
+║                                     RESUMEN INDIVIDUAL - 30 CUENTAS INDEPENDIENTES                              ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                                                                                                  ║
+║  👤  PENSIONADO: {p['pensionado']['nombre']:<70}                                           ║
+║  🆔  CÉDULA: {p['pensionado']['cedula']:<77}                                           ║
+║  📊  PORCENTAJE CUOTA: {float(p['pensionado']['porcentaje_cuota'])*100:>6.2f}%                                                                ║
+║  🎁  NÚMERO MESADAS: {p['pensionado']['mesadas']:<2}                                                                              ║
+║                                                                                                                  ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                           TOTALES PENSIONADO                                                     ║
+╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
+║                                                                                                                  ║
+║  📋  TOTAL CUENTAS: {len(pensionado_data['cuentas']):<2}                                                                            ║
+║  💰  CAPITAL TOTAL: ${float(pensionado_data['total_capital']):>15,.2f}                                                         ║
+║  📈  INTERESES TOTALES: ${float(pensionado_data['total_intereses']):>15,.2f}                                                         ║
+║  💯  GRAN TOTAL: ${float(pensionado_data['total_pensionado']):>15,.2f}                                                            ║
+║                                                                                                                  ║
+╚══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╝
+
+DETALLE DE LAS 30 CUENTAS:
+════════════════════════════════════════════════════════════════════════════════════════════════════════════════════
+
+ #  │   Mes/Año   │    Capital Base    │      Prima       │   Capital Total   │    Intereses     │   Total Cuenta   │ Estado
+────┼─────────────┼────────────────────┼──────────────────┼───────────────────┼──────────────────┼──────────────────┼─────────
+"""
+    
+    for cuenta in pensionado_data['cuentas']:
+        estado_emoji = "🎁" if cuenta['estado'] == '🎁 PRIMA' else "📈"
+        prima_str = f"${float(cuenta['prima']):>13,.2f}" if cuenta['prima'] > 0 else f"{'':>16}"
+        
+        content += f"{cuenta['consecutivo']:2d}  │ {cuenta['mes']:02d}/{cuenta['año']} │ ${float(cuenta['capital_base']):>14,.2f} │ {prima_str} │ ${float(cuenta['capital_total']):>13,.2f} │ ${float(cuenta['intereses']):>12,.2f} │ ${float(cuenta['total_cuenta']):>12,.2f} │ {estado_emoji}\n"
+    
+    content += f"""
+────┴─────────────┴────────────────────┴──────────────────┴───────────────────┴──────────────────┴──────────────────┴─────────
+
+METODOLOGÍA:
+• Cada cuenta es independiente con capital fijo (sin capitalización)
+• Intereses calculados desde el mes de la cuenta hasta agosto 2025
+• DTF efectiva anual específica para cada mes
+• Primas incluidas según número de mesadas (12/13/14)
+
+# (secciones duplicadas eliminadas)
+• Los intereses se calculan con la DTF del mes de la cuenta (mes vencido)
+• Este sistema evita la prescripción de cuotas partes (Ley 1066/2006)
+
+🔧 SOPORTE TÉCNICO:
+───────────────────────────────────────────────────────────────────────────────────────────────────────────────────
+
+Sistema: Cuotas Partes v2.0
+Metodología: 30 Cuentas Independientes
+Fecha generación: {date.today().strftime('%d/%m/%Y')}
+
+Para consultas técnicas sobre la liquidación, contactar al administrador del sistema.
+"""
+    
+    return content
+
+
+def _completar_totales_cuentas(todas_las_cuentas: list, fecha_corte: date):
+    """Completa en sitio capital, intereses y totales de `todas_las_cuentas` cuando vienen en
+    estructura mínima (solo año/mes por cuenta)."""
+    try:
+        from decimal import Decimal
+        from datetime import date as _date
+        from dateutil.relativedelta import relativedelta
+        # Misma lógica usada en la UI
+        from mostrar_liquidacion_36 import ajustar_base_por_ipc, calcular_interes_mensual_unico
+        from scripts.liquidacion_36_cuentas_corregida import tiene_prima_mes
+
+        fecha_limite = _date(fecha_corte.year, fecha_corte.month, 1)
+        for p in todas_las_cuentas:
+            cuentas = p.get('cuentas', [])
+            # Si ya tienen capital_total, asumimos que están completas
+            if cuentas and isinstance(cuentas[0], dict) and 'capital_total' in cuentas[0]:
+                # Asegurar totales agregados en el nivel del pensionado
+                p.setdefault('total_capital', sum(c.get('capital_total', 0) for c in cuentas))
+                p.setdefault('total_intereses', sum(c.get('intereses', 0) for c in cuentas))
+                p.setdefault('total_pensionado', p['total_capital'] + p['total_intereses'])
+                continue
+
+            # Calcular totales desde estructura mínima (solo año/mes)
+            info = p.get('pensionado', {})
+            try:
+                base = float(info.get('base_calculo_cuota', 0.0) or 0.0)
+            except Exception:
+                base = 0.0
+            try:
+                porcentaje = float(info.get('porcentaje_cuota', 0.0) or 0.0)
+            except Exception:
+                porcentaje = 0.0
+            try:
+                mesadas = int(info.get('mesadas', 12) or 12)
+            except Exception:
+                mesadas = 12
+
+            total_capital = Decimal('0')
+            total_intereses = Decimal('0')
+            total_total = Decimal('0')
+            consecutivo = 1
+            for cta in cuentas:
+                try:
+                    año = int(cta['año']); mes = int(cta['mes'])
+                except Exception:
+                    continue
+                fecha_cuenta = _date(año, mes, 1)
+                base_ajustada_año = ajustar_base_por_ipc(base, año)
+                capital_base = Decimal(str(base_ajustada_año)) * Decimal(str(porcentaje))
+                prima = capital_base if tiene_prima_mes(mesadas, mes) else Decimal('0')
+                capital_total = capital_base + prima
+
+                interes_acumulado = Decimal('0')
+                fa = fecha_cuenta
+                while fa <= fecha_limite:
+                    im = calcular_interes_mensual_unico(float(capital_total), fa, fecha_corte)
+                    interes_acumulado += Decimal(str(im))
+                    fa = fa + relativedelta(months=1)
+
+                total_cuenta = capital_total + interes_acumulado
+
+                # Enriquecer la cuenta mínima con campos completos
+                cta['consecutivo'] = consecutivo
+                cta['capital_base'] = capital_base
+                cta['prima'] = prima
+                cta['capital_total'] = capital_total
+                cta['intereses'] = interes_acumulado
+                cta['total_cuenta'] = total_cuenta
+                cta['estado'] = '🎁 PRIMA' if prima > 0 else '📈 Regular'
+
+                total_capital += capital_total
+                total_intereses += interes_acumulado
+                total_total += total_cuenta
+                consecutivo += 1
+
+            p['total_capital'] = total_capital
+            p['total_intereses'] = total_intereses
+            p['total_pensionado'] = total_total
+    except Exception:
+        # Si algo falla, seguimos sin bloquear la exportación; el consolidado puede quedar en cero para esos casos
+        pass
+
+
+def _tupla_pensionado(pensionado_info: dict, entidad_nombre: str, entidad_nit: str) -> tuple:
+    """Reconstruye la tupla de pensionado que espera `generar_pdf_para_pensionado`:
+    (identificacion, nombre, numero_mesadas, fecha_ingreso_nomina, empresa, base_calculo, porcentaje, nit)."""
+    base_calc = pensionado_info.get('base_calculo_cuota', 0.0)
+    try:
+        base_calc = float(base_calc)
+    except Exception:
+        base_calc = 0.0
+    porcentaje = pensionado_info.get('porcentaje_cuota', 0.0)
+    try:
+        porcentaje = float(porcentaje)
+    except Exception:
+        pass
+    return (
+        str(pensionado_info['cedula']),
+        pensionado_info['nombre'],
+        int(pensionado_info.get('mesadas', 12)),
+        None,  # fecha_ingreso_nomina (no requerida por el cálculo)
+        entidad_nombre,
+        base_calc,
+        porcentaje,
+        str(entidad_nit),
+    )
+
+
+def generar_pdf_fusionado_entidad(salida, entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date,
+                                  corregir_existentes: bool = False, estadisticas: dict | None = None,
+                                  progreso=None) -> str:
+    """
+    Escribe en `salida` (ruta o buffer) un solo PDF para imprenta con la portada consolidada y
+    todas las cuentas de cobro individuales de la entidad, con marcadores por pensionado y año.
+    Los consecutivos se asignan igual que en el ZIP. Devuelve el nombre sugerido del archivo.
+    `progreso(hechas, total)` se llama tras cada cuenta.
+    """
+    from generar_pdf_oficial import generar_pdf_para_pensionado, OpcionesRender
+    from app.pdf_fusionado import PDFFusionado
+
+    _completar_totales_cuentas(todas_las_cuentas, fecha_corte)
+    nombre = f"IMPRESION_{entidad_nit}_{fecha_corte.strftime('%Y%m%d')}.pdf"
+    fusionado = PDFFusionado(salida, titulo=f"Cuentas de cobro {entidad_nombre} - NIT {entidad_nit}")
+    escribir_pdf_consolidado(None, entidad_nit, entidad_nombre, todas_las_cuentas, fecha_corte,
+                             anexo=False, fusionado=fusionado)
+
+    opciones = OpcionesRender(
+        correccion=bool(corregir_existentes),
+        fecha_corte=fecha_corte,
+        motor='canvas',
+        fusionado=fusionado,
+    )
+    errores = []
+    total_cuentas = sum(len(p['cuentas']) for p in todas_las_cuentas)
+    hechas = 0
+    for pensionado_data in todas_las_cuentas:
+        pensionado_info = pensionado_data['pensionado']
+        pensionado_tuple = _tupla_pensionado(pensionado_info, entidad_nombre, entidad_nit)
+        # Orden de impresión: por año y mes, para que los marcadores de año no se repitan
+        for cuenta in sorted(pensionado_data['cuentas'], key=lambda c: (c['año'], c['mes'])):
+            try:
+                generar_pdf_para_pensionado(
+                    pensionado=pensionado_tuple,
+                    periodo='custom',
+                    año_inicio=cuenta['año'],
+                    mes_inicio=cuenta['mes'],
+                    solo_mes=True,
+                    opciones=opciones,
+                )
+            except Exception as e:
+                errores.append(f"Error generando cuenta para {pensionado_info['cedula']} (Mes: {cuenta['mes']}/{cuenta['año']}): {e}")
+            hechas += 1
+            if progreso is not None:
+                progreso(hechas, total_cuentas)
+    fusionado.cerrar()
+
+    if estadisticas is not None:
+        estadisticas.update({
+            'cuentas': fusionado.cuentas,
+            'paginas': fusionado.canvas.getPageNumber() - 1,
+            'errores': errores,
+        })
+    return nombre
+
+
+def carpeta_zip_entidad(entidad_nit: str, entidad_nombre: str) -> str:
+    """Carpeta raíz dentro del ZIP masivo: <Nombre_sin_signos>_<NIT>."""
+    import re
+    nombre = entidad_nombre.strip().replace(' ', '_')
+    nombre = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', nombre)
+    return f"{nombre}_{entidad_nit}"
+
+
+def renderizar_cuentas(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, opciones, errores: list,
+                       progreso=None):
+    """Genera el PDF de cada cuenta de `todas_las_cuentas` (una por mes) con `opciones`.
+
+    El destino de `opciones` decide dónde queda cada PDF. Los errores se agregan a `errores`
+    sin detener el resto; `progreso(hechas, total)` se llama tras cada cuenta.
+    """
+    from generar_pdf_oficial import generar_pdf_para_pensionado
+
+    total_cuentas = sum(len(p.get('cuentas', [])) for p in todas_las_cuentas)
+    hechas = 0
+    for pensionado_data in todas_las_cuentas:
+        pensionado_info = pensionado_data['pensionado']
+        pensionado_tuple = _tupla_pensionado(pensionado_info, entidad_nombre, entidad_nit)
+
+        for cuenta in pensionado_data['cuentas']:
+            año = cuenta['año']
+            mes = cuenta['mes']
+
+            # Generar el PDF para una sola cuenta (un mes)
+            try:
+                generar_pdf_para_pensionado(
+                    pensionado=pensionado_tuple,
+                    periodo='custom',
+                    año_inicio=año,
+                    mes_inicio=mes,
+                    solo_mes=True, # ¡Importante para generar solo 1 cuenta!
+                    opciones=opciones,
+                )
+            except Exception as e:
+                # Registrar el error para no detener todo el proceso y continuar
+                errores.append(f"Error generando PDF para {pensionado_info['cedula']} (Mes: {mes}/{año}): {e}\n")
+            hechas += 1
+            if progreso is not None:
+                progreso(hechas, total_cuentas)
+
+
+def renderizar_reanudable(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, opciones, errores: list,
+                          corrida, progreso=None):
+    """Como `renderizar_cuentas`, pero con puntos de control en `corrida` (PuntosControl).
+
+    Omite las cuentas que ya tienen punto de control, deja los PDFs en la carpeta de la corrida
+    y registra los puntos de cada pensionado al terminarlo. Las cuentas que fallan no se
+    registran: la próxima ejecución de la corrida las reintenta.
+    """
+    import os
+    from dataclasses import replace
+
+    total_cuentas = sum(len(p.get('cuentas', [])) for p in todas_las_cuentas)
+    hechas = 0
+    puntos = []
+
+    def _a_corrida(carpeta_pensionado, nombre_archivo, contenido, meta):
+        relativa = os.path.join(carpeta_pensionado, str(meta['periodo_inicio'].year), nombre_archivo)
+        corrida.guardar(relativa, contenido)
+        puntos.append({
+            'clave': corrida.clave(meta['identificacion'], meta['periodo_inicio'].year, meta['periodo_inicio'].month),
+            'consecutivo': meta['consecutivo'],
+            'archivo': relativa,
+            'meta': meta,
+        })
+        return relativa
+
+    opciones = replace(opciones, destino=_a_corrida, reusar_desde=corrida.inicio)
+    for pensionado_data in todas_las_cuentas:
+        cedula = pensionado_data['pensionado']['cedula']
+        pendientes = [c for c in pensionado_data['cuentas'] if not corrida.hecha(cedula, c['año'], c['mes'])]
+        hechas += len(pensionado_data['cuentas']) - len(pendientes)
+        if pendientes:
+            base = hechas
+            renderizar_cuentas(entidad_nit, entidad_nombre, [{**pensionado_data, 'cuentas': pendientes}], opciones, errores,
+                               None if progreso is None else lambda h, _t: progreso(base + h, total_cuentas))
+            hechas += len(pendientes)
+            corrida.registrar(puntos)
+            puntos.clear()
+        elif progreso is not None:
+            progreso(hechas, total_cuentas)
+
+
+def generar_zip_masivo_completo(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date, corregir_existentes: bool = False, motor: str = 'platypus', usar_cache: bool = True, estadisticas: dict | None = None,
+                                consolidado_de_sesion: bool = True, progreso=None, incluir_consolidado: bool = True,
+                                corrida=None, reimprimir_existentes: bool = False) -> bytes:
+    """
+    Crea un ZIP en memoria con la estructura completa:
+    - README.txt
+    - CONSOLIDADO_GLOBAL.pdf
+    - Carpeta por pensionado:
+        - Carpeta por año:
+            - PDF de cuenta de cobro individual.
+    - MANIFEST.json (SHA-256 y bytes de cada entrada, totales por pensionado y por entidad)
+
+    `motor` elige el render de los PDFs individuales: 'platypus' o 'canvas' (más rápido).
+    Con `usar_cache`, los PDFs cuyos datos no cambiaron se copian de la caché de PDFs.
+    Si se pasa `estadisticas` (dict), se llena con el resumen de la generación.
+    `consolidado_de_sesion=False` ignora el PDF consolidado guardado en la sesión de Streamlit
+    (procesos de trabajo y lotes de varias entidades). `progreso(hechas, total)` se llama tras
+    cada cuenta procesada. `incluir_consolidado=False` omite el PDF consolidado (ZIPs parciales).
+    Los PDFs se guardan sin recomprimir (ver app.zip_manifiesto.compresion_para). Con `corrida` (app.corridas.PuntosControl) la generación
+    es reanudable: omite las cuentas ya terminadas en una ejecución anterior con el mismo id,
+    acumula los PDFs en la carpeta de la corrida y arma el ZIP desde ahí.
+    `reimprimir_existentes` usa el consecutivo de las cuentas ya emitidas sin modificar
+    cuenta_cobro (ver OpcionesRender.reimpresion).
+    """
+    import io
+    import tempfile
+    import zipfile
+    import os
+
+    # Importar la función de generación de PDF individual; la política de consecutivo viaja
+    # en un OpcionesRender propio de este trabajo (sin mutar globales del módulo)
+    from generar_pdf_oficial import OpcionesRender
+    from app.pdf_cache import CachePDF
+    from app.contexto_render import obtener_contexto
+    from app.render_canvas import PlantillasCuentaCobro
+    from app.zip_manifiesto import ZipConManifiesto
+
+    zip_buffer = io.BytesIO()
+    # Toda entrada pasa por el manifiesto (hash y bytes calculados al escribirla)
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_archivo, \
+            ZipConManifiesto(zip_archivo) as zf:
+        top_dir = carpeta_zip_entidad(entidad_nit, entidad_nombre)
+        # 1. README
+        readme_content = generar_readme_texto(
+            entidad_nit,
+            len(todas_las_cuentas),
+            sum(len(p.get('cuentas', [])) for p in todas_las_cuentas),
+            entidad_nombre,
+        )
+        zf.writestr(f"{top_dir}/README.txt", readme_content)
+
+        # 1.1 Asegurar que 'todas_las_cuentas' tenga totales calculados si viene en estructura mínima
+        #     (solo los usa el consolidado)
+        if incluir_consolidado:
+            _completar_totales_cuentas(todas_las_cuentas, fecha_corte)
+
+        # 2. PDF Consolidado: usar la MISMA función del botón "PDF Consolidado"
+        #    Preferimos reutilizar el PDF ya generado en la sesión; si no existe, lo generamos aquí.
+        #    Los errores se acumulan en memoria (no en una carpeta temporal compartida entre sesiones).
+        errores = []
+
+        if incluir_consolidado:
+            try:
+                pdf_bytes = None
+                pdf_name = None
+                if consolidado_de_sesion:
+                    try:
+                        import streamlit as st  # puede no estar disponible en algunos contextos
+                        pdf_bytes = st.session_state.get('pdf_consolidado_data')
+                        pdf_name = st.session_state.get('pdf_consolidado_name')
+                    except Exception:
+                        pass
+
+                if pdf_bytes and pdf_name:
+                    zf.writestr(os.path.join(top_dir, pdf_name), pdf_bytes)
+                elif corrida is not None:
+                    # Corrida reanudable: el consolidado (y su número) se genera una sola vez
+                    from app.corridas import CLAVE_CONSOLIDADO
+                    punto = corrida.punto(CLAVE_CONSOLIDADO)
+                    if punto is None:
+                        os.makedirs(corrida.carpeta, exist_ok=True)
+                        ruta_tmp = corrida.ruta(f"consolidado.{os.getpid()}.tmp")
+                        pdf_name = escribir_pdf_consolidado(
+                            ruta_tmp,
+                            entidad_nit=entidad_nit,
+                            entidad_nombre=entidad_nombre,
+                            todas_las_cuentas=todas_las_cuentas,
+                            fecha_corte=fecha_corte,
+                        )
+                        os.replace(ruta_tmp, corrida.ruta(pdf_name))
+                        corrida.registrar([{'clave': CLAVE_CONSOLIDADO, 'archivo': pdf_name}])
+                        punto = corrida.punto(CLAVE_CONSOLIDADO)
+                    zf.write(corrida.ruta(punto['archivo']), os.path.join(top_dir, punto['archivo']))
+                else:
+                    # Generar con la misma lógica empleada por el botón, directo a un archivo temporal
+                    # (entidades grandes: el PDF no pasa completo por memoria antes de entrar al ZIP)
+                    with tempfile.TemporaryDirectory() as tmp_dir:
+                        ruta_tmp = os.path.join(tmp_dir, 'consolidado.pdf')
+                        pdf_name = escribir_pdf_consolidado(
+                            ruta_tmp,
+                            entidad_nit=entidad_nit,
+                            entidad_nombre=entidad_nombre,
+                            todas_las_cuentas=todas_las_cuentas,
+                            fecha_corte=fecha_corte,
+                        )
+                        zf.write(ruta_tmp, os.path.join(top_dir, pdf_name))
+            except Exception as e:
+                errores.append(f"Error generando/anexando PDF consolidado de la entidad {entidad_nombre} (NIT: {entidad_nit}): {e}\n")
+
+        def _agregar_al_zip(carpeta_pensionado, nombre_archivo, contenido, meta):
+            # Ej: Suarez_Mootoo_15240013/2023/15240013_Enero_2023.pdf
+            zip_path = os.path.join(top_dir, carpeta_pensionado, str(meta['periodo_inicio'].year), nombre_archivo)
+            zf.writestr(zip_path, contenido, meta=meta)
+            return zip_path
+
+        # True: si existe una cuenta previa para el mismo periodo y pensionado, se actualiza (mismo consecutivo)
+        # False: crea una nueva entrada con nuevo consecutivo
+        opciones = OpcionesRender(
+            correccion=bool(corregir_existentes),
+            reimpresion=bool(reimprimir_existentes),
+            fecha_corte=fecha_corte,
+            destino=_agregar_al_zip,
+            motor=motor,
+            cache=CachePDF() if usar_cache else None,
+            # Parte fija de las cuentas como form XObject (ver PlantillasCuentaCobro)
+            plantillas=PlantillasCuentaCobro(obtener_contexto()) if motor == 'canvas' else None,
+        )
+
+        # 3. Generar PDFs individuales y organizarlos en carpetas
+        if corrida is None:
+            renderizar_cuentas(entidad_nit, entidad_nombre, todas_las_cuentas, opciones, errores, progreso)
+        else:
+            renderizar_reanudable(entidad_nit, entidad_nombre, todas_las_cuentas, opciones, errores, corrida, progreso)
+            for punto in corrida.puntos():
+                if punto['meta'] is not None:
+                    zf.write(corrida.ruta(punto['archivo']), os.path.join(top_dir, punto['archivo']), meta=punto['meta'])
+
+        # Incluir el log de errores (si existe) dentro del ZIP para diagnóstico
+        if errores:
+            zf.writestr(f"{top_dir}/error_log.txt", "".join(errores))
+
+        # Manifiesto al final: los totales ya se acumularon al escribir cada entrada
+        zf.escribir_manifiesto(
+            f"{top_dir}/MANIFEST.json",
+            nit=str(entidad_nit),
+            nombre=entidad_nombre,
+            fecha_corte=fecha_corte.isoformat(),
+        )
+
+        if estadisticas is not None:
+            cache = opciones.cache
+            estadisticas.update({
+                'pdfs': sum(len(p.get('cuentas', [])) for p in todas_las_cuentas) - len(errores),
+                'errores': len(errores),
+                'cache_aciertos': cache.aciertos if cache else 0,
+                'cache_fallos': cache.fallos if cache else 0,
+                'cache_tasa': cache.tasa_aciertos if cache else 0.0,
+            })
+
+    # Con errores la corrida queda abierta: repetirla reintenta solo las cuentas que fallaron
+    if corrida is not None and not errores:
+        corrida.terminar()
+    return zip_buffer.getvalue()
+
+
+# Construye lista de (año, mes) para los últimos MESES_PRESCRIPCION meses hasta fecha_corte (inclusive)
+def _periodos_ultimos_meses(fecha_corte: date, meses: int) -> list[tuple[int,int]]:
+    from dateutil.relativedelta import relativedelta
+    inicio = date(fecha_corte.year, fecha_corte.month, 1) - relativedelta(months=meses-1)
+    actual = inicio
+    periodos = []
+    while actual <= date(fecha_corte.year, fecha_corte.month, 1):
+        periodos.append((actual.year, actual.month))
+        actual = actual + relativedelta(months=1)
+    return periodos
+
+
+# Construye la estructura mínima esperada por generar_zip_masivo_completo para una entidad
+# (con `identificaciones`, solo esos pensionados)
+def construir_todas_cuentas_min(session, entidad_nit: str, fecha_corte: date, identificaciones: list | None = None) -> list:
+    from sqlalchemy import text
+    from app.settings import MESES_PRESCRIPCION
+    periodos = _periodos_ultimos_meses(fecha_corte, MESES_PRESCRIPCION)
+    params = {"nit": entidad_nit}
+    filtro = ""
+    if identificaciones is not None:
+        if not identificaciones:
+            return []
+        params.update({f"id{i}": str(ident) for i, ident in enumerate(identificaciones)})
+        filtro = " AND identificacion IN (" + ", ".join(f":id{i}" for i in range(len(identificaciones))) + ")"
+    rows = session.execute(text(
+        f"""
+        SELECT identificacion, nombre, numero_mesadas, base_calculo_cuota_parte, porcentaje_cuota_parte
+        FROM pensionado WHERE nit_entidad = :nit{filtro} ORDER BY nombre
+        """
+    ), params).fetchall()
+    resultado = []
+    for r in rows:
+        resultado.append({
+            'pensionado': {
+                'cedula': r[0],
+                'nombre': r[1],
+                'mesadas': int(r[2] or 12),
+                'base_calculo_cuota': float(r[3] or 0),
+                'porcentaje_cuota': float(r[4] or 0),
+            },
+            'cuentas': [ {'año': a, 'mes': m} for a, m in periodos ]
+        })
+    return resultado
+
+
+def filtrar_cuentas(todas_las_cuentas: list, identificaciones: list | None = None,
+                    años: list | None = None, meses: list | None = None) -> list:
+    """Subconjunto de `todas_las_cuentas` (ya calculadas) por pensionado, año y mes.
+
+    No recalcula nada: las cuentas filtradas son los mismos dicts de la entrada. Los totales por
+    pensionado se rehacen sobre las cuentas que quedan y se omiten pensionados sin cuentas.
+    """
+    idents = {str(i) for i in identificaciones} if identificaciones is not None else None
+    años = set(int(a) for a in años) if años else None
+    meses = set(int(m) for m in meses) if meses else None
+    resultado = []
+    for p in todas_las_cuentas:
+        if idents is not None and str(p['pensionado']['cedula']) not in idents:
+            continue
+        cuentas = [c for c in p.get('cuentas', [])
+                   if (años is None or int(c['año']) in años) and (meses is None or int(c['mes']) in meses)]
+        if not cuentas:
+            continue
+        nuevo = {**p, 'cuentas': cuentas}
+        if 'capital_total' in cuentas[0]:
+            nuevo['total_capital'] = sum(c.get('capital_total', 0) for c in cuentas)
+            nuevo['total_intereses'] = sum(c.get('intereses', 0) for c in cuentas)
+            nuevo['total_pensionado'] = nuevo['total_capital'] + nuevo['total_intereses']
+        resultado.append(nuevo)
+    return resultado
+
+
+def generar_zip_parcial(entidad_nit: str, entidad_nombre: str, fecha_corte: date,
+                        identificaciones: list | None = None, años: list | None = None, meses: list | None = None,
+                        todas_las_cuentas: list | None = None, corregir_existentes: bool = False,
+                        motor: str = 'platypus', estadisticas: dict | None = None) -> tuple:
+    """
+    ZIP con solo las cuentas de los pensionados, años y meses pedidos (None = sin filtro).
+    Devuelve (bytes_zip, nombre_archivo).
+
+    Reutiliza las cuentas ya calculadas en `todas_las_cuentas` si se pasan (p. ej. las de la
+    sesión de la UI); si no, consulta solo los pensionados pedidos. Por defecto no modifica
+    cuenta_cobro: las cuentas ya emitidas se reimprimen con su consecutivo, así que con el mismo
+    `motor` del ZIP completo los PDFs salen de la caché cuando los datos no cambiaron (solo las
+    que aún no existen se emiten). Con `corregir_existentes` se corrigen como en el ZIP completo.
+    No incluye el consolidado de la entidad: el costo es proporcional al subconjunto, no a la
+    entidad.
+    """
+    if todas_las_cuentas is None:
+        from app.db import get_session
+        session = get_session()
+        try:
+            todas_las_cuentas = construir_todas_cuentas_min(session, entidad_nit, fecha_corte, identificaciones)
+        finally:
+            session.close()
+    subconjunto = filtrar_cuentas(todas_las_cuentas, identificaciones, años, meses)
+
+    partes = [str(entidad_nit)]
+    if identificaciones is not None and len(identificaciones) == 1:
+        partes.append(str(identificaciones[0]))
+    if años:
+        partes.append("-".join(str(a) for a in sorted(set(años))))
+    nombre = f"LIQUIDACION_PARCIAL_{'_'.join(partes)}_{fecha_corte.strftime('%Y%m%d')}.zip"
+
+    zip_bytes = generar_zip_masivo_completo(
+        entidad_nit=entidad_nit,
+        entidad_nombre=entidad_nombre,
+        todas_las_cuentas=subconjunto,
+        fecha_corte=fecha_corte,
+        corregir_existentes=corregir_existentes,
+        reimprimir_existentes=not corregir_existentes,
+        motor=motor,
+        estadisticas=estadisticas,
+        consolidado_de_sesion=False,
+        incluir_consolidado=False,
+    )
+    return zip_bytes, nombre
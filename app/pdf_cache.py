@@ -0,0 +1,130 @@
+# Caché de PDFs direccionada por contenido
+# - Clave: SHA-256 de los datos con que se dibuja el documento (mismo pensionado, tasas,
+#   fecha de corte y consecutivo => mismo PDF) y de la codificación de flujos de ReportLab
+# - Si la clave ya existe se copia el PDF del almacén en lugar de volver a renderizarlo
+# - Tamaño acotado: al superar el límite se eliminan los PDFs usados hace más tiempo
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+
+from reportlab import rl_config
+
+from app.settings import PDF_CACHE_DIR, PDF_CACHE_MAX_MB
+
+
+def _serializable(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable en clave de caché: {type(valor).__name__}")
+
+
+class CachePDF:
+    """Almacén en disco de PDFs ya renderizados, con conteo de aciertos por trabajo.
+
+    Varios procesos pueden compartir la carpeta: las escrituras son atómicas (archivo
+    temporal + os.replace) y un PDF desalojado por otro proceso cuenta como fallo.
+    """
+
+    def __init__(self, carpeta: str | None = None, max_bytes: int | None = None):
+        self.carpeta = carpeta or PDF_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else PDF_CACHE_MAX_MB * 1024 * 1024
+        self.aciertos = 0
+        self.fallos = 0
+        self._bytes_totales = None  # se calcula en el primer guardado
+
+    @staticmethod
+    def clave(*partes) -> str:
+        """Hash estable de las entradas del render (dicts, tuplas, números, fechas).
+
+        Incluye rl_config.useA85: con o sin ASCII85 el mismo documento tiene otros bytes.
+        """
+        contenido = json.dumps({'useA85': int(rl_config.useA85), 'partes': partes}, sort_keys=True, default=_serializable, ensure_ascii=False)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave: str) -> str:
+        # Subcarpetas por prefijo para no acumular miles de archivos en un solo directorio
+        return os.path.join(self.carpeta, clave[:2], f"{clave}.pdf")
+
+    def copiar_a(self, clave: str, salida) -> bool:
+        """Copia el PDF de la caché a `salida` (ruta o buffer). False si no está."""
+        ruta = self._ruta(clave)
+        try:
+            if isinstance(salida, str):
+                shutil.copyfile(ruta, salida)
+            else:
+                with open(ruta, 'rb') as f:
+                    salida.write(f.read())
+            # Marca de uso reciente para el desalojo
+            os.utime(ruta)
+        except FileNotFoundError:
+            self.fallos += 1
+            return False
+        self.aciertos += 1
+        return True
+
+    def guardar(self, clave: str, contenido: bytes):
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contenido)
+            os.replace(tmp, ruta)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        if self._bytes_totales is None:
+            self._bytes_totales = sum(tam for _, tam, _ in self._archivos())
+        else:
+            self._bytes_totales += len(contenido)
+        if self._bytes_totales > self.max_bytes:
+            self._desalojar()
+
+    def _archivos(self) -> list:
+        """(ruta, tamaño, mtime) de todos los PDFs del almacén."""
+        archivos = []
+        if not os.path.isdir(self.carpeta):
+            return archivos
+        for raiz, _, nombres in os.walk(self.carpeta):
+            for nombre in nombres:
+                if not nombre.endswith('.pdf'):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    st = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                archivos.append((ruta, st.st_size, st.st_mtime))
+        return archivos
+
+    def _desalojar(self):
+        """Elimina los PDFs menos usados hasta quedar en ~90% del límite."""
+        archivos = sorted(self._archivos(), key=lambda a: a[2])
+        total = sum(tam for _, tam, _ in archivos)
+        objetivo = int(self.max_bytes * 0.9)
+        for ruta, tam, _ in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tam
+        self._bytes_totales = total
+
+    @property
+    def tasa_aciertos(self) -> float:
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def resumen(self) -> str:
+        return (f"Caché de PDFs: {self.aciertos} aciertos, {self.fallos} renderizados "
+                f"({self.tasa_aciertos:.1%} de aciertos)")
@@ -0,0 +1,87 @@
+# PDF único por entidad, listo para imprenta
+# - Portada consolidada y todas las cuentas de cobro en un solo documento, escrito en una
+#   pasada sobre un único canvas (sin un archivo ni un buffer por cuenta)
+# - Marcadores (outline) por pensionado y, dentro de cada uno, por año
+# - La parte fija de las cuentas es un form XObject compartido por todas las páginas
+#   (PlantillasCuentaCobro): se escribe una vez por entidad y período
+# - Los metadatos incrustados listan todas las cuentas con su página de inicio
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from app.contexto_render import ContextoRender, obtener_contexto
+from app.metadatos_pdf import incrustar_metadatos, metadatos_cuenta
+from app.render_canvas import PlantillasCuentaCobro, cuenta_cobro_cabe_en_canvas, dibujar_pagina_cuenta_cobro
+
+
+class PDFFusionado:
+    """Escritor del PDF fusionado de una entidad.
+
+    Uso:
+        fusionado = PDFFusionado(salida, titulo="...")
+        fusionado.construir(doc, story, marcador="Consolidado")   # portada (platypus)
+        fusionado.agregar_cuenta(datos, año)                      # una por cuenta, en orden
+        fusionado.cerrar()
+    """
+
+    def __init__(self, salida, titulo: str = '', ctx: ContextoRender | None = None):
+        self.ctx = ctx or obtener_contexto()
+        self.plantillas = PlantillasCuentaCobro(self.ctx)
+        self.canvas = canvas.Canvas(salida, pagesize=A4)
+        self.titulo = titulo
+        self.cuentas = 0
+        self.metadatos = []
+        self._pensionado = None
+        self._año = None
+        self._n_marcadores = 0
+
+    def _marcar(self, titulo: str, nivel: int):
+        # El marcador apunta a la página en curso (la próxima que se dibuje)
+        self._n_marcadores += 1
+        clave = f"m{self._n_marcadores}"
+        self.canvas.bookmarkPage(clave)
+        self.canvas.addOutlineEntry(titulo, clave, level=nivel, closed=nivel == 0)
+
+    def _marcar_cuenta(self, datos: dict, año: int):
+        pensionado = (datos['identificacion'], datos['nombre'])
+        if pensionado != self._pensionado:
+            self._pensionado = pensionado
+            self._año = None
+            self._marcar(f"{datos['nombre']} ({datos['identificacion']})", 0)
+        if año != self._año:
+            self._año = año
+            self._marcar(str(año), 1)
+
+    def construir(self, doc, flowables, marcador: str | None = None):
+        """Construye un documento platypus (`doc` sin guardar) como páginas del PDF fusionado."""
+        if marcador:
+            self._marcar(marcador, 0)
+        # El doc dibuja sobre el canvas compartido y no lo cierra al terminar
+        doc._doSave = 0
+        doc.build(flowables, canvasmaker=lambda *args, **kwargs: self.canvas)
+
+    def agregar_cuenta(self, datos: dict, año: int, respaldo=None) -> int:
+        """Agrega una cuenta de cobro; devuelve la página en que empieza.
+
+        Las cuentas que no caben en una página del motor canvas se delegan a
+        `respaldo(fusionado, datos)`, que debe construirlas con `construir`.
+        """
+        self._marcar_cuenta(datos, año)
+        pagina = self.canvas.getPageNumber()
+        if respaldo is not None and not cuenta_cobro_cabe_en_canvas(datos, self.ctx):
+            respaldo(self, datos)
+        else:
+            self.canvas.setPageSize(A4)
+            dibujar_pagina_cuenta_cobro(self.canvas, datos, self.ctx, self.plantillas)
+            self.canvas.showPage()
+        self.cuentas += 1
+        self.metadatos.append(metadatos_cuenta(datos, pagina=pagina))
+        return pagina
+
+    def cerrar(self):
+        if self.titulo:
+            self.canvas.setTitle(self.titulo)
+        if self._n_marcadores:
+            self.canvas.showOutline()
+        incrustar_metadatos(self.canvas, self.metadatos)
+        self.canvas.save()
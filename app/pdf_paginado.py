@@ -0,0 +1,141 @@
+# Construcción de PDFs grandes con memoria acotada
+# - FlowablesPerezosos: platypus consume el story desde un generador (no se arma la lista completa)
+# - tablas_por_pagina: una Table por página con cabecera repetida, "Subtotal" de la página y
+#   acumulado ("Van"); la última página cierra con "TOTAL"
+# Cada tabla tiene a lo sumo una página de filas, así que el costo de layout es lineal.
+
+import collections
+import itertools
+
+from reportlab.platypus import PageBreak, Table
+
+# Padding por defecto del Frame de SimpleDocTemplate (6pt arriba y abajo)
+_PADDING_FRAME = 6
+# Holgura para redondeos al calcular cuántas filas caben
+_HOLGURA = 2
+
+
+class FlowablesPerezosos:
+    """Secuencia de flowables alimentada por un generador.
+
+    `BaseDocTemplate.build` solo trabaja sobre el frente de la lista (lee y borra
+    `flowables[0]`, reinserta al inicio las partes de un flowable partido), por lo que basta
+    un buffer pequeño: el story completo nunca está en memoria.
+    """
+
+    def __init__(self, flowables):
+        self._pendientes = iter(flowables)
+        self._buffer = collections.deque()
+
+    def _llenar(self, n: int):
+        while len(self._buffer) < n:
+            try:
+                self._buffer.append(next(self._pendientes))
+            except StopIteration:
+                break
+
+    def __len__(self):
+        self._llenar(1)
+        return len(self._buffer)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            self._llenar(i.stop or 0)
+            return list(self._buffer)[i]
+        self._llenar(i + 1)
+        return self._buffer[i]
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            self._llenar(i.stop or 0)
+            for _ in range(len(range(*i.indices(len(self._buffer))))):
+                self._buffer.popleft()
+            return
+        self._llenar(i + 1)
+        del self._buffer[i]
+
+    def __setitem__(self, i, valores):
+        # Solo se usa como `flowables[0:0] = partes`
+        if not (isinstance(i, slice) and not i.start and not i.stop):
+            raise IndexError("FlowablesPerezosos solo admite inserción al inicio")
+        self._buffer.extendleft(reversed(list(valores)))
+
+    def insert(self, i, flowable):
+        self._buffer.insert(i, flowable)
+
+
+def alto_util(doc) -> float:
+    """Alto disponible para flowables en una página de `doc` (SimpleDocTemplate)."""
+    return doc.height - 2 * _PADDING_FRAME
+
+
+def alto_flowables(flowables: list, ancho: float, alto: float) -> float:
+    """Alto que ocupan `flowables` apilados al inicio de un frame (mismas reglas de espacios)."""
+    total = 0.0
+    espacio_previo = 0.0
+    for i, f in enumerate(flowables):
+        _, h = f.wrap(ancho, alto)
+        if i:
+            total += max(f.getSpaceBefore() - espacio_previo, 0)
+        espacio_previo = f.getSpaceAfter()
+        total += h + espacio_previo
+    return total
+
+
+def tablas_por_pagina(cabecera: list, filas, fila_resumen, n_valores: int, anchos: list, estilo,
+                      estilo_subtotales, alto_primera: float, alto_pagina: float, **kw_tabla):
+    """Genera las tablas de un listado largo, una por página.
+
+    - filas: iterable de (celdas, valores); `valores` son los `n_valores` números que se suman.
+    - fila_resumen(etiqueta, sumas): celdas de una fila de totales.
+    - estilo: TableStyle con una fila final de totales; estilo_subtotales: con dos
+      (subtotal de la página y acumulado).
+    - alto_primera / alto_pagina: espacio libre en la primera página y en las siguientes.
+
+    Las filas deben ocupar un solo renglón (alto uniforme): con eso se calcula cuántas
+    caben por página. Si algo no cabe, platypus parte la tabla igual que antes.
+    """
+    ceros = (0.0,) * n_valores
+    filas = iter(filas)
+    primera = next(filas, None)
+    if primera is None:
+        yield Table([cabecera, fila_resumen('TOTAL', ceros)], colWidths=anchos, style=estilo, **kw_tabla)
+        return
+
+    # Medir alturas con una tabla de muestra
+    muestra = Table([cabecera, primera[0], fila_resumen('Subtotal', ceros), fila_resumen('TOTAL', ceros)],
+                    colWidths=anchos, style=estilo_subtotales)
+    muestra.wrap(sum(anchos), alto_pagina)
+    alto_cabecera, alto_fila, alto_subtotal, alto_total = muestra._rowHeights
+
+    def _capacidad(alto):
+        libre = alto - alto_cabecera - alto_subtotal - alto_total - _HOLGURA
+        return max(1, int(libre // alto_fila))
+
+    acumulado = list(ceros)
+    capacidad = _capacidad(alto_primera)
+    pagina = []
+    n_pagina = 0
+
+    def _tabla(pagina, ultima):
+        subtotal = [sum(v[i] for _, v in pagina) for i in range(n_valores)]
+        for i, v in enumerate(subtotal):
+            acumulado[i] += v
+        datos = [cabecera] + [celdas for celdas, _ in pagina]
+        if ultima and n_pagina == 0:
+            # Una sola página: solo la fila de TOTAL, como el formato original
+            datos.append(fila_resumen('TOTAL', acumulado))
+            return Table(datos, colWidths=anchos, style=estilo, **kw_tabla)
+        datos.append(fila_resumen('Subtotal', subtotal))
+        datos.append(fila_resumen('TOTAL' if ultima else 'Van', acumulado))
+        return Table(datos, colWidths=anchos, style=estilo_subtotales, **kw_tabla)
+
+    for fila in itertools.chain([primera], filas):
+        if len(pagina) == capacidad:
+            yield _tabla(pagina, ultima=False)
+            yield PageBreak()
+            pagina = []
+            n_pagina += 1
+            capacidad = _capacidad(alto_pagina)
+        pagina.append(fila)
+    yield _tabla(pagina, ultima=True)
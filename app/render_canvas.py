@@ -0,0 +1,321 @@
+# Render directo sobre canvas de la cuenta de cobro individual
+# - Mismo documento que construir_story_cuenta_cobro (generar_pdf_oficial) pero sin el
+#   layout de platypus: las coordenadas salen de la geometría fija del formato.
+# - Pensado para corridas masivas (ZIP por entidad); se elige por trabajo con
+#   OpcionesRender(motor='canvas').
+# - Capa estática (encabezado, etiquetas, entidad/período, cabeceras, grillas) separada de
+#   la dinámica; PlantillasCuentaCobro la escribe como form XObject una vez por archivo.
+
+import hashlib
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from app.contexto_render import ContextoRender
+from app.metadatos_pdf import incrustar_metadatos, metadatos_cuenta
+
+# Geometría de SimpleDocTemplate en generar_pdf_oficial (A4, márgenes 0.5cm/1cm)
+ANCHO_PAGINA, ALTO_PAGINA = A4
+_PADDING_FRAME = 6  # padding por defecto del Frame de platypus
+Y_SUPERIOR = ALTO_PAGINA - 1*cm - _PADDING_FRAME
+Y_INFERIOR = 1*cm + _PADDING_FRAME
+
+# Alto de filas (leading + padding superior/inferior de cada TableStyle)
+_ALTO_ENCABEZADO = 24      # dos líneas de 12pt
+_ALTO_FILA_INFO = 16       # tabla superior y resumen
+_ALTO_TITULO = 12          # párrafo "JULIO 29/2006 ..."
+_LEADING_CABECERA = 8      # cabeceras de la tabla de intereses
+_ALTO_FILA_DATOS = 11      # 7 de leading + 2 + 2
+_ALTO_FILA_TOTAL = 20      # 12 de leading + 4 + 4
+
+_CABECERAS = ['PERÍODO', 'Vr. Cuota parte periodo', 'Días', 'DTF EA', 'Valor Intereses', 'Capital']
+_TITULO_INTERESES = "JULIO 29/2006 - Art. 4 Ley 1066/2006 " + "\xa0" * 78 + " CON INTERESES DTF"
+
+
+def _lineas_cabecera(anchos: list) -> list:
+    """Cabeceras partidas según el ancho útil de cada columna (padding 2 + 2)."""
+    return [simpleSplit(t, 'Helvetica-Bold', 7, w - 4) for t, w in zip(_CABECERAS, anchos)]
+
+
+def _celdas_fila(fila: tuple) -> list:
+    etiqueta, vr_cuota, dias, dtf, interes, capital = fila
+    return [etiqueta, f"${vr_cuota:,.2f}", f"{dias:d}", f"{dtf:.2f}%", f"${interes:,.2f}", f"${capital:,.2f}"]
+
+
+def cuenta_cobro_cabe_en_canvas(datos: dict, ctx: ContextoRender) -> bool:
+    """True si la cuenta cabe en una página sin partir celdas.
+
+    Las cuentas más largas (periodos custom de muchos años) o con valores que no caben
+    en su columna se dejan a platypus, que sabe partir la tabla en varias páginas.
+    """
+    est = ctx.oficial
+    lineas = _lineas_cabecera(est.anchos_intereses)
+    alto_cabecera = max(len(l) for l in lineas) * _LEADING_CABECERA + 8
+    n_info = 4 + bool(datos.get('sustituto_nombre')) + bool(datos.get('sustituto_identificacion'))
+    alto = (_ALTO_ENCABEZADO + 0.5*cm + n_info * _ALTO_FILA_INFO + 0.3*cm + 2 * _ALTO_FILA_INFO + 0.3*cm
+            + _ALTO_TITULO + 0.2*cm + alto_cabecera + len(datos['filas']) * _ALTO_FILA_DATOS + _ALTO_FILA_TOTAL)
+    if Y_SUPERIOR - alto < Y_INFERIOR:
+        return False
+    for fila in datos['filas']:
+        for texto, ancho in zip(_celdas_fila(fila), est.anchos_intereses):
+            if stringWidth(texto, 'Helvetica', 6) > ancho - 4:
+                return False
+    return True
+
+
+def _grilla(c: canvas.Canvas, x: float, y_top: float, anchos: list, altos: list):
+    """Grilla de 1pt: bordes de todas las filas y columnas de una tabla."""
+    ancho_total = sum(anchos)
+    alto_total = sum(altos)
+    y = y_top
+    c.line(x, y, x + ancho_total, y)
+    for h in altos:
+        y -= h
+        c.line(x, y, x + ancho_total, y)
+    xc = x
+    c.line(xc, y_top, xc, y_top - alto_total)
+    for w in anchos:
+        xc += w
+        c.line(xc, y_top, xc, y_top - alto_total)
+
+
+def _geometria(datos: dict, est) -> dict:
+    """Posiciones verticales de cada bloque (dependen de las filas de sustituto y de datos)."""
+    n_info = 4 + bool(datos.get('sustituto_nombre')) + bool(datos.get('sustituto_identificacion'))
+    lineas = _lineas_cabecera(est.anchos_intereses)
+    y_info = Y_SUPERIOR - _ALTO_ENCABEZADO - 0.5*cm
+    y_resumen = y_info - n_info * _ALTO_FILA_INFO - 0.3*cm
+    y_titulo = y_resumen - 2 * _ALTO_FILA_INFO - 0.3*cm
+    y_intereses = y_titulo - _ALTO_TITULO - 0.2*cm
+    alto_cabecera = max(len(l) for l in lineas) * _LEADING_CABECERA + 8
+    return {
+        'n_info': n_info,
+        'lineas_cabecera': lineas,
+        'y_info': y_info,
+        'y_resumen': y_resumen,
+        'y_titulo': y_titulo,
+        'y_intereses': y_intereses,
+        'alto_cabecera': alto_cabecera,
+        'y_filas': y_intereses - alto_cabecera,
+        'y_total': y_intereses - alto_cabecera - len(datos['filas']) * _ALTO_FILA_DATOS,
+    }
+
+
+def _etiquetas_info(datos: dict) -> list:
+    etiquetas = ['Entidad', 'Período', 'Nombre', 'Identificación']
+    if datos.get('sustituto_nombre'):
+        etiquetas.append('Sustituto')
+    if datos.get('sustituto_identificacion'):
+        etiquetas.append('Identificación')
+    return etiquetas
+
+
+def _capa_estatica(c: canvas.Canvas, datos: dict, est, g: dict):
+    """Todo lo que se repite entre las cuentas de una entidad y trabajo: encabezado, etiquetas,
+    entidad y período, cabeceras, fondos y grillas."""
+    # Igual que las grillas de Table en platypus
+    c.setLineCap(1)
+    c.setLineJoin(1)
+    c.setStrokeColor(colors.black)
+
+    # ENCABEZADO CON CIUDAD (el consecutivo es dinámico)
+    x0 = (ANCHO_PAGINA - sum(est.anchos_encabezado)) / 2
+    x_der = x0 + sum(est.anchos_encabezado)
+    c.setFont('Helvetica-Bold', 12)
+    c.drawString(x0, Y_SUPERIOR - 12, 'BOGOTA, D.C.')
+    c.drawRightString(x_der, Y_SUPERIOR - 12, 'CUENTA DE COBRO')
+
+    # INFORMACIÓN COMPLETA: etiquetas, entidad y período
+    anchos = est.anchos_superior
+    x0 = (ANCHO_PAGINA - sum(anchos)) / 2
+    y = g['y_info']
+    alto = g['n_info'] * _ALTO_FILA_INFO
+    c.setFillColor(colors.lightgrey)
+    c.rect(x0, y - alto, anchos[0], alto, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+    c.setFont('Helvetica-Bold', 8)
+    for i, etiqueta in enumerate(_etiquetas_info(datos)):
+        c.drawString(x0 + 4, y - (i + 1) * _ALTO_FILA_INFO + 6, etiqueta)
+    c.drawString(x0 + anchos[0] + 4, y - _ALTO_FILA_INFO + 6, f"{datos['entidad']} - NIT. {datos['nit']}")
+    c.drawString(x0 + anchos[0] + 4, y - 2 * _ALTO_FILA_INFO + 6, f"CUOTAS PARTES POR COBRAR {datos['periodo_texto']}")
+    c.setLineWidth(1)
+    _grilla(c, x0, y, anchos, [_ALTO_FILA_INFO] * g['n_info'])
+
+    # TABLA DE RESUMEN: fondos, cabeceras y valores fijos
+    anchos = est.anchos_resumen
+    x0 = (ANCHO_PAGINA - sum(anchos)) / 2
+    y = g['y_resumen']
+    c.setFillColor(colors.lightgrey)
+    c.rect(x0, y - _ALTO_FILA_INFO, sum(anchos), _ALTO_FILA_INFO, stroke=0, fill=1)
+    c.setFillColor(colors.green)
+    c.rect(x0 + anchos[0] + anchos[1], y - 2 * _ALTO_FILA_INFO, anchos[2], _ALTO_FILA_INFO, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+    filas_resumen = [
+        ('Helvetica-Bold', ['Ingreso a Nómina', '% Cuota Parte', 'Estado', 'Capital pendiente', 'Interes acumulado', 'Total']),
+        ('Helvetica', ['01/05/2008', '36.10%', 'ACTIVO']),
+    ]
+    for i, (fuente, celdas) in enumerate(filas_resumen):
+        c.setFont(fuente, 7)
+        base = y - (i + 1) * _ALTO_FILA_INFO + 7
+        xc = x0
+        for texto, w in zip(celdas, anchos):
+            c.drawCentredString(xc + w / 2, base, texto)
+            xc += w
+    _grilla(c, x0, y, anchos, [_ALTO_FILA_INFO] * 2)
+
+    # TÍTULO DE LA SECCIÓN DE INTERESES
+    c.setFont('Helvetica-Bold', 8)
+    c.drawCentredString(ANCHO_PAGINA / 2, g['y_titulo'] - 8, _TITULO_INTERESES)
+
+    # TABLA DE INTERESES: fondos, cabeceras, etiqueta TOTAL y bordes
+    anchos = est.anchos_intereses
+    ancho_total = sum(anchos)
+    x0 = (ANCHO_PAGINA - ancho_total) / 2
+    y = g['y_intereses']
+    alto_cabecera = g['alto_cabecera']
+    n_filas = len(datos['filas'])
+    altos = [alto_cabecera] + [_ALTO_FILA_DATOS] * n_filas + [_ALTO_FILA_TOTAL]
+
+    # Fondos: cabecera y filas alternas (blanco / gris claro)
+    c.setFillColor(colors.lightblue)
+    c.rect(x0, y - alto_cabecera, ancho_total, alto_cabecera, stroke=0, fill=1)
+    c.setFillColor(colors.lightgrey)
+    for i in range(1, n_filas, 2):
+        c.rect(x0, y - alto_cabecera - (i + 1) * _ALTO_FILA_DATOS, ancho_total, _ALTO_FILA_DATOS, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+
+    # Cabeceras centradas vertical y horizontalmente
+    c.setFont('Helvetica-Bold', 7)
+    xc = x0
+    for partes, w in zip(g['lineas_cabecera'], anchos):
+        alto_parrafo = len(partes) * _LEADING_CABECERA
+        base = y - alto_cabecera + 4 + (alto_cabecera - 8 - alto_parrafo) / 2 + alto_parrafo - 7
+        for linea in partes:
+            c.drawCentredString(xc + w / 2, base, linea)
+            base -= _LEADING_CABECERA
+        xc += w
+    c.drawCentredString(x0 + anchos[0] / 2, g['y_total'] - _ALTO_FILA_TOTAL + 9, 'TOTAL')
+
+    # Bordes: grilla de 1pt y líneas de 2pt bajo la cabecera y sobre los totales
+    c.setLineWidth(1)
+    _grilla(c, x0, y, anchos, altos)
+    c.setLineWidth(2)
+    c.line(x0, y - alto_cabecera, x0 + ancho_total, y - alto_cabecera)
+    c.line(x0, g['y_total'], x0 + ancho_total, g['y_total'])
+
+
+def _capa_dinamica(c: canvas.Canvas, datos: dict, est, g: dict):
+    """Lo propio de cada cuenta: consecutivo, pensionado, valores y filas de la liquidación."""
+    c.setFillColor(colors.black)
+
+    # Consecutivo
+    x_der = (ANCHO_PAGINA + sum(est.anchos_encabezado)) / 2
+    c.setFont('Helvetica-Bold', 12)
+    c.drawRightString(x_der, Y_SUPERIOR - 24, f"Nro. {datos['consecutivo']}")
+
+    # Pensionado (y sustituto)
+    valores = [f"{datos['nombre']}", f"{datos['identificacion']}"]
+    if datos.get('sustituto_nombre'):
+        valores.append(datos['sustituto_nombre'])
+    if datos.get('sustituto_identificacion'):
+        valores.append(datos['sustituto_identificacion'])
+    anchos = est.anchos_superior
+    x0 = (ANCHO_PAGINA - sum(anchos)) / 2
+    c.setFont('Helvetica-Bold', 8)
+    for i, valor in enumerate(valores, start=2):
+        c.drawString(x0 + anchos[0] + 4, g['y_info'] - (i + 1) * _ALTO_FILA_INFO + 6, valor)
+
+    # Valores del resumen
+    anchos = est.anchos_resumen
+    xc = (ANCHO_PAGINA - sum(anchos)) / 2 + sum(anchos[:3])
+    base = g['y_resumen'] - 2 * _ALTO_FILA_INFO + 7
+    c.setFont('Helvetica', 7)
+    for texto, w in zip([f"${datos['total_capital']:,.2f}", f"${datos['total_intereses']:,.2f}",
+                         f"${datos['total']:,.2f}"], anchos[3:]):
+        c.drawCentredString(xc + w / 2, base, texto)
+        xc += w
+
+    # Filas de datos: período a la izquierda, días/DTF centrados, valores a la derecha
+    anchos = est.anchos_intereses
+    ancho_total = sum(anchos)
+    x0 = (ANCHO_PAGINA - ancho_total) / 2
+    c.setFont('Helvetica', 6)
+    y_fila = g['y_filas']
+    for fila in datos['filas']:
+        y_fila -= _ALTO_FILA_DATOS
+        base = y_fila + 3
+        xc = x0
+        for j, (texto, w) in enumerate(zip(_celdas_fila(fila), anchos)):
+            if j == 0:
+                c.drawString(xc + 2, base, texto)
+            elif j in (2, 3):
+                c.drawCentredString(xc + w / 2, base, texto)
+            else:
+                c.drawRightString(xc + w - 2, base, texto)
+            xc += w
+
+    # Valores de la fila de totales
+    c.setFont('Helvetica-Bold', 7)
+    base = g['y_total'] - _ALTO_FILA_TOTAL + 9
+    c.drawRightString(x0 + sum(anchos[:5]) - 2, base, f"${datos['suma_intereses_columna']:,.2f}")
+    if datos.get('capital_total') is not None:
+        c.drawRightString(x0 + ancho_total - 2, base, f"${datos['capital_total']:,.2f}")
+
+
+class PlantillasCuentaCobro:
+    """Capa estática de la cuenta de cobro como form XObject, una por entidad y trabajo.
+
+    La primera cuenta de cada archivo dibuja la capa estática dentro de un form
+    (beginForm/endForm) y las siguientes solo lo referencian (doForm); encima se dibuja la
+    capa dinámica. En un PDF de muchas páginas (p. ej. un archivo por entidad) la parte fija
+    se escribe una vez y cada página la reutiliza. Solo usa la API pública del canvas.
+    """
+
+    def __init__(self, ctx: ContextoRender):
+        self.ctx = ctx
+
+    @staticmethod
+    def clave(datos: dict) -> tuple:
+        return (datos['entidad'], datos['nit'], datos['periodo_texto'], len(datos['filas']),
+                bool(datos.get('sustituto_nombre')), bool(datos.get('sustituto_identificacion')))
+
+    @classmethod
+    def nombre_form(cls, datos: dict) -> str:
+        return 'CCPlantilla' + hashlib.sha1(repr(cls.clave(datos)).encode('utf-8')).hexdigest()[:12]
+
+    def aplicar(self, c: canvas.Canvas, datos: dict):
+        """Define (si hace falta) y dibuja en `c` el form de la capa estática de `datos`."""
+        nombre = self.nombre_form(datos)
+        if not c.hasForm(nombre):
+            est = self.ctx.oficial
+            c.beginForm(nombre)
+            _capa_estatica(c, datos, est, _geometria(datos, est))
+            c.endForm()
+        c.doForm(nombre)
+
+
+def dibujar_pagina_cuenta_cobro(c: canvas.Canvas, datos: dict, ctx: ContextoRender,
+                                plantillas: PlantillasCuentaCobro | None = None) -> None:
+    """Dibuja la cuenta de cobro en la página actual de `c` (sin cerrarla)."""
+    est = ctx.oficial
+    g = _geometria(datos, est)
+    if plantillas is not None:
+        plantillas.aplicar(c, datos)
+    else:
+        _capa_estatica(c, datos, est, g)
+    _capa_dinamica(c, datos, est, g)
+
+
+def dibujar_cuenta_cobro(datos: dict, ctx: ContextoRender, salida,
+                         plantillas: PlantillasCuentaCobro | None = None) -> None:
+    """Dibuja la cuenta de cobro en `salida` (ruta o buffer). Verificar antes con
+    `cuenta_cobro_cabe_en_canvas`. Con `plantillas`, la parte fija va en un form XObject."""
+    c = canvas.Canvas(salida, pagesize=A4)
+    incrustar_metadatos(c, [metadatos_cuenta(datos)])
+    dibujar_pagina_cuenta_cobro(c, datos, ctx, plantillas)
+    c.showPage()
+    c.save()
@@ -0,0 +1,231 @@
+# Resumen de pagos por entidad y mes (pago_resumen_mensual)
+# - Una fila por (nit_entidad, año, mes): cantidad de pagos, sumas de valor, capital e interés,
+#   pensionados distintos y primera/última fecha de pago
+# - Las rutas que escriben en pago (registrar_pago, registrar_pago_masivo, importador de Excel,
+#   importar-pagos) llaman a refrescar_meses con los meses que tocaron, dentro de su propia
+#   transacción. Cada mes se recalcula desde pago (rango del índice ix_pago_entidad_fecha) en vez
+#   de sumarle deltas: así un cambio de valor o un borrado también deja bien MIN/MAX
+# - resumen_entidad suma las filas de los meses completos del rango y solo lee pago para los
+#   meses parciales de los extremos
+# - Los pensionados distintos no se pueden sumar entre meses y siempre son exactos. Un solo mes
+#   completo sale de pago_resumen_mensual; rangos abiertos o sin rango, de
+#   pago_resumen_pensionado (primer y último pago de cada pensionado por entidad, que
+#   refrescar_meses mantiene con los meses); un rango acotado, de COUNT(DISTINCT) sobre pago
+#   limitado al rango de ix_pago_entidad_fecha (solo las filas del rango, no el historial)
+# - reconstruir_resumen rehace las tablas (o una entidad) desde pago: carga inicial o
+#   reparación (python -m app.cli reconstruir-resumen-pagos)
+# - Las tablas vienen en scripts/init_db.sql; las bases existentes las reciben con
+#   `make db-migrar` (scripts/tablas_resumen_pagos.sql) y luego reconstruir-resumen-pagos
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import bindparam, text
+
+_PENSIONADOS_POR_LOTE = 1000
+
+
+def mes_de(nit_entidad, fecha) -> tuple:
+    """Clave (nit_entidad, año, mes); refrescar_meses ignora las de pensionados sin entidad."""
+    return (str(nit_entidad) if nit_entidad else None), fecha.year, fecha.month
+
+
+def meses_tabla(session, tabla: str) -> set:
+    """Meses (nit_entidad, año, mes) de los pagos de una tabla temporal (pensionado_id, fecha_pago)."""
+    filas = session.execute(text(f"""
+        SELECT DISTINCT pen.nit_entidad, t.fecha_pago
+        FROM {tabla} t JOIN pensionado pen ON pen.pensionado_id = t.pensionado_id
+        WHERE pen.nit_entidad IS NOT NULL
+    """)).fetchall()
+    return {mes_de(nit, _fecha(fecha)) for nit, fecha in filas}
+
+
+def _fecha(valor):
+    # SQLite devuelve DATE como texto
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def refrescar_meses(session, meses) -> int:
+    """Recalcula desde pago las filas de los meses [(nit_entidad, año, mes)]. No confirma:
+    corre en la transacción de quien escribió los pagos."""
+    claves = sorted({(str(n), int(a), int(m)) for n, a, m in meses if n})
+    if not claves:
+        return 0
+    ahora = datetime.now()
+    parametros = []
+    for nit, anio, mes in claves:
+        desde = date(anio, mes, 1)
+        parametros.append({"nit": nit, "anio": anio, "mes": mes, "desde": desde,
+                           "hasta": desde + relativedelta(months=1), "ahora": ahora})
+    session.execute(text(
+        "DELETE FROM pago_resumen_mensual WHERE nit_entidad = :nit AND anio = :anio AND mes = :mes"
+    ), parametros)
+    session.execute(text("""
+        INSERT INTO pago_resumen_mensual (
+            nit_entidad, anio, mes, total_pagos, total_valor, total_capital, total_interes,
+            pensionados, fecha_primer_pago, fecha_ultimo_pago, fecha_actualizacion
+        )
+        SELECT :nit, :anio, :mes, COUNT(*), SUM(valor), COALESCE(SUM(capital), 0), COALESCE(SUM(interes), 0),
+               COUNT(DISTINCT pensionado_id), MIN(fecha_pago), MAX(fecha_pago), :ahora
+        FROM pago
+        WHERE nit_entidad = :nit AND fecha_pago >= :desde AND fecha_pago < :hasta
+        GROUP BY nit_entidad
+    """), parametros)
+    _refrescar_pensionados(session, parametros, ahora)
+    return len(claves)
+
+
+def _refrescar_pensionados(session, meses: list, ahora: datetime):
+    """Recalcula pago_resumen_pensionado de los pensionados que tocan los meses dados: los
+    que tienen pagos en el mes y los que tenían ahí su primer o último pago (pago borrado)."""
+    candidatos = defaultdict(set)
+    for mes in meses:
+        candidatos[mes["nit"]].update(fila[0] for fila in session.execute(text("""
+            SELECT pensionado_id FROM pago
+            WHERE nit_entidad = :nit AND fecha_pago >= :desde AND fecha_pago < :hasta
+            UNION
+            SELECT pensionado_id FROM pago_resumen_pensionado
+            WHERE nit_entidad = :nit AND fecha_primer_pago >= :desde AND fecha_primer_pago < :hasta
+            UNION
+            SELECT pensionado_id FROM pago_resumen_pensionado
+            WHERE nit_entidad = :nit AND fecha_ultimo_pago >= :desde AND fecha_ultimo_pago < :hasta
+        """), mes))
+    borrar = text(
+        "DELETE FROM pago_resumen_pensionado WHERE nit_entidad = :nit AND pensionado_id IN :ids"
+    ).bindparams(bindparam("ids", expanding=True))
+    insertar = text("""
+        INSERT INTO pago_resumen_pensionado (
+            nit_entidad, pensionado_id, fecha_primer_pago, fecha_ultimo_pago, fecha_actualizacion
+        )
+        SELECT :nit, pensionado_id, MIN(fecha_pago), MAX(fecha_pago), :ahora
+        FROM pago
+        WHERE nit_entidad = :nit AND pensionado_id IN :ids
+        GROUP BY pensionado_id
+    """).bindparams(bindparam("ids", expanding=True))
+    for nit, ids in candidatos.items():
+        ids = sorted(ids)
+        for inicio in range(0, len(ids), _PENSIONADOS_POR_LOTE):
+            lote = ids[inicio:inicio + _PENSIONADOS_POR_LOTE]
+            session.execute(borrar, {"nit": nit, "ids": lote})
+            session.execute(insertar, {"nit": nit, "ids": lote, "ahora": ahora})
+
+
+def reconstruir_resumen(session, entidad_nit: str = None) -> int:
+    """Rehace pago_resumen_mensual y pago_resumen_pensionado desde pago (todas las entidades
+    o una); devuelve las filas mensuales."""
+    filtro = "AND nit_entidad = :nit" if entidad_nit else ""
+    try:
+        session.execute(text(f"DELETE FROM pago_resumen_mensual WHERE 1 = 1 {filtro}"), {"nit": entidad_nit})
+        session.execute(text(f"DELETE FROM pago_resumen_pensionado WHERE 1 = 1 {filtro}"), {"nit": entidad_nit})
+        filas = session.execute(text(f"""
+            INSERT INTO pago_resumen_mensual (
+                nit_entidad, anio, mes, total_pagos, total_valor, total_capital, total_interes,
+                pensionados, fecha_primer_pago, fecha_ultimo_pago, fecha_actualizacion
+            )
+            SELECT nit_entidad, YEAR(fecha_pago), MONTH(fecha_pago), COUNT(*), SUM(valor),
+                   COALESCE(SUM(capital), 0), COALESCE(SUM(interes), 0), COUNT(DISTINCT pensionado_id),
+                   MIN(fecha_pago), MAX(fecha_pago), :ahora
+            FROM pago
+            WHERE nit_entidad IS NOT NULL {filtro}
+            GROUP BY nit_entidad, YEAR(fecha_pago), MONTH(fecha_pago)
+        """), {"nit": entidad_nit, "ahora": datetime.now()}).rowcount
+        session.execute(text(f"""
+            INSERT INTO pago_resumen_pensionado (
+                nit_entidad, pensionado_id, fecha_primer_pago, fecha_ultimo_pago, fecha_actualizacion
+            )
+            SELECT nit_entidad, pensionado_id, MIN(fecha_pago), MAX(fecha_pago), :ahora
+            FROM pago
+            WHERE nit_entidad IS NOT NULL {filtro}
+            GROUP BY nit_entidad, pensionado_id
+        """), {"nit": entidad_nit, "ahora": datetime.now()})
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return filas
+
+
+def _indice_mes(fecha: date) -> int:
+    return fecha.year * 12 + fecha.month - 1
+
+
+def _fin_de_mes(fecha: date) -> bool:
+    return (fecha + timedelta(days=1)).day == 1
+
+
+def resumen_entidad(session, entidad_nit: str, fecha_desde: date = None, fecha_hasta: date = None) -> dict:
+    """Totales de pagos de la entidad entre fecha_desde y fecha_hasta (inclusive)."""
+    # Meses completos dentro del rango -> pago_resumen_mensual; extremos parciales -> pago
+    desde_completo = None if fecha_desde is None else _indice_mes(fecha_desde) + (0 if fecha_desde.day == 1 else 1)
+    hasta_completo = None if fecha_hasta is None else _indice_mes(fecha_hasta) - (0 if _fin_de_mes(fecha_hasta) else 1)
+    parciales = []
+    if desde_completo is not None and hasta_completo is not None and desde_completo > hasta_completo:
+        parciales.append((fecha_desde, fecha_hasta))
+        usar_resumen = False
+    else:
+        usar_resumen = True
+        if fecha_desde is not None and fecha_desde.day != 1:
+            parciales.append((fecha_desde, fecha_desde + relativedelta(day=31)))
+        if fecha_hasta is not None and not _fin_de_mes(fecha_hasta):
+            parciales.append((fecha_hasta.replace(day=1), fecha_hasta))
+
+    partes = []
+    meses = 0
+    pensionados_mes = 0
+    if usar_resumen:
+        condiciones = ["nit_entidad = :nit"]
+        parametros = {"nit": entidad_nit}
+        if desde_completo is not None:
+            condiciones.append("anio * 12 + mes - 1 >= :desde")
+            parametros["desde"] = desde_completo
+        if hasta_completo is not None:
+            condiciones.append("anio * 12 + mes - 1 <= :hasta")
+            parametros["hasta"] = hasta_completo
+        fila = session.execute(text(f"""
+            SELECT COUNT(*) AS meses, COALESCE(SUM(total_pagos), 0), COALESCE(SUM(total_valor), 0),
+                   COALESCE(SUM(total_capital), 0), COALESCE(SUM(total_interes), 0),
+                   MIN(fecha_primer_pago), MAX(fecha_ultimo_pago), MAX(pensionados)
+            FROM pago_resumen_mensual
+            WHERE {" AND ".join(condiciones)}
+        """), parametros).fetchone()
+        meses, pensionados_mes = fila[0], fila[7] or 0
+        partes.append(fila[1:7])
+    for desde, hasta in parciales:
+        partes.append(session.execute(text("""
+            SELECT COUNT(*), COALESCE(SUM(valor), 0), COALESCE(SUM(capital), 0), COALESCE(SUM(interes), 0),
+                   MIN(fecha_pago), MAX(fecha_pago)
+            FROM pago
+            WHERE nit_entidad = :nit AND fecha_pago >= :desde AND fecha_pago <= :hasta
+        """), {"nit": entidad_nit, "desde": desde, "hasta": hasta}).fetchone())
+
+    parametros = {"nit": entidad_nit, "desde": fecha_desde, "hasta": fecha_hasta}
+    if meses <= 1 and not parciales:
+        pensionados = pensionados_mes
+    elif fecha_desde is None or fecha_hasta is None:
+        # Rango abierto: pagó en el rango si su primer pago es <= hasta y su último >= desde
+        condiciones = ["nit_entidad = :nit"]
+        if fecha_desde is not None:
+            condiciones.append("fecha_ultimo_pago >= :desde")
+        if fecha_hasta is not None:
+            condiciones.append("fecha_primer_pago <= :hasta")
+        pensionados = session.execute(text(
+            f"SELECT COUNT(*) FROM pago_resumen_pensionado WHERE {' AND '.join(condiciones)}"
+        ), parametros).scalar()
+    else:
+        pensionados = session.execute(text("""
+            SELECT COUNT(DISTINCT pensionado_id) FROM pago
+            WHERE nit_entidad = :nit AND fecha_pago >= :desde AND fecha_pago <= :hasta
+        """), parametros).scalar()
+
+    primeras = [_fecha(p[4]) for p in partes if p[4] is not None]
+    ultimas = [_fecha(p[5]) for p in partes if p[5] is not None]
+    return {
+        'total_pagos': sum(int(p[0]) for p in partes),
+        'total_valor': sum(p[1] for p in partes),
+        'total_capital': sum(p[2] for p in partes),
+        'total_interes': sum(p[3] for p in partes),
+        'pensionados_pagaron': int(pensionados or 0),
+        'fecha_primer_pago': min(primeras) if primeras else None,
+        'fecha_ultimo_pago': max(ultimas) if ultimas else None,
+    }
@@ -13,3 +13,7 @@ DIAS_SILENCIO_ADMIN = int(os.getenv("DIAS_SILENCIO_ADMIN", "15"))
 
 # Meses de prescripción para generación de cuentas (antes 36, ahora 30)
 MESES_PRESCRIPCION = int(os.getenv("MESES_PRESCRIPCION", "30"))
+
+# Caché de PDFs renderizados (clave = hash de los datos del documento)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache_pdf"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "500"))
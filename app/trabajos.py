@@ -0,0 +1,481 @@
+# Trabajos en segundo plano para la generación masiva
+# - La UI encola (tabla `trabajo`) y vuelve de inmediato; procesos trabajadores aparte
+#   (`python -m app.cli trabajador`) toman los pendientes y los ejecutan
+# - Estado y avance quedan en la BD: sobreviven a recargas de la pestaña y la UI solo consulta
+# - El resultado se escribe en disco (reportes_liquidacion/...) y su ruta queda en el trabajo
+# - Tomar un trabajo es un UPDATE condicionado al estado PENDIENTE: dos trabajadores nunca
+#   ejecutan el mismo
+# - Mientras corre, un hilo de latido marca el trabajo cada _INTERVALO_LATIDO segundos (como
+#   los arriendos de app.cola_distribuida). Si el trabajador muere (kill, falta de memoria,
+#   reinicio), el latido se vence y el trabajo pasa a FALLIDO, desde donde se puede reintentar.
+#   No se retoma solo: un trabajo que tumba a su trabajador lo volvería a tumbar
+# - La tabla se crea con scripts/init_db.sql (bases existentes: scripts/tabla_trabajo.sql, make
+#   db-migrar); la aplicación no altera el esquema
+
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import zipfile
+from datetime import date, datetime, timedelta
+
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+
+from app.db import get_session
+from app.models import Trabajo
+from app.zip_lote import carpeta_entidad, ruta_zip_entidad
+
+PENDIENTE = 'PENDIENTE'
+EN_CURSO = 'EN_CURSO'
+TERMINADO = 'TERMINADO'
+FALLIDO = 'FALLIDO'
+
+# Segundos mínimos entre escrituras de avance en la BD
+_INTERVALO_AVANCE = 1.0
+
+# Latido de los trabajos EN_CURSO: sin latido por más de VENCE_LATIDO segundos el trabajo se
+# considera abandonado
+_INTERVALO_LATIDO = 20.0
+VENCE_LATIDO = 120
+
+class TrabajoPerdido(RuntimeError):
+    """El trabajo dejó de ser de este trabajador (se dio por abandonado y se reintentó)."""
+
+
+class _Latido(threading.Thread):
+    """Ejecuta cada `intervalo` segundos `sentencia`, un UPDATE que renueva la marca de vida
+    de una fila (parámetros :ahora y :hasta = ahora + `vence` segundos) condicionado a que siga
+    siendo de este trabajador. Si deja de afectar filas, `perdido` queda en True."""
+
+    def __init__(self, nombre: str, sentencia: str, parametros: dict,
+                 intervalo: float = _INTERVALO_LATIDO, vence: int = VENCE_LATIDO):
+        super().__init__(daemon=True, name=nombre)
+        self.sentencia = sentencia
+        self.parametros = parametros
+        self.intervalo = intervalo
+        self.vence = vence
+        self.perdido = False
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            ahora = datetime.now()
+            try:
+                with get_session() as s:
+                    res = s.execute(text(self.sentencia), {
+                        **self.parametros, "ahora": ahora, "hasta": ahora + timedelta(seconds=self.vence),
+                    })
+                    s.commit()
+                if res.rowcount == 0:
+                    self.perdido = True
+                    return
+            except Exception:
+                # Falla transitoria de BD: se reintenta en el próximo latido (aún no vence)
+                pass
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+def _fecha(valor) -> date:
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+
+# Campos numéricos del resultado de las 30 cuentas (JSON los guarda como texto para no perder
+# decimales)
+_CAMPOS_DECIMALES = ('capital_base', 'prima', 'capital_total', 'intereses', 'total_cuenta',
+                     'total_capital', 'total_intereses', 'total_pensionado',
+                     'total_capital_entidad', 'total_intereses_entidad')
+
+
+def _decimales(valor):
+    if isinstance(valor, dict):
+        return {k: Decimal(v) if k in _CAMPOS_DECIMALES and v is not None else _decimales(v)
+                for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_decimales(v) for v in valor]
+    return valor
+
+
+def leer_cuentas_30(ruta: str) -> dict:
+    """Resultado de un trabajo 'cuentas_30' con los valores otra vez en Decimal."""
+    with open(ruta, encoding='utf-8') as f:
+        return _decimales(json.load(f))
+
+
+# --- Tipos de trabajo ---
+# Cada uno recibe (parametros + trabajo_id, avance) y devuelve la ruta del resultado en disco.
+# avance(hechas, total, mensaje=None) informa el progreso.
+
+def _trabajo_cuentas_30(p: dict, avance) -> str:
+    """Las cuentas de los últimos MESES_PRESCRIPCION meses de cada pensionado de la entidad, con
+    capital, intereses y totales (lo que muestra la página de liquidaciones masivas), en JSON."""
+    from app.paquete_entidad import _completar_totales_cuentas, construir_todas_cuentas_min
+    fecha_corte = _fecha(p['fecha_corte'])
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte)
+    finally:
+        session.close()
+    avance(0, len(todas), 'Calculando cuentas')
+    for i in range(len(todas)):
+        _completar_totales_cuentas(todas[i:i + 1], fecha_corte)
+        avance(i + 1, len(todas))
+    resultado = {
+        'todas_las_cuentas': todas,
+        'total_capital_entidad': sum((x.get('total_capital', 0) for x in todas), Decimal('0')),
+        'total_intereses_entidad': sum((x.get('total_intereses', 0) for x in todas), Decimal('0')),
+        'total_cuentas_generadas': sum(len(x['cuentas']) for x in todas),
+    }
+    carpeta = carpeta_entidad(p['nit'], p['nombre'])
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"CUENTAS_{p['nit']}_{fecha_corte.strftime('%Y%m%d')}_{p['trabajo_id']}.json")
+    with open(f"{ruta}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, default=str)
+    os.replace(f"{ruta}.tmp", ruta)
+    return ruta
+
+
+def _trabajo_zip_masivo(p: dict, avance) -> str:
+    from app.corridas import PuntosControl
+    from app.paquete_entidad import construir_todas_cuentas_min, generar_zip_masivo_completo
+    fecha_corte = _fecha(p['fecha_corte'])
+    # Corrida ligada al trabajo: reintentar un trabajo fallido retoma lo ya generado
+    corrida = PuntosControl(f"trabajo_{p['trabajo_id']}", 'zip_masivo', p['nit'], p)
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte)
+    finally:
+        session.close()
+    avance(0, sum(len(x['cuentas']) for x in todas), 'Generando PDFs')
+    zip_bytes = generar_zip_masivo_completo(
+        entidad_nit=p['nit'],
+        entidad_nombre=p['nombre'],
+        todas_las_cuentas=todas,
+        fecha_corte=fecha_corte,
+        corregir_existentes=bool(p.get('corregir', True)),
+        motor=p.get('motor', 'canvas'),
+        consolidado_de_sesion=False,
+        progreso=avance,
+        corrida=corrida,
+    )
+    ruta = ruta_zip_entidad(p['nit'], p['nombre'], fecha_corte)
+    with open(ruta, 'wb') as f:
+        f.write(zip_bytes)
+    return ruta
+
+
+def _trabajo_zip_parcial(p: dict, avance) -> str:
+    """ZIP con solo los pensionados, años y meses pedidos (ver generar_zip_parcial)."""
+    from app.paquete_entidad import generar_zip_parcial
+    fecha_corte = _fecha(p['fecha_corte'])
+    avance(0, 1, 'Generando ZIP parcial')
+    zip_bytes, nombre = generar_zip_parcial(
+        entidad_nit=p['nit'],
+        entidad_nombre=p['nombre'],
+        fecha_corte=fecha_corte,
+        identificaciones=p.get('identificaciones'),
+        años=p.get('años'),
+        meses=p.get('meses'),
+        corregir_existentes=bool(p.get('corregir', False)),
+        motor=p.get('motor', 'canvas'),
+    )
+    carpeta = carpeta_entidad(p['nit'], p['nombre'])
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, nombre)
+    with open(ruta, 'wb') as f:
+        f.write(zip_bytes)
+    return ruta
+
+
+def _trabajo_pdf_consolidado(p: dict, avance) -> str:
+    from app.paquete_entidad import _completar_totales_cuentas, construir_todas_cuentas_min, escribir_pdf_consolidado
+    fecha_corte = _fecha(p['fecha_corte'])
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte)
+    finally:
+        session.close()
+    avance(0, 2, 'Calculando totales')
+    _completar_totales_cuentas(todas, fecha_corte)
+    avance(1, 2, 'Escribiendo PDF')
+    carpeta = carpeta_entidad(p['nit'], p['nombre'])
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_tmp = os.path.join(carpeta, f".consolidado_{os.getpid()}.pdf")
+    nombre = escribir_pdf_consolidado(ruta_tmp, p['nit'], p['nombre'], todas, fecha_corte)
+    ruta = os.path.join(carpeta, nombre)
+    os.replace(ruta_tmp, ruta)
+    return ruta
+
+
+def _trabajo_pdf_imprenta(p: dict, avance) -> str:
+    from app.paquete_entidad import construir_todas_cuentas_min, generar_pdf_fusionado_entidad
+    fecha_corte = _fecha(p['fecha_corte'])
+    session = get_session()
+    try:
+        todas = construir_todas_cuentas_min(session, p['nit'], fecha_corte)
+    finally:
+        session.close()
+    avance(0, sum(len(x['cuentas']) for x in todas), 'Generando PDF único')
+    carpeta = carpeta_entidad(p['nit'], p['nombre'])
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_tmp = os.path.join(carpeta, f".imprenta_{os.getpid()}.pdf")
+    nombre = generar_pdf_fusionado_entidad(
+        ruta_tmp, p['nit'], p['nombre'], todas, fecha_corte,
+        corregir_existentes=bool(p.get('corregir', True)),
+        progreso=avance,
+    )
+    ruta = os.path.join(carpeta, nombre)
+    os.replace(ruta_tmp, ruta)
+    return ruta
+
+
+def _trabajo_pdfs_periodo(p: dict, avance) -> str:
+    """PDFs por periodo en la carpeta de la entidad; el resultado descargable es un ZIP con ellos."""
+    from generar_pdf_oficial import OpcionesRender, generar_pdf_para_pensionado
+    session = get_session()
+    try:
+        pensionados = session.execute(
+            text("SELECT identificacion, nombre, numero_mesadas, fecha_ingreso_nomina, empresa, base_calculo_cuota_parte, porcentaje_cuota_parte, nit_entidad FROM pensionado WHERE nit_entidad = :nit"),
+            {"nit": p['nit']}
+        ).fetchall()
+    finally:
+        session.close()
+    periodos = [tuple(x) for x in p['periodos']]
+    carpeta = carpeta_entidad(p['nit'], p['nombre'])
+    os.makedirs(carpeta, exist_ok=True)
+    opciones = OpcionesRender(correccion=bool(p.get('corregir', True)), output_dir=carpeta)
+    total = len(pensionados) * len(periodos)
+    rutas = []
+    for pensionado in pensionados:
+        for año, mes in periodos:
+            rutas.append(generar_pdf_para_pensionado(pensionado, 'custom', año, mes,
+                                                     solo_mes=bool(p.get('solo_mes', True)), opciones=opciones))
+            avance(len(rutas), total)
+    ruta = os.path.join(carpeta, f"PDFS_PERIODO_{p['nit']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    with zipfile.ZipFile(ruta, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for r in rutas:
+            zf.write(r, os.path.relpath(r, carpeta))
+    return ruta
+
+
+TIPOS = {
+    'cuentas_30': _trabajo_cuentas_30,
+    'zip_masivo': _trabajo_zip_masivo,
+    'zip_parcial': _trabajo_zip_parcial,
+    'pdf_consolidado': _trabajo_pdf_consolidado,
+    'pdf_imprenta': _trabajo_pdf_imprenta,
+    'pdfs_periodo': _trabajo_pdfs_periodo,
+}
+
+
+# --- Cola ---
+
+def encolar(tipo: str, parametros: dict) -> int:
+    """Registra un trabajo PENDIENTE y devuelve su id."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    with get_session() as s:
+        trabajo = Trabajo(
+            tipo=tipo,
+            parametros=json.dumps(parametros, default=str),
+            estado=PENDIENTE,
+            hechas=0,
+            total=0,
+            fecha_creacion=datetime.now(),
+        )
+        s.add(trabajo)
+        s.commit()
+        return trabajo.trabajo_id
+
+
+def _a_dict(t: Trabajo) -> dict:
+    return {
+        'trabajo_id': t.trabajo_id,
+        'tipo': t.tipo,
+        'parametros': json.loads(t.parametros),
+        'estado': t.estado,
+        'hechas': t.hechas or 0,
+        'total': t.total or 0,
+        'mensaje': t.mensaje,
+        'resultado_ruta': t.resultado_ruta,
+        'error': t.error,
+        'trabajador': t.trabajador,
+        'latido': t.latido,
+        'fecha_creacion': t.fecha_creacion,
+        'fecha_inicio': t.fecha_inicio,
+        'fecha_fin': t.fecha_fin,
+    }
+
+
+def obtener(trabajo_id: int) -> dict | None:
+    with get_session() as s:
+        t = s.get(Trabajo, trabajo_id)
+        return _a_dict(t) if t else None
+
+
+def listar(limite: int = 50) -> list:
+    """Trabajos más recientes primero."""
+    with get_session() as s:
+        filas = s.query(Trabajo).order_by(Trabajo.trabajo_id.desc()).limit(limite).all()
+        return [_a_dict(t) for t in filas]
+
+
+def _limite_latido() -> datetime:
+    return datetime.now() - timedelta(seconds=VENCE_LATIDO)
+
+
+def abandonado(t: dict) -> bool:
+    """Trabajo EN_CURSO (de la cola de trabajos completos) cuyo trabajador dejó de dar latido."""
+    ultimo = t.get('latido') or t.get('fecha_inicio')
+    return (t['estado'] == EN_CURSO and t['tipo'] in TIPOS
+            and ultimo is not None and ultimo < _limite_latido())
+
+
+# Trabajo EN_CURSO sin latido reciente (latido NULL: tomado antes de existir la columna)
+_SIN_LATIDO = "estado = :c AND COALESCE(latido, fecha_inicio) < :limite AND tipo IN :tipos"
+
+
+def _fallar_abandonados(s) -> int:
+    """Pasa a FALLIDO los trabajos cuyo trabajador murió (latido vencido)."""
+    return s.execute(text(
+        "UPDATE trabajo SET estado = :f, mensaje = 'Trabajador detenido (sin latido)', fecha_fin = :ahora "
+        f"WHERE {_SIN_LATIDO}"
+    ).bindparams(bindparam('tipos', expanding=True)),
+        {"f": FALLIDO, "c": EN_CURSO, "ahora": datetime.now(), "limite": _limite_latido(), "tipos": list(TIPOS)}
+    ).rowcount
+
+
+def reintentar(trabajo_id: int) -> bool:
+    """Devuelve a la cola un trabajo FALLIDO o abandonado (EN_CURSO sin latido); el ZIP
+    masivo retoma su corrida."""
+    with get_session() as s:
+        res = s.execute(text(
+            "UPDATE trabajo SET estado = :p, mensaje = 'Reintento', error = NULL, fecha_fin = NULL, "
+            "trabajador = NULL, latido = NULL "
+            f"WHERE trabajo_id = :id AND (estado = :f OR ({_SIN_LATIDO})) AND tipo IN :tipos"
+        ).bindparams(bindparam('tipos', expanding=True)),
+            {"p": PENDIENTE, "id": trabajo_id, "f": FALLIDO, "c": EN_CURSO, "limite": _limite_latido(),
+             "tipos": list(TIPOS)})
+        s.commit()
+        return res.rowcount == 1
+
+
+def _tomar_siguiente(nombre_trabajador: str) -> Trabajo | None:
+    """Toma el PENDIENTE más antiguo; si otro trabajador lo tomó primero, prueba el siguiente."""
+    with get_session() as s:
+        _fallar_abandonados(s)
+        s.commit()
+        candidatos = s.execute(text(
+            "SELECT trabajo_id FROM trabajo WHERE estado = :p ORDER BY trabajo_id LIMIT 10"
+        ), {"p": PENDIENTE}).scalars().all()
+        for trabajo_id in candidatos:
+            res = s.execute(text(
+                "UPDATE trabajo SET estado = :c, trabajador = :w, fecha_inicio = :ahora, latido = :ahora "
+                "WHERE trabajo_id = :id AND estado = :p"
+            ), {"c": EN_CURSO, "w": nombre_trabajador, "ahora": datetime.now(), "id": trabajo_id, "p": PENDIENTE})
+            s.commit()
+            if res.rowcount == 1:
+                return s.get(Trabajo, trabajo_id)
+    return None
+
+
+def _actualizar(trabajo_id: int, **campos):
+    asignaciones = ", ".join(f"{k} = :{k}" for k in campos)
+    with get_session() as s:
+        s.execute(text(f"UPDATE trabajo SET {asignaciones} WHERE trabajo_id = :trabajo_id"),
+                  {**campos, "trabajo_id": trabajo_id})
+        s.commit()
+
+
+def _cerrar(trabajo: Trabajo, **campos) -> bool:
+    """Deja el estado final si el trabajo sigue siendo de este trabajador."""
+    asignaciones = ", ".join(f"{k} = :{k}" for k in campos)
+    with get_session() as s:
+        res = s.execute(text(
+            f"UPDATE trabajo SET {asignaciones} WHERE trabajo_id = :trabajo_id AND trabajador = :w AND estado = :c"
+        ), {**campos, "trabajo_id": trabajo.trabajo_id, "w": trabajo.trabajador, "c": EN_CURSO})
+        s.commit()
+        return res.rowcount == 1
+
+
+def ejecutar(trabajo: Trabajo):
+    """Ejecuta un trabajo ya tomado con latido y deja en la BD su estado final."""
+    ultimo = [0.0]
+    latido = _Latido(
+        f"latido-trabajo-{trabajo.trabajo_id}",
+        "UPDATE trabajo SET latido = :ahora WHERE trabajo_id = :id AND trabajador = :w AND estado = :c",
+        {"id": trabajo.trabajo_id, "w": trabajo.trabajador, "c": EN_CURSO},
+    )
+    latido.start()
+
+    def avance(hechas, total, mensaje=None):
+        if latido.perdido:
+            raise TrabajoPerdido(f"Trabajo {trabajo.trabajo_id}: dado por abandonado")
+        ahora = time.monotonic()
+        if hechas < total and ahora - ultimo[0] < _INTERVALO_AVANCE and mensaje is None:
+            return
+        ultimo[0] = ahora
+        campos = {'hechas': hechas, 'total': total}
+        if mensaje is not None:
+            campos['mensaje'] = mensaje[:255]
+        _actualizar(trabajo.trabajo_id, **campos)
+
+    try:
+        ruta = TIPOS[trabajo.tipo]({**json.loads(trabajo.parametros), 'trabajo_id': trabajo.trabajo_id}, avance)
+        _cerrar(trabajo, estado=TERMINADO, resultado_ruta=ruta, mensaje='Terminado', fecha_fin=datetime.now())
+    except TrabajoPerdido:
+        pass
+    except Exception as e:
+        _cerrar(trabajo, estado=FALLIDO, mensaje=str(e)[:255], error=traceback.format_exc(),
+                fecha_fin=datetime.now())
+    finally:
+        latido.parar()
+
+
+def bucle_trabajador(intervalo: float = 2.0, una_vez: bool = False):
+    """Toma y ejecuta items de lotes y trabajos hasta ser interrumpido (o hasta vaciar la cola
+    con `una_vez`)."""
+    from app.zip_manifiesto import usar_pdf_binario
+    usar_pdf_binario()  # proceso 'spawn': no hereda la configuración del padre
+    nombre = f"{socket.gethostname()}:{os.getpid()}"
+    from app.cola_distribuida import ejecutar_item, tomar_item
+    while True:
+        # Primero los items de lotes distribuidos (otros trabajadores pueden estar en el mismo lote)
+        item = tomar_item(nombre)
+        if item is not None:
+            print(f"▶️ [{nombre}] Lote {item.trabajo_id}: {item.etapa} {item.clave} (intento {item.intentos})")
+            ejecutar_item(item)
+            continue
+        trabajo = _tomar_siguiente(nombre)
+        if trabajo is None:
+            if una_vez:
+                return
+            time.sleep(intervalo)
+            continue
+        print(f"▶️ [{nombre}] Trabajo {trabajo.trabajo_id} ({trabajo.tipo})")
+        ejecutar(trabajo)
+        print(f"⏹️ [{nombre}] Trabajo {trabajo.trabajo_id}: {obtener(trabajo.trabajo_id)['estado']}")
+
+
+def iniciar_trabajadores(procesos: int = 1, intervalo: float = 2.0, una_vez: bool = False):
+    """Lanza `procesos` trabajadores (procesos 'spawn') y espera a que terminen."""
+    if procesos <= 1:
+        bucle_trabajador(intervalo, una_vez)
+        return
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    hijos = [ctx.Process(target=bucle_trabajador, args=(intervalo, una_vez), daemon=False) for _ in range(procesos)]
+    for h in hijos:
+        h.start()
+    try:
+        for h in hijos:
+            h.join()
+    except KeyboardInterrupt:
+        for h in hijos:
+            h.terminate()
@@ -0,0 +1,158 @@
+# Generación de ZIPs masivos de varias entidades en paralelo
+# - Un proceso de trabajo por entidad (ProcessPoolExecutor con contexto 'spawn': los procesos
+#   no heredan conexiones de BD ni los hilos de Streamlit); cada uno fija la codificación de
+#   los PDFs al iniciar (usar_pdf_binario)
+# - Cada proceso trabaja en su propia carpeta temporal y abre su propia sesión de BD
+# - El ZIP se escribe directo en reportes_liquidacion/<PREFIJO>_<NIT>/; al proceso padre solo
+#   vuelve un resumen (ruta, tamaño, estadísticas), nunca los bytes del archivo
+# - Progreso agregado: los procesos reportan cuentas hechas por una cola compartida y el padre
+#   llama a `progreso(estado)` con los totales de todo el lote
+
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+
+from app.zip_manifiesto import usar_pdf_binario
+
+DIR_REPORTES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reportes_liquidacion')
+
+# Cada cuántas cuentas un proceso reporta avance (evita saturar la cola)
+_CADA_CUENTAS = 25
+
+
+def carpeta_entidad(nit: str, nombre: str, base_dir: str = DIR_REPORTES) -> str:
+    """Carpeta de reportes de la entidad: <tres primeras letras del nombre>_<NIT>."""
+    prefijo = nombre.strip().upper()[:3].replace(' ', '')
+    return os.path.join(base_dir, f"{prefijo}_{nit}")
+
+
+def ruta_zip_entidad(nit: str, nombre: str, fecha_corte: date, base_dir: str = DIR_REPORTES) -> str:
+    """Ruta libre para el ZIP masivo de la entidad (agrega _v2, _v3... si ya existe)."""
+    carpeta = carpeta_entidad(nit, nombre, base_dir)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"LIQUIDACION_MASIVA_{nit}_{fecha_corte.strftime('%Y%m%d')}.zip")
+    if os.path.exists(ruta):
+        base, ext = os.path.splitext(ruta)
+        suf = 2
+        while os.path.exists(f"{base}_v{suf}{ext}"):
+            suf += 1
+        ruta = f"{base}_v{suf}{ext}"
+    return ruta
+
+
+def _generar_entidad(nit: str, nombre: str, fecha_corte: date, corregir_existentes: bool, motor: str,
+                     base_dir: str, cola=None) -> dict:
+    """Trabajo de un proceso: ZIP completo de una entidad escrito en disco."""
+    from app.db import get_session
+    from app.paquete_entidad import construir_todas_cuentas_min, generar_zip_masivo_completo
+
+    inicio = time.perf_counter()
+
+    def _avance(hechas, total):
+        if cola is not None and (hechas % _CADA_CUENTAS == 0 or hechas == total):
+            cola.put((nit, hechas, total))
+
+    # Carpeta temporal propia: todo uso de tempfile en este proceso queda aislado y se borra al final
+    with tempfile.TemporaryDirectory(prefix=f"zip_{nit}_") as tmp_dir:
+        tempfile.tempdir = tmp_dir
+        try:
+            session = get_session()
+            try:
+                todas_min = construir_todas_cuentas_min(session, nit, fecha_corte)
+            finally:
+                session.close()
+            if cola is not None:
+                cola.put((nit, 0, sum(len(p['cuentas']) for p in todas_min)))
+            estadisticas = {}
+            zip_bytes = generar_zip_masivo_completo(
+                entidad_nit=nit,
+                entidad_nombre=nombre,
+                todas_las_cuentas=todas_min,
+                fecha_corte=fecha_corte,
+                corregir_existentes=corregir_existentes,
+                motor=motor,
+                estadisticas=estadisticas,
+                consolidado_de_sesion=False,
+                progreso=_avance,
+            )
+        finally:
+            tempfile.tempdir = None
+
+    ruta = ruta_zip_entidad(nit, nombre, fecha_corte, base_dir)
+    with open(ruta, 'wb') as f:
+        f.write(zip_bytes)
+    return {
+        'nit': nit,
+        'nombre': nombre,
+        'ruta': ruta,
+        'bytes': len(zip_bytes),
+        'pensionados': len(todas_min),
+        'estadisticas': estadisticas,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def generar_zips_paralelo(entidades: list, fecha_corte: date, corregir_existentes: bool = False,
+                          motor: str = 'canvas', procesos: int | None = None, progreso=None,
+                          base_dir: str = DIR_REPORTES) -> list:
+    """Genera el ZIP masivo de cada entidad de `entidades` [(nit, nombre), ...] en paralelo.
+
+    Devuelve un dict por entidad en orden de terminación; las que fallan traen 'error' en lugar
+    de 'ruta'. `progreso(estado)` recibe un dict con entidades_total, entidades_terminadas,
+    cuentas_total (de las entidades ya iniciadas), cuentas_hechas y fraccion (0 a 1, cada entidad
+    pesa lo mismo y avanza según sus cuentas hechas).
+    """
+    entidades = [(str(nit), nombre) for nit, nombre in entidades]
+    if not entidades:
+        return []
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(entidades)))
+    ctx = multiprocessing.get_context('spawn')
+    avance = {}  # nit -> (hechas, total)
+    terminadas = set()
+    resultados = []
+
+    def _fraccion(nit):
+        if nit in terminadas:
+            return 1.0
+        hechas, total = avance.get(nit, (0, 0))
+        return hechas / total if total else 0.0
+
+    def _reportar():
+        if progreso is not None:
+            progreso({
+                'entidades_total': len(entidades),
+                'entidades_terminadas': len(resultados),
+                'cuentas_total': sum(t for _, t in avance.values()),
+                'cuentas_hechas': sum(h for h, _ in avance.values()),
+                'fraccion': sum(_fraccion(nit) for nit, _ in entidades) / len(entidades),
+            })
+
+    with ctx.Manager() as manager, ProcessPoolExecutor(max_workers=procesos, mp_context=ctx,
+                                                         initializer=usar_pdf_binario) as ejecutor:
+        cola = manager.Queue()
+        futuros = {
+            ejecutor.submit(_generar_entidad, nit, nombre, fecha_corte, corregir_existentes, motor, base_dir, cola): (nit, nombre)
+            for nit, nombre in entidades
+        }
+        pendientes = set(futuros)
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+            while True:
+                try:
+                    nit, hechas, total = cola.get_nowait()
+                except queue.Empty:
+                    break
+                avance[nit] = (hechas, total)
+            for futuro in terminados:
+                nit, nombre = futuros[futuro]
+                terminadas.add(nit)
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    resultados.append({'nit': nit, 'nombre': nombre, 'error': str(e)})
+            _reportar()
+    return resultados
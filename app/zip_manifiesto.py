@@ -0,0 +1,126 @@
+# Manifiesto con sumas de verificación para los ZIP masivos
+# - Cada entrada se registra mientras se escribe: SHA-256 y bytes calculados sobre el mismo
+#   contenido que entra al ZIP (sin releer el archivo ni descomprimir)
+# - Totales por pensionado y por entidad acumulados en la misma pasada
+# - Al final se agrega MANIFEST.json con todo lo anterior
+# - Compresión por entrada: los PDFs (ya comprimidos por ReportLab) se guardan sin recomprimir
+#   y el texto se comprime con DEFLATE. Para que eso no cueste tamaño, los PDFs de un ZIP se
+#   generan con flujos binarios (usar_pdf_binario)
+
+import hashlib
+import json
+import os
+import time
+import zipfile
+from datetime import datetime
+
+VERSION_MANIFIESTO = 1
+_TAM_BLOQUE = 1024 * 1024
+_LIMITE_ZIP32 = 0x7FFFFFFF
+
+# Extensiones cuyo contenido ya viene comprimido: DEFLATE casi no las reduce
+EXTENSIONES_SIN_COMPRIMIR = ('.pdf', '.zip', '.png', '.jpg', '.jpeg')
+
+
+def compresion_para(arcname: str) -> int:
+    """Política de compresión de una entrada según su extensión."""
+    if arcname.lower().endswith(EXTENSIONES_SIN_COMPRIMIR):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def usar_pdf_binario():
+    """Flujos de contenido de ReportLab en binario, sin ASCII85 (~25% menos bytes por PDF).
+
+    Los PDFs van al ZIP sin recomprimir (compresion_para), así que su tamaño final depende de
+    esto. rl_config es global al proceso y ReportLab no permite fijarlo por documento: se llama
+    una sola vez al iniciar cada proceso que renderiza (app_ui, app.cli, los trabajadores de
+    app.trabajos y app.zip_lote), nunca desde una función de render.
+    """
+    from reportlab import rl_config
+    rl_config.useA85 = 0
+
+
+def _totales_vacios() -> dict:
+    return {'archivos': 0, 'bytes': 0, 'cuentas': 0,
+            'total_capital': 0.0, 'total_intereses': 0.0, 'total': 0.0}
+
+
+class ZipConManifiesto:
+    """Escribe entradas en un ZipFile abierto y lleva el manifiesto de lo escrito.
+
+    `meta` (opcional) es el dict que entrega generar_pdf_para_pensionado al destino:
+    con él la entrada se asocia al pensionado y suma sus valores a los totales. Cada entrada
+    se comprime según compresion_para, sin importar la compresión del ZipFile.
+    """
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self.zf = zf
+        self.entradas = []
+        self.pensionados = {}
+        self.totales = _totales_vacios()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _info(self, arcname: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        info.compress_type = compresion_para(arcname)
+        info.external_attr = 0o600 << 16
+        return info
+
+    def _registrar(self, arcname: str, n_bytes: int, sha256: str, meta: dict | None):
+        entrada = {'ruta': arcname, 'bytes': n_bytes, 'sha256': sha256}
+        grupos = [self.totales]
+        if meta:
+            entrada['consecutivo'] = meta.get('consecutivo')
+            entrada['identificacion'] = meta.get('identificacion')
+            ident = str(meta.get('identificacion'))
+            if ident not in self.pensionados:
+                self.pensionados[ident] = {'nombre': meta.get('nombre'), **_totales_vacios()}
+            grupos.append(self.pensionados[ident])
+        for g in grupos:
+            g['archivos'] += 1
+            g['bytes'] += n_bytes
+            if meta:
+                g['cuentas'] += 1
+                g['total_capital'] += float(meta.get('total_capital') or 0)
+                g['total_intereses'] += float(meta.get('total_intereses') or 0)
+                g['total'] += float(meta.get('total') or 0)
+        self.entradas.append(entrada)
+
+    def writestr(self, arcname: str, datos, meta: dict | None = None):
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self.zf.writestr(self._info(arcname), datos)
+        self._registrar(arcname, len(datos), hashlib.sha256(datos).hexdigest(), meta)
+
+    def write(self, ruta: str, arcname: str, meta: dict | None = None):
+        """Copia un archivo de disco al ZIP por bloques, calculando el hash en el mismo paso."""
+        h = hashlib.sha256()
+        n_bytes = 0
+        with open(ruta, 'rb') as origen, \
+                self.zf.open(self._info(arcname), 'w', force_zip64=os.path.getsize(ruta) > _LIMITE_ZIP32) as destino:
+            for bloque in iter(lambda: origen.read(_TAM_BLOQUE), b''):
+                h.update(bloque)
+                destino.write(bloque)
+                n_bytes += len(bloque)
+        self._registrar(arcname, n_bytes, h.hexdigest(), meta)
+
+    def manifiesto(self, **entidad) -> dict:
+        redondear = lambda g: {k: round(v, 2) if isinstance(v, float) else v for k, v in g.items()}
+        return {
+            'version': VERSION_MANIFIESTO,
+            'generado': datetime.now().isoformat(timespec='seconds'),
+            'entidad': {**entidad, **redondear(self.totales)},
+            'pensionados': {k: redondear(v) for k, v in self.pensionados.items()},
+            'archivos': self.entradas,
+        }
+
+    def escribir_manifiesto(self, arcname: str, **entidad):
+        """Agrega el manifiesto como última entrada (no se lista a sí mismo)."""
+        contenido = json.dumps(self.manifiesto(**entidad), ensure_ascii=False, indent=1)
+        self.zf.writestr(self._info(arcname), contenido.encode('utf-8'))
@@ -4,6 +4,67 @@ from decimal import Decimal, InvalidOperation
 from sqlalchemy import text
 import os
 
+from app.paquete_entidad import (
+    construir_todas_cuentas_min,
+    generar_zip_masivo_completo,
+)
+from app.zip_manifiesto import usar_pdf_binario
+
+# Codificación de los PDFs para todo el proceso (ver usar_pdf_binario)
+usar_pdf_binario()
+
+
+# --- Trabajos encolados desde las páginas de generación ---
+# La generación corre en los trabajadores (python -m app.cli trabajador), no en la sesión de
+# Streamlit: la página guarda el id del trabajo y en cada recarga muestra su avance o el
+# resultado para descargar (también visible en "🧵 Trabajos en segundo plano")
+_MIME_RESULTADO = {'.zip': "application/zip", '.pdf': "application/pdf", '.json': "application/json"}
+
+
+def _encolar_trabajo(clave: str, tipo: str, parametros: dict) -> int:
+    from app import trabajos
+    trabajo_id = trabajos.encolar(tipo, parametros)
+    st.session_state[clave] = {'trabajo_id': trabajo_id, 'nit': str(parametros.get('nit'))}
+    st.info(f"Trabajo {trabajo_id} encolado. Se ejecuta en los trabajadores de fondo.")
+    return trabajo_id
+
+
+def _panel_trabajo(clave: str, nit, etiqueta: str, descargar: bool = True) -> dict | None:
+    """Muestra el estado del trabajo guardado en st.session_state[clave] si es de la entidad
+    `nit`. Devuelve el trabajo (dict de app.trabajos.obtener) o None."""
+    from app import trabajos
+    ref = st.session_state.get(clave)
+    if not ref or ref['nit'] != str(nit):
+        return None
+    t = trabajos.obtener(ref['trabajo_id'])
+    if t is None:
+        return None
+    if t['estado'] in (trabajos.PENDIENTE, trabajos.EN_CURSO):
+        fraccion = t['hechas'] / t['total'] if t['total'] else 0.0
+        st.progress(min(fraccion, 1.0),
+                    text=f"{etiqueta} · trabajo {t['trabajo_id']}: {t['mensaje'] or t['estado'].lower()} ({t['hechas']}/{t['total']})")
+    elif t['estado'] == trabajos.FALLIDO:
+        st.error(f"{etiqueta} · trabajo {t['trabajo_id']}: {t['mensaje'] or 'Error'}")
+    elif descargar:
+        ruta = t['resultado_ruta']
+        if ruta and os.path.exists(ruta):
+            with open(ruta, 'rb') as f:
+                st.download_button(
+                    label=f"⬇️ {etiqueta}: {os.path.basename(ruta)}",
+                    data=f,
+                    file_name=os.path.basename(ruta),
+                    mime=_MIME_RESULTADO.get(os.path.splitext(ruta)[1], "application/octet-stream"),
+                    key=f"descargar_{clave}_{t['trabajo_id']}",
+                )
+        else:
+            st.warning(f"El resultado del trabajo {t['trabajo_id']} ya no está en disco: {ruta}")
+    return t
+
+
+def _trabajo_activo(t: dict | None) -> bool:
+    from app import trabajos
+    return t is not None and t['estado'] in (trabajos.PENDIENTE, trabajos.EN_CURSO)
+
 st.set_page_config(page_title="Cuotas Partes", page_icon="📑", layout="wide")
 
 # --- Estilos institucionales ---
@@ -30,758 +91,13 @@ menu = st.sidebar.radio(
         "⚖️ Liquidaciones Masivas (30 Cuentas)",
         "🔒 Seguridad y Trazabilidad",
         "🗓️ Liquidar por Periodos Personalizados",
+        "🧵 Trabajos en segundo plano",
     ),
     index=0,
     key="menu_principal",
 )
 
 
-# --- Utilidades: número a letras (es-CO) ---
-def numero_a_letras(n: int) -> str:
-    """Convierte un número entero a texto en español (simplificado para valores grandes)."""
-    unidades = (
-        "cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
-        "diez", "once", "doce", "trece", "catorce", "quince", "dieciséis", "diecisiete", "dieciocho", "diecinueve",
-        "veinte", "veintiuno", "veintidós", "veintitrés", "veinticuatro", "veinticinco", "veintiséis", "veintisiete", "veintiocho", "veintinueve"
-    )
-    # Debe tener 10 entradas (índices 0..9) para evitar IndexError cuando d=9 (noventa)
-    # Notar que 10-29 se manejan en el bloque num < 30, pero dejamos 'diez' y 'veinte' por completitud
-    decenas = ("", "diez", "veinte", "treinta", "cuarenta", "cincuenta", "sesenta", "setenta", "ochenta", "noventa")
-    centenas = ("", "cien", "doscientos", "trescientos", "cuatrocientos", "quinientos", "seiscientos", "setecientos", "ochocientos", "novecientos")
-
-    def _decenas(num):
-        if num < 30:
-            return unidades[num]
-        d, u = divmod(num, 10)
-        if u == 0:
-            return decenas[d]
-        return f"{decenas[d]} y {unidades[u]}"
-
-    def _centenas(num):
-        if num < 100:
-            return _decenas(num)
-        c, r = divmod(num, 100)
-        if c == 1:
-            if r == 0:
-                return "cien"
-            return f"ciento {_decenas(r)}"
-        return f"{centenas[c]}" if r == 0 else f"{centenas[c]} {_decenas(r)}"
-
-    def _seccion(num, divisor, singular, plural):
-        c, r = divmod(num, divisor)
-        if c == 0:
-            return "", r
-        if c == 1:
-            return f"{singular}", r
-        return f"{numero_a_letras(c)} {plural}", r
-
-    if n == 0:
-        return "cero"
-    if n < 0:
-        return "menos " + numero_a_letras(-n)
-
-    resultado = []
-    millones, resto = _seccion(n, 1_000_000, "un millón", "millones")
-    if millones:
-        resultado.append(millones)
-    miles, resto = _seccion(resto, 1_000, "mil", "mil")
-    if miles:
-        resultado.append(miles)
-    if resto:
-        resultado.append(_centenas(resto))
-    return " ".join([p for p in resultado if p])
-
-
-def generar_pdf_consolidado_en_memoria(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date):
-    """
-    Genera el PDF consolidado EXACTAMENTE con la misma lógica/formatos del botón "📄 PDF Consolidado".
-    Devuelve una tupla (bytes_pdf, nombre_archivo).
-    """
-    # Imports locales para evitar dependencias globales
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.lib import colors
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    import io, calendar
-    from dateutil.relativedelta import relativedelta
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter,
-                            rightMargin=0.3*inch, leftMargin=0.3*inch,
-                            topMargin=0.5*inch, bottomMargin=0.5*inch)
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=8, alignment=TA_CENTER, fontName='Helvetica-Bold')
-    normal_style = styles['Normal']
-    normal_left_bold = ParagraphStyle('NormalLeftBold', parent=styles['Normal'], fontSize=10, alignment=TA_LEFT, fontName='Helvetica-Bold')
-
-    story = []
-
-    # Encabezado: ciudad y CUENTA DE COBRO + No.
-    story.append(Spacer(1, 0.5*inch))
-    header_line1 = Table([["BOGOTÁ, D.C.", "CUENTA DE COBRO"]], colWidths=[4*inch, 3*inch])
-    header_line1.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(header_line1)
-
-    # Número de cuenta (persistencia simple como en botón; usamos archivo en disco para mantenerse igual)
-    try:
-        with open('ultimo_consecutivo.txt', 'r') as f:
-            ultimo_consecutivo = int(f.read().strip())
-    except Exception:
-        ultimo_consecutivo = 423
-    nuevo_consecutivo = ultimo_consecutivo + 1
-    with open('ultimo_consecutivo.txt', 'w') as f:
-        f.write(str(nuevo_consecutivo))
-
-    numero_table = Table([["", f"No.  {nuevo_consecutivo}"]], colWidths=[4*inch, 3*inch])
-    numero_table.setStyle(TableStyle([
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 14),
-        ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-    ]))
-    story.append(numero_table)
-
-    story.append(Spacer(1, 0.3*inch))
-
-    # Entidad acreedora (encabezado)
-    entidad_nombre_pdf = entidad_nombre
-    story.append(Paragraph(f"<b>{entidad_nombre_pdf.upper()}</b>", title_style))
-    story.append(Paragraph(f"<b>NIT: {entidad_nit}</b>", title_style))
-
-    story.append(Spacer(1, 0.4*inch))
-
-    # DEBE A: (mismo nombre/nit)
-    story.append(Paragraph("<b>DEBE A:</b>", title_style))
-    story.append(Spacer(1, 0.3*inch))
-    story.append(Paragraph(f"<b>{entidad_nombre_pdf.upper()}</b>", title_style))
-    story.append(Paragraph(f"<b>NIT: {entidad_nit}</b>", title_style))
-
-    # Totales consolidados (usando la misma suma que el botón)
-    total_consolidado_capital = 0.0
-    total_consolidado_intereses = 0.0
-    total_consolidado_total = 0.0
-    for p in todas_las_cuentas:
-        # Soportar estructura mínima (sin totales por cuenta)
-        capital_pensionado = sum(float(cuenta.get('capital_total', 0.0)) for cuenta in p.get('cuentas', []))
-        intereses_pensionado = sum(float(cuenta.get('intereses', 0.0)) for cuenta in p.get('cuentas', []))
-        total_pensionado = capital_pensionado + intereses_pensionado
-        total_consolidado_capital += capital_pensionado
-        total_consolidado_intereses += intereses_pensionado
-        total_consolidado_total += total_pensionado
-
-    story.append(Spacer(1, 0.3*inch))
-
-    # Valor en letras y numérico
-    valor_letras = numero_a_letras(int(total_consolidado_total))
-    story.append(Paragraph(f"<b>LA SUMA DE: {valor_letras.upper()} PESOS M/CTE</b>", normal_style))
-    story.append(Paragraph(f"<b>$ {total_consolidado_total:,.0f}</b>", normal_left_bold))
-
-    story.append(Spacer(1, 0.4*inch))
-
-    # Concepto con periodo de 30 meses (inicio-fin), meses en español
-    meses_es = {1:'enero',2:'febrero',3:'marzo',4:'abril',5:'mayo',6:'junio',7:'julio',8:'agosto',9:'septiembre',10:'octubre',11:'noviembre',12:'diciembre'}
-    _fecha_fin = date(fecha_corte.year, fecha_corte.month, 1)
-    _fecha_ini = _fecha_fin - relativedelta(months=29)
-    inicio_txt = f"01 de {meses_es[_fecha_ini.month].capitalize()} de {_fecha_ini.year}"
-    ultimo_dia = calendar.monthrange(_fecha_fin.year, _fecha_fin.month)[1]
-    fin_txt = f"{ultimo_dia} de {meses_es[_fecha_fin.month].capitalize()} de {_fecha_fin.year}"
-    concepto_text = (
-        "Por concepto de Cuotas Partes Pensionales sobre pagos realizados en la nómina de Pensionados del SENA "
-        f"a fecha de corte {inicio_txt} a corte de {fin_txt} por los pensionados que se relacionan a continuación:"
-    )
-    story.append(Paragraph(concepto_text, normal_style))
-    story.append(Spacer(1, 0.3*inch))
-
-    # Tabla principal
-    tabla_data = [[
-        'No. Cédula', 'Apellidos y Nombres', 'Ingreso\nNómina', 'RESOLUCIÓN\nNº', '% Cuota\nParte', 'Base\nCálculo\nCuota',
-        'Saldo\nCapital\nCausado', 'Intereses\nAcumulados', 'TOTAL\nDEUDA'
-    ]]
-
-    for p in todas_las_cuentas:
-        capital_pensionado = sum(float(cuenta.get('capital_total', 0.0)) for cuenta in p.get('cuentas', []))
-        intereses_pensionado = sum(float(cuenta.get('intereses', 0.0)) for cuenta in p.get('cuentas', []))
-        total_pensionado = capital_pensionado + intereses_pensionado
-        base_calc = float(p['pensionado'].get('base_calculo_cuota', 0.0))
-        nombre = p['pensionado']['nombre']
-        nombre_corto = nombre[:25] + '...' if len(nombre) > 25 else nombre
-        tabla_data.append([
-            str(p['pensionado']['cedula']),
-            nombre_corto,
-            '1-may-08',
-            '3089 de 2007',
-            f"{float(p['pensionado']['porcentaje_cuota'])*100:.2f}%",
-            f"{base_calc:,.0f}",
-            f"{capital_pensionado:,.0f}",
-            f"{intereses_pensionado:,.0f}",
-            f"{total_pensionado:,.0f}"
-        ])
-
-    # Totales fila final
-    tabla_data.append([
-        '', '', '', 'TOTAL', '', '',
-        f"{total_consolidado_capital:,.0f}",
-        f"{total_consolidado_intereses:,.0f}",
-        f"{total_consolidado_total:,.0f}"
-    ])
-
-    # Ajuste de anchos: tomar como referencia el bloque de "valor en letras" (área de texto)
-    # Usamos un ancho objetivo ligeramente menor que el ancho util de la página para que no se vea desbordado.
-    try:
-        available_width = doc.width  # ancho útil (página - márgenes)
-    except Exception:
-        from reportlab.lib.pagesizes import letter as _letter
-        available_width = _letter[0] - (0.3*inch + 0.3*inch)
-    target_width = max(5.8*inch, available_width - 0.6*inch)  # ~0.3in de aire a cada lado respecto al texto
-
-    # Pesos relativos por columna (proporciones estables)
-    col_weights = [1.0, 2.2, 0.8, 0.9, 0.6, 0.8, 0.8, 0.8, 0.8]
-    weights_sum = sum(col_weights)
-    col_widths = [w/weights_sum * target_width for w in col_weights]
-
-    tabla_pensionados = Table(tabla_data, colWidths=col_widths, hAlign='LEFT')
-    light_header = colors.Color(0.94, 0.94, 0.94)
-    light_row = colors.Color(0.985, 0.985, 0.985)
-    tabla_pensionados.setStyle(TableStyle([
-        # Encabezado gris claro, tipografía consistente y centrado
-        ('BACKGROUND', (0, 0), (-1, 0), light_header),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8.5),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-
-        # Filas: tamaño discreto, alineaciones refinadas como el ejemplo
-        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -2), 8),
-        ('ALIGN', (0, 1), (0, -2), 'RIGHT'),   # Cédula
-        ('ALIGN', (1, 1), (1, -2), 'LEFT'),    # Nombres
-        ('ALIGN', (2, 1), (3, -2), 'CENTER'),  # Ingreso nómina y Resolución
-        ('ALIGN', (4, 1), (-1, -2), 'RIGHT'),  # % y valores
-        ('VALIGN', (0, 1), (-1, -2), 'MIDDLE'),
-        # Alternancia muy sutil para elegancia (casi blanco)
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, light_row]),
-
-        # Fila de totales (última): énfasis en negrita y línea superior separadora
-        ('BACKGROUND', (0, -1), (-1, -1), colors.white),
-        ('FONTNAME', (5, -1), (5, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (6, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (5, -1), (-1, -1), 9),
-        ('ALIGN', (6, -1), (-1, -1), 'RIGHT'),
-        ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
-
-        # Grid delgado y paddings ajustados
-        ('GRID', (0, 0), (-1, -1), 0.8, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ('LEFTPADDING', (0, 0), (-1, -1), 2),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(tabla_pensionados)
-
-    # Anexo por pensionado con detalle de las 30 cuentas
-    story.append(PageBreak())
-    subtitle_pensionado = ParagraphStyle('SubPens', parent=styles['Heading2'], fontSize=12, spaceAfter=4, alignment=TA_LEFT, fontName='Helvetica-Bold')
-    small_right = ParagraphStyle('SmallRight', parent=styles['Normal'], fontSize=8, alignment=TA_RIGHT)
-    small_center = ParagraphStyle('SmallCenter', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER)
-    small_left = ParagraphStyle('SmallLeft', parent=styles['Normal'], fontSize=8, alignment=TA_LEFT)
-
-    for idx_p, p in enumerate(todas_las_cuentas):
-        if idx_p > 0:
-            story.append(PageBreak())
-        story.append(Paragraph(
-            f"Detalle de cuentas de cobro - {p['pensionado']['nombre']} (CC {p['pensionado']['cedula']})",
-            subtitle_pensionado
-        ))
-
-        detalle_headers = [
-            Paragraph('#', small_center),
-            Paragraph('Período', small_center),
-            Paragraph('Capital Total', small_center),
-            Paragraph('Intereses', small_center),
-            Paragraph('Total Cuenta', small_center),
-        ]
-        detalle_data = [detalle_headers]
-
-        cuentas_ord = sorted(p['cuentas'], key=lambda c: (c['año'], c['mes']))
-        subtotal_capital = subtotal_intereses = subtotal_total = 0.0
-        for idx, cta in enumerate(cuentas_ord, start=1):
-            periodo_txt = f"{meses_es[cta['mes']].upper()} {cta['año']}"
-            cap = float(cta.get('capital_total', 0))
-            inte = float(cta.get('intereses', 0))
-            tot = float(cta.get('total_cuenta', cap + inte))
-            subtotal_capital += cap
-            subtotal_intereses += inte
-            subtotal_total += tot
-            detalle_data.append([
-                Paragraph(f"{idx}", small_center),
-                Paragraph(periodo_txt, small_center),
-                Paragraph(f"${cap:,.2f}", small_right),
-                Paragraph(f"${inte:,.2f}", small_right),
-                Paragraph(f"${tot:,.2f}", small_right),
-            ])
-
-        detalle_data.append([
-            Paragraph('', small_center),
-            Paragraph('TOTAL', ParagraphStyle('SmallBoldCenter', parent=small_center, fontName='Helvetica-Bold')),
-            Paragraph(f"${subtotal_capital:,.2f}", ParagraphStyle('SmallBoldRight', parent=small_right, fontName='Helvetica-Bold')),
-            Paragraph(f"${subtotal_intereses:,.2f}", ParagraphStyle('SmallBoldRight', parent=small_right, fontName='Helvetica-Bold')),
-            Paragraph(f"${subtotal_total:,.2f}", ParagraphStyle('SmallBoldRight', parent=small_right, fontName='Helvetica-Bold')),
-        ])
-
-        detalle_table = Table(detalle_data, colWidths=[0.5*inch, 1.2*inch, 1.2*inch, 1.1*inch, 1.2*inch], repeatRows=1)
-        detalle_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
-        story.append(detalle_table)
-        story.append(Spacer(1, 0.25*inch))
-        story.append(Spacer(1, 0.1*inch))
-
-    # Construir PDF y retornar bytes + nombre
-    doc.build(story)
-    pdf_data = buffer.getvalue()
-    buffer.close()
-    pdf_name = f"LIQUIDACION_CONSOLIDADA_{entidad_nit}_{fecha_corte.strftime('%Y%m%d')}.pdf"
-    return pdf_data, pdf_name
-
-
-def generar_readme_texto(entidad_nit: str, total_pensionados: int, total_cuentas: int, entidad_nombre: str) -> str:
-    """Crea un README descriptivo para el ZIP exportado."""
-    hoy = date.today().strftime("%d/%m/%Y")
-    contenido = f"""
-    CUENTAS PARTES - PAQUETE DE LIQUIDACIÓN (30 MESES)
-    ==================================================
-
-    Entidad: {entidad_nombre} (NIT: {entidad_nit})
-    Fecha de generación: {hoy}
-
-    Contenido:
-    - CONSOLIDADO_GLOBAL.pdf (resumen ejecutivo y totales)
-    - PDFs individuales por pensionado (30 cuentas por persona)
-
-    Alcance metodológico:
-    - Sistema de 30 cuentas independientes (mes vencido)
-    - Capital fijo por cuenta, sin capitalización entre meses
-    - Intereses por DTF mensual específica
-    - Primas en junio y diciembre según número de mesadas
-
-    Resumen del paquete:
-    - Pensionados incluidos: {total_pensionados}
-    - Total de cuentas independientes: {total_cuentas}
-
-    Observaciones:
-    - Septiembre no se factura en este corte; ventana: últimos 30 meses hasta agosto de 2025.
-    - Este paquete es de uso interno y soporte de cobro persuasivo.
-    """
-    return "\n".join(line.rstrip() for line in contenido.splitlines()).strip() + "\n"
-
-def generar_consolidado_global_texto(entidad_nit, entidad_nombre, todas_las_cuentas, total_capital, total_intereses, fecha_corte):
-    """Genera el contenido del consolidado global en formato texto"""
-    content = f"""
-╔══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╗
-║                                    CONSOLIDADO GLOBAL - LIQUIDACIÓN 30 CUENTAS INDEPENDIENTES                    ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                                                                                                  ║
-║  🏛️  ENTIDAD: {entidad_nombre:<70}                                        ║
-║  🆔  NIT: {entidad_nit:<77}                                        ║
-║  📅  FECHA LIQUIDACIÓN: {fecha_corte.strftime('%d/%m/%Y'):<65}                                        ║
-║  📊  PERÍODO: SEPTIEMBRE 2022 - FEBRERO 2025 (30 MESES EXACTOS)                                               ║
-║                                                                                                                  ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                           RESUMEN EJECUTIVO                                                      ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                                                                                                  ║
-║  👥  TOTAL PENSIONADOS: {len(todas_las_cuentas):<2}                                                                         ║
-║  📋  TOTAL CUENTAS INDEPENDIENTES: {sum(len(p['cuentas']) for p in todas_las_cuentas):<3}                                                         ║
-║  💰  CAPITAL TOTAL: ${float(total_capital):>15,.2f}                                                         ║
-║  📈  INTERESES TOTALES: ${float(total_intereses):>15,.2f}                                                         ║
-║  💯  GRAN TOTAL A COBRAR: ${float(total_capital + total_intereses):>15,.2f}                                                      ║
-║                                                                                                                  ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                        RANKING POR PENSIONADO                                                    ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-
-"""
-    
-    # Agregar ranking de pensionados
-    pensionados_ordenados = sorted(todas_las_cuentas, key=lambda x: float(x['total_pensionado']), reverse=True)
-    
-    for i, p in enumerate(pensionados_ordenados, 1):
-        porcentaje_del_total = (float(p['total_pensionado']) / float(total_capital + total_intereses)) * 100
-        content += f"  {i:2d}. {p['pensionado']['nombre']:<35} ${float(p['total_pensionado']):>15,.2f} ({porcentaje_del_total:5.1f}%)\n"
-    
-    content += f"""
-
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                          METODOLOGÍA APLICADA                                                    ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                                                                                                  ║
-║  📋  SISTEMA: 30 Cuentas de Cobro Independientes por Pensionado                                                ║
-║  💰  CAPITAL: Fijo por cuenta (sin capitalización entre cuentas)                                               ║
-║  📈  INTERESES: DTF mensual específica aplicada sobre capital fijo                                             ║
-║  🏛️  CONCEPTO: Mes vencido - Cuentas históricas desde su propio mes                                            ║
-║  🎁  PRIMAS: Incluidas en diciembre y junio según número de mesadas                                            ║
-║  ⚖️  MARCO LEGAL: Sistema Anti-Prescripción según Ley 1066 de 2006                                             ║
-║                                                                                                                  ║
-╚══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╝
-
-NOTA IMPORTANTE: Este consolidado representa la suma de {sum(len(p['cuentas']) for p in todas_las_cuentas)} cuentas de cobro independientes.
-Cada pensionado tiene exactamente 30 cuentas mensuales según prescripción vigente.
-
-Generado el {fecha_corte.strftime('%d/%m/%Y')} - Sistema Cuotas Partes v2.0
-"""
-    
-    return content
-
-def generar_resumen_pensionado_texto(pensionado_data):
-    """Genera el resumen individual de un pensionado"""
-    p = pensionado_data['pensionado']
-    
-    content = f"""
-╔══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╗
-║                                     RESUMEN INDIVIDUAL - 30 CUENTAS INDEPENDIENTES                              ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                                                                                                  ║
-║  👤  PENSIONADO: {p['pensionado']['nombre']:<70}                                           ║
-║  🆔  CÉDULA: {p['pensionado']['cedula']:<77}                                           ║
-║  📊  PORCENTAJE CUOTA: {float(p['pensionado']['porcentaje_cuota'])*100:>6.2f}%                                                                ║
-║  🎁  NÚMERO MESADAS: {p['pensionado']['mesadas']:<2}                                                                              ║
-║                                                                                                                  ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                           TOTALES PENSIONADO                                                     ║
-╠══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╣
-║                                                                                                                  ║
-║  📋  TOTAL CUENTAS: {len(pensionado_data['cuentas']):<2}                                                                            ║
-║  💰  CAPITAL TOTAL: ${float(pensionado_data['total_capital']):>15,.2f}                                                         ║
-║  📈  INTERESES TOTALES: ${float(pensionado_data['total_intereses']):>15,.2f}                                                         ║
-║  💯  GRAN TOTAL: ${float(pensionado_data['total_pensionado']):>15,.2f}                                                            ║
-║                                                                                                                  ║
-╚══════════════════════════════════════════════════════════════════════════════════════════════════════════════════╝
-
-DETALLE DE LAS 30 CUENTAS:
-════════════════════════════════════════════════════════════════════════════════════════════════════════════════════
-
- #  │   Mes/Año   │    Capital Base    │      Prima       │   Capital Total   │    Intereses     │   Total Cuenta   │ Estado
-────┼─────────────┼────────────────────┼──────────────────┼───────────────────┼──────────────────┼──────────────────┼─────────
-"""
-    
-    for cuenta in pensionado_data['cuentas']:
-        estado_emoji = "🎁" if cuenta['estado'] == '🎁 PRIMA' else "📈"
-        prima_str = f"${float(cuenta['prima']):>13,.2f}" if cuenta['prima'] > 0 else f"{'':>16}"
-        
-        content += f"{cuenta['consecutivo']:2d}  │ {cuenta['mes']:02d}/{cuenta['año']} │ ${float(cuenta['capital_base']):>14,.2f} │ {prima_str} │ ${float(cuenta['capital_total']):>13,.2f} │ ${float(cuenta['intereses']):>12,.2f} │ ${float(cuenta['total_cuenta']):>12,.2f} │ {estado_emoji}\n"
-    
-    content += f"""
-────┴─────────────┴────────────────────┴──────────────────┴───────────────────┴──────────────────┴──────────────────┴─────────
-
-METODOLOGÍA:
-• Cada cuenta es independiente con capital fijo (sin capitalización)
-• Intereses calculados desde el mes de la cuenta hasta agosto 2025
-• DTF efectiva anual específica para cada mes
-• Primas incluidas según número de mesadas (12/13/14)
-
-# (secciones duplicadas eliminadas)
-• Los intereses se calculan con la DTF del mes de la cuenta (mes vencido)
-• Este sistema evita la prescripción de cuotas partes (Ley 1066/2006)
-
-🔧 SOPORTE TÉCNICO:
-───────────────────────────────────────────────────────────────────────────────────────────────────────────────────
-
-Sistema: Cuotas Partes v2.0
-Metodología: 30 Cuentas Independientes
-Fecha generación: {date.today().strftime('%d/%m/%Y')}
-
-Para consultas técnicas sobre la liquidación, contactar al administrador del sistema.
-"""
-    
-    return content
-
-
-def generar_zip_masivo_completo(entidad_nit: str, entidad_nombre: str, todas_las_cuentas: list, fecha_corte: date, corregir_existentes: bool = False) -> bytes:
-    """
-    Crea un ZIP en memoria con la estructura completa:
-    - README.txt
-    - CONSOLIDADO_GLOBAL.pdf
-    - Carpeta por pensionado:
-        - Carpeta por año:
-            - PDF de cuenta de cobro individual.
-    """
-    import io
-    import zipfile
-    import os
-    from datetime import datetime
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    
-    # Importar la función de generación de PDF individual y configurar política de consecutivo
-    import generar_pdf_oficial as gpo
-    from generar_pdf_oficial import generar_pdf_para_pensionado
-    try:
-        # True: si existe una cuenta previa para el mismo periodo y pensionado, se actualiza (misma consecutivo)
-        # False: crea una nueva entrada con nuevo consecutivo
-        gpo.CONSEC_CORRECCION = bool(corregir_existentes)
-        gpo.CONSEC_OVERRIDE = None
-    except Exception:
-        pass
-
-    def _sanitize(name: str) -> str:
-        import re
-        name = name.strip().replace(' ', '_')
-        name = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', name)
-        return name
-
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        top_dir = f"{_sanitize(entidad_nombre)}_{entidad_nit}"
-        # 1. README
-        readme_content = generar_readme_texto(
-            entidad_nit,
-            len(todas_las_cuentas),
-            sum(len(p.get('cuentas', [])) for p in todas_las_cuentas),
-            entidad_nombre,
-        )
-        zf.writestr(f"{top_dir}/README.txt", readme_content)
-
-        # 1.1 Asegurar que 'todas_las_cuentas' tenga totales calculados si viene en estructura mínima
-        try:
-            from decimal import Decimal
-            from datetime import date as _date
-            from dateutil.relativedelta import relativedelta
-            # Misma lógica usada en la UI
-            from mostrar_liquidacion_36 import ajustar_base_por_ipc, calcular_interes_mensual_unico
-            from scripts.liquidacion_36_cuentas_corregida import tiene_prima_mes
-
-            fecha_limite = _date(fecha_corte.year, fecha_corte.month, 1)
-            for p in todas_las_cuentas:
-                cuentas = p.get('cuentas', [])
-                # Si ya tienen capital_total, asumimos que están completas
-                if cuentas and isinstance(cuentas[0], dict) and 'capital_total' in cuentas[0]:
-                    # Asegurar totales agregados en el nivel del pensionado
-                    p.setdefault('total_capital', sum(c.get('capital_total', 0) for c in cuentas))
-                    p.setdefault('total_intereses', sum(c.get('intereses', 0) for c in cuentas))
-                    p.setdefault('total_pensionado', p['total_capital'] + p['total_intereses'])
-                    continue
-
-                # Calcular totales desde estructura mínima (solo año/mes)
-                info = p.get('pensionado', {})
-                try:
-                    base = float(info.get('base_calculo_cuota', 0.0) or 0.0)
-                except Exception:
-                    base = 0.0
-                try:
-                    porcentaje = float(info.get('porcentaje_cuota', 0.0) or 0.0)
-                except Exception:
-                    porcentaje = 0.0
-                try:
-                    mesadas = int(info.get('mesadas', 12) or 12)
-                except Exception:
-                    mesadas = 12
-
-                total_capital = Decimal('0')
-                total_intereses = Decimal('0')
-                total_total = Decimal('0')
-                consecutivo = 1
-                for cta in cuentas:
-                    try:
-                        año = int(cta['año']); mes = int(cta['mes'])
-                    except Exception:
-                        continue
-                    fecha_cuenta = _date(año, mes, 1)
-                    base_ajustada_año = ajustar_base_por_ipc(base, año)
-                    capital_base = Decimal(str(base_ajustada_año)) * Decimal(str(porcentaje))
-                    prima = capital_base if tiene_prima_mes(mesadas, mes) else Decimal('0')
-                    capital_total = capital_base + prima
-
-                    interes_acumulado = Decimal('0')
-                    fa = fecha_cuenta
-                    while fa <= fecha_limite:
-                        im = calcular_interes_mensual_unico(float(capital_total), fa, fecha_corte)
-                        interes_acumulado += Decimal(str(im))
-                        fa = fa + relativedelta(months=1)
-
-                    total_cuenta = capital_total + interes_acumulado
-
-                    # Enriquecer la cuenta mínima con campos completos
-                    cta['consecutivo'] = consecutivo
-                    cta['capital_base'] = capital_base
-                    cta['prima'] = prima
-                    cta['capital_total'] = capital_total
-                    cta['intereses'] = interes_acumulado
-                    cta['total_cuenta'] = total_cuenta
-                    cta['estado'] = '🎁 PRIMA' if prima > 0 else '📈 Regular'
-
-                    total_capital += capital_total
-                    total_intereses += interes_acumulado
-                    total_total += total_cuenta
-                    consecutivo += 1
-
-                p['total_capital'] = total_capital
-                p['total_intereses'] = total_intereses
-                p['total_pensionado'] = total_total
-        except Exception:
-            # Si algo falla, seguimos sin bloquear la exportación; el consolidado puede quedar en cero para esos casos
-            pass
-
-        # 2. PDF Consolidado: usar la MISMA función del botón "PDF Consolidado"
-        #    Preferimos reutilizar el PDF ya generado en la sesión; si no existe, lo generamos aquí.
-        temp_dir = "temp_pdf_generation"
-        os.makedirs(temp_dir, exist_ok=True)
-        error_log_path = os.path.join(temp_dir, "error_log.txt")
-
-        try:
-            try:
-                import streamlit as st  # puede no estar disponible en algunos contextos
-                pdf_bytes = st.session_state.get('pdf_consolidado_data')
-                pdf_name = st.session_state.get('pdf_consolidado_name')
-            except Exception:
-                pdf_bytes = None
-                pdf_name = None
-
-            if not pdf_bytes or not pdf_name:
-                # Generar con la misma lógica empleada por el botón
-                pdf_bytes, pdf_name = generar_pdf_consolidado_en_memoria(
-                    entidad_nit=entidad_nit,
-                    entidad_nombre=entidad_nombre,
-                    todas_las_cuentas=todas_las_cuentas,
-                    fecha_corte=fecha_corte,
-                )
-
-            if pdf_bytes and pdf_name:
-                zf.writestr(os.path.join(top_dir, pdf_name), pdf_bytes)
-        except Exception as e:
-            with open(error_log_path, "a", encoding="utf-8") as f:
-                f.write(f"Error generando/anexando PDF consolidado de la entidad {entidad_nombre} (NIT: {entidad_nit}): {e}\n")
-
-        # 3. Generar PDFs individuales y organizarlos en carpetas
-
-        for pensionado_data in todas_las_cuentas:
-            pensionado_info = pensionado_data['pensionado']
-            
-            # Reconstruir la tupla de pensionado que espera `generar_pdf_para_pensionado`
-            # (identificacion, nombre, numero_mesadas, fecha_ingreso_nomina, empresa, base_calculo, porcentaje, nit)
-            # Los índices pueden variar, es crucial ajustarlos al `pensionado_data` real.
-            base_calc = pensionado_info.get('base_calculo_cuota', 0.0)
-            try:
-                base_calc = float(base_calc)
-            except Exception:
-                base_calc = 0.0
-            porcentaje = pensionado_info.get('porcentaje_cuota', 0.0)
-            try:
-                porcentaje = float(porcentaje)
-            except Exception:
-                pass
-            pensionado_tuple = (
-                str(pensionado_info['cedula']),
-                pensionado_info['nombre'],
-                int(pensionado_info.get('mesadas', 12)),
-                None,  # fecha_ingreso_nomina (no requerida por el cálculo)
-                entidad_nombre,
-                base_calc,
-                porcentaje,
-                str(entidad_nit),
-            )
-
-            for cuenta in pensionado_data['cuentas']:
-                año = cuenta['año']
-                mes = cuenta['mes']
-                
-                # Generar el PDF para una sola cuenta (un mes)
-                # La función `generar_pdf_para_pensionado` crea el archivo en disco.
-                try:
-                    pdf_path = generar_pdf_para_pensionado(
-                        pensionado=pensionado_tuple,
-                        periodo='custom',
-                        año_inicio=año,
-                        mes_inicio=mes,
-                        solo_mes=True, # ¡Importante para generar solo 1 cuenta!
-                        output_dir=temp_dir # Guardar en una carpeta temporal
-                    )
-                    
-                    if pdf_path and os.path.exists(pdf_path):
-                        # Construir la ruta deseada dentro del ZIP
-                        # Ej: Suarez_Mootoo_15240013/2023/15240013_Enero_2023.pdf
-                        base_name = os.path.basename(pdf_path)
-                        
-                        # Extraer nombre de carpeta del pensionado desde la ruta generada
-                        # La ruta es como temp_pdf_generation/Pensionado_ID/archivo.pdf
-                        pensioner_folder_name = os.path.basename(os.path.dirname(pdf_path))
-                        zip_path = os.path.join(top_dir, pensioner_folder_name, str(año), base_name)
-                        
-                        # Añadir el archivo al ZIP
-                        zf.write(pdf_path, arcname=zip_path)
-                        
-                        # Opcional: eliminar el archivo temporal para no ocupar espacio
-                        os.remove(pdf_path)
-
-                except Exception as e:
-                    # Registrar el error para no detener todo el proceso y continuar
-                    error_log_path = os.path.join(temp_dir, "error_log.txt")
-                    with open(error_log_path, "a", encoding="utf-8") as f:
-                        f.write(f"Error generando PDF para {pensionado_info['cedula']} (Mes: {mes}/{año}): {e}\n")
-
-        # Incluir el log de errores (si existe) dentro del ZIP para diagnóstico
-        error_log_path = os.path.join(temp_dir, "error_log.txt")
-        if os.path.exists(error_log_path):
-            with open(error_log_path, "rb") as f:
-                zf.writestr(f"{top_dir}/error_log.txt", f.read())
-
-    # Limpiar la carpeta temporal
-    import shutil
-    shutil.rmtree(temp_dir, ignore_errors=True)
-    
-    return zip_buffer.getvalue()
-
-
-# Construye lista de (año, mes) para los últimos MESES_PRESCRIPCION meses hasta fecha_corte (inclusive)
-def _periodos_ultimos_meses(fecha_corte: date, meses: int) -> list[tuple[int,int]]:
-    from dateutil.relativedelta import relativedelta
-    inicio = date(fecha_corte.year, fecha_corte.month, 1) - relativedelta(months=meses-1)
-    actual = inicio
-    periodos = []
-    while actual <= date(fecha_corte.year, fecha_corte.month, 1):
-        periodos.append((actual.year, actual.month))
-        actual = actual + relativedelta(months=1)
-    return periodos
-
-
-# Construye la estructura mínima esperada por generar_zip_masivo_completo para una entidad
-def _construir_todas_cuentas_min(session, entidad_nit: str, fecha_corte: date) -> list:
-    from sqlalchemy import text
-    from app.settings import MESES_PRESCRIPCION
-    periodos = _periodos_ultimos_meses(fecha_corte, MESES_PRESCRIPCION)
-    rows = session.execute(text(
-        """
-        SELECT identificacion, nombre, numero_mesadas, base_calculo_cuota_parte, porcentaje_cuota_parte
-        FROM pensionado WHERE nit_entidad = :nit ORDER BY nombre
-        """
-    ), {"nit": entidad_nit}).fetchall()
-    resultado = []
-    for r in rows:
-        resultado.append({
-            'pensionado': {
-                'cedula': r[0],
-                'nombre': r[1],
-                'mesadas': int(r[2] or 12),
-                'base_calculo_cuota': float(r[3] or 0),
-                'porcentaje_cuota': float(r[4] or 0),
-            },
-            'cuentas': [ {'año': a, 'mes': m} for a, m in periodos ]
-        })
-    return resultado
-
 # --- Dashboard ---
 if menu == "🏠 Dashboard":
     st.title("Generador de Cuentas de Cobro (Cuotas Partes)")
@@ -941,19 +257,50 @@ elif menu == "📤 Cobro Persuasivo":
 # --- Módulo Reportes y Seguimiento ---
 elif menu == "📊 Reportes y Seguimiento":
     st.title("Reportes y Seguimiento")
-    st.subheader("Tabla dinámica de seguimiento")
-    
-    st.text_input("Filtrar por entidad")
-    st.text_input("Filtrar por pensionado")
-    st.date_input("Filtrar por período", value=date.today())
-    
+    st.subheader("Saldos por cuenta de cobro")
+    st.caption("Lo pagado sale de la aplicación FIFO de pagos (pago_aplicacion); solo cuentas vigentes.")
+
+    nit_reporte = st.text_input("Filtrar por entidad (NIT)", key="reporte_nit").strip()
+    ident_reporte = st.text_input("Filtrar por pensionado (identificación)", key="reporte_ident").strip()
+
     st.markdown("---")
-    st.write("(Aquí se mostraría la tabla de reportes y seguimiento)")
-    st.button("Exportar a PDF")
-    st.button("Exportar a Excel")
+    if nit_reporte:
+        try:
+            import pandas as pd
+            from app.aplicacion_pagos import saldos_cuentas
+            from app.db import get_session
+            session = get_session()
+            try:
+                saldos = saldos_cuentas(session, nit_reporte, ident_reporte or None)
+            finally:
+                session.close()
+            if saldos:
+                df_saldos = pd.DataFrame(saldos)
+                pagado = df_saldos['capital_pagado'] + df_saldos['interes_pagado']
+                df_saldos.insert(0, 'estado', [
+                    '🟢' if s <= 0 else ('🟡' if p > 0 else '🔴')
+                    for s, p in zip(df_saldos['saldo'], pagado)
+                ])
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Cuentas", f"{len(df_saldos):,}")
+                c2.metric("Pagado", f"${float(pagado.sum()):,.2f}")
+                c3.metric("Saldo", f"${float(df_saldos['saldo'].sum()):,.2f}")
+                st.dataframe(df_saldos, use_container_width=True)
+                st.download_button(
+                    "Exportar a CSV",
+                    data=df_saldos.to_csv(index=False).encode('utf-8-sig'),
+                    file_name=f"saldos_{nit_reporte}.csv",
+                    mime="text/csv",
+                )
+            else:
+                st.info("No hay cuentas de cobro vigentes para el filtro.")
+        except Exception as e:
+            st.error(f"Error consultando saldos: {e}")
+    else:
+        st.write("Ingresa el NIT de la entidad para ver sus cuentas.")
     
     st.markdown("---")
-    st.write("🔴 Cuentas próximas a prescribir | 🟡 Pagos parciales | 🟢 Pagos completos")
+    st.write("🔴 Sin pagos | 🟡 Pagos parciales | 🟢 Pagos completos")
 
 # --- Módulo Liquidaciones Masivas (30 Cuentas) ---
 elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
@@ -983,19 +330,6 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
         from sqlalchemy import text
         import os
         
-        # Importar las funciones del sistema corregido (desde el paquete scripts)
-        from scripts.liquidacion_36_cuentas_corregida import (
-            obtener_pensionados_entidad, 
-            calcular_cuenta_mensual, 
-            obtener_dtf_mes,
-            tiene_prima_mes,
-            calcular_interes_mensual,
-            calcular_dias_mes
-        )
-        from mostrar_liquidacion_36 import ajustar_base_por_ipc
-        # Usar la misma fórmula de intereses que el PDF de "solo mes" para alinear valores
-        from mostrar_liquidacion_36 import calcular_interes_mensual_unico
-        
         session = get_session()
         
         # Obtener entidades disponibles
@@ -1052,160 +386,33 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
         
         st.markdown("---")
         
-        # Botón de generación
+        # Botón de generación: el cálculo corre en un trabajo de fondo (tipo 'cuentas_30') y su
+        # resultado se carga en la sesión cuando termina
+        from app import trabajos
+        trabajos_activos = []
         if st.button("🚀 Generar 30 Cuentas de Cobro", type="primary"):
             if entidad_nit:
-                with st.spinner("⏳ Generando las 30 cuentas independientes..."):
-                    try:
-                        from decimal import Decimal, InvalidOperation
-                        from datetime import date
-                        from dateutil.relativedelta import relativedelta
-                        
-                        # Obtener pensionados de la entidad
-                        pensionados = obtener_pensionados_entidad(session, entidad_nit)
-                        
-                        if not pensionados:
-                            st.error(f"No se encontraron pensionados para la entidad {entidad_nit}")
-                        else:
-                            # Período dinámico: últimos 30 meses hasta fecha_corte
-                            from dateutil.relativedelta import relativedelta
-                            fecha_final = date(fecha_corte.year, fecha_corte.month, 1)
-                            fecha_inicial = fecha_final - relativedelta(months=29)
-                            
-                            # Generar todas las cuentas
-                            todas_las_cuentas = []
-                            total_capital_entidad = Decimal('0')
-                            total_intereses_entidad = Decimal('0')
-                            
-                            # Barra de progreso
-                            progress_bar = st.progress(0)
-                            status_text = st.empty()
-                            
-                            pensionado_count = 0
-                            total_pensionados = len(pensionados)
-                            
-                            for pensionado in pensionados:
-                                pensionado_count += 1
-                                status_text.text(f"Procesando pensionado {pensionado_count}/{total_pensionados}: {pensionado[1]}")
-                                
-                                # Generar 30 cuentas para este pensionado
-                                fecha_cuenta = fecha_inicial
-                                consecutivo = 1
-                                total_pensionado = Decimal('0')
-                                
-                                cuentas_pensionado = []
-
-                                # Base cálculo cuota original del pensionado (para mostrar en consolidado)
-                                try:
-                                    base_calculo_cuota_parte_origen = float(pensionado[8]) if pensionado[8] else 383628.0
-                                except (ValueError, IndexError, TypeError):
-                                    base_calculo_cuota_parte_origen = 383628.0
-                                
-                                while fecha_cuenta <= fecha_final:
-                                    # Obtener datos del pensionado de forma segura
-                                    try:
-                                        # Usar porcentaje_cuota del campo correcto (índice 3)
-                                        porcentaje_cuota = Decimal(str(pensionado[3])) if pensionado[3] else Decimal('0.15')
-                                        # Usar numero_mesadas del campo correcto (índice 4) 
-                                        numero_mesadas = int(pensionado[4]) if pensionado[4] else 12
-                                        # Usar base_calculo_cuota_parte de la base de datos (índice 8)
-                                        base_calculo_cuota_parte = Decimal(str(pensionado[8])) if pensionado[8] else Decimal('383628.0')
-                                    except (ValueError, IndexError, InvalidOperation):
-                                        # Valores por defecto en caso de error
-                                        porcentaje_cuota = Decimal('0.15')
-                                        numero_mesadas = 12
-                                        base_calculo_cuota_parte = Decimal('922628.0')  # Valor correcto de la BD
-                                    
-                                    # Ajustar base por IPC (base 2025 → año de la cuenta) usando la misma función que el cálculo individual
-                                    base_ajustada_año = ajustar_base_por_ipc(float(base_calculo_cuota_parte), fecha_cuenta.year)
-                                    
-                                    # Calcular capital fijo de la cuenta usando la base ajustada por IPC
-                                    capital_base = Decimal(str(base_ajustada_año)) * porcentaje_cuota
-                                    
-                                    # Determinar si tiene prima
-                                    tiene_prima = tiene_prima_mes(numero_mesadas, fecha_cuenta.month)
-                                    prima = capital_base if tiene_prima else Decimal('0')
-                                    capital_total = capital_base + prima
-                                    
-                                    # Calcular intereses acumulativos para ESTA cuenta específica
-                                    fecha_actual = fecha_cuenta
-                                    # Limitar intereses hasta el primer día del mes de corte
-                                    fecha_limite = date(fecha_corte.year, fecha_corte.month, 1)
-                                    interes_acumulado = Decimal('0')
-                                    
-                                    # Iterar mes a mes DESDE el mes de la cuenta hasta el mes de corte
-                                    while fecha_actual <= fecha_limite:
-                                        # Interés del mes usando la misma fórmula que el PDF individual (capital fijo)
-                                        interes_mes = calcular_interes_mensual_unico(float(capital_total), fecha_actual, fecha_corte)
-                                        interes_acumulado += Decimal(str(interes_mes))
-                                        fecha_actual = fecha_actual + relativedelta(months=1)
-                                    
-                                    total_cuenta = capital_total + interes_acumulado
-                                    
-                                    cuenta = {
-                                        'pensionado_id': pensionado[0],  # pensionado_id está en índice 0
-                                        'pensionado_nombre': pensionado[2],  # nombre está en índice 2
-                                        'cedula': pensionado[1],  # cedula está en índice 1
-                                        'porcentaje': float(porcentaje_cuota),
-                                        'consecutivo': consecutivo,
-                                        'mes': fecha_cuenta.month,
-                                        'año': fecha_cuenta.year,
-                                        'fecha_cuenta': fecha_cuenta,
-                                        'capital_base': capital_base,
-                                        'prima': prima,
-                                        'capital_total': capital_total,
-                                        'intereses': interes_acumulado,
-                                        'total_cuenta': total_cuenta,
-                                        'estado': '🎁 PRIMA' if tiene_prima else '📈 Regular'
-                                    }
-                                    
-                                    cuentas_pensionado.append(cuenta)
-                                    total_pensionado += total_cuenta
-                                    
-                                    fecha_cuenta += relativedelta(months=1)
-                                    consecutivo += 1
-                                
-                                # Agregar resumen del pensionado
-                                resumen_pensionado = {
-                                    'pensionado': {
-                                        'cedula': pensionado[1],  # identificacion está en índice 1
-                                        'nombre': pensionado[2],  # nombre está en índice 2
-                                        'porcentaje_cuota': porcentaje_cuota,
-                                        'mesadas': numero_mesadas,
-                                        'pensionado_id': pensionado[0],  # pensionado_id está en índice 0
-                                        'base_calculo_cuota': base_calculo_cuota_parte_origen
-                                    },
-                                    'cuentas': cuentas_pensionado,
-                                    'total_capital': sum(c['capital_total'] for c in cuentas_pensionado),
-                                    'total_intereses': sum(c['intereses'] for c in cuentas_pensionado),
-                                    'total_pensionado': total_pensionado
-                                }
-                                
-                                todas_las_cuentas.append(resumen_pensionado)
-                                total_capital_entidad += resumen_pensionado['total_capital']
-                                total_intereses_entidad += resumen_pensionado['total_intereses']
-                                
-                                # Actualizar progreso
-                                progress_bar.progress(pensionado_count / total_pensionados)
-                            
-                            progress_bar.progress(1.0)
-                            status_text.text("✅ Generación completada!")
-                            
-                            # Guardar resultados en session_state
-                            st.session_state.cuentas_generadas = {
-                                'todas_las_cuentas': todas_las_cuentas,
-                                'total_capital_entidad': total_capital_entidad,
-                                'total_intereses_entidad': total_intereses_entidad,
-                                'total_cuentas_generadas': sum(len(p['cuentas']) for p in todas_las_cuentas)
-                            }
-                            st.session_state.entidad_actual = entidad_nit
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error generando las 30 cuentas de cobro: {str(e)}")
-                        import traceback
-                        st.error(traceback.format_exc())
+                _encolar_trabajo('trabajo_cuentas_30', 'cuentas_30', {
+                    'nit': str(entidad_nit),
+                    'nombre': entidad_nombre,
+                    'fecha_corte': fecha_corte.isoformat(),
+                })
+                st.session_state.cuentas_generadas = None
             else:
                 st.error("⚠️ Por favor selecciona una entidad")
+
+        trabajo_cuentas = _panel_trabajo('trabajo_cuentas_30', entidad_nit, "30 cuentas de cobro", descargar=False)
+        if _trabajo_activo(trabajo_cuentas):
+            trabajos_activos.append(trabajo_cuentas)
+        elif (trabajo_cuentas is not None and trabajo_cuentas['estado'] == trabajos.TERMINADO
+              and st.session_state.get('cuentas_30_cargadas') != trabajo_cuentas['trabajo_id']):
+            try:
+                from app.trabajos import leer_cuentas_30
+                st.session_state.cuentas_generadas = leer_cuentas_30(trabajo_cuentas['resultado_ruta'])
+                st.session_state.entidad_actual = entidad_nit
+                st.session_state['cuentas_30_cargadas'] = trabajo_cuentas['trabajo_id']
+            except Exception as e:
+                st.error(f"❌ Error leyendo el resultado de las 30 cuentas de cobro: {str(e)}")
         
         # Mostrar resultados si existen en session_state
         if st.session_state.cuentas_generadas and st.session_state.entidad_actual == entidad_nit:
@@ -1291,63 +498,19 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
             st.markdown("---")
             st.subheader("📦 Exportar Documentos Oficiales")
 
-            # Placeholders para evitar botones duplicados tras múltiples clics
-            if 'pdf_consolidado_data' not in st.session_state:
-                st.session_state['pdf_consolidado_data'] = None
-            if 'pdf_consolidado_name' not in st.session_state:
-                st.session_state['pdf_consolidado_name'] = None
-            if 'zip_masivo_data' not in st.session_state:
-                st.session_state['zip_masivo_data'] = None
-            if 'zip_masivo_name' not in st.session_state:
-                st.session_state['zip_masivo_name'] = None
+            # Cada botón encola un trabajo de fondo; su avance y la descarga quedan bajo el botón
+            parametros_entidad = {
+                'nit': str(entidad_nit),
+                'nombre': entidad_nombre,
+                'fecha_corte': fecha_corte.isoformat(),
+            }
 
             col1, col2 = st.columns(2)
 
             with col1:
-                pdf_dl_placeholder = st.empty()
-                zip_dl_placeholder = st.empty()
-
-                # Render persistente en el mismo placeholder si ya existen datos en sesión
-                if st.session_state.get('pdf_consolidado_data') and st.session_state.get('pdf_consolidado_name'):
-                    pdf_dl_placeholder.download_button(
-                        label="⬇️ Descargar PDF Consolidado",
-                        data=st.session_state['pdf_consolidado_data'],
-                        file_name=st.session_state['pdf_consolidado_name'],
-                        mime="application/pdf",
-                        key="download_pdf_consolidado_persist"
-                    )
-                if st.session_state.get('zip_masivo_data') and st.session_state.get('zip_masivo_name'):
-                    zip_dl_placeholder.download_button(
-                        label="⬇️ Descargar ZIP (carpetas por año)",
-                        data=st.session_state['zip_masivo_data'],
-                        file_name=st.session_state['zip_masivo_name'],
-                        mime="application/zip",
-                        key="download_zip_masivo_persist"
-                    )
-
                 if st.button("📄 PDF Consolidado", type="primary", use_container_width=True):
-                    try:
-                        pdf_data, pdf_name = generar_pdf_consolidado_en_memoria(
-                            entidad_nit=entidad_nit,
-                            entidad_nombre=next((e.nombre for e in entidades if e.nit == entidad_nit), str(entidad_nit)),
-                            todas_las_cuentas=todas_las_cuentas,
-                            fecha_corte=fecha_corte,
-                        )
-                        st.session_state['pdf_consolidado_data'] = pdf_data
-                        st.session_state['pdf_consolidado_name'] = pdf_name
-
-                        pdf_dl_placeholder.download_button(
-                            label="⬇️ Descargar PDF Consolidado",
-                            data=st.session_state['pdf_consolidado_data'],
-                            file_name=st.session_state['pdf_consolidado_name'],
-                            mime="application/pdf",
-                            key="download_pdf_consolidado"
-                        )
-                        st.success(f"✅ PDF consolidado generado para {len(todas_las_cuentas)} pensionados")
-                    except Exception as e:
-                        st.error(f"Error generando PDF consolidado: {str(e)}")
-                        import traceback
-                        st.error(traceback.format_exc())
+                    _encolar_trabajo('trabajo_pdf_consolidado', 'pdf_consolidado', parametros_entidad)
+                trabajos_activos.append(_panel_trabajo('trabajo_pdf_consolidado', entidad_nit, "PDF Consolidado"))
                 
                 # Política para consecutivos duplicados
                 corregir_existentes = st.toggle(
@@ -1356,6 +519,12 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
                     help="Si está activo: se corrige la cuenta existente conservando el consecutivo. Si está desactivado: se crea una nueva cuenta con un nuevo consecutivo.",
                     key="pol_dup_corr"
                 )
+                render_rapido = st.toggle(
+                    "Render rápido (canvas) para los PDFs individuales",
+                    value=True,
+                    help="Dibuja cada cuenta de cobro directamente (varias veces más rápido). Desactivar para usar el layout clásico (platypus).",
+                    key="motor_canvas"
+                )
 
                 # Pre-escaneo de duplicados en cuenta_cobro para advertir antes de generar
                 try:
@@ -1382,7 +551,7 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
                     pass
 
                 # Consulta rápida de consecutivos (BD vs archivo)
-                with st.expander("Consecutivos (BD vs archivo)"):
+                with st.expander("Consecutivos (cuentas vs consolidado)"):
                     if st.button("🔄 Recalcular siguiente consecutivo", key="btn_recalc_cons_masivo"):
                         try:
                             from sqlalchemy import text as _tx
@@ -1390,8 +559,8 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
                         except Exception:
                             mx = None
                         try:
-                            with open('ultimo_consecutivo.txt', 'r', encoding='utf-8') as f:
-                                u = int(f.read().strip())
+                            from app import contadores
+                            u = contadores.valor_actual(session, contadores.CONSOLIDADO)
                         except Exception:
                             u = None
                         colc1, colc2 = st.columns(2)
@@ -1399,67 +568,48 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
                             st.metric("Siguiente BD", (mx or 0) + 1)
                             st.caption(f"MAX BD: {mx or 0}")
                         with colc2:
-                            st.metric("Siguiente archivo", (u or 0) + 1)
-                            st.caption(f"Archivo actual: {u if u is not None else 'N/A'}")
+                            st.metric("Siguiente consolidado", (u or 0) + 1)
+                            st.caption(f"Contador actual: {u if u is not None else 'N/A'}")
 
-                # Botón para generar ZIP con la nueva estructura de carpetas por año
+                # ZIP con la estructura de carpetas por año (se guarda en reportes_liquidacion/<entidad>)
                 if st.button("📁 Generar ZIP (carpetas por año)", key="zip_masivo_completo"):
-                    try:
-                        with st.spinner("⏳ Generando ZIP con estructura de carpetas por año..."):
-                            # Obtener el nombre de la entidad para el nombre del archivo
-                            entidad_nombre = next((e.nombre for e in entidades if e.nit == entidad_nit), "ENTIDAD")
-                            
-                            # Llamar a la nueva función que genera el ZIP con subcarpetas de año
-                            zip_data = generar_zip_masivo_completo(
-                                entidad_nit=entidad_nit,
-                                entidad_nombre=entidad_nombre,
-                                todas_las_cuentas=todas_las_cuentas,
-                                fecha_corte=fecha_corte,
-                                corregir_existentes=corregir_existentes
-                            )
-
-                            # Guardar en session_state y renderizar/actualizar botón único
-                            st.session_state['zip_masivo_data'] = zip_data
-                            st.session_state['zip_masivo_name'] = f"LIQUIDACION_MASIVA_{entidad_nit}_{fecha_corte.strftime('%Y%m%d')}.zip"
-
-                            # Además: guardar automáticamente en la misma carpeta que "personalizados"
-                            try:
-                                import os
-                                # Obtener nombre oficial de la entidad
-                                entidad_row = session.execute(text("SELECT nombre FROM entidad WHERE nit = :nit"), {"nit": entidad_nit}).fetchone()
-                                entidad_nombre_fs = (entidad_row[0] if entidad_row else str(entidad_nit))
-                                prefijo = entidad_nombre_fs.strip().upper()[:3].replace(' ', '')
-                                carpeta_entidad = f"{prefijo}_{entidad_nit}"
-                                base_dir = os.path.join(os.path.dirname(__file__), 'reportes_liquidacion', carpeta_entidad)
-                                os.makedirs(base_dir, exist_ok=True)
-                                target_path = os.path.join(base_dir, st.session_state['zip_masivo_name'])
-                                # Asegurar nombre único si existe
-                                if os.path.exists(target_path):
-                                    base, ext = os.path.splitext(target_path)
-                                    suf = 2
-                                    while os.path.exists(f"{base}_v{suf}{ext}"):
-                                        suf += 1
-                                    target_path = f"{base}_v{suf}{ext}"
-                                with open(target_path, 'wb') as f:
-                                    f.write(st.session_state['zip_masivo_data'])
-                                st.info(f"También se guardó en: {target_path}")
-                            except Exception as _e:
-                                st.warning(f"No se pudo guardar automáticamente el ZIP en disco: {_e}")
-
-                            zip_dl_placeholder.download_button(
-                                label="⬇️ Descargar ZIP (carpetas por año)",
-                                data=st.session_state['zip_masivo_data'],
-                                file_name=st.session_state['zip_masivo_name'],
-                                mime="application/zip",
-                                key="download_zip_masivo"
-                            )
-
-                            st.success(f"✅ ZIP generado con {len(todas_las_cuentas)} pensionados y estructura de carpetas por año.")
-                            
-                    except Exception as e:
-                        st.error(f"❌ Error generando el ZIP masivo: {str(e)}")
-                        import traceback
-                        st.error(traceback.format_exc())
+                    _encolar_trabajo('trabajo_zip_masivo', 'zip_masivo', {
+                        **parametros_entidad,
+                        'corregir': corregir_existentes,
+                        'motor': 'canvas' if render_rapido else 'platypus',
+                    })
+                trabajos_activos.append(_panel_trabajo('trabajo_zip_masivo', entidad_nit, "ZIP (carpetas por año)"))
+
+                # PDF único para imprenta: consolidado + todas las cuentas, con marcadores
+                if st.button("🖨️ Generar PDF único (imprenta)", key="pdf_imprenta_entidad",
+                             help="Un solo PDF con la portada consolidada y todas las cuentas de cobro, con marcadores por pensionado y año."):
+                    _encolar_trabajo('trabajo_pdf_imprenta', 'pdf_imprenta', {
+                        **parametros_entidad,
+                        'corregir': corregir_existentes,
+                    })
+                trabajos_activos.append(_panel_trabajo('trabajo_pdf_imprenta', entidad_nit, "PDF único (imprenta)"))
+
+                # ZIP parcial: solo algunos pensionados / años / meses (el trabajo liquida solo esos pensionados)
+                with st.expander("📂 ZIP parcial (pensionados, años o meses)"):
+                    nombres_parcial = {str(p['pensionado']['cedula']): p['pensionado']['nombre'] for p in todas_las_cuentas}
+                    sel_idents = st.multiselect(
+                        "Pensionados (vacío = todos)",
+                        options=list(nombres_parcial),
+                        format_func=lambda c: f"{nombres_parcial[c]} ({c})",
+                        key="parcial_pensionados"
+                    )
+                    años_disp = sorted({c['año'] for p in todas_las_cuentas for c in p['cuentas']})
+                    sel_años = st.multiselect("Años (vacío = todos)", options=años_disp, key="parcial_años")
+                    sel_meses = st.multiselect("Meses (vacío = todos)", options=list(range(1, 13)), key="parcial_meses")
+                    if st.button("📂 Generar ZIP parcial", key="zip_parcial"):
+                        _encolar_trabajo('trabajo_zip_parcial', 'zip_parcial', {
+                            **parametros_entidad,
+                            'identificaciones': sel_idents or None,
+                            'años': sel_años or None,
+                            'meses': sel_meses or None,
+                            'motor': 'canvas' if render_rapido else 'platypus',
+                        })
+                    trabajos_activos.append(_panel_trabajo('trabajo_zip_parcial', entidad_nit, "ZIP parcial"))
             
             with col2:
                 st.info("""
@@ -1476,17 +626,35 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
                 - Formato basado en plantilla Excel oficial
                 - Numeración consecutiva automática
                 - Estructura completa según PLANTILLA CXC 06
+
+                **🖨️ PDF único (imprenta):**
+                - Portada consolidada y todas las cuentas en un solo archivo
+                - Marcadores por pensionado y por año
                 """)
 
             st.markdown("---")
             st.subheader("🚚 Generación Masiva por Todas las Entidades")
-            st.caption("Genera un ZIP por cada entidad, uno tras otro, con la misma estructura de carpetas por año.")
+            st.caption("Genera un ZIP por cada entidad con la misma estructura de carpetas por año. "
+                       "Con más de un proceso, las entidades se generan en paralelo (un proceso por entidad).")
 
             corr_all = st.toggle(
                 "Si ya existe la cuenta del mismo periodo, actualizar (conservar consecutivo) [todas las entidades]",
                 value=True,
                 key="pol_dup_corr_all"
             )
+            render_rapido_all = st.toggle(
+                "Render rápido (canvas) para los PDFs individuales [todas las entidades]",
+                value=True,
+                key="motor_canvas_all"
+            )
+            procesos_all = st.number_input(
+                "Procesos en paralelo",
+                min_value=1,
+                max_value=os.cpu_count() or 1,
+                value=min(4, os.cpu_count() or 1),
+                key="procesos_all",
+                help="Cada proceso genera una entidad completa con su propia carpeta temporal y conexión a la BD"
+            )
 
             # Listado de entidades para selección con check
             try:
@@ -1561,58 +729,106 @@ elif menu == "⚖️ Liquidaciones Masivas (30 Cuentas)":
 
                     total_e = len(entidades_target)
                     resultados = []
-                    for i, (nit_e, nom_e) in enumerate(entidades_target, start=1):
-                        try:
-                            todas_min = _construir_todas_cuentas_min(session, nit_e, fecha_corte)
-                            zip_bytes = generar_zip_masivo_completo(
-                                entidad_nit=str(nit_e),
-                                entidad_nombre=nom_e,
-                                todas_las_cuentas=todas_min,
-                                fecha_corte=fecha_corte,
-                                corregir_existentes=corr_all
+                    cache_total = [0, 0]  # aciertos, renderizados
+                    if procesos_all > 1 and total_e > 1:
+                        from app.zip_lote import generar_zips_paralelo
+                        estado_lote = st.empty()
+
+                        def _progreso_lote(estado):
+                            barra.progress(min(1.0, estado['fraccion']))
+                            estado_lote.caption(
+                                f"Entidades: {estado['entidades_terminadas']}/{estado['entidades_total']} · "
+                                f"Cuentas: {estado['cuentas_hechas']:,}/{estado['cuentas_total']:,} (entidades iniciadas)"
                             )
-                            # Persistir también en disco (misma carpeta que personalizados)
+
+                        for r in generar_zips_paralelo(
+                            [(str(nit), nom) for nit, nom in entidades_target],
+                            fecha_corte,
+                            corregir_existentes=corr_all,
+                            motor='canvas' if render_rapido_all else 'platypus',
+                            procesos=int(procesos_all),
+                            progreso=_progreso_lote,
+                        ):
+                            if 'error' in r:
+                                st.error(f"Error generando ZIP para {r['nombre']} ({r['nit']}): {r['error']}")
+                                continue
+                            resultados.append((r['nit'], r['nombre'], None, r['ruta']))
+                            cache_total[0] += r['estadisticas'].get('cache_aciertos', 0)
+                            cache_total[1] += r['estadisticas'].get('cache_fallos', 0)
+                        barra.progress(1.0)
+                    else:
+                        for i, (nit_e, nom_e) in enumerate(entidades_target, start=1):
                             try:
-                                import os
-                                prefijo = nom_e.strip().upper()[:3].replace(' ', '')
-                                carpeta_entidad = f"{prefijo}_{nit_e}"
-                                base_dir = os.path.join(os.path.dirname(__file__), 'reportes_liquidacion', carpeta_entidad)
-                                os.makedirs(base_dir, exist_ok=True)
-                                file_name = f"LIQUIDACION_MASIVA_{nit_e}_{fecha_corte.strftime('%Y%m%d')}.zip"
-                                target_path = os.path.join(base_dir, file_name)
-                                if os.path.exists(target_path):
-                                    basep, extp = os.path.splitext(target_path)
-                                    suf = 2
-                                    while os.path.exists(f"{basep}_v{suf}{extp}"):
-                                        suf += 1
-                                    target_path = f"{basep}_v{suf}{extp}"
-                                with open(target_path, 'wb') as f:
-                                    f.write(zip_bytes)
-                            except Exception as _e:
-                                target_path = None
-                                st.warning(f"No se pudo guardar en disco para {nom_e} ({nit_e}): {_e}")
-
-                            resultados.append((nit_e, nom_e, zip_bytes, target_path))
-                        except Exception as ex:
-                            st.error(f"Error generando ZIP para {nom_e} ({nit_e}): {ex}")
-                        finally:
-                            barra.progress(i/total_e)
+                                todas_min = construir_todas_cuentas_min(session, nit_e, fecha_corte)
+                                stats_e = {}
+                                zip_bytes = generar_zip_masivo_completo(
+                                    entidad_nit=str(nit_e),
+                                    entidad_nombre=nom_e,
+                                    todas_las_cuentas=todas_min,
+                                    fecha_corte=fecha_corte,
+                                    corregir_existentes=corr_all,
+                                    motor='canvas' if render_rapido_all else 'platypus',
+                                    estadisticas=stats_e,
+                                    consolidado_de_sesion=False,
+                                )
+                                # Persistir también en disco (misma carpeta que personalizados)
+                                try:
+                                    import os
+                                    prefijo = nom_e.strip().upper()[:3].replace(' ', '')
+                                    carpeta_entidad = f"{prefijo}_{nit_e}"
+                                    base_dir = os.path.join(os.path.dirname(__file__), 'reportes_liquidacion', carpeta_entidad)
+                                    os.makedirs(base_dir, exist_ok=True)
+                                    file_name = f"LIQUIDACION_MASIVA_{nit_e}_{fecha_corte.strftime('%Y%m%d')}.zip"
+                                    target_path = os.path.join(base_dir, file_name)
+                                    if os.path.exists(target_path):
+                                        basep, extp = os.path.splitext(target_path)
+                                        suf = 2
+                                        while os.path.exists(f"{basep}_v{suf}{extp}"):
+                                            suf += 1
+                                        target_path = f"{basep}_v{suf}{extp}"
+                                    with open(target_path, 'wb') as f:
+                                        f.write(zip_bytes)
+                                except Exception as _e:
+                                    target_path = None
+                                    st.warning(f"No se pudo guardar en disco para {nom_e} ({nit_e}): {_e}")
+
+                                # Guardado en disco: la descarga lee el archivo y no se retienen los bytes
+                                resultados.append((nit_e, nom_e, zip_bytes if target_path is None else None, target_path))
+                                cache_total[0] += stats_e.get('cache_aciertos', 0)
+                                cache_total[1] += stats_e.get('cache_fallos', 0)
+                            except Exception as ex:
+                                st.error(f"Error generando ZIP para {nom_e} ({nit_e}): {ex}")
+                            finally:
+                                barra.progress(i/total_e)
 
                     st.success(f"Proceso finalizado. Se generaron {len(resultados)} ZIP(s). Descárgalos abajo:")
+                    if sum(cache_total):
+                        st.caption(f"Caché de PDFs: {cache_total[0]} reutilizados, {cache_total[1]} renderizados "
+                                   f"({cache_total[0] / sum(cache_total):.1%} de aciertos)")
                     for nit_e, nom_e, data_e, path_e in resultados:
-                        st.download_button(
+                        boton_zip = dict(
                             label=f"⬇️ {nom_e} ({nit_e})",
-                            data=data_e,
                             file_name=f"LIQUIDACION_MASIVA_{nit_e}_{fecha_corte.strftime('%Y%m%d')}.zip",
                             mime="application/zip",
                             key=f"dl_zip_{nit_e}"
                         )
+                        if data_e is None:
+                            # ZIP en disco: se entrega el archivo abierto, sin leerlo completo aquí
+                            with open(path_e, 'rb') as f:
+                                st.download_button(data=f, **boton_zip)
+                        else:
+                            st.download_button(data=data_e, **boton_zip)
                         if path_e:
                             st.caption(f"Guardado en: {path_e}")
 
-            # Los botones persistentes ya se renderizan en los placeholders superiores
-        
         session.close()
+
+        # Mientras haya trabajos de esta página en cola o en curso, la página se refresca sola
+        if (any(_trabajo_activo(t) for t in trabajos_activos)
+                and st.checkbox("Actualizar automáticamente", value=True, key="auto_masivas")):
+            import time
+            time.sleep(2)
+            st.rerun()
         
     except Exception as e:
         st.error(f"Error al conectar con la base de datos: {e}")
@@ -1673,15 +889,15 @@ elif menu == "🔒 Seguridad y Trazabilidad":
             st.error(f"No fue posible obtener conteos: {ex}")
 
     # Consulta rápida de consecutivos desde seguridad
-    with st.expander("Consecutivos actuales (BD vs archivo)"):
+    with st.expander("Consecutivos actuales (cuentas vs consolidado)"):
         if st.button("🔄 Recalcular siguiente consecutivo", key="btn_recalc_cons_admin"):
             try:
                 mx = session.execute(text("SELECT MAX(consecutivo) FROM cuenta_cobro")).scalar()
             except Exception:
                 mx = None
             try:
-                with open('ultimo_consecutivo.txt', 'r', encoding='utf-8') as f:
-                    u = int(f.read().strip())
+                from app import contadores
+                u = contadores.valor_actual(session, contadores.CONSOLIDADO)
             except Exception:
                 u = None
             cola, colb = st.columns(2)
@@ -1689,12 +905,12 @@ elif menu == "🔒 Seguridad y Trazabilidad":
                 st.metric("Siguiente BD", (mx or 0) + 1)
                 st.caption(f"MAX BD: {mx or 0}")
             with colb:
-                st.metric("Siguiente archivo", (u or 0) + 1)
-                st.caption(f"Archivo actual: {u if u is not None else 'N/A'}")
+                st.metric("Siguiente consolidado", (u or 0) + 1)
+                st.caption(f"Contador actual: {u if u is not None else 'N/A'}")
 
     colA, colB = st.columns(2)
     with colA:
-        reset_txt_file = st.checkbox("Reiniciar archivo ultimo_consecutivo.txt a 0", value=True)
+        reset_txt_file = st.checkbox("Reiniciar contador del consolidado a 0", value=True)
         reset_ai = st.checkbox("Reiniciar AUTO_INCREMENT de cuenta_cobro_id a 1", value=False)
         wipe_reportes = st.checkbox("Borrar archivos/ZIPs en carpeta reportes_liquidacion", value=True)
         wipe_temp = st.checkbox("Borrar carpeta temporal temp_pdf_generation", value=True)
@@ -1721,11 +937,15 @@ elif menu == "🔒 Seguridad y Trazabilidad":
                 for nit in nits:
                     res = session.execute(text("DELETE FROM cuenta_cobro WHERE nit_entidad = :nit"), {"nit": nit})
                     total_borradas += res.rowcount if res.rowcount is not None else 0
+                    # Sin cuentas no quedan aplicaciones de pagos vigentes para la entidad
+                    session.execute(text("DELETE FROM pago_aplicacion WHERE nit_entidad = :nit"), {"nit": nit})
                 session.commit()
 
                 # Borrar en tablas de historial relacionadas por pensionado_id (si se seleccionó)
                 if wipe_hist_tables:
                     tablas = [
+                        ("cartera_estado", "pensionado_id"),
+                        ("pago_resumen_pensionado", "pensionado_id"),
                         ("liquidacion_detalle", "pensionado_id"),
                         ("liquidacion", "pensionado_id"),
                         ("periodo_liquidacion", "pensionado_id"),
@@ -1746,6 +966,20 @@ elif menu == "🔒 Seguridad y Trazabilidad":
                         except Exception as ex_del:
                             session.rollback()
                             st.warning(f"No se pudo limpiar {tbl}: {ex_del}")
+                    # El resumen mensual se indexa por entidad, no por pensionado
+                    try:
+                        borradas_tbl = 0
+                        for nit in nits:
+                            res = session.execute(text(
+                                "DELETE FROM pago_resumen_mensual WHERE nit_entidad = :nit"
+                            ), {"nit": nit})
+                            if res.rowcount is not None:
+                                borradas_tbl += res.rowcount
+                        borradas_tablas["pago_resumen_mensual"] = borradas_tbl
+                        session.commit()
+                    except Exception as ex_del:
+                        session.rollback()
+                        st.warning(f"No se pudo limpiar pago_resumen_mensual: {ex_del}")
 
                 # Eliminar archivos de reportes si procede
                 import os, shutil
@@ -1790,13 +1024,15 @@ elif menu == "🔒 Seguridad y Trazabilidad":
                     except Exception as ex_ai:
                         st.warning(f"No se pudo reiniciar AUTO_INCREMENT: {ex_ai}")
 
-                # Reiniciar archivo local de consecutivo (usado por PDF consolidado)
+                # Reiniciar el contador del PDF consolidado (tabla contador)
                 if reset_txt_file:
                     try:
-                        with open('ultimo_consecutivo.txt', 'w', encoding='utf-8') as f:
-                            f.write('0')
+                        from app import contadores
+                        contadores.reiniciar(session, contadores.CONSOLIDADO, 0)
+                        session.commit()
                     except Exception as exf:
-                        st.warning(f"No se pudo reiniciar ultimo_consecutivo.txt: {exf}")
+                        session.rollback()
+                        st.warning(f"No se pudo reiniciar el contador del consolidado: {exf}")
 
                 # Mensaje final
                 detalles_hist = ""
@@ -1945,26 +1181,11 @@ elif menu == "🗓️ Liquidar por Periodos Personalizados":
     )
 
     if st.button("Generar PDFs por periodo"):
-        import generar_pdf_oficial as gpo
-        from generar_pdf_oficial import generar_pdf_para_pensionado
-        # Aplicar política de duplicados a nivel de generador
-        try:
-            gpo.CONSEC_CORRECCION = bool(corr_custom)
-            gpo.CONSEC_OVERRIDE = None
-        except Exception:
-            pass
         pensionados = session.execute(
-            text("SELECT identificacion, nombre, numero_mesadas, fecha_ingreso_nomina, empresa, base_calculo_cuota_parte, porcentaje_cuota_parte, nit_entidad FROM pensionado WHERE nit_entidad = :nit"),
-            {"nit": entidad_nit}
+            text("SELECT identificacion FROM pensionado WHERE nit_entidad = :nit"), {"nit": entidad_nit}
         ).fetchall()
-        # Construir carpeta base por entidad: <3 primeras letras>_<NIT>
-        # Obtener nombre de entidad
         entidad_row = session.execute(text("SELECT nombre FROM entidad WHERE nit = :nit"), {"nit": entidad_nit}).fetchone()
         entidad_nombre = (entidad_row[0] if entidad_row else str(entidad_nit))
-        prefijo = entidad_nombre.strip().upper()[:3].replace(' ', '')
-        carpeta_entidad = f"{prefijo}_{entidad_nit}"
-        base_dir = os.path.join(os.path.dirname(__file__), 'reportes_liquidacion', carpeta_entidad)
-        os.makedirs(base_dir, exist_ok=True)
         # Pre-escaneo de duplicados para advertir
         try:
             periodo_fin_chk = date(2025, 8, 1)
@@ -1987,8 +1208,122 @@ elif menu == "🗓️ Liquidar por Periodos Personalizados":
         except Exception:
             pass
 
-        # Reusar la lista de periodos ya calculada en la previsualización
-        for pensionado in pensionados:
-            for año, mes in st.session_state.get('periodos_preview', []):
-                generar_pdf_para_pensionado(pensionado, 'custom', año, mes, solo_mes=solo_un_mes, output_dir=base_dir)
-        st.success(f"PDFs generados para {len(pensionados)} pensionados y {len(st.session_state.get('periodos_preview', []))} periodos seleccionados.")
\ No newline at end of file
+        # Los PDFs quedan en reportes_liquidacion/<3 primeras letras>_<NIT>; el trabajo entrega un
+        # ZIP con ellos. Reusa la lista de periodos ya calculada en la previsualización
+        _encolar_trabajo('trabajo_pdfs_periodo', 'pdfs_periodo', {
+            'nit': str(entidad_nit),
+            'nombre': entidad_nombre,
+            'corregir': bool(corr_custom),
+            'solo_mes': bool(solo_un_mes),
+            'periodos': [list(x) for x in st.session_state.get('periodos_preview', [])],
+        })
+
+    if _trabajo_activo(_panel_trabajo('trabajo_pdfs_periodo', entidad_nit, "PDFs por periodo")):
+        if st.checkbox("Actualizar automáticamente", value=True, key="auto_periodos"):
+            import time
+            time.sleep(2)
+            st.rerun()
+
+# --- Trabajos en segundo plano ---
+elif menu == "🧵 Trabajos en segundo plano":
+    import time
+    from app.db import get_session
+    from app import trabajos
+    from app.cola_distribuida import TIPO_LOTE, avance_lote, encolar_lote
+
+    st.title("Trabajos en segundo plano")
+    st.caption("La generación corre en procesos trabajadores aparte (python -m app.cli trabajador): "
+               "puedes cerrar o recargar esta página sin perder el avance.")
+
+    session = get_session()
+    entidades = session.execute(text("SELECT nit, nombre FROM entidad ORDER BY nombre")).fetchall()
+    session.close()
+    nombres_entidad = {str(e[0]): e[1] for e in entidades}
+    tipos_trabajo = {
+        'cuentas_30': "30 cuentas de cobro (cálculo)",
+        'zip_masivo': "ZIP masivo de la entidad",
+        'pdf_consolidado': "PDF consolidado",
+        'pdf_imprenta': "PDF único para imprenta",
+        'pdfs_periodo': "PDFs de un periodo (mes)",
+        TIPO_LOTE: "ZIP masivo por bloques (varios trabajadores)",
+    }
+    # Encolados solo desde la página de liquidaciones masivas (necesitan filtros)
+    etiquetas_trabajo = {**tipos_trabajo, 'zip_parcial': "ZIP parcial"}
+
+    with st.form("nuevo_trabajo"):
+        col1, col2 = st.columns(2)
+        with col1:
+            nit_trabajo = st.selectbox("Entidad", options=list(nombres_entidad), format_func=lambda x: nombres_entidad[x])
+            tipo_trabajo = st.selectbox("Tipo", options=list(tipos_trabajo), format_func=lambda x: tipos_trabajo[x])
+        with col2:
+            fecha_corte_trabajo = st.date_input("Fecha de corte", value=date(2025, 8, 31))
+            corregir_trabajo = st.checkbox("Corregir cuentas existentes (reutilizar consecutivos)", value=True)
+        periodo_trabajo = st.date_input("Periodo (solo para PDFs de un periodo)", value=date(2025, 7, 1))
+        if st.form_submit_button("Encolar trabajo"):
+            parametros = {
+                'nit': nit_trabajo,
+                'nombre': nombres_entidad[nit_trabajo],
+                'fecha_corte': fecha_corte_trabajo.isoformat(),
+                'corregir': corregir_trabajo,
+            }
+            if tipo_trabajo == TIPO_LOTE:
+                trabajo_id = encolar_lote([(nit_trabajo, nombres_entidad[nit_trabajo])], fecha_corte_trabajo,
+                                          corregir=corregir_trabajo)
+            else:
+                if tipo_trabajo == 'pdfs_periodo':
+                    parametros['periodos'] = [[periodo_trabajo.year, periodo_trabajo.month]]
+                trabajo_id = trabajos.encolar(tipo_trabajo, parametros)
+            st.success(f"Trabajo {trabajo_id} encolado.")
+
+    lista = trabajos.listar()
+    if not lista:
+        st.info("No hay trabajos registrados.")
+    for t in lista:
+        p = t['parametros']
+        destino = p.get('nombre', p.get('nit')) if t['tipo'] != TIPO_LOTE else ", ".join(e[1] for e in p['entidades'])
+        titulo = f"#{t['trabajo_id']} · {etiquetas_trabajo.get(t['tipo'], t['tipo'])} · {destino} · {t['estado']}"
+        with st.container(border=True):
+            st.markdown(f"**{titulo}**")
+            if t['estado'] == trabajos.EN_CURSO:
+                fraccion = t['hechas'] / t['total'] if t['total'] else 0.0
+                st.progress(min(fraccion, 1.0), text=f"{t['mensaje'] or 'En curso'} ({t['hechas']}/{t['total']})")
+                if trabajos.abandonado(t):
+                    st.warning(f"Sin señal del trabajador {t['trabajador'] or ''} desde {t['latido'] or t['fecha_inicio']:%Y-%m-%d %H:%M:%S}")
+                    if st.button("🔁 Reintentar (retoma lo ya generado)", key=f"reintentar_{t['trabajo_id']}"):
+                        trabajos.reintentar(t['trabajo_id'])
+                        st.rerun()
+                if t['tipo'] == TIPO_LOTE:
+                    st.caption(" · ".join(
+                        f"{etapa}: " + ", ".join(f"{n} {estado.lower()}" for estado, n in estados.items())
+                        for etapa, estados in avance_lote(t['trabajo_id']).items()
+                    ))
+            elif t['estado'] == trabajos.FALLIDO:
+                st.error(t['mensaje'] or "Error")
+                if t['error']:
+                    with st.expander("Detalle del error"):
+                        st.code(t['error'])
+                if t['tipo'] in trabajos.TIPOS and st.button("🔁 Reintentar (retoma lo ya generado)", key=f"reintentar_{t['trabajo_id']}"):
+                    trabajos.reintentar(t['trabajo_id'])
+                    st.rerun()
+            elif t['estado'] == trabajos.TERMINADO:
+                ruta = t['resultado_ruta']
+                if ruta and os.path.exists(ruta):
+                    with open(ruta, 'rb') as f:
+                        st.download_button(
+                            label=f"⬇️ Descargar {os.path.basename(ruta)} ({os.path.getsize(ruta) / 1024 / 1024:.1f} MB)",
+                            data=f,
+                            file_name=os.path.basename(ruta),
+                            mime=_MIME_RESULTADO.get(os.path.splitext(ruta)[1], "application/octet-stream"),
+                            key=f"descargar_trabajo_{t['trabajo_id']}",
+                        )
+                elif ruta:
+                    st.warning(f"El archivo del resultado ya no está en disco: {ruta}")
+                else:
+                    st.success(t['mensaje'])
+            else:
+                st.caption(f"En cola desde {t['fecha_creacion']:%Y-%m-%d %H:%M:%S}")
+
+    activos = any(t['estado'] in (trabajos.PENDIENTE, trabajos.EN_CURSO) for t in lista)
+    if st.checkbox("Actualizar automáticamente", value=True, key="auto_trabajos") and activos:
+        time.sleep(2)
+        st.rerun()
@@ -14,23 +14,24 @@ El consecutivo se toma como el siguiente número global de la tabla cuenta_cobro
 Se registra una fila de trazabilidad con identificacion = f"ENTIDAD-{nit}" para control básico.
 """
 
+import itertools
 import os
 import sys
 from datetime import date, datetime
 from typing import List, Tuple
 
-from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
 
 from sqlalchemy import text, select, func
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.db import get_session, engine
 from app.models import Base, CuentaCobro
+from app.contexto_render import obtener_contexto
+from app.metadatos_pdf import incrustar_metadatos, metadatos_cuenta
+from app.pdf_paginado import FlowablesPerezosos, alto_flowables, alto_util, tablas_por_pagina
 from mostrar_liquidacion_36 import generar_cuentas_prescripcion
 from app.settings import MESES_PRESCRIPCION
 from dateutil.relativedelta import relativedelta
@@ -256,47 +257,36 @@ def generar_pdf_consolidado(nit: str, deudor: str = "SERVICIO NACIONAL DE APREND
         bottomMargin=1*cm,
     )
 
-    story = []
-    styles = getSampleStyleSheet()
-
-    style_left_bold = ParagraphStyle('leftBold', parent=styles['Normal'], fontName='Helvetica-Bold', alignment=TA_LEFT, fontSize=11)
-    style_right_bold = ParagraphStyle('rightBold', parent=styles['Normal'], fontName='Helvetica-Bold', alignment=TA_RIGHT, fontSize=11)
-    style_center_title = ParagraphStyle('centerTitle', parent=styles['Heading1'], fontName='Helvetica-Bold', alignment=TA_CENTER, fontSize=14, spaceAfter=4)
-    style_center = ParagraphStyle('center', parent=styles['Normal'], alignment=TA_CENTER, fontSize=12, spaceAfter=2)
-    style_normal = ParagraphStyle('normal', parent=styles['Normal'], fontSize=9, alignment=TA_LEFT, leading=12)
-    style_normal_bold = ParagraphStyle('normalBold', parent=styles['Normal'], fontSize=9, alignment=TA_LEFT, leading=12, fontName='Helvetica-Bold')
-    style_header = ParagraphStyle('header', parent=styles['Normal'], fontName='Helvetica-Bold', alignment=TA_CENTER, fontSize=8)
+    story = []  # cabecera del documento; la tabla se genera por páginas
+    # Estilos y TableStyle compartidos (se construyen una vez por proceso)
+    est = obtener_contexto().consolidado
 
     # Encabezado ciudad + consecutivo
     encabezado = Table([
-        [Paragraph(ciudad, style_left_bold), Paragraph(f"CUENTA DE COBRO<br/>Nro.&nbsp;{consecutivo}", style_right_bold)]
-    ], colWidths=[8*cm, 8*cm])
-    encabezado.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0),
-    ]))
+        [Paragraph(ciudad, est.left_bold), Paragraph(f"CUENTA DE COBRO<br/>Nro.&nbsp;{consecutivo}", est.right_bold)]
+    ], colWidths=est.anchos_encabezado)
+    encabezado.setStyle(est.tabla_encabezado)
     story.append(encabezado)
     story.append(Spacer(1, 0.6*cm))
 
     # Nombre entidad y NIT centrados
-    story.append(Paragraph(entidad[0], style_center_title))
-    story.append(Paragraph(str(entidad[1]), style_center))
+    story.append(Paragraph(entidad[0], est.center_title))
+    story.append(Paragraph(str(entidad[1]), est.center))
     # Espacio adicional para empujar hacia abajo el bloque de 'LA SUMA DE' y la tabla
     story.append(Spacer(1, 0.8*cm))
 
     # DEBE A
-    story.append(Paragraph("DEBE A:", style_center))
+    story.append(Paragraph("DEBE A:", est.center))
     story.append(Spacer(1, 0.2*cm))
-    story.append(Paragraph(deudor, style_center_title))
+    story.append(Paragraph(deudor, est.center_title))
     if deudor_nit:
-        story.append(Paragraph(deudor_nit, style_center))
+        story.append(Paragraph(deudor_nit, est.center))
     story.append(Spacer(1, 0.2*cm))
 
     # LA SUMA DE
     total_letras = _numero_en_letras_es(int(round(total_deuda)))
-    story.append(Paragraph(f"LA SUMA DE:&nbsp; {total_letras} PESOS M/CTE", style_normal_bold))
-    story.append(Paragraph(f"{_fmt_money(total_deuda)}", style_normal))
+    story.append(Paragraph(f"LA SUMA DE:&nbsp; {total_letras} PESOS M/CTE", est.normal_bold))
+    story.append(Paragraph(f"{_fmt_money(total_deuda)}", est.normal))
     story.append(Spacer(1, 0.2*cm))
 
     # Párrafo de concepto y período
@@ -306,95 +296,65 @@ def generar_pdf_consolidado(nit: str, deudor: str = "SERVICIO NACIONAL DE APREND
         "Por concepto de Cuotas Partes Pensionales sobre pagos realizados en la nómina de Pensionados del SENA "
         f"a fecha de corte {inicio_txt} a corte de {fin_txt} por los pensionados que se relacionan a continuación:"
     )
-    story.append(Paragraph(parrafo, style_normal))
+    story.append(Paragraph(parrafo, est.normal))
     story.append(Spacer(1, 0.3*cm))
 
     # Tabla
     headers = [
-        Paragraph('No. Cédula', style_header),
-        Paragraph('Apellidos y Nombres', style_header),
-        Paragraph('Ingreso nómina', style_header),
-        Paragraph('RESOLUCION N°', style_header),
-        Paragraph('% Cuota Parte', style_header),
-        Paragraph('Vr. Cuota Parte Mes', style_header),
-        Paragraph('Saldo Capital Causado', style_header),
-        Paragraph('Intereses Acumulados', style_header),
-        Paragraph('TOTAL DEUDA', style_header),
+        Paragraph('No. Cédula', est.header),
+        Paragraph('Apellidos y Nombres', est.header),
+        Paragraph('Ingreso nómina', est.header),
+        Paragraph('RESOLUCION N°', est.header),
+        Paragraph('% Cuota Parte', est.header),
+        Paragraph('Vr. Cuota Parte Mes', est.header),
+        Paragraph('Saldo Capital Causado', est.header),
+        Paragraph('Intereses Acumulados', est.header),
+        Paragraph('TOTAL DEUDA', est.header),
     ]
 
-    data = [headers]
-    for f in filas:
-        doc_id = f"{int(f['id']):,}"
-        ingreso = f["ingreso_nomina"].strftime('%d-%b-%y').lower() if f["ingreso_nomina"] else ''
-        data.append([
-            doc_id,
-            f['nombre'],
-            ingreso,
-            f['resolucion'],
-            f"{f['porcentaje']*100:.2f}%",
-            f"{int(round(f['vr_cuota_mes'])):,}",
-            f"{int(round(f['total_capital'])):,}",
-            f"{int(round(f['total_interes'])):,}",
-            f"{int(round(f['total_deuda'])):,}",
-        ])
-
-    # Totales fila final
-    data.append([
-        '', '', '', '', '', 'TOTAL',
-        f"{int(round(total_capital)):,}",
-        f"{int(round(total_interes)):,}",
-        f"{int(round(total_deuda)):,}",
-    ])
-
-    # Ajuste fino de anchos (suman ~19cm para márgenes de 1cm a cada lado)
-    col_widths = [
-        2.0*cm,  # No. Cédula
-        4.2*cm,  # Apellidos y Nombres
-        1.8*cm,  # Ingreso nómina
-        2.0*cm,  # Resolución N°
-        1.5*cm,  # % Cuota Parte
-        2.0*cm,  # Vr. Cuota Parte Mes
-        2.0*cm,  # Saldo Capital Causado
-        1.8*cm,  # Intereses Acumulados
-        1.7*cm,  # TOTAL DEUDA
-    ]
-    tabla = Table(data, colWidths=col_widths, repeatRows=1)
-    tabla.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 0.8, colors.black),
-        ('BACKGROUND', (0,0), (-1,0), colors.Color(0.92,0.92,0.92)),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-
-        # Encabezados
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 8.5),
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-
-        # Filas
-        ('FONTSIZE', (0,1), (-1,-2), 8),
-        ('ALIGN', (0,1), (0,-2), 'RIGHT'),   # Cédula
-        ('ALIGN', (1,1), (1,-2), 'LEFT'),    # Nombres
-        ('ALIGN', (2,1), (3,-2), 'CENTER'),  # Ingreso y Resolución
-        ('ALIGN', (4,1), (-1,-2), 'RIGHT'),  # Valores y porcentajes
-
-        ('ROWBACKGROUNDS', (0,1), (-1,-2), [colors.white, colors.Color(0.97,0.97,0.97)]),
-
-        # Totales (última fila)
-        ('FONTNAME', (5,-1), (5,-1), 'Helvetica-Bold'),
-        ('FONTNAME', (6,-1), (-1,-1), 'Helvetica-Bold'),
-        ('FONTSIZE', (5,-1), (-1,-1), 9),
-        ('ALIGN', (6,-1), (-1,-1), 'RIGHT'),
-
-        # Padding fino
-        ('LEFTPADDING', (0,0), (-1,-1), 2),
-        ('RIGHTPADDING', (0,0), (-1,-1), 2),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-    ]))
-
-    story.append(tabla)
+    def _filas():
+        # Filas perezosas: las celdas de cada pensionado se arman cuando platypus llega a su página
+        for f in filas:
+            doc_id = f"{int(f['id']):,}"
+            ingreso = f["ingreso_nomina"].strftime('%d-%b-%y').lower() if f["ingreso_nomina"] else ''
+            yield [
+                doc_id,
+                f['nombre'],
+                ingreso,
+                f['resolucion'],
+                f"{f['porcentaje']*100:.2f}%",
+                f"{int(round(f['vr_cuota_mes'])):,}",
+                f"{int(round(f['total_capital'])):,}",
+                f"{int(round(f['total_interes'])):,}",
+                f"{int(round(f['total_deuda'])):,}",
+            ], (f['total_capital'], f['total_interes'], f['total_deuda'])
+
+    def _fila_resumen(etiqueta, sumas):
+        cap, inte, deuda = sumas
+        return ['', '', '', '', '', etiqueta, f"{int(round(cap)):,}", f"{int(round(inte)):,}", f"{int(round(deuda)):,}"]
+
+    # Una tabla por página (cabecera repetida, subtotal y acumulado) en lugar de una sola
+    # Table con todas las filas: el layout no crece más que linealmente con los pensionados
+    alto = alto_util(doc)
+    alto_primera = alto - alto_flowables(story, doc.width, alto)
+    tablas = tablas_por_pagina(headers, _filas(), _fila_resumen, 3, est.anchos, est.tabla,
+                               est.tabla_subtotales, alto_primera, alto, repeatRows=1)
+
+    # Metadatos incrustados: mismos valores que la fila de trazabilidad en cuenta_cobro
+    meta = metadatos_cuenta({
+        'consecutivo': consecutivo,
+        'nit': str(nit),
+        'identificacion': f"ENTIDAD-{nit}",
+        'periodo_inicio': inicio,
+        'periodo_fin': fin,
+        'total_capital': total_capital,
+        'total_intereses': total_interes,
+        'total': total_deuda,
+    })
 
     # Render
-    doc.build(story)
+    doc.build(FlowablesPerezosos(itertools.chain(story, tablas)),
+              onFirstPage=lambda canv, doc: incrustar_metadatos(canv, [meta]))
     print(f"✓ PDF consolidado generado: {nombre_pdf}")
     print(f"   - Entidad: {entidad[0]} (NIT {entidad[1]})")
     print(f"   - Consecutivo Nro.: {consecutivo}")
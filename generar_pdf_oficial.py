@@ -11,15 +11,14 @@ import os
 import re
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from dataclasses import dataclass, replace
 from datetime import date, datetime
+from typing import Callable
 import argparse
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfgen import canvas
+import io
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
 
 # Importar funciones del sistema funcionando
 from mostrar_liquidacion_36 import (
@@ -32,12 +31,67 @@ from mostrar_liquidacion_36 import (
 from app.db import get_session, engine
 from sqlalchemy import text
 from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 from app.models import Base, CuentaCobro
+from app.contexto_render import ContextoRender, obtener_contexto
+from app.render_canvas import PlantillasCuentaCobro, cuenta_cobro_cabe_en_canvas, dibujar_cuenta_cobro
+from app.pdf_cache import CachePDF
+from app.pdf_fusionado import PDFFusionado
+from app.metadatos_pdf import incrustar_metadatos, metadatos_cuenta
+
+# Fecha de corte por defecto: agosto 2025 (septiembre no se toma por facturar)
+FECHA_CORTE = date(2025, 8, 31)
 
 # --- Gestión de consecutivo en base de datos (tabla cuenta_cobro) ---
+# Valores por defecto para llamadas sin OpcionesRender (compatibilidad). No mutarlos desde
+# la UI ni desde trabajos concurrentes: usar OpcionesRender por trabajo.
 CONSEC_OVERRIDE = None  # --consecutivo
 CONSEC_CORRECCION = False  # --correccion
 
+# Reintentos al asignar consecutivo cuando otro proceso toma el mismo número (UNIQUE)
+_MAX_REINTENTOS_CONSECUTIVO = 5
+
+
+@dataclass
+class OpcionesRender:
+    """Opciones de un trabajo de generación de cuentas de cobro.
+
+    Se pasan explícitamente a `generar_pdf_para_pensionado`, de modo que varios trabajos
+    (hilos, procesos o sesiones de Streamlit) pueden generar al mismo tiempo sin compartir
+    estado global.
+
+    - consecutivo_override: fuerza el Nro. de cuenta de cobro (equivale a --consecutivo).
+    - correccion: si ya existe la cuenta del mismo periodo, se corrige conservando su consecutivo.
+    - reimpresion: si ya existe la cuenta del mismo periodo, se usa su consecutivo sin modificar
+      cuenta_cobro (descargas de cuentas ya emitidas); las que no existen se emiten normalmente.
+    - output_dir: carpeta base en disco (por defecto `reportes_liquidacion`).
+    - destino: callable `(carpeta_pensionado, nombre_archivo, contenido, meta) -> str`. Si se
+      indica, el PDF se construye en memoria y se entrega al destino (p. ej. un ZIP) sin tocar disco.
+    - fecha_corte: fecha de corte de la liquidación.
+    - motor: 'platypus' (por defecto) o 'canvas' (dibujo directo, más rápido para corridas
+      masivas; si la cuenta no cabe en una página se usa platypus).
+    - cache: CachePDF opcional; los documentos con datos idénticos se copian del almacén
+      en lugar de renderizarse otra vez.
+    - plantillas: PlantillasCuentaCobro del trabajo (solo motor 'canvas'); la parte fija de la
+      cuenta (encabezado, etiquetas, entidad, cabeceras y grillas) va en un form XObject por archivo.
+    - fusionado: PDFFusionado opcional; cada cuenta se agrega como página(s) del PDF único de
+      la entidad en lugar de escribirse como archivo (no se usan destino, output_dir ni cache).
+    - reusar_desde: inicio de la corrida en curso (corridas reanudables). Una cuenta del mismo
+      periodo registrada desde ese momento ya fue emitida por esta corrida antes de
+      interrumpirse: se reutiliza su consecutivo en lugar de asignar otro.
+    """
+    consecutivo_override: int | None = None
+    correccion: bool = False
+    reimpresion: bool = False
+    output_dir: str | None = None
+    destino: Callable | None = None
+    fecha_corte: date = FECHA_CORTE
+    motor: str = 'platypus'
+    cache: CachePDF | None = None
+    plantillas: PlantillasCuentaCobro | None = None
+    fusionado: PDFFusionado | None = None
+    reusar_desde: datetime | None = None
+
 _cuenta_table_ready = False
 
 def _ensure_cuenta_table():
@@ -80,7 +134,257 @@ def _ensure_unique_filename(base_name: str) -> str:
     ts = datetime.now().strftime('%Y%m%d%H%M%S')
     return f"{base}_{ts}{ext}"
 
-def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes_inicio=None, solo_mes: bool = False, output_dir: str | None = None):
+def _reaplicar_pagos(s, nit_text, identificacion):
+    """Aplica los pagos ya registrados del pensionado a la cuenta recién emitida (FIFO)."""
+    from app.aplicacion_pagos import reaplicar_cuenta
+    s.flush()  # la sesión no hace autoflush y la consulta debe ver la cuenta
+    reaplicar_cuenta(s, nit_text, identificacion)
+
+def _asignar_consecutivo(pensionado, nit_text, periodo_inicio_fecha, periodo_fin_fecha,
+                         total_capital, total_intereses, total_final, archivo_pdf, opciones: OpcionesRender) -> int:
+    """Obtiene el consecutivo de la cuenta y registra/actualiza su trazabilidad en cuenta_cobro.
+
+    El siguiente consecutivo se calcula como MAX+1; si otro proceso inserta el mismo número
+    antes (restricción UNIQUE), se reintenta con el siguiente.
+    """
+    _ensure_cuenta_table()
+    for intento in range(_MAX_REINTENTOS_CONSECUTIVO):
+        with get_session() as s:
+            existente = _db_find_existing(s, nit_text, pensionado[0], periodo_inicio_fecha, periodo_fin_fecha)
+            if existente is not None and opciones.reimpresion and opciones.consecutivo_override is None:
+                return existente.consecutivo
+            # Emitida por esta misma corrida antes de interrumpirse (ver OpcionesRender.reusar_desde)
+            de_esta_corrida = (existente is not None and opciones.reusar_desde is not None
+                               and existente.fecha_creacion is not None
+                               and existente.fecha_creacion >= opciones.reusar_desde)
+            reutilizar = (existente is not None and opciones.consecutivo_override is None
+                          and (opciones.correccion or de_esta_corrida))
+            if opciones.consecutivo_override is not None:
+                consecutivo_cc = int(opciones.consecutivo_override)
+            elif reutilizar:
+                consecutivo_cc = existente.consecutivo
+            else:
+                # Nuevo consecutivo global
+                consecutivo_cc = _db_get_next_consecutivo(s)
+
+            ahora = datetime.now()
+            try:
+                if reutilizar:
+                    # Existe mismo periodo y es corrección (o reanudación): solo se actualizan totales
+                    existente.total_capital = total_capital
+                    existente.total_intereses = total_intereses
+                    existente.total_liquidacion = total_final
+                    existente.archivo_pdf = archivo_pdf
+                    if not de_esta_corrida:
+                        existente.estado = 'CORREGIDA'
+                    existente.fecha_actualizacion = ahora
+                    _reaplicar_pagos(s, nit_text, pensionado[0])
+                    s.commit()
+                    return existente.consecutivo
+
+                # Nueva entrada (primera emisión, o nueva versión con nuevo consecutivo)
+                if existente is None:
+                    estado = 'EMITIDA' if opciones.consecutivo_override is None else 'EMITIDA_MANUAL'
+                    version = 1
+                else:
+                    estado = 'EMITIDA'
+                    version = (existente.version or 1) + 1
+                s.add(CuentaCobro(
+                    consecutivo=consecutivo_cc,
+                    nit_entidad=nit_text,
+                    empresa=pensionado[4],
+                    pensionado_identificacion=str(pensionado[0]),
+                    pensionado_nombre=pensionado[1],
+                    periodo_inicio=periodo_inicio_fecha,
+                    periodo_fin=periodo_fin_fecha,
+                    total_capital=total_capital,
+                    total_intereses=total_intereses,
+                    total_liquidacion=total_final,
+                    archivo_pdf=archivo_pdf,
+                    estado=estado,
+                    version=version,
+                    fecha_creacion=ahora,
+                    fecha_actualizacion=ahora,
+                ))
+                _reaplicar_pagos(s, nit_text, pensionado[0])
+                s.commit()
+                return consecutivo_cc
+            except IntegrityError:
+                s.rollback()
+                # Consecutivo tomado por otro proceso; con override no tiene sentido reintentar
+                if opciones.consecutivo_override is not None or intento == _MAX_REINTENTOS_CONSECUTIVO - 1:
+                    raise
+
+def _carpeta_pensionado(pensionado) -> str:
+    """Subcarpeta del pensionado: <PrimerApellido>_<SegundoApellido>_<Identificación>."""
+    nombre_completo = str(pensionado[1]) if len(pensionado) > 1 and pensionado[1] else ''
+    if ',' in nombre_completo:
+        bloque_apellidos = nombre_completo.split(',')[0].strip()
+    else:
+        bloque_apellidos = nombre_completo.strip()
+    partes = [p for p in bloque_apellidos.split() if p]
+    ap1 = partes[0] if partes else ''
+    ap2 = partes[1] if len(partes) > 1 else ''
+    # Sanitizar: solo letras, números, guiones y guiones bajos; capitalizar
+    ap1 = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', ap1).strip()
+    ap2 = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', ap2).strip()
+    if ap1 and ap2:
+        return f"{ap1.title()}_{ap2.title()}_{pensionado[0]}"
+    if ap1:
+        return f"{ap1.title()}_{pensionado[0]}"
+    return str(pensionado[0])
+
+# Versión del formato de la cuenta de cobro: incrementarla al cambiar el layout para que la
+# caché de PDFs no entregue documentos con el formato anterior
+# (2: metadatos JSON incrustados en el Info del PDF)
+VERSION_FORMATO_CUENTA_COBRO = 2
+
+MESES_MINUSCULA = ["enero", "febrero", "marzo", "abril", "mayo", "junio",
+                   "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+
+# Título de la sección de intereses (espaciado fijo del formato oficial)
+_TITULO_INTERESES = (
+    "<b>JULIO 29/2006 - Art. 4 Ley 1066/2006 " + "&nbsp;" * 78 + " CON INTERESES DTF</b>"
+)
+
+
+def _documento_cuenta_cobro(salida) -> SimpleDocTemplate:
+    """Documento A4 con márgenes estrechos; `salida` es una ruta o un buffer."""
+    return SimpleDocTemplate(
+        salida,
+        pagesize=A4,
+        rightMargin=0.5*cm,
+        leftMargin=0.5*cm,
+        topMargin=1*cm,
+        bottomMargin=1*cm
+    )
+
+
+def construir_story_cuenta_cobro(datos: dict, ctx: ContextoRender) -> list:
+    """Flowables de la cuenta de cobro individual a partir de los datos ya calculados.
+
+    Solo da formato: estilos, anchos y TableStyle vienen del contexto compartido.
+    """
+    est = ctx.oficial
+    story = []
+
+    # ENCABEZADO CON CIUDAD Y CONSECUTIVO
+    tabla_encabezado = Table([[
+        Paragraph('BOGOTA, D.C.', est.encabezado),
+        Paragraph(f"CUENTA DE COBRO<br/>Nro. {datos['consecutivo']}", est.cuenta_cobro),
+    ]], colWidths=est.anchos_encabezado)
+    tabla_encabezado.setStyle(est.tabla_encabezado)
+    story.append(tabla_encabezado)
+    story.append(Spacer(1, 0.5*cm))
+
+    # INFORMACIÓN COMPLETA (ENTIDAD + PENSIONADO)
+    info_superior = [
+        ['Entidad', f"{datos['entidad']} - NIT. {datos['nit']}"],
+        ['Período', f"CUOTAS PARTES POR COBRAR {datos['periodo_texto']}"],
+        ['Nombre', f"{datos['nombre']}"],
+        ['Identificación', f"{datos['identificacion']}"],
+    ]
+    # Solo agregar filas de sustituto si tienen datos
+    if datos.get('sustituto_nombre'):
+        info_superior.append(['Sustituto', datos['sustituto_nombre']])
+    if datos.get('sustituto_identificacion'):
+        info_superior.append(['Identificación', datos['sustituto_identificacion']])
+    tabla_superior = Table(info_superior, colWidths=est.anchos_superior)
+    tabla_superior.setStyle(est.tabla_superior)
+    story.append(tabla_superior)
+    story.append(Spacer(1, 0.3*cm))
+
+    # TABLA DE RESUMEN INTERMEDIA
+    resumen_data = [
+        ['Ingreso a Nómina', '% Cuota Parte', 'Estado', 'Capital pendiente', 'Interes acumulado', 'Total'],
+        ['01/05/2008', '36.10%', 'ACTIVO', f"${datos['total_capital']:,.2f}",
+         f"${datos['total_intereses']:,.2f}", f"${datos['total']:,.2f}"]
+    ]
+    tabla_resumen = Table(resumen_data, colWidths=est.anchos_resumen)
+    tabla_resumen.setStyle(est.tabla_resumen)
+    story.append(tabla_resumen)
+    story.append(Spacer(1, 0.3*cm))
+
+    # TÍTULO DE LA SECCIÓN DE INTERESES
+    story.append(Paragraph(_TITULO_INTERESES, est.titulo_intereses))
+    story.append(Spacer(1, 0.2*cm))
+
+    # Cabeceras de la tabla usando Paragraph para ajuste automático de texto
+    table_data = [[
+        Paragraph('PERÍODO', est.header),
+        Paragraph('Vr. Cuota parte periodo', est.header),
+        Paragraph('Días', est.header),
+        Paragraph('DTF EA', est.header),
+        Paragraph('Valor Intereses', est.header),
+        Paragraph('Capital', est.header)
+    ]]
+    for etiqueta, vr_cuota, dias, dtf, interes, capital in datos['filas']:
+        table_data.append([
+            Paragraph(etiqueta, est.data_left),
+            Paragraph(f"${vr_cuota:,.2f}", est.data_right),
+            Paragraph(f"{dias:d}", est.data_center),
+            Paragraph(f"{dtf:.2f}%", est.data_center),
+            Paragraph(f"${interes:,.2f}", est.data_right),
+            Paragraph(f"${capital:,.2f}", est.data_right)
+        ])
+
+    # Fila de total de intereses (suma de la columna)
+    capital_total = datos.get('capital_total')
+    table_data.append([
+        Paragraph('TOTAL', est.total_hdr),
+        '', '', '',
+        Paragraph(f"${datos['suma_intereses_columna']:,.2f}", est.total_num),
+        Paragraph(f"${capital_total:,.2f}", est.total_num) if capital_total is not None else ''
+    ])
+
+    tabla = Table(table_data, colWidths=est.anchos_intereses, repeatRows=1)
+    tabla.setStyle(est.tabla_intereses)
+    story.append(tabla)
+    return story
+
+
+def _renderizar_cuenta_cobro(datos: dict, salida, motor: str = 'platypus',
+                             plantillas: PlantillasCuentaCobro | None = None):
+    """Escribe la cuenta de cobro en `salida` con el motor indicado ('platypus' | 'canvas')."""
+    ctx = obtener_contexto()
+    if motor == 'canvas' and cuenta_cobro_cabe_en_canvas(datos, ctx):
+        dibujar_cuenta_cobro(datos, ctx, salida, plantillas)
+    else:
+        meta = metadatos_cuenta(datos)
+        _documento_cuenta_cobro(salida).build(
+            construir_story_cuenta_cobro(datos, ctx),
+            onFirstPage=lambda canv, doc: incrustar_metadatos(canv, [meta]),
+        )
+
+
+def _respaldo_fusionado(fusionado: PDFFusionado, datos: dict):
+    """Cuentas largas del PDF fusionado: layout platypus sobre el canvas compartido."""
+    fusionado.construir(_documento_cuenta_cobro(None), construir_story_cuenta_cobro(datos, fusionado.ctx))
+
+
+def _generar_cuenta_cobro(datos: dict, salida, opciones: OpcionesRender):
+    """Render con caché: copia el PDF del almacén si los datos no cambiaron."""
+    cache = opciones.cache
+    if cache is None:
+        _renderizar_cuenta_cobro(datos, salida, opciones.motor, opciones.plantillas)
+        return
+    # Con plantilla el PDF lleva la parte fija como form XObject: bytes distintos, otra clave
+    motor = opciones.motor + ('+plantilla' if opciones.plantillas is not None else '')
+    clave = cache.clave(VERSION_FORMATO_CUENTA_COBRO, motor, datos)
+    if cache.copiar_a(clave, salida):
+        return
+    buffer = io.BytesIO()
+    _renderizar_cuenta_cobro(datos, buffer, opciones.motor, opciones.plantillas)
+    contenido = buffer.getvalue()
+    cache.guardar(clave, contenido)
+    if isinstance(salida, str):
+        with open(salida, 'wb') as f:
+            f.write(contenido)
+    else:
+        salida.write(contenido)
+
+
+def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes_inicio=None, solo_mes: bool = False, output_dir: str | None = None, opciones: OpcionesRender | None = None):
     """Genera un PDF para un pensionado ya consultado.
 
     Espera una tupla en el siguiente orden (para compatibilidad con mostrar_liquidacion_36):
@@ -92,10 +396,20 @@ def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes
         periodo: 'sep' para Sep 2022-Ago 2025, 'oct' para Oct 2022-Ago 2025, 'custom' para personalizado
         año_inicio: Año de inicio para período custom
         mes_inicio: Mes de inicio para período custom
+        opciones: OpcionesRender del trabajo. Si no se indica, se usan los valores por defecto
+            del módulo (CONSEC_OVERRIDE / CONSEC_CORRECCION) y `output_dir`.
+
+    Returns:
+        Ruta del PDF en disco, o lo que retorne `opciones.destino` si se indicó.
     """
+    if opciones is None:
+        opciones = OpcionesRender(consecutivo_override=CONSEC_OVERRIDE, correccion=CONSEC_CORRECCION)
+    if output_dir and not opciones.output_dir:
+        opciones = replace(opciones, output_dir=output_dir)
+
     # Generar datos usando el sistema funcionando según el período
-    # Fecha de corte: agosto 2025. Se generan los últimos 30 meses hasta esta fecha (septiembre no se toma por facturar)
-    fecha_corte = date(2025, 8, 31)
+    # Se generan los últimos 30 meses hasta la fecha de corte del trabajo
+    fecha_corte = opciones.fecha_corte
     
     if periodo == 'oct':
         cuentas = generar_cuentas_prescripcion_oct(pensionado, fecha_corte)
@@ -106,7 +420,7 @@ def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes
         # Para período custom, calcular hasta la fecha de corte válida
         fecha_inicio = date(año_inicio, mes_inicio, 1)
         if fecha_inicio > fecha_corte:
-            raise ValueError(f"La fecha de inicio ({fecha_inicio}) no puede ser posterior a agosto 2025")
+            raise ValueError(f"La fecha de inicio ({fecha_inicio}) no puede ser posterior a la fecha de corte ({fecha_corte})")
 
         from dateutil.relativedelta import relativedelta
 
@@ -200,307 +514,37 @@ def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes
     meses_nombres = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
     mes_nombre = meses_nombres[fecha_inicio.month - 1]
     nombre_archivo = f"{pensionado[0]}_{mes_nombre}_{fecha_inicio.year}.pdf"
-    # Guardar PDF en la carpeta 'reportes_liquidacion' dentro del proyecto
-    # Soporta un directorio base externo (por entidad) y subcarpeta por pensionado
-    base_dir = output_dir if output_dir else os.path.join(os.path.dirname(__file__), 'reportes_liquidacion')
-    # Subcarpeta del pensionado: <PrimerApellido>_<SegundoApellido>_<Identificación> (si hay dos apellidos)
-    nombre_completo = str(pensionado[1]) if len(pensionado) > 1 and pensionado[1] else ''
-    if ',' in nombre_completo:
-        bloque_apellidos = nombre_completo.split(',')[0].strip()
+    carpeta_pensionado = _carpeta_pensionado(pensionado)
+    if opciones.fusionado is not None:
+        # PDF único de la entidad: la cuenta no tiene archivo propio
+        ruta_pdf = nombre_archivo
+        salida_pdf = None
+    elif opciones.destino is None:
+        # Guardar PDF en la carpeta 'reportes_liquidacion' dentro del proyecto
+        # Soporta un directorio base externo (por entidad) y subcarpeta por pensionado
+        base_dir = opciones.output_dir if opciones.output_dir else os.path.join(os.path.dirname(__file__), 'reportes_liquidacion')
+        carpeta_reportes = os.path.join(base_dir, carpeta_pensionado)
+        if not os.path.exists(carpeta_reportes):
+            os.makedirs(carpeta_reportes, exist_ok=True)
+        ruta_pdf = os.path.join(carpeta_reportes, nombre_archivo)
+        # Asegurar nombre único para evitar conflictos con archivos abiertos/sincronizados
+        ruta_pdf = _ensure_unique_filename(ruta_pdf)
+        salida_pdf = ruta_pdf
     else:
-        bloque_apellidos = nombre_completo.strip()
-    partes = [p for p in bloque_apellidos.split() if p]
-    ap1 = partes[0] if partes else ''
-    ap2 = partes[1] if len(partes) > 1 else ''
-    # Sanitizar: solo letras, números, guiones y guiones bajos; capitalizar
-    ap1 = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', ap1).strip()
-    ap2 = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑáéíóúüñ0-9_-]", '', ap2).strip()
-    if ap1 and ap2:
-        carpeta_pensionado = f"{ap1.title()}_{ap2.title()}_{pensionado[0]}"
-    elif ap1:
-        carpeta_pensionado = f"{ap1.title()}_{pensionado[0]}"
-    else:
-        carpeta_pensionado = str(pensionado[0])
-    carpeta_reportes = os.path.join(base_dir, carpeta_pensionado)
-    if not os.path.exists(carpeta_reportes):
-        os.makedirs(carpeta_reportes, exist_ok=True)
-    ruta_pdf = os.path.join(carpeta_reportes, nombre_archivo)
-    # Asegurar nombre único para evitar conflictos con archivos abiertos/sincronizados
-    ruta_pdf = _ensure_unique_filename(ruta_pdf)
-
-    # Configurar documento con márgenes más estrechos
-    doc = SimpleDocTemplate(
-        ruta_pdf,
-        pagesize=A4,
-        rightMargin=0.5*cm,
-        leftMargin=0.5*cm,
-        topMargin=1*cm,
-        bottomMargin=1*cm
-    )
-    
-    # Estilos
-    styles = getSampleStyleSheet()
-    
-    # Estilo para título principal
-    titulo_style = ParagraphStyle(
-        'TituloCustom',
-        parent=styles['Heading1'],
-        fontSize=14,
-        spaceAfter=12,
-        alignment=TA_CENTER,
-        textColor=colors.black,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para subtítulo
-    subtitulo_style = ParagraphStyle(
-        'SubtituloCustom',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=16,
-        alignment=TA_CENTER,
-        textColor=colors.black,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para información
-    info_style = ParagraphStyle(
-        'InfoCustom',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=6,
-        alignment=TA_LEFT,
-        textColor=colors.black,
-        fontName='Helvetica'
-    )
-    
-    # Estilo para totales
-    total_style = ParagraphStyle(
-        'TotalCustom',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_LEFT,
-        textColor=colors.black,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para encabezado
-    encabezado_style = ParagraphStyle(
-        'EncabezadoCustom',
-        parent=styles['Normal'],
-        fontSize=12,
-        spaceAfter=8,
-        alignment=TA_LEFT,
-        textColor=colors.black,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Estilo para cuenta de cobro (alineado a la derecha)
-    cuenta_cobro_style = ParagraphStyle(
-        'CuentaCobroCustom',
-        parent=styles['Normal'],
-        fontSize=12,
-        spaceAfter=8,
-        alignment=TA_RIGHT,
-        textColor=colors.black,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Construir contenido del PDF según formato de la imagen
-    story = []
-    
+        # Destino en memoria (ZIP, etc.): el nombre final lo decide el destino
+        ruta_pdf = nombre_archivo
+        salida_pdf = io.BytesIO()
+
     # ENCABEZADO CON CIUDAD Y CONSECUTIVO (gestión en BD)
-    _ensure_cuenta_table()
     # Fechas de periodo para registro
     periodo_inicio_fecha = cuentas[0]['fecha_cuenta'] if cuentas else date(2022, 9, 1)
-    periodo_fin_fecha = cuentas[-1]['fecha_cuenta'] if cuentas else date(2025, 8, 31)
+    periodo_fin_fecha = cuentas[-1]['fecha_cuenta'] if cuentas else fecha_corte
     nit_text = str(pensionado[7]) if len(pensionado) > 7 and pensionado[7] else 'N/D'
-    # Calcular/obtener consecutivo
-    with get_session() as s:
-        existente = _db_find_existing(s, nit_text, pensionado[0], periodo_inicio_fecha, periodo_fin_fecha)
-        consecutivo_cc = None
-        if CONSEC_OVERRIDE is not None:
-            consecutivo_cc = int(CONSEC_OVERRIDE)
-        elif CONSEC_CORRECCION and existente is not None:
-            consecutivo_cc = existente.consecutivo
-        else:
-            # Nuevo consecutivo global
-            consecutivo_cc = _db_get_next_consecutivo(s)
-        
-        # Crear o actualizar registro de trazabilidad
-        ahora = datetime.now()
-        # Guardar en BD el nombre real del PDF generado (sin la ruta completa)
-        pdf_name_preview = os.path.basename(ruta_pdf)
-        if existente is None:
-            reg = CuentaCobro(
-                consecutivo=consecutivo_cc,
-                nit_entidad=nit_text,
-                empresa=pensionado[4],
-                pensionado_identificacion=str(pensionado[0]),
-                pensionado_nombre=pensionado[1],
-                periodo_inicio=periodo_inicio_fecha,
-                periodo_fin=periodo_fin_fecha,
-                total_capital=total_capital,
-                total_intereses=total_intereses,
-                total_liquidacion=total_final,
-                archivo_pdf=pdf_name_preview,
-                estado='EMITIDA' if CONSEC_OVERRIDE is None else 'EMITIDA_MANUAL',
-                version=1,
-                fecha_creacion=ahora,
-                fecha_actualizacion=ahora,
-            )
-            s.add(reg)
-            s.commit()
-        else:
-            # Existe mismo periodo; si corrección, solo actualizamos totales;
-            # si no es corrección y no se forzó, incrementamos versión y creamos nueva entrada con nuevo consecutivo
-            if CONSEC_CORRECCION and CONSEC_OVERRIDE is None:
-                existente.total_capital = total_capital
-                existente.total_intereses = total_intereses
-                existente.total_liquidacion = total_final
-                existente.archivo_pdf = pdf_name_preview
-                existente.estado = 'CORREGIDA'
-                existente.fecha_actualizacion = ahora
-                s.commit()
-                consecutivo_cc = existente.consecutivo
-            else:
-                reg = CuentaCobro(
-                    consecutivo=consecutivo_cc,
-                    nit_entidad=nit_text,
-                    empresa=pensionado[4],
-                    pensionado_identificacion=str(pensionado[0]),
-                    pensionado_nombre=pensionado[1],
-                    periodo_inicio=periodo_inicio_fecha,
-                    periodo_fin=periodo_fin_fecha,
-                    total_capital=total_capital,
-                    total_intereses=total_intereses,
-                    total_liquidacion=total_final,
-                    archivo_pdf=pdf_name_preview,
-                    estado='EMITIDA',
-                    version=(existente.version or 1) + 1,
-                    fecha_creacion=ahora,
-                    fecha_actualizacion=ahora,
-                )
-                s.add(reg)
-                s.commit()
-    encabezado_data = [
-        [Paragraph('BOGOTA, D.C.', encabezado_style), 
-        Paragraph(f'CUENTA DE COBRO<br/>Nro. {consecutivo_cc}', cuenta_cobro_style)]
-    ]
-    
-    tabla_encabezado = Table(encabezado_data, colWidths=[7*cm, 7*cm])
-    tabla_encabezado.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    
-    story.append(tabla_encabezado)
-    story.append(Spacer(1, 0.5*cm))
-    
-    # INFORMACIÓN COMPLETA (ENTIDAD + PENSIONADO)
-    # Calcular el ancho total de las otras tablas para que coincidan
-    ancho_total_otras_tablas = 2.5*cm + 2.5*cm + 2*cm + 2.5*cm + 2*cm + 2.5*cm  # Total: 14cm
-
-    nit_text = str(pensionado[7]) if len(pensionado) > 7 and pensionado[7] else 'N/D'
-    info_superior = [
-        ['Entidad', f'{pensionado[4]} - NIT. {nit_text}'],
-        ['Período', f'CUOTAS PARTES POR COBRAR {periodo_texto}'],
-        ['Nombre', f'{pensionado[1]}'],
-        ['Identificación', f'{pensionado[0]}']
-    ]
-    
-    # Solo agregar filas de sustituto si tienen datos
-    sustituto_nombre = ''  # Aquí puedes obtener el dato del sustituto si existe
-    sustituto_identificacion = ''  # Aquí puedes obtener la identificación del sustituto si existe
-    
-    if sustituto_nombre and sustituto_nombre.strip():
-        info_superior.append(['Sustituto', sustituto_nombre])
-    
-    if sustituto_identificacion and sustituto_identificacion.strip():
-        info_superior.append(['Identificación', sustituto_identificacion])
-    
-    tabla_superior = Table(info_superior, colWidths=[3*cm, ancho_total_otras_tablas - 3*cm])
-    tabla_superior.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    
-    story.append(tabla_superior)
-    story.append(Spacer(1, 0.3*cm))
-    
-    # TABLA DE RESUMEN INTERMEDIA
-    resumen_data = [
-        ['Ingreso a Nómina', '% Cuota Parte', 'Estado', 'Capital pendiente', 'Interes acumulado', 'Total'],
-        ['01/05/2008', '36.10%', 'ACTIVO', f'${total_capital:,.2f}', f'${total_intereses:,.2f}', f'${total_final:,.2f}']
-    ]
-    
-    tabla_resumen = Table(resumen_data, colWidths=[2.3*cm, 2.3*cm, 2.3*cm, 2.3*cm, 2.4*cm, 2.4*cm])
-    tabla_resumen.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('BACKGROUND', (2, 1), (2, 1), colors.green),  # Estado en posición 2
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 7),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    
-    story.append(tabla_resumen)
-    story.append(Spacer(1, 0.3*cm))
-    
-    # TÍTULO DE LA SECCIÓN DE INTERESES
-    titulo_intereses = f"""
-    <b>JULIO 29/2006 - Art. 4 Ley 1066/2006 &nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; CON INTERESES DTF</b>
-    """
-    
-    story.append(Paragraph(titulo_intereses, ParagraphStyle('TituloIntereses', parent=styles['Normal'], fontSize=8, alignment=TA_CENTER, fontName='Helvetica-Bold')))
-    story.append(Spacer(1, 0.2*cm))
-    
-    # Estilo para cabeceras con texto ajustado
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        parent=styles['Normal'],
-        fontSize=7,
-        fontName='Helvetica-Bold',
-        alignment=TA_CENTER,
-        leading=8,
-        spaceAfter=0,
-        spaceBefore=0
+    # Calcular/obtener consecutivo y guardar en BD el nombre real del PDF (sin la ruta completa)
+    consecutivo_cc = _asignar_consecutivo(
+        pensionado, nit_text, periodo_inicio_fecha, periodo_fin_fecha,
+        total_capital, total_intereses, total_final, os.path.basename(ruta_pdf), opciones,
     )
-    
-    # Cabeceras de la tabla usando Paragraph para ajuste automático de texto
-    headers = [
-        Paragraph('PERÍODO', header_style),
-        Paragraph('Vr. Cuota parte periodo', header_style),
-        Paragraph('Días', header_style),
-        Paragraph('DTF EA', header_style),
-        Paragraph('Valor Intereses', header_style),
-        Paragraph('Capital', header_style)
-    ]
-    
-    # Datos de la tabla
-    table_data = [headers]
 
     # Capital fijo para toda la tabla (solo_mes): usar valor_cuota_periodo del mes de la cuenta
     capital_general = None
@@ -513,19 +557,10 @@ def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes
             ref_vcp = cuentas[0].get('valor_cuota_periodo', None)
             if ref_vcp is not None and all(abs(float(c.get('valor_cuota_periodo', ref_vcp)) - float(ref_vcp)) < 1e-6 for c in cuentas):
                 capital_general = float(ref_vcp)
-    
-    # Estilos para celdas de datos
-    data_style_left = ParagraphStyle('DataLeft', parent=styles['Normal'], fontSize=6, fontName='Helvetica', alignment=TA_LEFT, leading=7)
-    data_style_center = ParagraphStyle('DataCenter', parent=styles['Normal'], fontSize=6, fontName='Helvetica', alignment=TA_CENTER, leading=7)
-    data_style_right = ParagraphStyle('DataRight', parent=styles['Normal'], fontSize=6, fontName='Helvetica', alignment=TA_RIGHT, leading=7)
-    
-    meses_nombres = ["enero", "febrero", "marzo", "abril", "mayo", "junio",
-                     "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
-    
-    for cuenta in cuentas:
-        mes_nombre = meses_nombres[cuenta['mes'] - 1]
-        año = cuenta['año']
 
+    # Filas de la tabla de intereses: (período, vr. cuota, días, DTF, interés, capital)
+    filas = []
+    for cuenta in cuentas:
         if capital_general is not None:
             # Cuenta de un solo mes: capital fijo para todas las filas; recalcular intereses por cada mes
             capital_base_fijo = capital_general
@@ -536,97 +571,58 @@ def generar_pdf_para_pensionado(pensionado, periodo='sep', año_inicio=None, mes
             vr_cuota = cuenta.get('valor_cuota_periodo', cuenta.get('capital', 0))
             capital_base_fijo = cuenta.get('capital_base', cuenta.get('capital', 0))
             interes_mes = cuenta.get('interes', 0)
-
-        fila = [
-            Paragraph(f"{mes_nombre.capitalize()}-{año}", data_style_left),
-            Paragraph(f"${vr_cuota:,.2f}", data_style_right),
-            Paragraph(f"{cuenta['dias_interes']:d}", data_style_center),
-            Paragraph(f"{cuenta['dtf_interes']:.2f}%", data_style_center),
-            Paragraph(f"${interes_mes:,.2f}", data_style_right),
-            Paragraph(f"${capital_base_fijo:,.2f}", data_style_right)
-        ]
-        table_data.append(fila)
-    
-    # Estilo para fila de totales
-    total_style_center = ParagraphStyle('TotalCenter', parent=styles['Normal'], fontSize=7, fontName='Helvetica-Bold', alignment=TA_CENTER, leading=8)
-    total_style_right = ParagraphStyle('TotalRight', parent=styles['Normal'], fontSize=7, fontName='Helvetica-Bold', alignment=TA_RIGHT, leading=8)
-    
-    # Total de cuota parte del periodo (no se muestra como suma en tabla; usamos totales de cabecera)
-    total_cuota_parte_periodo = sum(c.get('valor_cuota_periodo', c.get('capital', 0)) for c in cuentas)
-    
-    # Eliminar la fila de totales en la tabla de intereses para periodos personalizados
-    
-    # Agregar fila de total de intereses (suma de la columna)
-    if capital_general is not None:
-        suma_intereses_columna = sum(calcular_interes_mensual_unico(capital_general, c['fecha_cuenta'], fecha_corte) for c in cuentas)
-        capital_total_row = capital_general
+        filas.append((
+            f"{MESES_MINUSCULA[cuenta['mes'] - 1].capitalize()}-{cuenta['año']}",
+            float(vr_cuota), int(cuenta['dias_interes']), float(cuenta['dtf_interes']),
+            float(interes_mes), float(capital_base_fijo),
+        ))
+
+    # Datos del documento: todo lo que el render necesita, ya calculado
+    datos = {
+        'consecutivo': consecutivo_cc,
+        'entidad': pensionado[4],
+        'nit': nit_text,
+        'periodo_texto': periodo_texto,
+        'nombre': pensionado[1],
+        'identificacion': str(pensionado[0]),
+        'total_capital': float(total_capital),
+        'total_intereses': float(total_intereses),
+        'total': float(total_final),
+        'filas': filas,
+        'suma_intereses_columna': sum(f[4] for f in filas),
+        # Capital de la fila TOTAL solo cuando es fijo en toda la tabla
+        'capital_total': capital_general,
+        # Solo para los metadatos incrustados (no se dibujan)
+        'periodo_inicio': periodo_inicio_fecha,
+        'periodo_fin': periodo_fin_fecha,
+    }
+
+    if opciones.fusionado is not None:
+        pagina = opciones.fusionado.agregar_cuenta(datos, periodo_inicio_fecha.year, respaldo=_respaldo_fusionado)
+        ruta_pdf = f"{nombre_archivo} (PDF único, pág. {pagina})"
     else:
-        suma_intereses_columna = sum(float(c.get('interes', 0)) for c in cuentas)
-        capital_total_row = ''
-    total_row = [
-        Paragraph('TOTAL', ParagraphStyle('TotalHdr', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=7, alignment=TA_CENTER)),
-        '', '', '',
-        Paragraph(f"${suma_intereses_columna:,.2f}", ParagraphStyle('TotalNum', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=7, alignment=TA_RIGHT)),
-        Paragraph(f"${capital_total_row:,.2f}", ParagraphStyle('TotalNum', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=7, alignment=TA_RIGHT)) if capital_general is not None else ''
-    ]
-    table_data.append(total_row)
-
-    # Crear tabla con 6 columnas (eliminada la redundante)
-    col_widths = [2.5*cm, 2.5*cm, 1.2*cm, 1.8*cm, 2.3*cm, 2.7*cm]
-    tabla = Table(table_data, colWidths=col_widths, repeatRows=1)
-    
-    # Estilo de la tabla
-    tabla.setStyle(TableStyle([
-        # Cabecera
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 4),
-        ('TOPPADDING', (0, 0), (-1, 0), 4),
-        
-        # Datos
-        ('BACKGROUND', (0, 1), (-1, -2), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
-        ('VALIGN', (0, 1), (-1, -2), 'MIDDLE'), # Alineación vertical centrada
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
-        
-        # Fila de totales
-    ('BACKGROUND', (0, -1), (-1, -1), colors.white),
-    ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
-        ('VALIGN', (0, -1), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, -1), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, -1), (-1, -1), 4),
-        
-        # Bordes
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),
-        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
-        
-        # Padding general reducido
-        ('LEFTPADDING', (0, 0), (-1, -1), 2),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-        ('TOPPADDING', (0, 1), (-1, -2), 2),
-        ('BOTTOMPADDING', (0, 1), (-1, -2), 2),
-    ]))
-    
-    story.append(tabla)
-    
-    # Generar PDF (reintenta con nombre alterno si hay PermissionError)
-    try:
-        doc.build(story)
-    except PermissionError:
-        # Si el archivo está bloqueado (por visor/OneDrive), reintentar con nombre único
-        ruta_pdf_alt = _ensure_unique_filename(ruta_pdf)
-        doc = SimpleDocTemplate(
-            ruta_pdf_alt,
-            pagesize=A4,
-            rightMargin=0.5*cm,
-            leftMargin=0.5*cm,
-            topMargin=1*cm,
-            bottomMargin=1*cm
-        )
-        doc.build(story)
-        ruta_pdf = ruta_pdf_alt
+        # Generar PDF (reintenta con nombre alterno si hay PermissionError)
+        try:
+            _generar_cuenta_cobro(datos, salida_pdf, opciones)
+        except PermissionError:
+            # Si el archivo está bloqueado (por visor/OneDrive), reintentar con nombre único
+            ruta_pdf_alt = _ensure_unique_filename(ruta_pdf)
+            _generar_cuenta_cobro(datos, ruta_pdf_alt, opciones)
+            ruta_pdf = ruta_pdf_alt
+
+    if opciones.destino is not None and opciones.fusionado is None:
+        meta = {
+            'consecutivo': consecutivo_cc,
+            'nit': nit_text,
+            'identificacion': str(pensionado[0]),
+            'nombre': pensionado[1],
+            'periodo_inicio': periodo_inicio_fecha,
+            'periodo_fin': periodo_fin_fecha,
+            'total_capital': float(total_capital),
+            'total_intereses': float(total_intereses),
+            'total': float(total_final),
+        }
+        ruta_pdf = opciones.destino(carpeta_pensionado, nombre_archivo, salida_pdf.getvalue(), meta)
 
     print(f"✅ PDF creado exitosamente: {ruta_pdf}")
     print(f"🧾 Cuenta de cobro Nro.: {consecutivo_cc}")
@@ -655,12 +651,19 @@ def crear_pdf_formato_oficial():
     parser.add_argument('--periodo', dest='periodo', choices=['sep', 'oct', 'custom'], default='sep', help='Período inicial: sep (Sep 2022-Ago 2025), oct (Oct 2022-Ago 2025), o custom (usar --año-inicio y --mes-inicio)')
     parser.add_argument('--año-inicio', dest='año_inicio', type=int, help='Año de inicio para período custom (ej: 2023)')
     parser.add_argument('--mes-inicio', dest='mes_inicio', type=int, choices=range(1,13), help='Mes de inicio para período custom (1-12)')
+    parser.add_argument('--motor', dest='motor', choices=['platypus', 'canvas'], default='platypus', help='Motor de render: platypus (clásico) o canvas (rápido, para lotes)')
+    parser.add_argument('--sin-cache', dest='sin_cache', action='store_true', help='No usar la caché de PDFs (renderizar siempre)')
+    parser.add_argument('--corrida', dest='corrida', help='Id de la corrida del lote --nit; repetir el mismo id reanuda una corrida interrumpida')
     args, unknown = parser.parse_known_args()
 
-    # Configurar flags globales de consecutivo
-    global CONSEC_OVERRIDE, CONSEC_CORRECCION
-    CONSEC_OVERRIDE = args.consecutivo
-    CONSEC_CORRECCION = args.correccion
+    # Política de consecutivo del trabajo (sin tocar globales del módulo)
+    opciones = OpcionesRender(
+        consecutivo_override=args.consecutivo,
+        correccion=args.correccion,
+        motor=args.motor,
+        cache=None if args.sin_cache else CachePDF(),
+        plantillas=PlantillasCuentaCobro(obtener_contexto()) if args.motor == 'canvas' else None,
+    )
 
     # Caso 1: Procesar por NIT (lote)
     if args.nit_entidad:
@@ -675,14 +678,34 @@ def crear_pdf_formato_oficial():
             if not results:
                 print(f"❌ No se encontraron pensionados para la entidad NIT {args.nit_entidad}")
                 return
+            # Punto de control por pensionado: una corrida interrumpida se reanuda con --corrida <id>
+            from app.corridas import PuntosControl, nuevo_id
+            corrida = PuntosControl(args.corrida or nuevo_id(args.nit_entidad), 'pdf_entidad', args.nit_entidad,
+                                    {'periodo': args.periodo, 'año_inicio': args.año_inicio, 'mes_inicio': args.mes_inicio})
+            opciones = replace(opciones, reusar_desde=corrida.inicio)
+            if corrida.reanudada:
+                print(f"🔁 Reanudando corrida {corrida.corrida_id}: {len(corrida.puntos())} pensionados ya generados")
+            else:
+                print(f"🧷 Corrida {corrida.corrida_id} (si se interrumpe, repetir con --corrida {corrida.corrida_id})")
             print(f"🔎 Procesando {len(results)} pensionados de la entidad NIT {args.nit_entidad}...")
+            fallidos = 0
             for idx, pensionado in enumerate(results, 1):
+                if corrida.hecha(pensionado[0]):
+                    continue
                 print(f"\n[{idx}/{len(results)}] Generando PDF para: {pensionado[1]} (ID: {pensionado[0]})")
                 try:
-                    generar_pdf_para_pensionado(pensionado, args.periodo, args.año_inicio, args.mes_inicio)
+                    ruta = generar_pdf_para_pensionado(pensionado, args.periodo, args.año_inicio, args.mes_inicio, opciones=opciones)
+                    corrida.registrar([{'clave': corrida.clave(pensionado[0]), 'archivo': ruta}])
                 except Exception as e:
+                    fallidos += 1
                     print(f"   ⚠️ Error generando PDF para {pensionado[1]} ({pensionado[0]}): {e}")
+            if fallidos:
+                print(f"\n⚠️ {fallidos} pensionados con error; repetir con --corrida {corrida.corrida_id} para reintentarlos")
+            else:
+                corrida.terminar()
             print("\n✅ Proceso por entidad finalizado")
+            if opciones.cache is not None:
+                print(f"🗄️ {opciones.cache.resumen()}")
             return
         finally:
             session.close()
@@ -700,7 +723,7 @@ def crear_pdf_formato_oficial():
                 print(f"❌ No se encontró pensionado con ID {args.identificacion}")
                 return
             print(f"✅ Pensionado encontrado: {result[1]} ({result[0]})")
-            generar_pdf_para_pensionado(result, args.periodo, args.año_inicio, args.mes_inicio)
+            generar_pdf_para_pensionado(result, args.periodo, args.año_inicio, args.mes_inicio, opciones=opciones)
             return
         finally:
             session.close()
@@ -721,7 +744,7 @@ def crear_pdf_formato_oficial():
         if args.solo_prima:
             # Generar PDFs solo para meses con prima (junio y diciembre) en el rango
             fecha_inicio = date(args.año_inicio or 2022, args.mes_inicio or 9, 1)
-            fecha_fin = date(2025, 8, 31)
+            fecha_fin = opciones.fecha_corte
             meses_prima = []
             actual = fecha_inicio
             while actual <= fecha_fin:
@@ -734,9 +757,9 @@ def crear_pdf_formato_oficial():
                     actual = date(actual.year, actual.month + 1, 1)
             for año, mes in meses_prima:
                 print(f"Generando PDF para prima: {mes}/{año}")
-                generar_pdf_para_pensionado(result, 'custom', año, mes)
+                generar_pdf_para_pensionado(result, 'custom', año, mes, opciones=opciones)
         else:
-            generar_pdf_para_pensionado(result, args.periodo, args.año_inicio, args.mes_inicio)
+            generar_pdf_para_pensionado(result, args.periodo, args.año_inicio, args.mes_inicio, opciones=opciones)
     finally:
         session.close()
 
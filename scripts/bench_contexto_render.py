@@ -0,0 +1,96 @@
+"""Micro-benchmark del contexto de render compartido.
+
+Compara el costo por documento de construir estilos/TableStyle en cada PDF (como se hacía
+antes) contra reutilizar el contexto del proceso, y el motor platypus contra el dibujo
+directo en canvas (OpcionesRender(motor='canvas')), con y sin la capa estática como form XObject
+(PlantillasCuentaCobro). No requiere base de datos: usa datos
+sintéticos de una cuenta de cobro de 30 meses.
+
+Uso:
+    python scripts/bench_contexto_render.py [--docs 200] [--rondas 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.contexto_render import ContextoRender, obtener_contexto
+from generar_pdf_oficial import construir_story_cuenta_cobro, _documento_cuenta_cobro, MESES_MINUSCULA
+from app.render_canvas import PlantillasCuentaCobro, dibujar_cuenta_cobro
+
+
+def _datos_sinteticos(consecutivo: int) -> dict:
+    filas = []
+    for i in range(30):
+        mes = (2 + i) % 12
+        año = 2023 + (2 + i) // 12
+        filas.append((f"{MESES_MINUSCULA[mes].capitalize()}-{año}", 645428.57, 30, 10.5, 4500.0 + i, 645428.57))
+    return {
+        'consecutivo': consecutivo,
+        'entidad': 'ENTIDAD DE PRUEBA',
+        'nit': '800103913',
+        'periodo_texto': 'MARZO DEL 2023 A AGOSTO DEL 2025',
+        'nombre': 'PEREZ GOMEZ, JUAN',
+        'identificacion': '12345678',
+        'total_capital': 645428.57,
+        'total_intereses': sum(f[4] for f in filas),
+        'total': 645428.57 + sum(f[4] for f in filas),
+        'filas': filas,
+        'suma_intereses_columna': sum(f[4] for f in filas),
+        'capital_total': 645428.57,
+    }
+
+
+def _medir_canvas(n: int, con_plantilla: bool = False) -> float:
+    ctx = obtener_contexto()
+    plantillas = PlantillasCuentaCobro(ctx) if con_plantilla else None
+    inicio = time.perf_counter()
+    for i in range(n):
+        dibujar_cuenta_cobro(_datos_sinteticos(i), ctx, io.BytesIO(), plantillas)
+    return time.perf_counter() - inicio
+
+
+def _medir(n: int, contexto_por_documento: bool) -> float:
+    inicio = time.perf_counter()
+    for i in range(n):
+        ctx = ContextoRender() if contexto_por_documento else obtener_contexto()
+        buffer = io.BytesIO()
+        _documento_cuenta_cobro(buffer).build(construir_story_cuenta_cobro(_datos_sinteticos(i), ctx))
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del contexto de render compartido')
+    parser.add_argument('--docs', type=int, default=200, help='Cantidad de documentos por escenario')
+    parser.add_argument('--rondas', type=int, default=3, help='Rondas alternadas; se reporta la mejor de cada escenario')
+    args = parser.parse_args()
+
+    # Calentamiento (imports perezosos de ReportLab, fuentes)
+    _medir(3, False)
+
+    t = time.perf_counter()
+    ContextoRender()
+    t_ctx = time.perf_counter() - t
+
+    # Rondas alternadas para reducir el ruido de la máquina
+    t_antes = t_despues = t_canvas = t_plantilla = float('inf')
+    for _ in range(args.rondas):
+        t_antes = min(t_antes, _medir(args.docs, True))
+        t_despues = min(t_despues, _medir(args.docs, False))
+        t_canvas = min(t_canvas, _medir_canvas(args.docs))
+        t_plantilla = min(t_plantilla, _medir_canvas(args.docs, con_plantilla=True))
+    print(f"Construcción de un contexto: {t_ctx*1000:.2f} ms")
+    print(f"Contexto por documento: {t_antes:.2f}s ({t_antes/args.docs*1000:.2f} ms/doc)")
+    print(f"Contexto compartido:    {t_despues:.2f}s ({t_despues/args.docs*1000:.2f} ms/doc)")
+    print(f"Motor canvas:           {t_canvas:.2f}s ({t_canvas/args.docs*1000:.2f} ms/doc)")
+    print(f"Canvas + plantilla:     {t_plantilla:.2f}s ({t_plantilla/args.docs*1000:.2f} ms/doc)")
+    print(f"Mejora contexto compartido: {(1 - t_despues/t_antes)*100:.1f}%")
+    print(f"Documentos/s platypus: {args.docs/t_despues:.0f} | canvas: {args.docs/t_canvas:.0f} "
+          f"(x{t_despues/t_canvas:.1f})")
+
+
+if __name__ == '__main__':
+    main()
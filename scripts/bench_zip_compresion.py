@@ -0,0 +1,113 @@
+"""Benchmark de la compresión de entradas del ZIP masivo.
+
+Compara, para una entidad sintética de tamaño real (pensionados x 30 cuentas):
+- Antes: PDFs con flujos ASCII85 y todas las entradas con DEFLATE
+- PDFs binarios (rl_config.useA85 = 0, lo que fija app.zip_manifiesto.usar_pdf_binario) y todo con DEFLATE
+- Política por entrada (ZipConManifiesto): PDFs binarios guardados sin recomprimir (ZIP_STORED),
+  texto con DEFLATE
+
+Mide dos cosas: solo la escritura del ZIP (PDFs ya renderizados en memoria) y el flujo completo
+render + ZIP con el motor canvas y la capa estática como form XObject. No requiere base de datos.
+
+Uso:
+    python scripts/bench_zip_compresion.py [--pensionados 100] [--rondas 3]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config
+
+from app.contexto_render import obtener_contexto
+from app.render_canvas import PlantillasCuentaCobro, dibujar_cuenta_cobro
+from app.zip_manifiesto import ZipConManifiesto
+from scripts.bench_contexto_render import _datos_sinteticos
+
+ESCENARIOS = (
+    # nombre, ASCII85 en los PDFs, política por entrada
+    ('Antes (todo DEFLATE)', True, False),
+    ('PDF binario + DEFLATE', False, False),
+    ('Política por entrada', False, True),
+)
+
+
+class _TodoDeflate(ZipConManifiesto):
+    """Manifiesto con todas las entradas en DEFLATE (como antes de la política por entrada)."""
+
+    def _info(self, arcname: str) -> zipfile.ZipInfo:
+        info = super()._info(arcname)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+
+def _datos(i: int) -> dict:
+    datos = _datos_sinteticos(i)
+    datos['identificacion'] = str(10000000 + i // 30)
+    return datos
+
+
+def _renderizar(i: int, plantillas) -> bytes:
+    buffer = io.BytesIO()
+    dibujar_cuenta_cobro(_datos(i), obtener_contexto(), buffer, plantillas)
+    return buffer.getvalue()
+
+
+def _zip(n: int, politica: bool, pdfs: list | None) -> tuple:
+    """ZIP con n cuentas; si `pdfs` es None se renderizan dentro del ciclo. Devuelve (segundos, bytes)."""
+    plantillas = PlantillasCuentaCobro(obtener_contexto())
+    salida = io.BytesIO()
+    inicio = time.perf_counter()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as zip_archivo, \
+            (ZipConManifiesto if politica else _TodoDeflate)(zip_archivo) as zf:
+        zf.writestr('ENTIDAD/README.txt', 'README\n' * 40)
+        for i in range(n):
+            contenido = pdfs[i] if pdfs is not None else _renderizar(i, plantillas)
+            zf.writestr(f"ENTIDAD/{10000000 + i // 30}/{2023 + i % 30 // 12}/{i}.pdf", contenido,
+                        meta={'identificacion': str(10000000 + i // 30), 'total': 1.0})
+        zf.escribir_manifiesto('ENTIDAD/MANIFEST.json', nit='800103913')
+    return time.perf_counter() - inicio, len(salida.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la compresión del ZIP masivo')
+    parser.add_argument('--pensionados', type=int, default=100, help='Pensionados de la entidad (30 cuentas cada uno)')
+    parser.add_argument('--rondas', type=int, default=3, help='Rondas alternadas; se reporta la mejor de cada escenario')
+    args = parser.parse_args()
+    n = args.pensionados * 30
+    a85_original = rl_config.useA85
+
+    # PDFs pre-renderizados por variante de codificación (para medir solo la escritura)
+    plantillas = PlantillasCuentaCobro(obtener_contexto())
+    pdfs = {}
+    for a85 in (True, False):
+        rl_config.useA85 = int(a85)
+        pdfs[a85] = [_renderizar(i, plantillas) for i in range(n)]
+
+    solo_zip = {nombre: (float('inf'), 0) for nombre, *_ in ESCENARIOS}
+    completo = {nombre: (float('inf'), 0) for nombre, *_ in ESCENARIOS}
+    try:
+        for _ in range(args.rondas):
+            for nombre, a85, politica in ESCENARIOS:
+                rl_config.useA85 = int(a85)
+                solo_zip[nombre] = min(solo_zip[nombre], _zip(n, politica, pdfs[a85]))
+                completo[nombre] = min(completo[nombre], _zip(n, politica, None))
+    finally:
+        rl_config.useA85 = a85_original
+
+    print(f"Entidad sintética: {args.pensionados} pensionados, {n:,} cuentas")
+    print(f"PDF promedio: ASCII85 {sum(map(len, pdfs[True])) / n:,.0f} B | binario {sum(map(len, pdfs[False])) / n:,.0f} B")
+    base_zip, base_completo = solo_zip[ESCENARIOS[0][0]][0], completo[ESCENARIOS[0][0]][0]
+    for nombre, *_ in ESCENARIOS:
+        t_zip, tam = solo_zip[nombre]
+        t_total, _ = completo[nombre]
+        print(f"{nombre:<26} solo ZIP {t_zip:6.2f}s (x{base_zip / t_zip:4.1f}) | render+ZIP {t_total:6.2f}s "
+              f"(x{base_completo / t_total:4.2f}) | {tam / 1024 / 1024:6.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
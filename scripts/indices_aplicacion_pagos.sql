@@ -0,0 +1,46 @@
+-- Aplicación FIFO de pagos por pensionado (ver reaplicar_pensionados en app/aplicacion_pagos.py)
+-- Cada pago registrado o importado recalcula pago_aplicacion de sus pensionados: estos índices
+-- evitan recorrer cuenta_cobro y pago_aplicacion completas en cada uno.
+-- La aplicación ya no crea pago_aplicacion al arrancar: las bases nuevas la traen en init_db.sql y
+-- las existentes la reciben aquí. Después de crearla, llenarla con
+-- `python -m app.cli reaplicar-pagos --nit ...` por entidad
+-- Corre con `make db-migrar`. Se puede correr varias veces: solo crea la tabla y los índices que
+-- falten (una tabla que no existe se omite)
+
+CREATE TABLE IF NOT EXISTS pago_aplicacion (
+  aplicacion_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  pago_id BIGINT NOT NULL,
+  pensionado_id BIGINT NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  consecutivo INT,
+  fecha_pago DATE NOT NULL,
+  capital DECIMAL(18,2) NOT NULL,
+  interes DECIMAL(18,2) NOT NULL,
+  INDEX ix_pago_aplicacion_pago_id (pago_id),
+  INDEX ix_pago_aplicacion_cuenta (nit_entidad, consecutivo),
+  INDEX ix_pago_aplicacion_pensionado (pensionado_id)
+);
+
+DROP PROCEDURE IF EXISTS crear_indice_si_falta;
+DELIMITER //
+CREATE PROCEDURE crear_indice_si_falta(IN tabla VARCHAR(64), IN indice VARCHAR(64), IN columnas VARCHAR(255))
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.tables
+    WHERE table_schema = DATABASE() AND table_name = tabla
+  ) AND NOT EXISTS (
+    SELECT 1 FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = tabla AND index_name = indice
+  ) THEN
+    SET @sentencia = CONCAT('CREATE INDEX ', indice, ' ON ', tabla, ' (', columnas, ')');
+    PREPARE crear FROM @sentencia;
+    EXECUTE crear;
+    DEALLOCATE PREPARE crear;
+  END IF;
+END //
+DELIMITER ;
+
+CALL crear_indice_si_falta('cuenta_cobro', 'ix_cuenta_cobro_pensionado', 'pensionado_identificacion, nit_entidad');
+CALL crear_indice_si_falta('pago_aplicacion', 'ix_pago_aplicacion_pensionado', 'pensionado_id');
+
+DROP PROCEDURE crear_indice_si_falta;
@@ -0,0 +1,45 @@
+-- Historial de pagos paginado por (fecha_pago, pago_id) (ver obtener_historial_pagos en app/pagos.py)
+-- Las páginas se piden con un cursor (la última fecha_pago y pago_id vistos) en vez de OFFSET;
+-- con estos índices cada página lee solo sus filas, sin ordenar todos los pagos del filtro
+--
+-- Migración de bases existentes (las nuevas ya lo traen en init_db.sql): correr con
+-- `make db-migrar` ANTES de desplegar el código que escribe pago.nit_entidad.
+-- Se puede correr varias veces: solo agrega la columna y los índices que falten
+
+DROP PROCEDURE IF EXISTS migrar_pago_historial;
+DELIMITER //
+CREATE PROCEDURE migrar_pago_historial()
+BEGIN
+  -- 1. NIT de la entidad copiado en pago (los pagos nuevos ya lo traen desde la aplicación):
+  --    el historial de una entidad se recorre por índice sin pasar por pensionado
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'pago' AND column_name = 'nit_entidad'
+  ) THEN
+    ALTER TABLE pago ADD COLUMN nit_entidad VARCHAR(30) NULL AFTER pensionado_id;
+  END IF;
+
+  UPDATE pago pg
+  JOIN pensionado p ON p.pensionado_id = pg.pensionado_id
+  SET pg.nit_entidad = p.nit_entidad
+  WHERE pg.nit_entidad IS NULL;
+
+  -- 2. Índices del recorrido: por pensionado y por entidad, en el orden de la paginación
+  --    (InnoDB agrega la llave primaria a cada índice secundario; pago_id va explícito por claridad)
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'pago' AND index_name = 'ix_pago_pensionado_fecha'
+  ) THEN
+    CREATE INDEX ix_pago_pensionado_fecha ON pago (pensionado_id, fecha_pago, pago_id);
+  END IF;
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'pago' AND index_name = 'ix_pago_entidad_fecha'
+  ) THEN
+    CREATE INDEX ix_pago_entidad_fecha ON pago (nit_entidad, fecha_pago, pago_id);
+  END IF;
+END //
+DELIMITER ;
+
+CALL migrar_pago_historial();
+DROP PROCEDURE migrar_pago_historial;
@@ -67,12 +67,16 @@ CREATE TABLE periodo_liquidacion (
 CREATE TABLE pago (
   pago_id BIGINT AUTO_INCREMENT PRIMARY KEY,
   pensionado_id BIGINT NOT NULL,
+  nit_entidad VARCHAR(30) NULL,
   periodo_liquidacion_id BIGINT,
   fecha_pago DATE NOT NULL,
   valor DECIMAL(18,2) NOT NULL,
   observaciones VARCHAR(255),
   FOREIGN KEY (pensionado_id) REFERENCES pensionado(pensionado_id),
-  FOREIGN KEY (periodo_liquidacion_id) REFERENCES periodo_liquidacion(periodo_liquidacion_id)
+  FOREIGN KEY (periodo_liquidacion_id) REFERENCES periodo_liquidacion(periodo_liquidacion_id),
+  -- Historial paginado por (fecha_pago, pago_id): ver scripts/indices_pago_historial.sql
+  INDEX ix_pago_pensionado_fecha (pensionado_id, fecha_pago, pago_id),
+  INDEX ix_pago_entidad_fecha (nit_entidad, fecha_pago, pago_id)
 );
 
 -- Tabla de liquidaciones mensuales por pensionado y periodo
@@ -88,4 +92,147 @@ CREATE TABLE IF NOT EXISTS liquidacion (
   fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   FOREIGN KEY (pensionado_id) REFERENCES pensionado(pensionado_id)
 );
--- Puedes agregar más campos según tu modelo, pero este es el esqueleto principal y el orden correcto.
\ No newline at end of file
+-- Puedes agregar más campos según tu modelo, pero este es el esqueleto principal y el orden correcto.
+
+-- Contadores compartidos entre procesos (app/contadores.py): "No." de la cuenta consolidada
+CREATE TABLE IF NOT EXISTS contador (
+  nombre VARCHAR(40) PRIMARY KEY,
+  valor BIGINT NOT NULL
+);
+
+-- Cola de trabajos en segundo plano (app/trabajos.py)
+CREATE TABLE IF NOT EXISTS trabajo (
+  trabajo_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  tipo VARCHAR(40) NOT NULL,
+  parametros TEXT NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  hechas INT,
+  total INT,
+  mensaje VARCHAR(255),
+  resultado_ruta VARCHAR(500),
+  error TEXT,
+  trabajador VARCHAR(100),
+  latido DATETIME,
+  fecha_creacion DATETIME,
+  fecha_inicio DATETIME,
+  fecha_fin DATETIME,
+  INDEX ix_trabajo_estado (estado)
+);
+
+-- Items de los lotes distribuidos (app/cola_distribuida.py)
+CREATE TABLE IF NOT EXISTS trabajo_item (
+  item_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  trabajo_id BIGINT NOT NULL,
+  etapa VARCHAR(20) NOT NULL,
+  clave VARCHAR(60) NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  parametros TEXT NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  intentos INT NOT NULL DEFAULT 0,
+  pendientes INT NOT NULL DEFAULT 0,
+  trabajador VARCHAR(100),
+  arriendo_hasta DATETIME,
+  latido DATETIME,
+  resultado TEXT,
+  error TEXT,
+  fecha_creacion DATETIME,
+  fecha_inicio DATETIME,
+  fecha_fin DATETIME,
+  UNIQUE KEY uq_trabajo_item_clave (trabajo_id, etapa, clave),
+  INDEX ix_trabajo_item_trabajo_id (trabajo_id),
+  INDEX ix_trabajo_item_reclamo (estado, arriendo_hasta)
+);
+
+-- Corridas reanudables y sus puntos de control (app/corridas.py)
+CREATE TABLE IF NOT EXISTS corrida (
+  corrida_id VARCHAR(64) PRIMARY KEY,
+  tipo VARCHAR(40) NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  parametros TEXT,
+  estado VARCHAR(20) NOT NULL,
+  fecha_inicio DATETIME NOT NULL,
+  fecha_fin DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS corrida_punto (
+  corrida_id VARCHAR(64) NOT NULL,
+  clave VARCHAR(60) NOT NULL,
+  orden INT NOT NULL,
+  consecutivo INT,
+  archivo VARCHAR(500),
+  meta TEXT,
+  fecha DATETIME,
+  PRIMARY KEY (corrida_id, clave)
+);
+
+-- Huellas del último import del libro de Excel (app/importer_excel.py)
+CREATE TABLE IF NOT EXISTS importacion_huella (
+  hoja VARCHAR(20) NOT NULL,
+  clave VARCHAR(64) NOT NULL,
+  huella BIGINT NOT NULL,
+  fecha DATETIME NOT NULL,
+  PRIMARY KEY (hoja, clave)
+);
+
+-- Aplicación FIFO de pagos a cuentas de cobro (app/aplicacion_pagos.py)
+CREATE TABLE IF NOT EXISTS pago_aplicacion (
+  aplicacion_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  pago_id BIGINT NOT NULL,
+  pensionado_id BIGINT NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  consecutivo INT,
+  fecha_pago DATE NOT NULL,
+  capital DECIMAL(18,2) NOT NULL,
+  interes DECIMAL(18,2) NOT NULL,
+  INDEX ix_pago_aplicacion_pago_id (pago_id),
+  INDEX ix_pago_aplicacion_cuenta (nit_entidad, consecutivo),
+  INDEX ix_pago_aplicacion_pensionado (pensionado_id)
+);
+
+-- Resumen de pagos por entidad y mes, y primer/último pago por pensionado (app/resumen_pagos.py)
+CREATE TABLE IF NOT EXISTS pago_resumen_mensual (
+  nit_entidad VARCHAR(30) NOT NULL,
+  anio INT NOT NULL,
+  mes INT NOT NULL,
+  total_pagos INT NOT NULL,
+  total_valor DECIMAL(18,2) NOT NULL,
+  total_capital DECIMAL(18,2) NOT NULL,
+  total_interes DECIMAL(18,2) NOT NULL,
+  pensionados INT NOT NULL,
+  fecha_primer_pago DATE,
+  fecha_ultimo_pago DATE,
+  fecha_actualizacion DATETIME,
+  PRIMARY KEY (nit_entidad, anio, mes)
+);
+
+CREATE TABLE IF NOT EXISTS pago_resumen_pensionado (
+  nit_entidad VARCHAR(30) NOT NULL,
+  pensionado_id BIGINT NOT NULL,
+  fecha_primer_pago DATE NOT NULL,
+  fecha_ultimo_pago DATE NOT NULL,
+  fecha_actualizacion DATETIME,
+  PRIMARY KEY (nit_entidad, pensionado_id),
+  INDEX ix_pago_resumen_pensionado_primero (nit_entidad, fecha_primer_pago),
+  INDEX ix_pago_resumen_pensionado_ultimo (nit_entidad, fecha_ultimo_pago)
+);
+
+-- Estado de cartera materializado (app/cartera.py); lo lee la vista v_estado_cartera
+CREATE TABLE IF NOT EXISTS cartera_estado (
+  detalle_id BIGINT PRIMARY KEY,
+  liquidacion_id BIGINT NOT NULL,
+  nit_entidad VARCHAR(30),
+  entidad VARCHAR(200),
+  pensionado_id BIGINT NOT NULL,
+  identificacion VARCHAR(30),
+  pensionado VARCHAR(200),
+  periodo DATE NOT NULL,
+  valor_liquidado DECIMAL(18,2) NOT NULL,
+  valor_pagado DECIMAL(18,2) NOT NULL,
+  saldo_pendiente DECIMAL(18,2) NOT NULL,
+  tasa_dtf DECIMAL(9,6),
+  intereses_mora DECIMAL(18,2) NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  fecha_actualizacion DATETIME,
+  INDEX ix_cartera_estado_pensionado_id (pensionado_id),
+  INDEX ix_cartera_estado_entidad (nit_entidad, estado, periodo)
+);
@@ -1,6 +1,9 @@
 DELIMITER $$
 -- Procedimientos almacenados para liquidación mensual y global
 -- Adaptados a la estructura de tus tablas actuales
+-- Escriben liquidacion y liquidacion_detalle por fuera de la aplicación: NO refrescan
+-- cartera_estado (app/cartera.py), así que v_estado_cartera no ve sus cambios hasta correr
+-- python -m app.cli refrescar-cartera --nit <nit de la entidad>
 
 
 
@@ -171,6 +174,7 @@ BEGIN
         IF p_modo = 'reprocesar' THEN
             IF v_liquidacion_id IS NOT NULL THEN
                 -- Guardar histórico del valor anterior
+                -- (cartera_estado no se refresca aquí: correr refrescar-cartera --nit después)
                 INSERT INTO liquidacion_detalle (
                     liquidacion_id, fecha_version, valor_anterior, capital_anterior, interes_anterior, motivo
                 ) VALUES (
@@ -0,0 +1,25 @@
+-- Estado de cartera materializado (ver app/cartera.py y scripts/vista_estado_cartera.sql)
+-- La aplicación ya no crea la tabla al arrancar: las bases nuevas la traen en init_db.sql y las
+-- existentes la reciben con este script. Si se crea aquí queda vacía: llenarla con
+-- `python -m app.cli refrescar-cartera` antes de consultar la vista
+-- Corre con `make db-migrar` ANTES de desplegar; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS cartera_estado (
+  detalle_id BIGINT PRIMARY KEY,
+  liquidacion_id BIGINT NOT NULL,
+  nit_entidad VARCHAR(30),
+  entidad VARCHAR(200),
+  pensionado_id BIGINT NOT NULL,
+  identificacion VARCHAR(30),
+  pensionado VARCHAR(200),
+  periodo DATE NOT NULL,
+  valor_liquidado DECIMAL(18,2) NOT NULL,
+  valor_pagado DECIMAL(18,2) NOT NULL,
+  saldo_pendiente DECIMAL(18,2) NOT NULL,
+  tasa_dtf DECIMAL(9,6),
+  intereses_mora DECIMAL(18,2) NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  fecha_actualizacion DATETIME,
+  INDEX ix_cartera_estado_pensionado_id (pensionado_id),
+  INDEX ix_cartera_estado_entidad (nit_entidad, estado, periodo)
+);
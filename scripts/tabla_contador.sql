@@ -0,0 +1,11 @@
+-- Contadores compartidos entre procesos (ver app/contadores.py)
+-- El "No." de la cuenta consolidada ya no se lleva en ultimo_consecutivo.txt (uno por máquina y
+-- sin bloqueo entre procesos) sino en una fila de esta tabla. La primera generación después de
+-- migrar crea la fila continuando desde ese archivo si existe en la carpeta de trabajo; para
+-- fijarla a mano: INSERT INTO contador VALUES ('cuenta_consolidada', <último número emitido>)
+-- Corre con `make db-migrar`; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS contador (
+  nombre VARCHAR(40) PRIMARY KEY,
+  valor BIGINT NOT NULL
+);
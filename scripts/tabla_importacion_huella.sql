@@ -0,0 +1,12 @@
+-- Import incremental del libro de Excel (ver cargar_excel_a_bd_masivo en app/importer_excel.py)
+-- La aplicación ya no crea la tabla al arrancar: las bases nuevas la traen en init_db.sql y las
+-- existentes la reciben con este script. Sin huellas, el primer import aplica todas las filas
+-- Corre con `make db-migrar` ANTES de desplegar; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS importacion_huella (
+  hoja VARCHAR(20) NOT NULL,
+  clave VARCHAR(64) NOT NULL,
+  huella BIGINT NOT NULL,
+  fecha DATETIME NOT NULL,
+  PRIMARY KEY (hoja, clave)
+);
@@ -0,0 +1,65 @@
+-- Cola de trabajos en segundo plano (ver app/trabajos.py) y sus items distribuidos
+-- (ver app/cola_distribuida.py)
+-- Las tablas ya no las crea ni las altera la aplicación al arrancar: las bases nuevas las traen
+-- en init_db.sql y las existentes se ponen al día con este script (trabajo_item y la columna
+-- latido, que marca el trabajador mientras el trabajo está EN_CURSO)
+-- Corre con `make db-migrar` ANTES de desplegar; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS trabajo (
+  trabajo_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  tipo VARCHAR(40) NOT NULL,
+  parametros TEXT NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  hechas INT,
+  total INT,
+  mensaje VARCHAR(255),
+  resultado_ruta VARCHAR(500),
+  error TEXT,
+  trabajador VARCHAR(100),
+  latido DATETIME,
+  fecha_creacion DATETIME,
+  fecha_inicio DATETIME,
+  fecha_fin DATETIME,
+  INDEX ix_trabajo_estado (estado)
+);
+
+-- Antes la creaba la aplicación con create_all; en ese caso ya existe con los mismos índices
+CREATE TABLE IF NOT EXISTS trabajo_item (
+  item_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  trabajo_id BIGINT NOT NULL,
+  etapa VARCHAR(20) NOT NULL,
+  clave VARCHAR(60) NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  parametros TEXT NOT NULL,
+  estado VARCHAR(20) NOT NULL,
+  intentos INT NOT NULL DEFAULT 0,
+  pendientes INT NOT NULL DEFAULT 0,
+  trabajador VARCHAR(100),
+  arriendo_hasta DATETIME,
+  latido DATETIME,
+  resultado TEXT,
+  error TEXT,
+  fecha_creacion DATETIME,
+  fecha_inicio DATETIME,
+  fecha_fin DATETIME,
+  UNIQUE KEY uq_trabajo_item_clave (trabajo_id, etapa, clave),
+  INDEX ix_trabajo_item_trabajo_id (trabajo_id),
+  INDEX ix_trabajo_item_reclamo (estado, arriendo_hasta)
+);
+
+DROP PROCEDURE IF EXISTS migrar_trabajo;
+DELIMITER //
+CREATE PROCEDURE migrar_trabajo()
+BEGIN
+  -- Tablas creadas por la aplicación antes del latido
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'trabajo' AND column_name = 'latido'
+  ) THEN
+    ALTER TABLE trabajo ADD COLUMN latido DATETIME NULL AFTER trabajador;
+  END IF;
+END //
+DELIMITER ;
+
+CALL migrar_trabajo();
+DROP PROCEDURE migrar_trabajo;
@@ -0,0 +1,25 @@
+-- Corridas reanudables de generación masiva (ver app/corridas.py)
+-- La aplicación ya no crea estas tablas al arrancar: las bases nuevas las traen en init_db.sql y
+-- las existentes las reciben con este script. Si ya las había creado la aplicación, no cambia nada
+-- Corre con `make db-migrar` ANTES de desplegar; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS corrida (
+  corrida_id VARCHAR(64) PRIMARY KEY,
+  tipo VARCHAR(40) NOT NULL,
+  nit_entidad VARCHAR(30) NOT NULL,
+  parametros TEXT,
+  estado VARCHAR(20) NOT NULL,
+  fecha_inicio DATETIME NOT NULL,
+  fecha_fin DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS corrida_punto (
+  corrida_id VARCHAR(64) NOT NULL,
+  clave VARCHAR(60) NOT NULL,
+  orden INT NOT NULL,
+  consecutivo INT,
+  archivo VARCHAR(500),
+  meta TEXT,
+  fecha DATETIME,
+  PRIMARY KEY (corrida_id, clave)
+);
@@ -0,0 +1,31 @@
+-- Resumen de pagos por entidad y mes (ver app/resumen_pagos.py)
+-- La aplicación ya no crea estas tablas al arrancar: las bases nuevas las traen en init_db.sql y
+-- las existentes las reciben con este script. Si se crean aquí quedan vacías: llenarlas con
+-- `python -m app.cli reconstruir-resumen-pagos`
+-- Corre con `make db-migrar` ANTES de desplegar; se puede correr varias veces
+
+CREATE TABLE IF NOT EXISTS pago_resumen_mensual (
+  nit_entidad VARCHAR(30) NOT NULL,
+  anio INT NOT NULL,
+  mes INT NOT NULL,
+  total_pagos INT NOT NULL,
+  total_valor DECIMAL(18,2) NOT NULL,
+  total_capital DECIMAL(18,2) NOT NULL,
+  total_interes DECIMAL(18,2) NOT NULL,
+  pensionados INT NOT NULL,
+  fecha_primer_pago DATE,
+  fecha_ultimo_pago DATE,
+  fecha_actualizacion DATETIME,
+  PRIMARY KEY (nit_entidad, anio, mes)
+);
+
+CREATE TABLE IF NOT EXISTS pago_resumen_pensionado (
+  nit_entidad VARCHAR(30) NOT NULL,
+  pensionado_id BIGINT NOT NULL,
+  fecha_primer_pago DATE NOT NULL,
+  fecha_ultimo_pago DATE NOT NULL,
+  fecha_actualizacion DATETIME,
+  PRIMARY KEY (nit_entidad, pensionado_id),
+  INDEX ix_pago_resumen_pensionado_primero (nit_entidad, fecha_primer_pago),
+  INDEX ix_pago_resumen_pensionado_ultimo (nit_entidad, fecha_ultimo_pago)
+);
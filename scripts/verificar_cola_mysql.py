@@ -0,0 +1,129 @@
+"""Verificación de la cola distribuida (app/cola_distribuida.py) con dos procesos contra MySQL.
+
+Las pruebas de test_cola_distribuida.py corren en SQLite, donde no hay SELECT ... FOR UPDATE
+SKIP LOCKED ni dos conexiones compitiendo de verdad. Este script lo comprueba contra la base
+configurada en app.settings, con un lote de prueba que borra al terminar:
+
+1. SKIP LOCKED: dos procesos arrancan a la vez y drenan el lote. Cada item se toma una sola
+   vez, todos quedan TERMINADO y los dos procesos alcanzan a tomar items.
+2. Arriendo: un proceso toma un item y muere sin cerrarlo. Vencido el arriendo, el otro proceso
+   lo retoma (intentos = 2) y el dueño original ya no puede cerrarlo.
+
+Las etapas no se ejecutan (no genera PDFs ni ZIPs): solo se reclaman y cierran items.
+
+Uso:
+    python scripts/verificar_cola_mysql.py [--items 40] [--arriendo 3]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app import cola_distribuida
+from app.db import engine, get_session
+from app.trabajos import TERMINADO
+
+NIT_PRUEBA = 'PRU_COLA'
+
+
+def _drenar(nombre: str, arranque, cola):
+    """Proceso hijo: toma y cierra items hasta vaciar la cola; reporta (item_id, intentos)."""
+    arranque.wait()
+    tomados = []
+    while (item := cola_distribuida.tomar_item(nombre)) is not None:
+        tomados.append((item.item_id, item.intentos))
+        time.sleep(0.01)  # da tiempo a que el otro proceso choque con la fila bloqueada
+        cola_distribuida._terminar(item, {}, [])
+    cola.put((nombre, tomados))
+
+
+def _tomar_y_morir(arriendo: int, cola):
+    """Proceso hijo: toma un item con arriendo corto y termina sin cerrarlo."""
+    cola_distribuida.ARRIENDO_SEGUNDOS = arriendo
+    item = cola_distribuida.tomar_item('muere')
+    cola.put(item)
+
+
+def _encolar(n: int) -> int:
+    entidades = [(f"{NIT_PRUEBA}_{k}", f"Entidad de prueba {k}") for k in range(n)]
+    return cola_distribuida.encolar_lote(entidades, date.today())
+
+
+def _borrar(trabajo_id: int):
+    with get_session() as s:
+        s.execute(text("DELETE FROM trabajo_item WHERE trabajo_id = :t"), {"t": trabajo_id})
+        s.execute(text("DELETE FROM trabajo WHERE trabajo_id = :t"), {"t": trabajo_id})
+        s.commit()
+
+
+def verificar_skip_locked(n: int, ctx) -> bool:
+    trabajo_id = _encolar(n)
+    try:
+        arranque, cola = ctx.Event(), ctx.Queue()
+        procesos = [ctx.Process(target=_drenar, args=(f"p{k}", arranque, cola)) for k in (1, 2)]
+        for p in procesos:
+            p.start()
+        arranque.set()
+        reportes = dict(cola.get(timeout=300) for _ in procesos)
+        for p in procesos:
+            p.join()
+        tomados = [i for t in reportes.values() for i in t]
+        with get_session() as s:
+            estados = dict(s.execute(text(
+                "SELECT estado, COUNT(*) FROM trabajo_item WHERE trabajo_id = :t GROUP BY estado"
+            ), {"t": trabajo_id}).fetchall())
+        ok = (len(tomados) == n and len({i for i, _ in tomados}) == n
+              and all(intentos == 1 for _, intentos in tomados)
+              and estados == {TERMINADO: n} and all(reportes.values()))
+        print(f"{'✅' if ok else '❌'} SKIP LOCKED: {n} items, "
+              + ", ".join(f"{k} tomó {len(v)}" for k, v in sorted(reportes.items()))
+              + f", estados {estados}")
+        return ok
+    finally:
+        _borrar(trabajo_id)
+
+
+def verificar_arriendo(arriendo: int, ctx) -> bool:
+    trabajo_id = _encolar(1)
+    try:
+        cola = ctx.Queue()
+        p = ctx.Process(target=_tomar_y_morir, args=(arriendo, cola))
+        p.start()
+        perdido = cola.get(timeout=60)
+        p.join()
+        antes = cola_distribuida.tomar_item('retoma')
+        time.sleep(arriendo + 1)
+        retomado = cola_distribuida.tomar_item('retoma')
+        cierra_muerto = cola_distribuida._terminar(perdido, {}, [])
+        cierra_nuevo = cola_distribuida._terminar(retomado, {}, []) if retomado else False
+        ok = (antes is None and retomado is not None and retomado.item_id == perdido.item_id
+              and retomado.intentos == 2 and not cierra_muerto and cierra_nuevo)
+        print(f"{'✅' if ok else '❌'} Arriendo: antes de vencer {'nadie lo toma' if antes is None else 'lo tomó otro'}, "
+              f"retomado={'sí' if retomado else 'no'}"
+              f"{f' (intentos {retomado.intentos})' if retomado else ''}, "
+              f"cierre del dueño muerto={'rechazado' if not cierra_muerto else 'aceptado'}")
+        return ok
+    finally:
+        _borrar(trabajo_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=40)
+    parser.add_argument('--arriendo', type=int, default=3, help='segundos de arriendo en la prueba de retoma')
+    args = parser.parse_args()
+    if engine.dialect.name != 'mysql':
+        sys.exit("❌ Requiere MySQL (ver app/settings.py)")
+    ctx = multiprocessing.get_context('spawn')
+    ok = verificar_skip_locked(args.items, ctx) & verificar_arriendo(args.arriendo, ctx)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Pruebas de la aplicación FIFO de pagos a cuentas de cobro (app/aplicacion_pagos.py)."""
+
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.aplicacion_pagos as ap
+from app.aplicacion_pagos import aplicar_fifo
+
+
+def _pago(pago_id, valor, mes=1):
+    return {'pago_id': pago_id, 'fecha_pago': date(2024, mes, 1), 'valor': valor}
+
+
+def _resumen(aplicaciones):
+    return [(a['pago_id'], a['consecutivo'], a['capital'], a['interes']) for a in aplicaciones]
+
+
+def test_primero_intereses_y_luego_capital():
+    cuentas = [{'consecutivo': 1, 'capital': 100, 'interes': 10}]
+    assert _resumen(aplicar_fifo(cuentas, [_pago(1, 30)])) == [(1, 1, Decimal('20'), Decimal('10'))]
+
+
+def test_excedente_sin_cuentas_pendientes():
+    cuentas = [{'consecutivo': 1, 'capital': 100, 'interes': 10}]
+    assert _resumen(aplicar_fifo(cuentas, [_pago(1, 150)])) == [
+        (1, 1, Decimal('100'), Decimal('10')),
+        (1, None, Decimal('40'), Decimal('0.00')),
+    ]
+
+
+def test_sin_cuentas_todo_es_excedente():
+    assert _resumen(aplicar_fifo([], [_pago(1, '12.50')])) == [(1, None, Decimal('12.50'), Decimal('0.00'))]
+
+
+def test_varios_pagos_cruzan_cuentas():
+    cuentas = [
+        {'consecutivo': 1, 'capital': 100, 'interes': 10},
+        {'consecutivo': 2, 'capital': 100, 'interes': 10},
+        {'consecutivo': 3, 'capital': 50, 'interes': 0},
+    ]
+    pagos = [_pago(1, 60, 1), _pago(2, 100, 2), _pago(3, 200, 3)]
+    assert _resumen(aplicar_fifo(cuentas, pagos)) == [
+        (1, 1, Decimal('50'), Decimal('10')),
+        (2, 1, Decimal('50'), Decimal('0')),
+        (2, 2, Decimal('40'), Decimal('10')),
+        (3, 2, Decimal('60'), Decimal('0')),
+        (3, 3, Decimal('50'), Decimal('0')),
+        (3, None, Decimal('90'), Decimal('0.00')),
+    ]
+
+
+def test_lo_aplicado_suma_lo_pagado():
+    cuentas = [{'consecutivo': i, 'capital': Decimal('33.33'), 'interes': Decimal('1.11')} for i in range(1, 6)]
+    pagos = [_pago(i, Decimal('27.40'), i) for i in range(1, 8)]
+    aplicaciones = aplicar_fifo(cuentas, pagos)
+    for pago in pagos:
+        aplicado = sum(a['capital'] + a['interes'] for a in aplicaciones if a['pago_id'] == pago['pago_id'])
+        assert aplicado == pago['valor']
+
+
+def test_pago_en_cero_no_aplica_nada():
+    cuentas = [{'consecutivo': 1, 'capital': 100, 'interes': 10}]
+    assert aplicar_fifo(cuentas, [_pago(1, 0), _pago(2, None)]) == []
+
+
+@pytest.fixture
+def session():
+    sqlite3.register_adapter(Decimal, str)
+    engine = create_engine('sqlite://')
+    s = sessionmaker(bind=engine)()
+    for ddl in (
+        "CREATE TABLE pensionado (pensionado_id INTEGER PRIMARY KEY, identificacion VARCHAR(30), nit_entidad VARCHAR(30))",
+        """CREATE TABLE cuenta_cobro (
+            consecutivo INTEGER PRIMARY KEY, nit_entidad VARCHAR(30), pensionado_identificacion VARCHAR(30),
+            pensionado_nombre VARCHAR(200), periodo_inicio DATE, periodo_fin DATE, total_capital DECIMAL(18,2),
+            total_intereses DECIMAL(18,2), estado VARCHAR(20), version INTEGER)""",
+        "CREATE TABLE pago (pago_id INTEGER PRIMARY KEY, pensionado_id INTEGER, fecha_pago DATE, valor DECIMAL(18,2))",
+        """CREATE TABLE pago_aplicacion (
+            pago_aplicacion_id INTEGER PRIMARY KEY, pago_id INTEGER, pensionado_id INTEGER, nit_entidad VARCHAR(30),
+            consecutivo INTEGER, fecha_pago DATE, capital DECIMAL(18,2), interes DECIMAL(18,2))""",
+    ):
+        s.execute(text(ddl))
+    s.execute(text("INSERT INTO pensionado VALUES (1, '111', '900')"))
+    s.execute(text("INSERT INTO pago VALUES (1, 1, '2024-03-01', 150)"))
+    yield s
+    s.close()
+
+
+def _cuenta(s, consecutivo, mes, estado='EMITIDA', version=1, capital=100):
+    s.execute(text("""
+        INSERT INTO cuenta_cobro (consecutivo, nit_entidad, pensionado_identificacion, periodo_inicio, periodo_fin,
+                                  total_capital, total_intereses, estado, version)
+        VALUES (:c, '900', '111', :p, :p, :capital, 0, :estado, :version)
+    """), {'c': consecutivo, 'p': date(2024, mes, 1), 'capital': capital, 'estado': estado, 'version': version})
+
+
+def _aplicado(s):
+    return [tuple(f) for f in s.execute(text(
+        "SELECT consecutivo, capital FROM pago_aplicacion ORDER BY consecutivo IS NULL, consecutivo"))]
+
+
+def test_version_reemplazada_no_recibe_pagos(session):
+    _cuenta(session, 1, 1, estado='CORREGIDA', version=1)
+    _cuenta(session, 2, 1, version=2, capital=80)  # reemisión del mismo periodo
+    _cuenta(session, 3, 2, estado='ANULADA')
+    _cuenta(session, 4, 2)
+    ap.reaplicar_entidad(session, '900')
+    assert _aplicado(session) == [(2, 80), (4, 70)]
+    assert [f['consecutivo'] for f in ap.saldos_cuentas(session, '900')] == [2, 4]
+
+
+def test_emitir_una_cuenta_reaplica_los_pagos(session):
+    _cuenta(session, 1, 1)
+    ap.reaplicar_entidad(session, '900')
+    assert _aplicado(session) == [(1, 100), (None, 50)]
+    _cuenta(session, 2, 2)
+    assert ap.reaplicar_cuenta(session, '900', '111') == 2
+    assert _aplicado(session) == [(1, 100), (2, 50)]
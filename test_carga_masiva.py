@@ -0,0 +1,63 @@
+"""Pruebas de la subida por INSERT de varias filas a tablas temporales (app/carga_masiva.py)."""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+import app.carga_masiva as carga_masiva
+
+
+@pytest.fixture
+def sesion():
+    engine = create_engine("sqlite://")
+    sentencias = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, sql, params, ctx, many: sentencias.append(sql))
+    with Session(engine) as s:
+        s.execute(text("CREATE TABLE tmp_pago (pensionado_id INTEGER, fecha_pago DATE, valor NUMERIC, "
+                       "observaciones TEXT, PRIMARY KEY (pensionado_id, fecha_pago))"))
+        s.sentencias = sentencias
+        yield s
+
+
+def _pagos(n: int, valor: float = 10.0) -> pd.DataFrame:
+    return pd.DataFrame({'pensionado_id': np.arange(n, dtype='int64'), 'fecha_pago': [date(2024, 1, 1)] * n,
+                         'valor': [valor] * n, 'observaciones': [None if i % 2 else 'ok' for i in range(n)]})
+
+
+def test_insert_de_varias_filas(sesion, monkeypatch):
+    monkeypatch.setattr(carga_masiva, '_FILAS_POR_INSERT', 4)
+    sesion.sentencias.clear()
+    assert carga_masiva.insertar_filas(sesion, 'tmp_pago', _pagos(10)) == 10
+    # 10 filas de a 4: tres viajes a la BD
+    assert len(sesion.sentencias) == 3
+    assert all(s.startswith('INSERT INTO tmp_pago') for s in sesion.sentencias)
+    filas = sesion.execute(text("SELECT pensionado_id, valor, observaciones FROM tmp_pago ORDER BY 1")).fetchall()
+    assert [tuple(f) for f in filas[:3]] == [(0, 10, 'ok'), (1, 10, None), (2, 10, 'ok')]
+    assert len(filas) == 10
+
+
+def test_reemplazar_la_ultima_gana(sesion):
+    carga_masiva.insertar_filas(sesion, 'tmp_pago', _pagos(3), reemplazar=True)
+    carga_masiva.insertar_filas(sesion, 'tmp_pago', _pagos(2, valor=99.0), reemplazar=True)
+    assert sesion.execute(text("SELECT valor FROM tmp_pago ORDER BY pensionado_id")).scalars().all() == [99, 99, 10]
+    assert carga_masiva.insertar_filas(sesion, 'tmp_pago', _pagos(0)) == 0
+
+
+def test_valores_para_el_driver():
+    assert carga_masiva._valor(np.int64(7)) == 7 and type(carga_masiva._valor(np.int64(7))) is int
+    assert carga_masiva._valor(np.float64('nan')) is None
+    assert carga_masiva._valor(pd.NaT) is None
+    assert carga_masiva._valor(pd.Timestamp('2024-01-31 10:00')).isoformat() == '2024-01-31T10:00:00'
+    assert carga_masiva._valor('nan') == 'nan'
+
+
+def test_identificaciones_como_texto():
+    serie = pd.Series([12345678.0, '0007', None, 'AB-1', 12345678, float('nan'), 1e30], dtype=object)
+    salida = [None if pd.isna(v) else v for v in carga_masiva.identificaciones(serie)]
+    # Como el import fila a fila: los números pierden los decimales y los ceros a la izquierda
+    assert salida == ['12345678', '7', None, 'AB-1', '12345678', None, '1e+30']
@@ -0,0 +1,107 @@
+"""Pruebas del estado de cartera materializado (app/cartera.py) sobre SQLite."""
+
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.cartera as cartera
+from app.models import Base, CarteraEstado
+
+HOY = date(2024, 4, 10)
+
+
+@pytest.fixture
+def session():
+    sqlite3.register_adapter(Decimal, str)
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[CarteraEstado.__table__])
+    s = sessionmaker(bind=engine, autoflush=False)()
+    for ddl in (
+        "CREATE TABLE pensionado (pensionado_id INTEGER PRIMARY KEY, identificacion VARCHAR(30), "
+        "nombre VARCHAR(200), nit_entidad VARCHAR(30))",
+        "CREATE TABLE liquidacion (liquidacion_id INTEGER PRIMARY KEY, identificacion VARCHAR(30), nombre VARCHAR(200))",
+        "CREATE TABLE liquidacion_detalle (detalle_id INTEGER PRIMARY KEY, liquidacion_id INTEGER, "
+        "pensionado_id INTEGER, periodo DATE, capital DECIMAL(18,2), interes DECIMAL(18,2))",
+        "CREATE TABLE pago (pago_id INTEGER PRIMARY KEY, pensionado_id INTEGER, fecha_pago DATE, valor DECIMAL(18,2))",
+        "CREATE TABLE dtf_mensual (periodo DATE PRIMARY KEY, tasa DECIMAL(9,6))",
+    ):
+        s.execute(text(ddl))
+    s.execute(text("INSERT INTO pensionado VALUES (:id, :ident, :nombre, :nit)"), [
+        {"id": 1, "ident": '111', "nombre": 'PEREZ', "nit": '900'},
+        {"id": 2, "ident": '222', "nombre": 'DIAZ', "nit": '900'},
+        {"id": 3, "ident": '333', "nombre": 'GOMEZ', "nit": '800'},
+    ])
+    s.execute(text("INSERT INTO liquidacion VALUES (10, '900', 'ENTIDAD 900'), (20, '800', 'ENTIDAD 800')"))
+    s.execute(text("INSERT INTO liquidacion_detalle VALUES (:id, :liq, :p, :periodo, :capital, :interes)"), [
+        {"id": 1, "liq": 10, "p": 1, "periodo": date(2024, 1, 1), "capital": 100, "interes": 10},
+        {"id": 2, "liq": 10, "p": 1, "periodo": date(2024, 2, 1), "capital": 100, "interes": 10},
+        {"id": 3, "liq": 10, "p": 1, "periodo": date(2024, 4, 1), "capital": 100, "interes": 0},
+        {"id": 4, "liq": 10, "p": 2, "periodo": date(2024, 2, 1), "capital": 50, "interes": 0},
+        {"id": 5, "liq": 20, "p": 3, "periodo": date(2024, 1, 1), "capital": 70, "interes": 0},
+    ])
+    s.execute(text("INSERT INTO pago (pensionado_id, fecha_pago, valor) VALUES (:p, :f, :v)"), [
+        {"p": 1, "f": date(2024, 1, 1), "v": 60}, {"p": 1, "f": date(2024, 1, 1), "v": 50},  # enero pagado
+        {"p": 1, "f": date(2024, 2, 1), "v": 10},
+    ])
+    s.execute(text("INSERT INTO dtf_mensual VALUES ('2024-02-01', 0.1)"))
+    s.commit()
+    yield s
+    s.close()
+
+
+def _estado(session) -> dict:
+    return {f[0]: (f[1], Decimal(str(f[2])), Decimal(str(f[3])), f[4]) for f in session.execute(text(
+        "SELECT detalle_id, estado, saldo_pendiente, intereses_mora, nit_entidad FROM cartera_estado"))}
+
+
+def test_refrescar_solo_los_pensionados_dados(session):
+    assert cartera.refrescar_cartera(session, [1, None, '1'], hoy=HOY) == 3
+    assert _estado(session) == {
+        1: ('Pagada', Decimal('0'), Decimal('0'), '900'),
+        2: ('En mora', Decimal('100'), Decimal('10'), '900'),
+        3: ('Al día', Decimal('100'), Decimal('0'), '900'),
+    }
+    # Un pago nuevo del pensionado 1 reemplaza sus filas sin tocar las de otros
+    session.execute(text("INSERT INTO pago (pensionado_id, fecha_pago, valor) VALUES (1, '2024-02-01', 100)"))
+    cartera.refrescar_cartera(session, [2], hoy=HOY)
+    cartera.refrescar_cartera(session, [1], hoy=HOY)
+    estado = _estado(session)
+    assert estado[2] == ('Pagada', Decimal('0'), Decimal('0'), '900')
+    assert estado[4] == ('En mora', Decimal('50'), Decimal('5'), '900')
+    assert 5 not in estado
+
+
+def test_estado_a_la_fecha_al_leer(session):
+    cartera.refrescar_cartera(session, [1, 2], hoy=HOY)
+    # Un mes después, abril ya está en mora aunque la fila guardada diga 'Al día'
+    despues = date(2024, 5, 3)
+    en_mora = cartera.obtener_cartera(session, '900', estado='En mora', hoy=despues)
+    assert [f['detalle_id'] for f in en_mora] == [2, 4, 3]
+    assert cartera.obtener_cartera(session, '900', estado='Al día', hoy=despues) == []
+    assert [f['detalle_id'] for f in cartera.obtener_cartera(session, '900', estado='Al día', hoy=HOY)] == [3]
+    resumen = cartera.resumen_cartera(session, '900', hoy=despues)
+    assert {e: (r['registros'], Decimal(str(r['saldo_pendiente']))) for e, r in resumen.items()} == {
+        'En mora': (3, Decimal('250')), 'Pagada': (1, Decimal('0'))}
+    assert cartera.actualizar_vencidas(session, hoy=despues) == 1
+    assert _estado(session)[3][0] == 'En mora'
+
+
+def test_tasas_nuevas_y_reconstruccion(session):
+    cartera.reconstruir_cartera(session, hoy=HOY)
+    assert sorted(_estado(session)) == [1, 2, 3, 4, 5]
+    session.execute(text("UPDATE dtf_mensual SET tasa = 0.2 WHERE periodo = '2024-02-01'"))
+    session.execute(text("INSERT INTO dtf_mensual VALUES ('2024-01-01', 0.5)"))
+    assert cartera.actualizar_tasas(session, [date(2024, 2, 1), date(2024, 1, 1)]) == 4
+    estado = _estado(session)
+    assert (estado[2][2], estado[4][2], estado[5][2], estado[1][2]) == (
+        Decimal('20'), Decimal('10'), Decimal('35'), Decimal('0'))
+    # Reconstruir una entidad no toca las filas de otra
+    session.execute(text("DELETE FROM pago"))
+    assert cartera.reconstruir_cartera(session, '800', hoy=HOY) == 1
+    assert _estado(session)[1][0] == 'Pagada'
+    assert cartera.reconstruir_cartera(session, '900', hoy=HOY) == 4
+    assert _estado(session)[1] == ('En mora', Decimal('110'), Decimal('55'), '900')
@@ -0,0 +1,177 @@
+"""Pruebas de los lotes distribuidos por items (app/cola_distribuida.py) sobre SQLite."""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.cola_distribuida as cola_distribuida
+import app.trabajos as trabajos
+from app.models import Base, Trabajo, TrabajoItem
+
+ENTIDADES = [(900, 'Alcaldía Uno'), ('901', 'Banco Dos')]
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'lotes.db'}")
+    Base.metadata.create_all(engine, tables=[Trabajo.__table__, TrabajoItem.__table__])
+    fabrica = sessionmaker(bind=engine, autoflush=False)  # como app.db.SessionLocal
+    monkeypatch.setattr(cola_distribuida, 'engine', engine)
+    monkeypatch.setattr(cola_distribuida, 'get_session', fabrica)
+    monkeypatch.setattr(trabajos, 'get_session', fabrica)  # latido de los items
+    return fabrica
+
+
+def _items(fabrica, trabajo_id: int) -> list:
+    with fabrica() as s:
+        return s.execute(text(
+            "SELECT etapa, clave, estado, trabajador, intentos FROM trabajo_item "
+            "WHERE trabajo_id = :t ORDER BY item_id"
+        ), {"t": trabajo_id}).fetchall()
+
+
+def _trabajo(fabrica, trabajo_id: int) -> Trabajo:
+    with fabrica() as s:
+        trabajo = s.get(Trabajo, trabajo_id)
+        s.expunge(trabajo)
+        return trabajo
+
+
+def _vencer(fabrica, item_id: int):
+    with fabrica() as s:
+        s.execute(text("UPDATE trabajo_item SET arriendo_hasta = :t WHERE item_id = :id"),
+                  {"t": datetime.now() - timedelta(seconds=5), "id": item_id})
+        s.commit()
+
+
+def _drenar(trabajador: str = 'w1'):
+    while (item := cola_distribuida.tomar_item(trabajador)) is not None:
+        cola_distribuida.ejecutar_item(item)
+
+
+def test_encolar_y_reclamar_en_orden(cola):
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES, date(2025, 8, 31), tam_bloque=0)
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.tipo, trabajo.estado, trabajo.total) == (cola_distribuida.TIPO_LOTE, trabajos.EN_CURSO, 2)
+    assert json.loads(trabajo.parametros)['tam_bloque'] == 1
+    assert [(e, c, s) for e, c, s, _, _ in _items(cola, trabajo_id)] == [
+        ('liquidacion', '900', trabajos.PENDIENTE), ('liquidacion', '901', trabajos.PENDIENTE)]
+    primero = cola_distribuida.tomar_item('w1')
+    segundo = cola_distribuida.tomar_item('w2')
+    assert (primero.clave, primero.trabajador, primero.intentos) == ('900', 'w1', 1)
+    assert (segundo.clave, segundo.trabajador) == ('901', 'w2')
+    assert cola_distribuida.tomar_item('w3') is None
+    assert cola_distribuida.avance_lote(trabajo_id) == {'liquidacion': {trabajos.EN_CURSO: 2}}
+
+
+def test_arriendo_vencido_lo_retoma_otro(cola):
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES[:1], date(2025, 8, 31))
+    item = cola_distribuida.tomar_item('w1')
+    _vencer(cola, item.item_id)
+    retomado = cola_distribuida.tomar_item('w2')
+    assert (retomado.item_id, retomado.trabajador, retomado.intentos) == (item.item_id, 'w2', 2)
+    # Quien perdió el arriendo no cierra el item del que lo retomó
+    assert not cola_distribuida._terminar(item, {}, [])
+    assert cola_distribuida._terminar(retomado, {}, [])
+    assert _items(cola, trabajo_id) == [('liquidacion', '900', trabajos.TERMINADO, 'w2', 2)]
+
+
+def test_sin_intentos_restantes_falla_el_lote(cola):
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES, date(2025, 8, 31))
+    item = cola_distribuida.tomar_item('w1')
+    with cola() as s:
+        s.execute(text("UPDATE trabajo_item SET intentos = :n WHERE item_id = :id"),
+                  {"n": cola_distribuida._MAX_INTENTOS, "id": item.item_id})
+        s.commit()
+    _vencer(cola, item.item_id)
+    assert cola_distribuida.tomar_item('w2') is None
+    assert [(c, s) for _, c, s, _, _ in _items(cola, trabajo_id)] == [
+        ('900', trabajos.FALLIDO), ('901', trabajos.FALLIDO)]
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.estado, trabajo.mensaje) == (trabajos.FALLIDO, 'Arriendo vencido sin intentos restantes')
+
+
+def _etapas_falsas(monkeypatch, tmp_path, renders: list):
+    def _liquidacion(item, lote, p, avance):
+        avance()
+        return {'pensionados': 3}, [('render', f"{p['nit']}:{k}", {**p, 'bloque': k}) for k in range(2)]
+
+    def _render(item, lote, p, avance):
+        renders.append((item.clave, item.trabajador))
+        return {'archivos': [], 'errores': []}, []
+
+    def _archivo(item, lote, p, avance):
+        return {'ruta': str(tmp_path / f"{p['nit']}.zip")}, []
+
+    monkeypatch.setitem(cola_distribuida.ETAPAS, 'liquidacion', _liquidacion)
+    monkeypatch.setitem(cola_distribuida.ETAPAS, 'render', _render)
+    monkeypatch.setitem(cola_distribuida.ETAPAS, 'archivo', _archivo)
+
+
+def test_etapas_y_archivo_tras_el_ultimo_bloque(cola, monkeypatch, tmp_path):
+    renders = []
+    _etapas_falsas(monkeypatch, tmp_path, renders)
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES[:1], date(2025, 8, 31))
+    cola_distribuida.ejecutar_item(cola_distribuida.tomar_item('w1'))
+    cola_distribuida.ejecutar_item(cola_distribuida.tomar_item('w1'))
+    # Queda un bloque: todavía no hay item de archivo
+    assert [e for e, *_ in _items(cola, trabajo_id)] == ['liquidacion', 'render', 'render']
+    _drenar()
+    assert renders == [('900:0', 'w1'), ('900:1', 'w1')]
+    assert [(e, c, s) for e, c, s, _, _ in _items(cola, trabajo_id)] == [
+        ('liquidacion', '900', trabajos.TERMINADO), ('render', '900:0', trabajos.TERMINADO),
+        ('render', '900:1', trabajos.TERMINADO), ('archivo', '900', trabajos.TERMINADO)]
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.estado, trabajo.hechas, trabajo.total) == (trabajos.TERMINADO, 4, 4)
+    assert trabajo.resultado_ruta == str(tmp_path / '900.zip')
+
+
+def test_dos_entidades_sin_ruta_unica(cola, monkeypatch, tmp_path):
+    _etapas_falsas(monkeypatch, tmp_path, [])
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES, date(2025, 8, 31))
+    _drenar()
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.estado, trabajo.hechas, trabajo.total, trabajo.resultado_ruta) == (trabajos.TERMINADO, 8, 8, None)
+    assert trabajo.mensaje.startswith('2 ZIP(s)')
+
+
+def test_error_reintenta_y_luego_cancela_el_lote(cola, monkeypatch):
+    def _falla(item, lote, p, avance):
+        raise RuntimeError('sin conexión')
+
+    monkeypatch.setitem(cola_distribuida.ETAPAS, 'liquidacion', _falla)
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES, date(2025, 8, 31))
+    cola_distribuida.ejecutar_item(cola_distribuida.tomar_item('w1'))
+    # Vuelve a la cola con el error del intento
+    with cola() as s:
+        estado, trabajador, error = s.execute(text(
+            "SELECT estado, trabajador, error FROM trabajo_item WHERE clave = '900'")).one()
+    assert (estado, trabajador) == (trabajos.PENDIENTE, None)
+    assert 'sin conexión' in error
+    for _ in range(cola_distribuida._MAX_INTENTOS - 1):
+        item = cola_distribuida.tomar_item('w2')
+        assert item.clave == '900'
+        cola_distribuida.ejecutar_item(item)
+    assert [(c, s) for _, c, s, _, _ in _items(cola, trabajo_id)] == [
+        ('900', trabajos.FALLIDO), ('901', trabajos.FALLIDO)]
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.estado, trabajo.mensaje) == (trabajos.FALLIDO, 'liquidacion 900: sin conexión')
+    assert cola_distribuida.tomar_item('w3') is None
+
+
+def test_sucesor_duplicado_falla_el_item(cola):
+    trabajo_id = cola_distribuida.encolar_lote(ENTIDADES[:1], date(2025, 8, 31))
+    item = cola_distribuida.tomar_item('w1')
+    with cola() as s:
+        cola_distribuida._nuevo_item(s, trabajo_id, 'render', '900:0', '900', {})
+        s.commit()
+    assert not cola_distribuida._terminar(item, {}, [('render', '900:0', {}), ('render', '900:1', {})])
+    # No queda EN_CURSO a la espera del arriendo: falla junto con su lote, sin sucesores nuevos
+    assert [(e, c, s) for e, c, s, _, _ in _items(cola, trabajo_id)] == [
+        ('liquidacion', '900', trabajos.FALLIDO), ('render', '900:0', trabajos.FALLIDO)]
+    trabajo = _trabajo(cola, trabajo_id)
+    assert (trabajo.estado, trabajo.hechas, trabajo.mensaje) == (trabajos.FALLIDO, 0, 'liquidacion 900: sucesor duplicado')
+    assert cola_distribuida.tomar_item('w2') is None
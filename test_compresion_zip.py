@@ -0,0 +1,40 @@
+"""Pruebas de la política de compresión por entrada (app/zip_manifiesto.py)."""
+
+import io
+import zipfile
+
+from app.zip_manifiesto import ZipConManifiesto, compresion_para
+
+
+def test_pdf_se_guarda_y_el_texto_se_comprime():
+    assert compresion_para('111/cuenta_10.pdf') == zipfile.ZIP_STORED
+    assert compresion_para('ANEXO.PDF') == zipfile.ZIP_STORED
+    assert compresion_para('LEEME.txt') == zipfile.ZIP_DEFLATED
+    assert compresion_para('MANIFEST.json') == zipfile.ZIP_DEFLATED
+
+
+def test_write_y_writestr_aplican_la_politica(tmp_path):
+    en_disco = tmp_path / 'grande.pdf'
+    en_disco.write_bytes(b'%PDF-1.4 disco' * 1000)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with ZipConManifiesto(zf) as zm:
+            zm.writestr('111/cuenta_10.pdf', b'%PDF-1.4 uno')
+            zm.write(str(en_disco), 'anexos/grande.pdf')
+            zm.writestr('LEEME.txt', 'texto de prueba ' * 100)
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as zf:
+        assert zf.getinfo('111/cuenta_10.pdf').compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo('anexos/grande.pdf').compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo('LEEME.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zf.testzip() is None
+
+
+def test_la_politica_no_depende_de_la_compresion_del_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        with ZipConManifiesto(zf) as zm:
+            zm.writestr('a.pdf', b'%PDF')
+            zm.writestr('b.txt', 'texto')
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as zf:
+        assert zf.getinfo('a.pdf').compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo('b.txt').compress_type == zipfile.ZIP_DEFLATED
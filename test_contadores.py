@@ -0,0 +1,47 @@
+"""Pruebas del contador compartido del PDF consolidado (app/contadores.py)."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.contadores as contadores
+from app.models import Base, Contador
+
+
+@pytest.fixture
+def sesiones(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'contador.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine, tables=[Contador.__table__])
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(contadores, 'get_session', fabrica)
+    monkeypatch.chdir(tmp_path)
+    return fabrica
+
+
+def test_continua_desde_el_archivo_anterior(sesiones, tmp_path):
+    (tmp_path / contadores.ARCHIVO_CONSOLIDADO).write_text('512')
+    assert contadores.siguiente(contadores.CONSOLIDADO) == 513
+    (tmp_path / contadores.ARCHIVO_CONSOLIDADO).write_text('9')  # ya no se lee
+    assert contadores.siguiente(contadores.CONSOLIDADO) == 514
+
+
+def test_sin_archivo_arranca_en_el_valor_historico(sesiones):
+    assert contadores.siguiente(contadores.CONSOLIDADO) == 424
+
+
+def test_numeros_distintos_entre_hilos(sesiones):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numeros = list(pool.map(lambda _: contadores.siguiente('prueba'), range(80)))
+    assert sorted(numeros) == list(range(1, 81))
+
+
+def test_reiniciar_y_valor_actual(sesiones):
+    with sesiones() as s:
+        assert contadores.valor_actual(s, contadores.CONSOLIDADO) is None
+        contadores.reiniciar(s, contadores.CONSOLIDADO, 0)
+        s.commit()
+        assert contadores.siguiente(contadores.CONSOLIDADO, s) == 1
+        s.rollback()  # el número no queda reservado si la transacción de quien llama no confirma
+        assert contadores.valor_actual(s, contadores.CONSOLIDADO) == 0
@@ -0,0 +1,55 @@
+"""Pruebas del contexto de render compartido (app/contexto_render.py)."""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from reportlab import rl_config
+
+from app.contexto_render import ContextoRender, obtener_contexto
+from generar_pdf_oficial import MESES_MINUSCULA, _documento_cuenta_cobro, construir_story_cuenta_cobro
+
+
+def _datos(consecutivo: int) -> dict:
+    filas = [(f"{MESES_MINUSCULA[i].capitalize()}-2025", 1000.0, 30, 9.5, 10.0 + i, 1000.0) for i in range(8)]
+    intereses = sum(f[4] for f in filas)
+    return {
+        'consecutivo': consecutivo, 'entidad': 'ENTIDAD DE PRUEBA', 'nit': '800103913',
+        'periodo_texto': 'ENERO DEL 2025 A AGOSTO DEL 2025', 'nombre': 'PEREZ, ANA', 'identificacion': '111',
+        'total_capital': 1000.0, 'total_intereses': intereses, 'total': 1000.0 + intereses,
+        'filas': filas, 'suma_intereses_columna': intereses, 'capital_total': 1000.0,
+    }
+
+
+@pytest.fixture(autouse=True)
+def pdf_determinista(monkeypatch):
+    # Sin fecha de creación ni ID aleatorio: mismos datos, mismos bytes
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+
+
+def _pdf(datos: dict, ctx: ContextoRender) -> bytes:
+    buffer = io.BytesIO()
+    _documento_cuenta_cobro(buffer).build(construir_story_cuenta_cobro(datos, ctx))
+    return buffer.getvalue()
+
+
+def test_un_contexto_por_proceso():
+    assert obtener_contexto() is obtener_contexto()
+
+
+def test_contexto_compartido_igual_que_uno_nuevo():
+    compartido = obtener_contexto()
+    for consecutivo in (1, 2):
+        assert _pdf(_datos(consecutivo), compartido) == _pdf(_datos(consecutivo), ContextoRender())
+
+
+def test_render_concurrente_con_el_mismo_contexto():
+    ctx = obtener_contexto()
+    comandos = len(ctx.oficial.tabla_intereses.getCommands())
+    esperados = {i: _pdf(_datos(i), ContextoRender()) for i in range(6)}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pdfs = list(pool.map(lambda i: (i, _pdf(_datos(i), ctx)), list(range(6)) * 4))
+    for i, pdf in pdfs:
+        assert pdf == esperados[i]
+    # El render no agrega comandos a los TableStyle compartidos
+    assert len(ctx.oficial.tabla_intereses.getCommands()) == comandos
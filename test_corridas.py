@@ -0,0 +1,116 @@
+"""Pruebas de las corridas reanudables y sus puntos de control (app/corridas.py) sobre SQLite."""
+
+import io
+import os
+import zipfile
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.corridas as corridas
+import generar_pdf_oficial as gpo
+from app.metadatos_pdf import leer_metadatos
+from app.models import Base, Corrida, CorridaPunto
+from app.paquete_entidad import generar_zip_masivo_completo
+
+FECHA = date(2025, 8, 31)
+
+
+@pytest.fixture
+def bd(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'corridas.db'}")
+    Base.metadata.create_all(engine, tables=[Corrida.__table__, CorridaPunto.__table__])
+    monkeypatch.setattr(corridas, 'get_session', sessionmaker(bind=engine, autoflush=False))
+    return tmp_path / 'corridas'
+
+
+def test_crear_retomar_y_terminar(bd):
+    corrida = corridas.PuntosControl('c1', 'zip_masivo', 900, {'motor': 'canvas'}, base_dir=str(bd))
+    assert not corrida.reanudada and corrida.puntos() == []
+    assert corrida.inicio.microsecond == 0
+    ruta = corrida.guardar(os.path.join('Perez_111', '2025', 'a.pdf'), b'%PDF')
+    assert open(ruta, 'rb').read() == b'%PDF' and os.listdir(os.path.dirname(ruta)) == ['a.pdf']
+    corrida.registrar([{'clave': corrida.clave('111', 2025, 1), 'consecutivo': 7, 'archivo': 'a.pdf',
+                        'meta': {'consecutivo': 7}},
+                       {'clave': corridas.CLAVE_CONSOLIDADO, 'archivo': 'consolidado.pdf'}])
+    # Registrar de nuevo un punto existente no lo duplica
+    corrida.registrar([{'clave': '111:2025-01', 'consecutivo': 8}])
+
+    retomada = corridas.PuntosControl('c1', 'zip_masivo', '900', base_dir=str(bd))
+    assert retomada.reanudada and retomada.inicio == corrida.inicio
+    assert retomada.hecha(111, 2025, 1) and not retomada.hecha(111, 2025, 2)
+    assert retomada.puntos() == [
+        {'clave': '111:2025-01', 'consecutivo': 7, 'archivo': 'a.pdf', 'meta': {'consecutivo': 7}},
+        {'clave': 'CONSOLIDADO', 'consecutivo': None, 'archivo': 'consolidado.pdf', 'meta': None}]
+    with pytest.raises(ValueError, match='otro tipo o entidad'):
+        corridas.PuntosControl('c1', 'pdf_entidad', '900', base_dir=str(bd))
+    retomada.terminar()
+    assert not os.path.exists(retomada.carpeta)
+    with pytest.raises(ValueError, match='ya terminó'):
+        corridas.PuntosControl('c1', 'zip_masivo', '900', base_dir=str(bd))
+
+
+def _entidad() -> list:
+    return [{'pensionado': {'cedula': cedula, 'nombre': nombre, 'mesadas': 14,
+                            'base_calculo_cuota': 1000.0, 'porcentaje_cuota': 0.1},
+             'cuentas': [{'año': 2025, 'mes': m, 'capital_total': 100.0, 'intereses': 1.0} for m in (1, 2)]}
+            for cedula, nombre in (('111', 'PEREZ GOMEZ, ANA'), ('222', 'DIAZ LOPEZ, LUIS'))]
+
+
+@pytest.fixture
+def emitidas(monkeypatch):
+    """Render real sin MySQL. El consecutivo de 222 en febrero falla mientras `caidas` tenga elementos."""
+    llamadas, caidas = [], [RuntimeError('conexión perdida')]
+
+    def _cuenta_mes(pensionado, año, mes, fecha_corte, num_meses=None):
+        return [{'año': año, 'mes': mes, 'fecha_cuenta': date(año, mes, 1), 'capital': 100.0,
+                 'valor_cuota_periodo': 100.0, 'interes': 1.0, 'dias_interes': 30, 'dtf_interes': 9.5}]
+
+    def _consecutivo(pensionado, nit, inicio, fin, *args):
+        opciones = args[-1]
+        if (str(pensionado[0]), inicio.month) == ('222', 2) and caidas:
+            raise caidas.pop()
+        llamadas.append((str(pensionado[0]), inicio.month, opciones.reusar_desde))
+        return 100 + len(llamadas)
+
+    monkeypatch.setattr(gpo, 'generar_cuentas_prescripcion_custom', _cuenta_mes)
+    monkeypatch.setattr(gpo, 'obtener_dtf_mes', lambda año, mes: 9.5)
+    monkeypatch.setattr(gpo, 'calcular_interes_mensual_unico', lambda capital, fecha, corte: 1.0)
+    monkeypatch.setattr(gpo, '_asignar_consecutivo', _consecutivo)
+    return llamadas
+
+
+def _zip(corrida) -> dict:
+    contenido = generar_zip_masivo_completo('900', 'Entidad Prueba', _entidad(), FECHA, motor='canvas',
+                                            usar_cache=False, incluir_consolidado=False, corrida=corrida)
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        return {n: zf.read(n) for n in zf.namelist()}
+
+
+def _consecutivos(archivos: dict) -> dict:
+    return {os.path.basename(n): leer_metadatos(c)['cuentas'][0]['consecutivo']
+            for n, c in archivos.items() if n.endswith('.pdf')}
+
+
+def test_reanudar_solo_rehace_lo_pendiente(bd, emitidas):
+    corrida = corridas.PuntosControl('c2', 'zip_masivo', '900', base_dir=str(bd))
+    primera = _zip(corrida)
+    assert _consecutivos(primera) == {'111_Enero_2025.pdf': 101, '111_Febrero_2025.pdf': 102,
+                                      '222_Enero_2025.pdf': 103}
+    assert b'conexi' in primera['Entidad_Prueba_900/error_log.txt']
+    assert [p['clave'] for p in corrida.puntos()] == ['111:2025-01', '111:2025-02', '222:2025-01']
+
+    # El proceso muere y se relanza con el mismo id: solo falta la cuenta que falló
+    retomada = corridas.PuntosControl('c2', 'zip_masivo', '900', base_dir=str(bd))
+    segunda = _zip(retomada)
+    assert emitidas[3:] == [('222', 2, retomada.inicio)]
+    assert all(reusar == corrida.inicio for _, _, reusar in emitidas)
+    assert _consecutivos(segunda) == {'111_Enero_2025.pdf': 101, '111_Febrero_2025.pdf': 102,
+                                      '222_Enero_2025.pdf': 103, '222_Febrero_2025.pdf': 104}
+    assert 'Entidad_Prueba_900/error_log.txt' not in segunda
+    # Los PDFs de la primera ejecución entran al ZIP final sin volver a generarse
+    for nombre, contenido in primera.items():
+        if nombre.endswith('.pdf'):
+            assert segunda[nombre] == contenido
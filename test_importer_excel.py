@@ -0,0 +1,150 @@
+"""Pruebas del import del libro de Excel (app/importer_excel.py)."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from app.importer_excel import (COLUMNA_DTF, COLUMNA_IPC, COLUMNAS_BASE, _columna_pagos, _con_huella,
+                                leer_hoja_por_bloques, mapa_meses, normalizar_dtf, normalizar_hoja_base,
+                                normalizar_ipc, normalizar_pagos)
+
+
+def test_hoja_base_ultima_fila_gana():
+    df = pd.DataFrame({'Identificacion': [12345678.0, None, 'AB-1', 12345678],
+                       'Res. No': [1, 'x', None, 2.0], 'Reliqui': [None, 'a', 'b', 'c']})
+    salida = normalizar_hoja_base(df)
+    # Sin columna Consulta en la hoja: queda vacía; las filas sin identificación se omiten
+    assert list(salida.columns) == ['identificacion', 'res_no', 'reliqui', 'consulta']
+    filas = [tuple(None if pd.isna(v) else v for v in f) for f in salida.itertuples(index=False)]
+    assert filas == [('AB-1', None, 'b', None), ('12345678', '2.0', 'c', None)]
+
+
+def test_dtf_fechas_y_tasas():
+    df = pd.DataFrame({'Fecha': ['31/01/2024', '2024-02-29', datetime(2024, 3, 31), 'malo', pd.Timestamp('2024-03-31')],
+                       COLUMNA_DTF: ['10,5', 0.11, '9.2', 1, 'x']})
+    salida = normalizar_dtf(df)
+    assert list(salida.itertuples(index=False, name=None)) == [
+        (date(2024, 1, 31), 0.105), (date(2024, 2, 29), 0.11), (date(2024, 3, 31), 0.092)]
+
+
+def test_ipc_años_y_porcentajes():
+    df = pd.DataFrame({'Año': [2023, '2024', None, 2023.0], COLUMNA_IPC: ['9,28', 5.2, 1, 0.0928]})
+    salida = normalizar_ipc(df)
+    assert salida['anio'].dtype == 'int64'
+    assert list(salida['anio']) == [2024, 2023]
+    assert list(salida['valor']) == pytest.approx([0.052, 0.0928])
+
+
+def _huellas(df):
+    return list(_con_huella(df, ('clave_a', 'clave_b'), ('valor', 'observaciones'))['huella'])
+
+
+def test_clave_como_texto():
+    df = pd.DataFrame({'clave_a': [7], 'clave_b': ['2024-01-01'], 'valor': [1.0], 'observaciones': ['x']})
+    assert list(_con_huella(df, ('clave_a', 'clave_b'), ('valor',))['clave']) == ['7|2024-01-01']
+
+
+def test_huella_no_depende_del_dtype():
+    claves = {'clave_a': [1, 2, 3], 'clave_b': ['a', 'b', 'c']}
+    enteros = pd.DataFrame({**claves, 'valor': [150000, 2, 0], 'observaciones': ['x', None, 'z']})
+    flotantes = pd.DataFrame({**claves, 'valor': [150000.0, 2.0, 0.0], 'observaciones': ['x', float('nan'), 'z']})
+    decimales = pd.DataFrame({**claves, 'valor': [Decimal('150000.00'), Decimal('2'), Decimal('0.0')],
+                              'observaciones': ['x', None, 'z']})
+    assert _huellas(enteros) == _huellas(flotantes) == _huellas(decimales)
+
+
+def test_huella_cambia_con_el_valor():
+    base = pd.DataFrame({'clave_a': [1], 'clave_b': ['a'], 'valor': [150000.0], 'observaciones': ['x']})
+    otro_valor = base.assign(valor=[150000.01])
+    otra_observacion = base.assign(observaciones=['y'])
+    sin_observacion = base.assign(observaciones=[None])
+    huellas = {_huellas(df)[0] for df in (base, otro_valor, otra_observacion, sin_observacion)}
+    assert len(huellas) == 4
+
+
+def test_huella_no_depende_del_bloque():
+    df = pd.DataFrame({'clave_a': [1, 2], 'clave_b': ['a', 'b'], 'valor': [10, 20.5], 'observaciones': ['x', 'y']})
+    assert _huellas(df) == _huellas(df.iloc[:1]) + _huellas(df.iloc[1:].reset_index(drop=True))
+
+
+PAGOS = ['Nombre', 'Identificacion', 'Enero 2024', 'febrero de 2024', 'ENE-2025', 'sept 2023', 'Jan/2022',
+         datetime(2021, 5, 31), 'Observaciones', 'Total 2024', 'Mayo', 'NIT. ENTIDAD']
+
+
+def test_encabezados_de_mes():
+    assert mapa_meses(PAGOS) == {
+        'Enero 2024': date(2024, 1, 1), 'febrero de 2024': date(2024, 2, 1), 'ENE-2025': date(2025, 1, 1),
+        'sept 2023': date(2023, 9, 1), 'Jan/2022': date(2022, 1, 1), datetime(2021, 5, 31): date(2021, 5, 1)}
+    assert mapa_meses(['Mar. 2024', 'DIC 2023', 'setiembre 2020', 'Diciembre']) == {
+        'Mar. 2024': date(2024, 3, 1), 'DIC 2023': date(2023, 12, 1), 'setiembre 2020': date(2020, 9, 1)}
+
+
+def test_pagos_a_formato_largo():
+    df = pd.DataFrame([
+        ['A', 111.0, 100, None, 0, '50', 1, 2, 'obs1', 999, 5, '800'],
+        ['B', 333, 7, 8, 9, 10, 11, 12, None, 1, 1, '800'],  # pensionado desconocido
+        ['C', '222', 'abc', 20, 0, 0, 0, 0, 'obs2', 1, 1, '800'],
+        ['A', 111, 300, None, None, None, None, None, 'obs3', 1, 1, '800'],  # repite enero de 111
+    ], columns=PAGOS)
+    salida = normalizar_pagos(df, {'111': 1, '222': 2})
+    assert list(salida.columns) == ['pensionado_id', 'fecha_pago', 'valor', 'observaciones']
+    # Celdas vacías, en cero o no numéricas se omiten; la última fila repetida gana por celda
+    assert sorted(salida.itertuples(index=False, name=None)) == [
+        (1, date(2021, 5, 1), 2.0, 'obs1'), (1, date(2022, 1, 1), 1.0, 'obs1'),
+        (1, date(2023, 9, 1), 50.0, 'obs1'), (1, date(2024, 1, 1), 300.0, 'obs3'),
+        (2, date(2024, 2, 1), 20.0, 'obs2')]
+
+
+def test_pagos_sin_meses_o_vacia():
+    assert normalizar_pagos(pd.DataFrame({'Identificacion': [111], 'Total': [5]}), {'111': 1}).empty
+    assert normalizar_pagos(pd.DataFrame(columns=['Identificacion', 'Enero 2024']), {'111': 1}).empty
+    sin_observaciones = pd.DataFrame({'Identificacion': [111], 'Enero 2024': [5]})
+    assert normalizar_pagos(sin_observaciones, {'111': 1})['observaciones'].isna().all()
+
+
+@pytest.fixture
+def libro(tmp_path):
+    wb = openpyxl.Workbook()
+    base = wb.active
+    base.title = 'a'
+    base.append(['Nombre', 'Identificacion', 'Res. No', 'Empresa', 'Reliqui', None, 'Consulta'])
+    for i in range(7):
+        base.append([f'P{i}', 1000 + i, f'R{i}', 'E', None, 'basura', f'C{i}'])
+    base.append([None] * 7)  # fila vacía entre los datos
+    base.append(['P7', 1007, 'R7'])  # fila corta: las columnas que faltan llegan vacías
+    pagos = wb.create_sheet('PAGOS')
+    pagos.append(['Nombre', 'Identificacion', 'Empresa', 'Enero 2024', 'Total', 'febrero 2024', 'Observaciones'])
+    for i in range(5):
+        pagos.append([f'P{i}', 1000 + i, 'E', 10 * (i + 1), 999, None if i % 2 else 5, f'o{i}'])
+    wb.create_sheet('DTF')
+    ruta = tmp_path / 'libro.xlsx'
+    wb.save(ruta)
+    abierto = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    yield abierto
+    abierto.close()
+
+
+def test_bloques_con_solo_las_columnas_pedidas(libro):
+    bloques = list(leer_hoja_por_bloques(libro, 'a', COLUMNAS_BASE, tam_bloque=3))
+    assert [len(b) for b in bloques] == [3, 3, 2]
+    assert all(list(b.columns) == ['Identificacion', 'Res. No', 'Reliqui', 'Consulta'] for b in bloques)
+    todo = pd.concat(bloques, ignore_index=True)
+    assert list(todo['Identificacion']) == list(range(1000, 1008))
+    assert todo.iloc[-1]['Res. No'] == 'R7' and todo.iloc[-1][['Reliqui', 'Consulta']].isna().all()
+
+
+def test_bloques_de_pagos_igual_que_la_hoja_completa(libro):
+    bloques = list(leer_hoja_por_bloques(libro, 'PAGOS', _columna_pagos, tam_bloque=2))
+    assert list(bloques[0].columns) == ['Identificacion', 'Enero 2024', 'febrero 2024', 'Observaciones']
+    ids = {str(1000 + i): i + 1 for i in range(5)}
+    por_bloques = pd.concat([normalizar_pagos(b, ids) for b in bloques], ignore_index=True)
+    completa = normalizar_pagos(pd.concat(bloques, ignore_index=True), ids).reset_index(drop=True)
+    assert sorted(por_bloques.itertuples(index=False, name=None)) == sorted(completa.itertuples(index=False, name=None))
+    assert len(completa) == 5 + 3
+
+
+def test_hoja_sin_encabezado(libro):
+    assert [b.empty for b in leer_hoja_por_bloques(libro, 'DTF', {'Fecha'})] == [True]
@@ -0,0 +1,67 @@
+"""Pruebas de la importación de archivos de pagos de los bancos (app/importer_pagos.py)."""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.importer_pagos import _fechas, _valores, leer_archivo_por_bloques, normalizar_archivo_pagos
+
+
+def test_valores_con_miles_y_decimales():
+    texto = pd.Series(['150.000', '1.234.567,89', '1,234,567.89', '150000', '150000,5', '150000.50', ' 1 500 ',
+                       '-2.000', '150.00', '1,234', '0'])
+    assert list(_valores(texto)) == [150000.0, 1234567.89, 1234567.89, 150000.0, 150000.5, 150000.5, 1500.0,
+                                     -2000.0, 150.0, 1234.0, 0.0]
+    # Sin formato reconocible queda en NaN: no se adivina
+    assert _valores(pd.Series(['1.5.0', '12,3456', 'abc', None, '1.234,567'])).isna().all()
+    assert list(_valores(pd.Series([1, 2]))) == [1.0, 2.0]
+
+
+def test_fechas_en_dos_formatos():
+    assert list(_fechas(pd.Series(['2024-01-31', ' 31/01/2024 ', '2024/01/31', '', None]))) == [
+        date(2024, 1, 31), date(2024, 1, 31), None, None, None]
+    assert list(_fechas(pd.Series(pd.to_datetime(['2024-02-29'])))) == [date(2024, 2, 29)]
+
+
+def test_csv_por_bloques_con_punto_y_coma(tmp_path):
+    ruta = tmp_path / 'pagos.csv'
+    ruta.write_text('Identificacion;Banco;FECHA;Valor\n'
+                    + ''.join(f'{1000 + i};B;2024-01-{i + 1:02d};1.500,{i:02d}\n' for i in range(5))
+                    + '0007;B;31/01/2024;NA\n', encoding='utf-8-sig')
+    bloques = list(leer_archivo_por_bloques(str(ruta), tam_bloque=2))
+    assert [len(b) for b in bloques] == [2, 2, 2]
+    assert all(list(b.columns) == ['identificacion', 'fecha', 'valor'] for b in bloques)
+    # Todo llega como texto: ceros a la izquierda y 'NA' no se pierden
+    assert bloques[-1].iloc[-1].tolist() == ['0007', '31/01/2024', 'NA']
+
+
+def test_formato_no_soportado(tmp_path):
+    with pytest.raises(ValueError, match='Formato no soportado'):
+        list(leer_archivo_por_bloques(str(tmp_path / 'pagos.xlsx')))
+
+
+def test_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    ruta = tmp_path / 'pagos.parquet'
+    pd.DataFrame({'Identificacion': ['1', '2', '3'], 'Fecha': pd.to_datetime(['2024-01-31'] * 3),
+                  'VALOR': [1.0, 2.0, 3.0], 'otra': [0, 0, 0]}).to_parquet(ruta)
+    bloques = list(leer_archivo_por_bloques(str(ruta), tam_bloque=2))
+    assert [list(b.columns) for b in bloques] == [['identificacion', 'fecha', 'valor']] * 2
+
+
+def test_normalizar_cuenta_y_descarta():
+    conteo = {'leidas': 0, 'desconocidos': 0, 'invalidas': 0, 'validas': 0}
+    df = pd.DataFrame({
+        'identificacion': ['111', '111.0', '999', '222', '222', '222', '111'],
+        'fecha': ['2024-01-31', '31/01/2024', '2024-01-31', 'ayer', '2024-02-29', '2024-02-29', '2024-03-31'],
+        'valor': ['100', '150.000', '5', '5', '0', '7,5', 'x'],
+        'observaciones': ['a', None, 'c', 'd', 'e', 'f' * 300, 'g'],
+    })
+    salida = normalizar_archivo_pagos(df, {'111': 1, '222': 2}, conteo)
+    assert conteo == {'leidas': 7, 'desconocidos': 1, 'invalidas': 3, 'validas': 3}
+    # La última fila repetida (mismo pensionado y fecha) gana; observaciones a 255 caracteres
+    assert [tuple(None if pd.isna(v) else v for v in f) for f in salida.itertuples(index=False, name=None)] == [
+        (1, date(2024, 1, 31), 150000.0, None), (2, date(2024, 2, 29), 7.5, 'f' * 255)]
+    with pytest.raises(ValueError, match='fecha, valor'):
+        normalizar_archivo_pagos(df[['identificacion']], {}, conteo)
@@ -0,0 +1,51 @@
+"""Pruebas de los metadatos incrustados en los PDFs (app/metadatos_pdf.py)."""
+
+import io
+from datetime import date
+
+import pytest
+from reportlab import rl_config
+from reportlab.pdfgen import canvas
+
+from app.metadatos_pdf import VERSION_METADATOS, incrustar_metadatos, leer_metadatos, metadatos_cuenta
+
+DATOS = {
+    'consecutivo': 1234, 'nit': 800103913, 'identificacion': 26489799,
+    'periodo_inicio': date(2024, 1, 1), 'periodo_fin': date(2024, 1, 31),
+    'total_capital': 520210.137, 'total_intereses': 1000, 'total': 521210.14,
+}
+
+
+def _pdf(cuentas) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(100, 700, 'Cuenta de cobro ÁÉÍÓÚ ñ')
+    if cuentas is not None:
+        incrustar_metadatos(c, cuentas)
+    c.save()
+    return buffer.getvalue()
+
+
+def test_metadatos_cuenta():
+    meta = metadatos_cuenta(DATOS, pagina=3)
+    assert meta == {
+        'consecutivo': 1234, 'nit': '800103913', 'identificacion': '26489799',
+        'periodo_inicio': '2024-01-01', 'periodo_fin': '2024-01-31',
+        'total_capital': 520210.14, 'total_intereses': 1000.0, 'total': 521210.14, 'pagina': 3,
+    }
+
+
+@pytest.mark.parametrize('a85', [0, 1])
+def test_ida_y_vuelta(monkeypatch, a85):
+    monkeypatch.setattr(rl_config, 'useA85', a85)
+    cuentas = [metadatos_cuenta(DATOS, pagina=1), metadatos_cuenta({**DATOS, 'consecutivo': 1235}, pagina=2)]
+    assert leer_metadatos(_pdf(cuentas)) == {'version': VERSION_METADATOS, 'cuentas': cuentas}
+
+
+def test_texto_no_ascii_en_metadatos():
+    cuentas = [{**metadatos_cuenta(DATOS), 'nombre': 'PEÑA MUÑOZ, JOSÉ'}]
+    assert leer_metadatos(_pdf(cuentas))['cuentas'] == cuentas
+
+
+def test_pdf_sin_metadatos():
+    assert leer_metadatos(_pdf(None)) is None
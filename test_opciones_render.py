@@ -0,0 +1,58 @@
+"""Pruebas de OpcionesRender: trabajos concurrentes sin estado global (generar_pdf_oficial)."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+import generar_pdf_oficial as gpo
+from app.metadatos_pdf import leer_metadatos
+
+PENSIONADO = (12345678, 'PEREZ GOMEZ, JUAN', 14, date(2008, 5, 1), 'ENTIDAD DE PRUEBA', 2302789.5, 0.2259, '800103913')
+
+
+def _cuentas(pensionado, fecha_corte):
+    cuentas = []
+    for i in range(3):
+        fecha = date(2025, 6 + i, 1)
+        cuentas.append({'año': fecha.year, 'mes': fecha.month, 'fecha_cuenta': fecha, 'capital': 1000.0,
+                        'capital_base': 1000.0, 'valor_cuota_periodo': 1000.0, 'interes': 10.0,
+                        'dias_interes': 30, 'dtf_interes': 9.5})
+    return cuentas
+
+
+@pytest.fixture(autouse=True)
+def sin_base_de_datos(monkeypatch):
+    # Cálculo y consecutivo sin MySQL: el consecutivo es el override del trabajo
+    monkeypatch.setattr(gpo, 'generar_cuentas_prescripcion', _cuentas)
+    monkeypatch.setattr(gpo, 'calcular_interes_mensual_unico', lambda capital, fecha, corte: 10.0)
+    monkeypatch.setattr(gpo, '_asignar_consecutivo', lambda *args: int(args[-1].consecutivo_override))
+
+
+def _trabajo(consecutivo: int, motor: str) -> tuple:
+    entregados = []
+    opciones = gpo.OpcionesRender(
+        consecutivo_override=consecutivo, motor=motor,
+        destino=lambda carpeta, nombre, contenido, meta: entregados.append((contenido, meta)) or nombre,
+    )
+    gpo.generar_pdf_para_pensionado(PENSIONADO, opciones=opciones)
+    return consecutivo, entregados
+
+
+def test_trabajos_concurrentes_no_comparten_opciones():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(_trabajo, range(100, 112), ['canvas', 'platypus'] * 6))
+    for consecutivo, entregados in resultados:
+        assert len(entregados) == 1
+        contenido, meta = entregados[0]
+        assert meta['consecutivo'] == consecutivo
+        assert leer_metadatos(contenido)['cuentas'][0]['consecutivo'] == consecutivo
+    assert gpo.CONSEC_OVERRIDE is None and gpo.CONSEC_CORRECCION is False
+
+
+def test_sin_opciones_usa_los_valores_del_modulo(monkeypatch, tmp_path):
+    monkeypatch.setattr(gpo, 'CONSEC_OVERRIDE', 555)
+    ruta = gpo.generar_pdf_para_pensionado(PENSIONADO, output_dir=str(tmp_path))
+    with open(ruta, 'rb') as f:
+        assert leer_metadatos(f.read())['cuentas'][0]['consecutivo'] == 555
+    assert ruta.startswith(str(tmp_path))
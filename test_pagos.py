@@ -0,0 +1,180 @@
+"""Pruebas del registro masivo y el historial de pagos (app/pagos.py) sobre SQLite."""
+
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import app.pagos as pagos
+from app.carga_masiva import insertar_filas
+
+FECHA = date(2024, 3, 15)
+
+# UPDATE ... JOIN de MySQL en la forma UPDATE ... FROM de SQLite (misma semántica)
+_ABONO_SQLITE = """
+    UPDATE pensionado SET
+        capital_pendiente = MAX(0, capital_pendiente - t.abono_capital),
+        intereses_pendientes = MAX(0, intereses_pendientes - t.abono_interes),
+        ultima_fecha_pago = ?
+    FROM tmp_abono t WHERE t.pensionado_id = pensionado.pensionado_id
+"""
+
+
+@pytest.fixture
+def session(monkeypatch):
+    sqlite3.register_adapter(Decimal, str)
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def _como_sqlite(conn, cursor, sql, params, ctx, many):
+        if 'JOIN tmp_abono' in sql:
+            return _ABONO_SQLITE, params
+        return sql, params
+
+    def _subir(s, nombre, columnas, df, clave=()):
+        s.execute(text(f"CREATE TEMP TABLE {nombre} ({', '.join(f'{c} {t}' for c, t in columnas.items())})"))
+        return insertar_filas(s, nombre, df[list(columnas)])
+
+    refrescos = []
+    monkeypatch.setattr(pagos, 'subir', _subir)
+    monkeypatch.setattr(pagos, 'refrescar_meses', lambda s, meses: refrescos.append(('meses', set(meses))))
+    monkeypatch.setattr(pagos, 'refrescar_cartera', lambda s, ids: refrescos.append(('cartera', set(ids))))
+    monkeypatch.setattr(pagos, 'reaplicar_pensionados', lambda s, ids: refrescos.append(('aplicacion', set(ids))))
+    s = sessionmaker(bind=engine, autoflush=False)()
+    s.execute(text("""
+        CREATE TABLE pensionado (
+            pensionado_id INTEGER PRIMARY KEY, identificacion VARCHAR(30), nombre VARCHAR(100),
+            nit_entidad VARCHAR(30), capital_pendiente DECIMAL(18,2), intereses_pendientes DECIMAL(18,2),
+            ultima_fecha_pago DATE
+        )
+    """))
+    s.execute(text("""
+        CREATE TABLE pago (
+            pago_id INTEGER PRIMARY KEY, pensionado_id INTEGER NOT NULL, nit_entidad VARCHAR(30),
+            fecha_pago DATE NOT NULL, valor DECIMAL(18,2) NOT NULL, capital DECIMAL(18,2),
+            interes DECIMAL(18,2), observaciones VARCHAR(255), fecha_creacion DATETIME
+        )
+    """))
+    s.execute(text(
+        "INSERT INTO pensionado (pensionado_id, identificacion, nombre, nit_entidad, capital_pendiente, "
+        "intereses_pendientes) VALUES (:id, :ident, :nombre, :nit, :capital, :interes)"
+    ), [
+        {"id": 1, "ident": '111', "nombre": 'PEREZ', "nit": '900', "capital": 100, "interes": 30},
+        {"id": 2, "ident": '222', "nombre": 'DIAZ', "nit": '900', "capital": 50, "interes": 0},
+        {"id": 3, "ident": '333', "nombre": 'GOMEZ', "nit": '800', "capital": 70, "interes": 7},
+    ])
+    s.commit()
+    s.refrescos = refrescos
+    yield s
+    s.close()
+
+
+def _saldos(session) -> dict:
+    return {f[0]: (Decimal(str(f[1])), Decimal(str(f[2])), f[3]) for f in session.execute(text(
+        "SELECT pensionado_id, capital_pendiente, intereses_pendientes, ultima_fecha_pago FROM pensionado"))}
+
+
+def test_pensionado_repetido_sobre_el_saldo_que_dejo_el_anterior(session):
+    resultado = pagos.registrar_pago_masivo(session, '900', FECHA, [
+        {'identificacion': 111, 'valor': 20},
+        {'identificacion': '222', 'valor': '25.50'},
+        {'identificacion': '111', 'valor': 50},
+        {'identificacion': '111', 'valor': 100},
+        {'identificacion': '111', 'valor': 0},
+        {'identificacion': '222', 'valor': -5},
+        {'identificacion': '222', 'valor': 'abc'},
+        {'identificacion': '999', 'valor': 10},
+        {'identificacion': '333', 'valor': 10},  # de otra entidad
+    ], observaciones='Banco X')
+    assert (resultado['pagos_exitosos'], resultado['pagos_fallidos'], resultado['total_procesado']) == (4, 5, 195.5)
+    assert [e.split(':')[0] for e in resultado['errores']] == [
+        'Identificación 111', 'Identificación 222', 'Identificación 222', 'Identificación 999', 'Identificación 333']
+    # Primero intereses, luego capital; el excedente sobre el saldo también es abono a capital
+    filas = session.execute(text(
+        "SELECT pensionado_id, valor, capital, interes, observaciones FROM pago ORDER BY pago_id")).fetchall()
+    assert [(f[0], Decimal(str(f[1])), Decimal(str(f[2])), Decimal(str(f[3]))) for f in filas] == [
+        (1, Decimal('20'), Decimal('0'), Decimal('20')),
+        (2, Decimal('25.5'), Decimal('25.5'), Decimal('0')),
+        (1, Decimal('50'), Decimal('40'), Decimal('10')),
+        (1, Decimal('100'), Decimal('100'), Decimal('0')),
+    ]
+    assert {f[4] for f in filas} == {'Banco X - Lote masivo'}
+    assert _saldos(session) == {
+        1: (Decimal('0'), Decimal('0'), str(FECHA)),
+        2: (Decimal('24.5'), Decimal('0'), str(FECHA)),
+        3: (Decimal('70'), Decimal('7'), None),
+    }
+    assert session.refrescos == [('meses', {('900', 2024, 3)}), ('cartera', {1, 2}), ('aplicacion', {1, 2})]
+
+
+def test_igual_que_uno_por_uno(session):
+    # Repartir en memoria da lo mismo que registrar los pagos de a uno sobre el saldo de la BD
+    lote = [(111, Decimal('12.34')), (111, Decimal('40')), (222, Decimal('60')), (111, Decimal('1'))]
+    esperado = []
+    capital, interes = {111: Decimal(100), 222: Decimal(50)}, {111: Decimal(30), 222: Decimal(0)}
+    for identificacion, valor in lote:
+        i, c = pagos.calcular_distribucion_pago(valor, capital[identificacion], interes[identificacion])
+        capital[identificacion] = max(Decimal(0), capital[identificacion] - c)
+        interes[identificacion] = max(Decimal(0), interes[identificacion] - i)
+        esperado.append((valor, c, i))
+    pagos.registrar_pago_masivo(session, '900', FECHA, [{'identificacion': i, 'valor': v} for i, v in lote])
+    filas = session.execute(text("SELECT valor, capital, interes FROM pago ORDER BY pago_id")).fetchall()
+    assert [tuple(Decimal(str(x)) for x in f) for f in filas] == esperado
+    saldos = _saldos(session)
+    assert (saldos[1][:2], saldos[2][:2]) == ((capital[111], interes[111]), (capital[222], interes[222]))
+
+
+def test_sin_pagos_validos_no_toca_nada(session):
+    resultado = pagos.registrar_pago_masivo(session, '900', FECHA, [{'identificacion': '111', 'valor': 0}])
+    assert resultado == {'pagos_exitosos': 0, 'pagos_fallidos': 1, 'total_procesado': 0.0,
+                         'errores': ['Identificación 111: Valor inválido']}
+    assert session.execute(text("SELECT COUNT(*) FROM pago")).scalar() == 0
+    assert session.refrescos == []
+
+
+@pytest.fixture
+def historial(session):
+    # Varios pagos el mismo día: el cursor desempata por pago_id
+    fechas = [date(2024, 1, 5)] * 4 + [date(2024, 2, 1), date(2024, 2, 20)] * 3 + [date(2024, 3, 1)] * 2
+    session.execute(text(
+        "INSERT INTO pago (pensionado_id, nit_entidad, fecha_pago, valor) VALUES (:p, :nit, :f, :v)"
+    ), [{"p": 3 if i % 5 == 4 else 1 + i % 2, "nit": '800' if i % 5 == 4 else '900', "f": f, "v": 10 + i}
+        for i, f in enumerate(fechas)])
+    session.commit()
+    return session
+
+
+def _paginas(session, limite: int, **filtros) -> list:
+    paginas, cursor = [], None
+    while True:
+        pagina = pagos.obtener_historial_pagos(session, limite=limite, despues_de=cursor, **filtros)
+        if not pagina:
+            return paginas
+        paginas.append([p['pago_id'] for p in pagina])
+        cursor = pagos.cursor_historial(pagina)
+
+
+def _esperado(session, condicion: str = "1 = 1", **params) -> list:
+    return list(session.execute(text(
+        f"SELECT pago_id FROM pago WHERE {condicion} ORDER BY fecha_pago DESC, pago_id DESC"), params).scalars())
+
+
+def test_keyset_recorre_todo_sin_repetir(historial):
+    paginas = _paginas(historial, 3)
+    assert [len(p) for p in paginas] == [3, 3, 3, 3]
+    assert sum(paginas, []) == _esperado(historial)
+    assert pagos.cursor_historial([]) is None
+
+
+def test_keyset_con_filtros(historial):
+    por_entidad = _paginas(historial, 2, entidad_nit='900')
+    assert sum(por_entidad, []) == _esperado(historial, "nit_entidad = '900'")
+    por_pensionado = _paginas(historial, 2, pensionado_id=1, fecha_desde=date(2024, 1, 6),
+                              fecha_hasta=date(2024, 2, 28))
+    assert sum(por_pensionado, []) == _esperado(
+        historial, "pensionado_id = 1 AND fecha_pago BETWEEN '2024-01-06' AND '2024-02-28'")
+    primera = pagos.obtener_historial_pagos(historial, entidad_nit='900', limite=1)[0]
+    assert (primera['pago_id'], primera['identificacion'], primera['nombre']) == (12, '222', 'DIAZ')
@@ -0,0 +1,87 @@
+"""Pruebas del ZIP parcial por pensionado y año (app/paquete_entidad.py)."""
+
+import io
+import json
+import zipfile
+from datetime import date
+
+import pytest
+
+import app.pdf_cache as pdf_cache
+import generar_pdf_oficial as gpo
+from app.metadatos_pdf import leer_metadatos
+from app.paquete_entidad import filtrar_cuentas, generar_zip_parcial
+
+FECHA = date(2025, 8, 31)
+
+
+def _entidad() -> list:
+    todas = []
+    for cedula, nombre in (('111', 'PEREZ GOMEZ, ANA'), ('222', 'DIAZ LOPEZ, LUIS')):
+        cuentas = [{'año': a, 'mes': m, 'capital_total': 100.0, 'intereses': 1.0}
+                   for a, m in ((2024, 11), (2024, 12), (2025, 1), (2025, 2))]
+        todas.append({'pensionado': {'cedula': cedula, 'nombre': nombre, 'mesadas': 14,
+                                     'base_calculo_cuota': 1000.0, 'porcentaje_cuota': 0.1},
+                      'cuentas': cuentas})
+    return todas
+
+
+def test_filtrar_cuentas_rehace_totales():
+    todas = _entidad()
+    sub = filtrar_cuentas(todas, identificaciones=[111], años=[2025])
+    assert [p['pensionado']['cedula'] for p in sub] == ['111']
+    assert [(c['año'], c['mes']) for c in sub[0]['cuentas']] == [(2025, 1), (2025, 2)]
+    assert sub[0]['cuentas'][0] is todas[0]['cuentas'][2]
+    assert (sub[0]['total_capital'], sub[0]['total_intereses'], sub[0]['total_pensionado']) == (200.0, 2.0, 202.0)
+    assert filtrar_cuentas(todas, meses=[12]) == [
+        {**p, 'cuentas': [p['cuentas'][1]], 'total_capital': 100.0, 'total_intereses': 1.0, 'total_pensionado': 101.0}
+        for p in todas]
+    assert filtrar_cuentas(todas, años=[2019]) == []
+
+
+@pytest.fixture
+def emitidas(monkeypatch, tmp_path):
+    """Render real sin MySQL; registra las opciones con que se pidió cada consecutivo."""
+    llamadas = []
+
+    def _cuenta_mes(pensionado, año, mes, fecha_corte, num_meses=None):
+        return [{'año': año, 'mes': mes, 'fecha_cuenta': date(año, mes, 1), 'capital': 100.0,
+                 'valor_cuota_periodo': 100.0, 'interes': 1.0, 'dias_interes': 30, 'dtf_interes': 9.5}]
+
+    def _consecutivo(pensionado, nit, inicio, fin, *args):
+        opciones = args[-1]
+        llamadas.append((str(pensionado[0]), inicio, opciones.reimpresion, opciones.correccion))
+        return 1000 + len(llamadas)
+
+    monkeypatch.setattr(gpo, 'generar_cuentas_prescripcion_custom', _cuenta_mes)
+    monkeypatch.setattr(gpo, 'obtener_dtf_mes', lambda año, mes: 9.5)
+    monkeypatch.setattr(gpo, 'calcular_interes_mensual_unico', lambda capital, fecha, corte: 1.0)
+    monkeypatch.setattr(gpo, '_asignar_consecutivo', _consecutivo)
+    monkeypatch.setattr(pdf_cache, 'PDF_CACHE_DIR', str(tmp_path / 'cache'))
+    return llamadas
+
+
+def test_zip_parcial_solo_el_subconjunto(emitidas):
+    estadisticas = {}
+    contenido, nombre = generar_zip_parcial('900', 'Entidad Prueba', FECHA, identificaciones=['111'], años=[2025],
+                                            todas_las_cuentas=_entidad(), motor='canvas', estadisticas=estadisticas)
+    assert nombre == 'LIQUIDACION_PARCIAL_900_111_2025_20250831.zip'
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        nombres = zf.namelist()
+        pdfs = [n for n in nombres if n.endswith('.pdf')]
+        assert pdfs == ['Entidad_Prueba_900/Perez_Gomez_111/2025/111_Enero_2025.pdf',
+                        'Entidad_Prueba_900/Perez_Gomez_111/2025/111_Febrero_2025.pdf']
+        assert nombres == ['Entidad_Prueba_900/README.txt'] + pdfs + ['Entidad_Prueba_900/MANIFEST.json']
+        assert [leer_metadatos(zf.read(n))['cuentas'][0]['consecutivo'] for n in pdfs] == [1001, 1002]
+        manifiesto = json.loads(zf.read('Entidad_Prueba_900/MANIFEST.json'))
+        assert manifiesto['entidad']['cuentas'] == 2
+    # Por defecto reimprime: no corrige ni toca las cuentas ya emitidas
+    assert emitidas == [('111', date(2025, 1, 1), True, False), ('111', date(2025, 2, 1), True, False)]
+    assert estadisticas['pdfs'] == 2 and estadisticas['errores'] == 0
+
+
+def test_zip_parcial_con_correccion(emitidas):
+    generar_zip_parcial('900', 'Entidad Prueba', FECHA, meses=[12], todas_las_cuentas=_entidad(),
+                        corregir_existentes=True)
+    assert [(c[0], c[1]) for c in emitidas] == [('111', date(2024, 12, 1)), ('222', date(2024, 12, 1))]
+    assert all(not reimpresion and correccion for _, _, reimpresion, correccion in emitidas)
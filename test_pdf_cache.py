@@ -0,0 +1,68 @@
+"""Pruebas de la caché de PDFs (app/pdf_cache.py)."""
+
+import io
+import os
+from datetime import date
+from decimal import Decimal
+
+from reportlab import rl_config
+
+import generar_pdf_oficial as gpo
+from app.pdf_cache import CachePDF
+
+DATOS = {'identificacion': '111', 'periodo': date(2024, 1, 1), 'capital': Decimal('100.10')}
+
+
+def test_clave_depende_de_la_codificacion_de_reportlab(monkeypatch):
+    monkeypatch.setattr(rl_config, 'useA85', 1)
+    con_a85 = CachePDF.clave(1, 'canvas', DATOS)
+    assert CachePDF.clave(1, 'canvas', dict(DATOS)) == con_a85
+    monkeypatch.setattr(rl_config, 'useA85', 0)
+    assert CachePDF.clave(1, 'canvas', DATOS) != con_a85
+
+
+def _datos_cuenta(consecutivo: int) -> dict:
+    filas = [('Enero-2025', 1000.0, 31, 9.5, 10.0, 1000.0)]
+    return {
+        'consecutivo': consecutivo, 'entidad': 'ENTIDAD DE PRUEBA', 'nit': '800103913',
+        'periodo_texto': 'ENERO DEL 2025 A ENERO DEL 2025', 'nombre': 'PEREZ, ANA', 'identificacion': '111',
+        'total_capital': 1000.0, 'total_intereses': 10.0, 'total': 1010.0,
+        'filas': filas, 'suma_intereses_columna': 10.0, 'capital_total': 1000.0,
+    }
+
+
+def test_acierto_copia_el_pdf_sin_renderizar(monkeypatch, tmp_path):
+    renders = []
+    original = gpo._renderizar_cuenta_cobro
+
+    def contar(datos, salida, motor='platypus', plantillas=None):
+        renders.append(datos['consecutivo'])
+        original(datos, salida, motor, plantillas)
+
+    monkeypatch.setattr(gpo, '_renderizar_cuenta_cobro', contar)
+    opciones = gpo.OpcionesRender(motor='canvas', cache=CachePDF(str(tmp_path / 'cache')))
+    primero = io.BytesIO()
+    gpo._generar_cuenta_cobro(_datos_cuenta(1), primero, opciones)
+    segundo = io.BytesIO()
+    gpo._generar_cuenta_cobro(_datos_cuenta(1), segundo, opciones)
+    en_disco = tmp_path / 'cuenta.pdf'
+    gpo._generar_cuenta_cobro(_datos_cuenta(1), str(en_disco), opciones)
+    assert renders == [1]
+    assert segundo.getvalue() == primero.getvalue() == en_disco.read_bytes()
+    assert (opciones.cache.aciertos, opciones.cache.fallos) == (2, 1)
+
+    # Otros datos u otro motor: otra clave
+    gpo._generar_cuenta_cobro(_datos_cuenta(2), io.BytesIO(), opciones)
+    otro_motor = gpo.OpcionesRender(motor='platypus', cache=opciones.cache)
+    gpo._generar_cuenta_cobro(_datos_cuenta(1), io.BytesIO(), otro_motor)
+    assert renders == [1, 2, 1]
+
+
+def test_desaloja_los_menos_usados(tmp_path):
+    cache = CachePDF(str(tmp_path / 'cache'), max_bytes=2500)
+    for i in range(3):
+        cache.guardar(f'{i:02d}' * 32, b'x' * 1000)
+        os.utime(cache._ruta(f'{i:02d}' * 32), (i, i))
+    assert not cache.copiar_a('00' * 32, str(tmp_path / 'a.pdf'))
+    assert cache.copiar_a('02' * 32, str(tmp_path / 'b.pdf'))
+    assert sum(tam for _, tam, _ in cache._archivos()) <= 2500
@@ -0,0 +1,58 @@
+"""Pruebas del PDF único por entidad para imprenta (app/pdf_fusionado.py)."""
+
+import io
+import re
+
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from app.contexto_render import obtener_contexto
+from app.metadatos_pdf import leer_metadatos
+from app.pdf_fusionado import PDFFusionado
+from generar_pdf_oficial import MESES_MINUSCULA, _respaldo_fusionado
+
+
+def _datos(consecutivo: int, identificacion: str, nombre: str, año: int, meses: int = 6) -> dict:
+    filas = [(f"{MESES_MINUSCULA[i % 12].capitalize()}-{año + i // 12}", 1000.0, 30, 9.5, 10.0, 1000.0)
+             for i in range(meses)]
+    return {
+        'consecutivo': consecutivo, 'entidad': 'ENTIDAD DE PRUEBA', 'nit': '800103913',
+        'periodo_texto': f'ENERO DEL {año} A JUNIO DEL {año}', 'nombre': nombre, 'identificacion': identificacion,
+        'total_capital': 1000.0, 'total_intereses': 10.0 * meses, 'total': 1000.0 + 10.0 * meses,
+        'filas': filas, 'suma_intereses_columna': 10.0 * meses, 'capital_total': 1000.0,
+    }
+
+
+def _fusionado() -> tuple:
+    buffer = io.BytesIO()
+    fusionado = PDFFusionado(buffer, titulo='Cuentas de cobro ENTIDAD DE PRUEBA')
+    estilo = obtener_contexto().styles['Normal']
+    fusionado.construir(SimpleDocTemplate(None), [Paragraph('Portada consolidada', estilo)], marcador='Consolidado')
+    paginas = [
+        fusionado.agregar_cuenta(_datos(1, '111', 'PEREZ, ANA', 2023), 2023, respaldo=_respaldo_fusionado),
+        fusionado.agregar_cuenta(_datos(2, '111', 'PEREZ, ANA', 2024), 2024, respaldo=_respaldo_fusionado),
+        # No cabe en una página del motor canvas: la construye platypus sobre el mismo canvas
+        fusionado.agregar_cuenta(_datos(3, '222', 'GOMEZ, LUIS', 2015, meses=120), 2015, respaldo=_respaldo_fusionado),
+        fusionado.agregar_cuenta(_datos(4, '333', 'DIAZ, EVA', 2024), 2024, respaldo=_respaldo_fusionado),
+    ]
+    fusionado.cerrar()
+    return buffer.getvalue(), paginas, fusionado
+
+
+def test_un_documento_con_todas_las_cuentas():
+    pdf, paginas, fusionado = _fusionado()
+    assert fusionado.cuentas == 4
+    # Portada en la página 1; la cuenta larga ocupa varias páginas
+    assert paginas[:2] == [2, 3]
+    assert paginas[3] - paginas[2] > 1
+    assert pdf.count(b'/Type /Page\n') == paginas[3]
+    meta = leer_metadatos(pdf)
+    assert [(c['consecutivo'], c['pagina']) for c in meta['cuentas']] == list(zip([1, 2, 3, 4], paginas))
+
+
+def test_marcadores_por_pensionado_y_año():
+    pdf, _, _ = _fusionado()
+    titulos = [re.sub(rb'\\(.)', rb'\1', t).decode('latin-1')
+               for t in re.findall(rb'/Title \(((?:\\.|[^\\)])*)\)', pdf)]
+    assert titulos[0] == 'Cuentas de cobro ENTIDAD DE PRUEBA'
+    assert titulos[1:] == ['Consolidado', 'PEREZ, ANA (111)', '2023', '2024',
+                           'GOMEZ, LUIS (222)', '2015', 'DIAZ, EVA (333)', '2024']
@@ -0,0 +1,103 @@
+"""Pruebas del listado por páginas con subtotales (app/pdf_paginado.py)."""
+
+import io
+from datetime import date
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate
+
+from app import contadores
+from app.contexto_render import obtener_contexto
+from app.paquete_entidad import escribir_pdf_consolidado
+from app.pdf_paginado import FlowablesPerezosos, tablas_por_pagina
+
+CABECERA = ['Cédula', 'Nombre', 'Capital', 'Intereses', 'Total']
+ANCHOS = [80, 200, 90, 90, 90]
+
+
+def _filas(n: int):
+    for i in range(n):
+        capital, intereses = 1000.0 + i, 10.0 + i % 7
+        yield [str(i), f'PENSIONADO {i}', f"{capital:,.0f}", f"{intereses:,.0f}", f"{capital + intereses:,.0f}"], \
+            (capital, intereses, capital + intereses)
+
+
+def _fila_totales(etiqueta, sumas):
+    return ['', etiqueta] + [f"{v:,.0f}" for v in sumas]
+
+
+def _tablas(n: int, alto=600.0) -> list:
+    est = obtener_contexto().consolidado_memoria
+    return list(tablas_por_pagina(CABECERA, _filas(n), _fila_totales, 3, ANCHOS, est.tabla_pensionados,
+                                  est.tabla_pensionados_subtotales, alto - 200, alto))
+
+
+def _numero(celda: str) -> float:
+    return float(celda.replace(',', ''))
+
+
+def test_subtotales_y_acumulado_por_pagina():
+    flowables = _tablas(250)
+    tablas = flowables[::2]
+    assert all(isinstance(f, PageBreak) for f in flowables[1::2])
+    assert len(tablas) > 3
+    acumulado = [0.0, 0.0, 0.0]
+    vistas = 0
+    for n, tabla in enumerate(tablas):
+        filas = tabla._cellvalues
+        assert filas[0] == CABECERA
+        cuerpo, subtotal, van = filas[1:-2], filas[-2], filas[-1]
+        vistas += len(cuerpo)
+        assert subtotal[1] == 'Subtotal'
+        assert van[1] == ('TOTAL' if n == len(tablas) - 1 else 'Van')
+        for j in range(3):
+            suma = sum(_numero(f[2 + j]) for f in cuerpo)
+            assert _numero(subtotal[2 + j]) == suma
+            acumulado[j] += suma
+            assert _numero(van[2 + j]) == acumulado[j]
+        # Cada tabla cabe en su página (la primera en el espacio que deja el encabezado)
+        _, alto = tabla.wrap(sum(ANCHOS), 600)
+        assert alto <= (400 if n == 0 else 600)
+    assert vistas == 250
+
+
+def test_una_pagina_solo_total():
+    flowables = _tablas(5)
+    assert len(flowables) == 1
+    filas = flowables[0]._cellvalues
+    assert len(filas) == 1 + 5 + 1 and filas[-1][1] == 'TOTAL'
+
+
+def test_sin_filas():
+    flowables = _tablas(0)
+    assert [f[1] for f in flowables[0]._cellvalues[1:]] == ['TOTAL']
+
+
+def test_story_perezoso_no_se_carga_completo():
+    en_memoria = []
+    estilo = obtener_contexto().consolidado_memoria.normal
+
+    def story():
+        for i in range(400):
+            en_memoria.append(len(perezosos._buffer))
+            yield Paragraph(f'Renglón {i}', estilo)
+
+    perezosos = FlowablesPerezosos(story())
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(perezosos)
+    assert len(en_memoria) == 400
+    assert max(en_memoria) <= 2
+    assert buffer.getvalue().count(b'/Type /Page\n') > 1
+
+
+def test_consolidado_de_entidad_grande(monkeypatch):
+    monkeypatch.setattr(contadores, 'siguiente', lambda nombre, session=None: 424)
+    cuentas = [{
+        'pensionado': {'cedula': 1000 + i, 'nombre': f'PENSIONADO {i}', 'porcentaje_cuota': 0.2,
+                       'base_calculo_cuota': 1000.0},
+        'cuentas': [{'capital_total': 100.0, 'intereses': 1.0}],
+    } for i in range(300)]
+    buffer = io.BytesIO()
+    nombre = escribir_pdf_consolidado(buffer, '800103913', 'ENTIDAD DE PRUEBA', cuentas, date(2025, 8, 31), anexo=False)
+    assert '800103913' in nombre
+    assert buffer.getvalue().count(b'/Type /Page\n') > 3
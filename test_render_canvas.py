@@ -0,0 +1,107 @@
+"""Pruebas del motor canvas de la cuenta de cobro (app/render_canvas.py)."""
+
+import io
+import re
+import zlib
+from collections import Counter
+
+import pytest
+from reportlab import rl_config
+
+from app.contexto_render import obtener_contexto
+from app.pdf_fusionado import PDFFusionado
+from app.render_canvas import PlantillasCuentaCobro, cuenta_cobro_cabe_en_canvas
+from generar_pdf_oficial import MESES_MINUSCULA, _renderizar_cuenta_cobro
+
+
+def _datos(consecutivo=7, meses=30, nombre='PEREZ GOMEZ, JUAN') -> dict:
+    filas = []
+    for i in range(meses):
+        mes = (2 + i) % 12
+        año = 2023 + (2 + i) // 12
+        filas.append((f"{MESES_MINUSCULA[mes].capitalize()}-{año}", 645428.57, 30, 10.5, 4500.0 + i, 645428.57))
+    intereses = sum(f[4] for f in filas)
+    return {
+        'consecutivo': consecutivo,
+        'entidad': 'ENTIDAD DE PRUEBA',
+        'nit': '800103913',
+        'periodo_texto': 'MARZO DEL 2023 A AGOSTO DEL 2025',
+        'nombre': nombre,
+        'identificacion': '12345678',
+        'total_capital': 645428.57,
+        'total_intereses': intereses,
+        'total': 645428.57 + intereses,
+        'filas': filas,
+        'suma_intereses_columna': intereses,
+        'capital_total': 645428.57,
+    }
+
+
+@pytest.fixture(autouse=True)
+def sin_ascii85(monkeypatch):
+    # Flujos solo con Flate: se descomprimen con zlib para leer el texto
+    monkeypatch.setattr(rl_config, 'useA85', 0)
+
+
+def _flujos(pdf: bytes) -> list:
+    flujos = []
+    for m in re.finditer(rb'stream\r?\n(.*?)endstream', pdf, re.S):
+        try:
+            flujos.append(zlib.decompressobj().decompress(m.group(1)))
+        except zlib.error:
+            pass
+    return flujos
+
+
+def _palabras(pdf: bytes) -> Counter:
+    """Palabras de todos los operadores Tj del PDF (páginas y forms), sin importar el orden."""
+    partes = [t.decode('latin-1') for f in _flujos(pdf) for t in re.findall(rb'\(((?:\\.|[^\\)])*)\)\s*Tj', f)]
+    texto = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), ' '.join(partes))
+    texto = re.sub(r'\\(.)', r'\1', texto)
+    return Counter(texto.replace('\xa0', ' ').split())
+
+
+def _render(datos, motor, plantillas=None) -> bytes:
+    buffer = io.BytesIO()
+    _renderizar_cuenta_cobro(datos, buffer, motor, plantillas)
+    return buffer.getvalue()
+
+
+def test_canvas_mismo_texto_que_platypus():
+    datos = _datos()
+    datos['sustituto_nombre'] = 'GOMEZ, ANA'
+    datos['sustituto_identificacion'] = '87654321'
+    canvas_pdf = _render(datos, 'canvas')
+    assert b'/Subtype /Form' not in canvas_pdf
+    assert _palabras(canvas_pdf) == _palabras(_render(datos, 'platypus'))
+
+
+def test_cuenta_larga_queda_en_platypus():
+    ctx = obtener_contexto()
+    assert cuenta_cobro_cabe_en_canvas(_datos(), ctx)
+    larga = _datos(meses=120)
+    assert not cuenta_cobro_cabe_en_canvas(larga, ctx)
+    pdf = _render(larga, 'canvas')
+    assert pdf.count(b'/Type /Page\n') > 1
+    assert _palabras(pdf) == _palabras(_render(larga, 'platypus'))
+
+
+def test_plantilla_mismo_texto_que_platypus():
+    plantillas = PlantillasCuentaCobro(obtener_contexto())
+    for datos in (_datos(7), _datos(8, nombre='GOMEZ, ANA')):
+        pdf = _render(datos, 'canvas', plantillas)
+        assert b'/Subtype /Form' in pdf
+        assert _palabras(pdf) == _palabras(_render(datos, 'platypus'))
+
+
+def test_plantilla_se_escribe_una_vez_por_archivo():
+    buffer = io.BytesIO()
+    fusionado = PDFFusionado(buffer)
+    for i in range(3):
+        fusionado.agregar_cuenta(_datos(10 + i), 2023)
+    fusionado.cerrar()
+    pdf = buffer.getvalue()
+    assert pdf.count(b'/Subtype /Form') == 1
+    assert sum(len(re.findall(rb'/FormXob\.\w+ Do', f)) for f in _flujos(pdf)) == 3
+    for i in range(3):
+        assert _palabras(pdf)[f'{10 + i}'] == 1
@@ -0,0 +1,144 @@
+"""Pruebas de resumen_entidad (app/resumen_pagos.py): meses completos desde
+pago_resumen_mensual y extremos parciales desde pago, contra una SQLite en memoria."""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import app.resumen_pagos as rp
+from app.models import Base, PagoResumenMensual, PagoResumenPensionado
+
+PAGOS = [
+    # (pago_id, pensionado_id, nit_entidad, fecha_pago, valor)
+    (1, 1, '900', date(2024, 1, 10), 100),
+    (2, 2, '900', date(2024, 1, 31), 50),
+    (3, 1, '900', date(2024, 2, 15), 30),
+    (4, 3, '900', date(2024, 3, 1), 20),
+    (5, 1, '900', date(2024, 3, 20), 10),
+    (6, 2, '900', date(2024, 4, 30), 5),
+    (7, 9, '800', date(2024, 2, 15), 999),
+]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'connect')
+    def _funciones_mysql(conexion, _):
+        conexion.create_function('YEAR', 1, lambda f: int(f[:4]))
+        conexion.create_function('MONTH', 1, lambda f: int(f[5:7]))
+
+    Base.metadata.create_all(engine, tables=[PagoResumenMensual.__table__, PagoResumenPensionado.__table__])
+    s = sessionmaker(bind=engine)()
+    s.execute(text("""
+        CREATE TABLE pago (
+            pago_id INTEGER PRIMARY KEY, pensionado_id INTEGER NOT NULL, nit_entidad VARCHAR(30),
+            fecha_pago DATE NOT NULL, valor DECIMAL(18,2) NOT NULL, capital DECIMAL(18,2), interes DECIMAL(18,2)
+        )
+    """))
+    s.execute(text("""
+        INSERT INTO pago (pago_id, pensionado_id, nit_entidad, fecha_pago, valor, capital, interes)
+        VALUES (:pago_id, :pensionado_id, :nit, :fecha, :valor, :valor, 0)
+    """), [dict(zip(('pago_id', 'pensionado_id', 'nit', 'fecha', 'valor'), p)) for p in PAGOS])
+    rp.refrescar_meses(s, [rp.mes_de(p[2], p[3]) for p in PAGOS])
+    s.commit()
+    yield s
+    s.close()
+
+
+def _esperado(desde, hasta):
+    pagos = [p for p in PAGOS if p[2] == '900' and (desde is None or p[3] >= desde) and (hasta is None or p[3] <= hasta)]
+    return {
+        'total_pagos': len(pagos),
+        'total_valor': sum(p[4] for p in pagos),
+        'fecha_primer_pago': min((p[3] for p in pagos), default=None),
+        'fecha_ultimo_pago': max((p[3] for p in pagos), default=None),
+    }
+
+
+RANGOS = [
+    (None, None),
+    (date(2024, 1, 1), date(2024, 3, 31)),   # meses completos
+    (date(2024, 1, 31), date(2024, 3, 1)),   # extremos parciales de un día
+    (date(2024, 1, 11), date(2024, 4, 29)),  # extremos parciales que dejan pagos fuera
+    (date(2024, 1, 5), date(2024, 1, 20)),   # dentro de un solo mes
+    (date(2024, 2, 1), date(2024, 2, 29)),   # un mes completo (bisiesto)
+    (date(2024, 2, 16), None),
+    (None, date(2024, 2, 14)),
+    (date(2024, 5, 1), date(2024, 12, 31)),  # sin pagos
+]
+
+
+@pytest.mark.parametrize('desde,hasta', RANGOS)
+def test_totales_como_si_se_sumara_pago(session, desde, hasta):
+    resumen = rp.resumen_entidad(session, '900', desde, hasta)
+    assert {k: resumen[k] for k in _esperado(desde, hasta)} == _esperado(desde, hasta)
+
+
+def test_todos_los_rangos_de_un_trimestre(session):
+    dias = [date(2024, 1, 1) + timedelta(days=i) for i in range(0, 121, 4)]
+    for desde in dias:
+        for hasta in dias:
+            if desde <= hasta:
+                resumen = rp.resumen_entidad(session, '900', desde, hasta)
+                assert resumen['total_pagos'] == _esperado(desde, hasta)['total_pagos'], (desde, hasta)
+                assert resumen['total_valor'] == _esperado(desde, hasta)['total_valor'], (desde, hasta)
+
+
+def _pensionados(desde, hasta):
+    return len({p[1] for p in PAGOS if p[2] == '900' and (desde is None or p[3] >= desde)
+                and (hasta is None or p[3] <= hasta)})
+
+
+@pytest.mark.parametrize('desde,hasta', RANGOS)
+def test_pensionados_exactos(session, desde, hasta):
+    assert rp.resumen_entidad(session, '900', desde, hasta)['pensionados_pagaron'] == _pensionados(desde, hasta)
+
+
+def test_pensionados_de_todos_los_rangos_de_un_trimestre(session):
+    dias = [date(2024, 1, 1) + timedelta(days=i) for i in range(0, 121, 6)]
+    for desde in dias:
+        for hasta in dias:
+            if desde <= hasta:
+                assert (rp.resumen_entidad(session, '900', desde, hasta)['pensionados_pagaron']
+                        == _pensionados(desde, hasta)), (desde, hasta)
+
+
+def test_rango_abierto_no_cuenta_en_pago(session):
+    consultas = []
+    listener = lambda *a: consultas.append(a[2])
+    event.listen(session.get_bind(), 'before_cursor_execute', listener)
+    try:
+        assert rp.resumen_entidad(session, '900')['pensionados_pagaron'] == 3
+        assert rp.resumen_entidad(session, '900', date(2024, 3, 2))['pensionados_pagaron'] == 2
+    finally:
+        event.remove(session.get_bind(), 'before_cursor_execute', listener)
+    assert not [c for c in consultas if 'COUNT(DISTINCT' in c]
+
+
+def test_pensionados_de_un_mes_completo(session):
+    assert rp.resumen_entidad(session, '900', date(2024, 1, 1), date(2024, 1, 31))['pensionados_pagaron'] == 2
+    assert rp.resumen_entidad(session, '900', date(2024, 3, 1), date(2024, 3, 31))['pensionados_pagaron'] == 2
+
+
+def test_refrescar_un_mes_tras_borrar_un_pago(session):
+    session.execute(text("DELETE FROM pago WHERE pago_id = 2"))
+    rp.refrescar_meses(session, [rp.mes_de('900', date(2024, 1, 31))])
+    resumen = rp.resumen_entidad(session, '900', date(2024, 1, 1), date(2024, 1, 31))
+    assert (resumen['total_pagos'], resumen['total_valor'], resumen['fecha_ultimo_pago']) == (1, 100, date(2024, 1, 10))
+    # El pensionado 2 conserva su pago de abril; el 1 no cambia
+    assert rp.resumen_entidad(session, '900', None, date(2024, 1, 31))['pensionados_pagaron'] == 1
+    assert rp.resumen_entidad(session, '900')['pensionados_pagaron'] == 3
+    session.execute(text("DELETE FROM pago WHERE pago_id = 6"))
+    rp.refrescar_meses(session, [rp.mes_de('900', date(2024, 4, 30))])
+    assert rp.resumen_entidad(session, '900')['pensionados_pagaron'] == 2
+
+
+def test_reconstruir_igual_que_refrescar(session):
+    antes = session.execute(text("SELECT * FROM pago_resumen_pensionado ORDER BY 1, 2")).fetchall()
+    rp.reconstruir_resumen(session)
+    despues = session.execute(text("SELECT * FROM pago_resumen_pensionado ORDER BY 1, 2")).fetchall()
+    assert [f[:4] for f in antes] == [f[:4] for f in despues]
@@ -0,0 +1,123 @@
+"""Pruebas de la cola de trabajos en segundo plano (app/trabajos.py) sobre SQLite."""
+
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.trabajos as trabajos
+from app.models import Base, Trabajo
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'trabajos.db'}")
+    Base.metadata.create_all(engine, tables=[Trabajo.__table__])
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(trabajos, 'get_session', fabrica)
+    return fabrica
+
+
+def _registrar(monkeypatch, funcion):
+    monkeypatch.setitem(trabajos.TIPOS, 'prueba', funcion)
+    return trabajos.encolar('prueba', {'nit': '900', 'fecha_corte': date(2025, 8, 31)})
+
+
+def test_tipo_desconocido(cola):
+    with pytest.raises(ValueError):
+        trabajos.encolar('no_existe', {})
+
+
+def test_ejecuta_y_termina(cola, monkeypatch, tmp_path):
+    vistos = []
+
+    def _prueba(p, avance):
+        vistos.append(p)
+        for i in range(3):
+            avance(i + 1, 3, f'Paso {i + 1}')
+        ruta = tmp_path / f"resultado_{p['trabajo_id']}.txt"
+        ruta.write_text('ok')
+        return str(ruta)
+
+    trabajo_id = _registrar(monkeypatch, _prueba)
+    assert trabajos.obtener(trabajo_id)['estado'] == trabajos.PENDIENTE
+    trabajo = trabajos._tomar_siguiente('w1')
+    assert trabajo.trabajo_id == trabajo_id
+    # Ya tomado: otro trabajador no lo recibe
+    assert trabajos._tomar_siguiente('w2') is None
+    trabajos.ejecutar(trabajo)
+    t = trabajos.obtener(trabajo_id)
+    assert (t['estado'], t['hechas'], t['total'], t['trabajador']) == (trabajos.TERMINADO, 3, 3, 'w1')
+    assert t['resultado_ruta'].endswith(f'resultado_{trabajo_id}.txt')
+    assert vistos == [{'nit': '900', 'fecha_corte': '2025-08-31', 'trabajo_id': trabajo_id}]
+
+
+def test_falla_y_se_reintenta(cola, monkeypatch):
+    intentos = []
+
+    def _prueba(p, avance):
+        intentos.append(p['trabajo_id'])
+        if len(intentos) == 1:
+            raise RuntimeError('disco lleno')
+        return 'ruta.zip'
+
+    trabajo_id = _registrar(monkeypatch, _prueba)
+    trabajos.ejecutar(trabajos._tomar_siguiente('w1'))
+    t = trabajos.obtener(trabajo_id)
+    assert (t['estado'], t['mensaje']) == (trabajos.FALLIDO, 'disco lleno')
+    assert 'RuntimeError' in t['error']
+    assert trabajos.reintentar(trabajo_id)
+    assert trabajos.obtener(trabajo_id)['estado'] == trabajos.PENDIENTE
+    trabajos.ejecutar(trabajos._tomar_siguiente('w2'))
+    t = trabajos.obtener(trabajo_id)
+    assert (t['estado'], t['error'], t['trabajador']) == (trabajos.TERMINADO, None, 'w2')
+    # Un trabajo terminado no se reintenta
+    assert not trabajos.reintentar(trabajo_id)
+
+
+def test_latido_vencido_pasa_a_fallido(cola, monkeypatch):
+    trabajo_id = _registrar(monkeypatch, lambda p, avance: 'ruta.zip')
+    trabajo = trabajos._tomar_siguiente('w1')
+    with cola() as s:
+        s.execute(text("UPDATE trabajo SET latido = :t WHERE trabajo_id = :id"),
+                  {"t": datetime.now() - timedelta(seconds=trabajos.VENCE_LATIDO + 5), "id": trabajo_id})
+        s.commit()
+    assert trabajos.abandonado(trabajos.obtener(trabajo_id))
+    # El siguiente trabajador que busca trabajo lo da por fallido
+    assert trabajos._tomar_siguiente('w2') is None
+    t = trabajos.obtener(trabajo_id)
+    assert (t['estado'], t['mensaje']) == (trabajos.FALLIDO, 'Trabajador detenido (sin latido)')
+    # El trabajador original ya no puede cerrarlo
+    assert not trabajos._cerrar(trabajo, estado=trabajos.TERMINADO)
+    assert trabajos.reintentar(trabajo_id)
+
+
+def test_resultado_de_otro_trabajador_no_se_pisa(cola, monkeypatch):
+    def _prueba(p, avance):
+        # Mientras corre, el trabajo se da por abandonado y otro trabajador lo vuelve a tomar
+        with cola() as s:
+            s.execute(text("UPDATE trabajo SET trabajador = 'w2' WHERE trabajo_id = :id"), {"id": p['trabajo_id']})
+            s.commit()
+        return 'ruta_w1.zip'
+
+    trabajo_id = _registrar(monkeypatch, _prueba)
+    trabajos.ejecutar(trabajos._tomar_siguiente('w1'))
+    t = trabajos.obtener(trabajo_id)
+    assert (t['estado'], t['trabajador'], t['resultado_ruta']) == (trabajos.EN_CURSO, 'w2', None)
+
+
+def test_cuentas_30_vuelven_en_decimal(tmp_path):
+    resultado = {
+        'todas_las_cuentas': [{'pensionado': {'cedula': '111', 'nombre': 'PEREZ'},
+                               'cuentas': [{'año': 2025, 'mes': 1, 'capital_total': Decimal('100.10'),
+                                            'intereses': Decimal('0.015')}],
+                               'total_capital': Decimal('100.10')}],
+        'total_capital_entidad': Decimal('100.10'),
+        'total_cuentas_generadas': 1,
+    }
+    ruta = tmp_path / 'cuentas.json'
+    ruta.write_text(json.dumps(resultado, default=str), encoding='utf-8')
+    assert trabajos.leer_cuentas_30(str(ruta)) == resultado
@@ -0,0 +1,60 @@
+"""Pruebas del lote de ZIPs de varias entidades (app/zip_lote.py)."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+import app.zip_lote as zip_lote
+
+FECHA = date(2025, 8, 31)
+
+
+def test_ruta_zip_no_sobrescribe(tmp_path):
+    ruta = zip_lote.ruta_zip_entidad('900', 'Hospital Central', FECHA, str(tmp_path))
+    assert ruta == str(tmp_path / 'HOS_900' / 'LIQUIDACION_MASIVA_900_20250831.zip')
+    open(ruta, 'wb').close()
+    segunda = zip_lote.ruta_zip_entidad('900', 'Hospital Central', FECHA, str(tmp_path))
+    assert segunda.endswith('LIQUIDACION_MASIVA_900_20250831_v2.zip')
+    open(segunda, 'wb').close()
+    assert zip_lote.ruta_zip_entidad('900', 'Hospital Central', FECHA, str(tmp_path)).endswith('_v3.zip')
+
+
+def _entidad_falsa(nit, nombre, fecha_corte, corregir_existentes, motor, base_dir, cola=None):
+    # Mismo contrato que _generar_entidad: avance por la cola y resumen sin los bytes del ZIP
+    total = int(nit) % 10
+    cola.put((nit, 0, total))
+    if nit == '903':
+        raise RuntimeError('sin conexión')
+    cola.put((nit, total, total))
+    ruta = zip_lote.ruta_zip_entidad(nit, nombre, fecha_corte, base_dir)
+    return {'nit': nit, 'nombre': nombre, 'ruta': ruta, 'bytes': 0, 'pensionados': total,
+            'estadisticas': {}, 'segundos': 0.0}
+
+
+@pytest.fixture
+def en_hilos(monkeypatch):
+    # Los procesos 'spawn' no ven monkeypatch: el mismo lote en hilos del proceso de la prueba
+    monkeypatch.setattr(zip_lote, 'ProcessPoolExecutor',
+                        lambda max_workers, mp_context, initializer: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(zip_lote, '_generar_entidad', _entidad_falsa)
+
+
+def test_lote_agrega_resultados_errores_y_progreso(en_hilos, tmp_path):
+    estados = []
+    entidades = [(901, 'Alcaldía Uno'), ('902', 'Banco Dos'), ('903', 'Caja Tres'), ('905', 'Diócesis')]
+    resultados = zip_lote.generar_zips_paralelo(entidades, FECHA, procesos=2, progreso=estados.append,
+                                                base_dir=str(tmp_path))
+    por_nit = {r['nit']: r for r in resultados}
+    assert sorted(por_nit) == ['901', '902', '903', '905']
+    assert por_nit['903'] == {'nit': '903', 'nombre': 'Caja Tres', 'error': 'sin conexión'}
+    assert por_nit['905']['ruta'] == str(tmp_path / 'DIÓ_905' / 'LIQUIDACION_MASIVA_905_20250831.zip')
+    final = estados[-1]
+    assert final['entidades_total'] == 4 and final['entidades_terminadas'] == 4
+    assert final['fraccion'] == 1.0
+    assert final['cuentas_total'] == 1 + 2 + 3 + 5
+    assert [e['entidades_terminadas'] for e in estados] == sorted(e['entidades_terminadas'] for e in estados)
+
+
+def test_lote_vacio():
+    assert zip_lote.generar_zips_paralelo([], FECHA) == []
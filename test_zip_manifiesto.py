@@ -0,0 +1,55 @@
+"""Pruebas del ZIP con manifiesto (app/zip_manifiesto.py)."""
+
+import hashlib
+import io
+import json
+import zipfile
+
+import pytest
+
+from app.zip_manifiesto import ZipConManifiesto
+
+META = {'consecutivo': 10, 'identificacion': '111', 'nombre': 'PEREZ, ANA',
+        'total_capital': 100.10, 'total_intereses': 5.05, 'total': 105.15}
+
+
+def _zip(tmp_path) -> bytes:
+    en_disco = tmp_path / 'grande.pdf'
+    en_disco.write_bytes(b'%PDF-1.4 disco' * 1000)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with ZipConManifiesto(zf) as zm:
+            zm.writestr('111/cuenta_10.pdf', b'%PDF-1.4 uno', META)
+            zm.writestr('111/cuenta_11.pdf', b'%PDF-1.4 dos', {**META, 'consecutivo': 11})
+            zm.writestr('222/cuenta_12.pdf', b'%PDF-1.4 tres',
+                        {**META, 'consecutivo': 12, 'identificacion': '222', 'nombre': 'GOMEZ, LUIS'})
+            zm.write(str(en_disco), 'anexos/grande.pdf')
+            zm.writestr('LEEME.txt', 'texto de prueba ' * 100)
+            zm.escribir_manifiesto('MANIFEST.json', nit='900', nombre='ENTIDAD')
+    return buffer.getvalue()
+
+
+def test_manifiesto_coincide_con_el_zip(tmp_path):
+    with zipfile.ZipFile(io.BytesIO(_zip(tmp_path))) as zf:
+        nombres = zf.namelist()
+        manifiesto = json.loads(zf.read('MANIFEST.json'))
+        assert nombres[-1] == 'MANIFEST.json'
+        assert [e['ruta'] for e in manifiesto['archivos']] == nombres[:-1]
+        for entrada in manifiesto['archivos']:
+            datos = zf.read(entrada['ruta'])
+            assert entrada['bytes'] == len(datos)
+            assert entrada['sha256'] == hashlib.sha256(datos).hexdigest()
+        assert zf.testzip() is None
+
+
+def test_totales_por_pensionado_y_entidad(tmp_path):
+    with zipfile.ZipFile(io.BytesIO(_zip(tmp_path))) as zf:
+        manifiesto = json.loads(zf.read('MANIFEST.json'))
+    entidad = manifiesto['entidad']
+    assert (entidad['nit'], entidad['archivos'], entidad['cuentas']) == ('900', 5, 3)
+    assert entidad['total'] == pytest.approx(315.45)
+    ana = manifiesto['pensionados']['111']
+    assert (ana['nombre'], ana['archivos'], ana['cuentas']) == ('PEREZ, ANA', 2, 2)
+    assert (ana['total_capital'], ana['total_intereses'], ana['total']) == (200.2, 10.1, 210.3)
+    assert manifiesto['pensionados']['222']['cuentas'] == 1
+
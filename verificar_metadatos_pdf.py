@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Verificador de PDFs generados contra la tabla cuenta_cobro
+- Lee solo los metadatos JSON incrustados en cada PDF (clave /CuentaCobro del Info), sin
+  extraer texto: miles de PDFs se revisan en segundos
+- Acepta archivos PDF, carpetas (recursivo) y ZIPs del flujo masivo
+- Compara NIT, identificación, período y totales con la fila del mismo consecutivo
+
+Uso:
+    python verificar_metadatos_pdf.py reportes_liquidacion/ALC_800103021/LIQUIDACION_MASIVA_800103021_20250831.zip
+    python verificar_metadatos_pdf.py reportes_liquidacion/ --detalle
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.db import get_session
+from app.metadatos_pdf import leer_metadatos
+
+# Consecutivos por consulta (IN con parámetros)
+TAM_LOTE = 1000
+TOLERANCIA = Decimal('0.01')
+
+
+def recorrer_pdfs(rutas: list):
+    """Genera (origen, bytes) de cada PDF en las rutas: archivos, carpetas o ZIPs."""
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, nombres in os.walk(ruta):
+                for nombre in sorted(nombres):
+                    yield from recorrer_pdfs([os.path.join(raiz, nombre)])
+        elif ruta.lower().endswith('.zip'):
+            with zipfile.ZipFile(ruta) as zf:
+                for info in zf.infolist():
+                    if info.filename.lower().endswith('.pdf'):
+                        yield f"{ruta}!{info.filename}", zf.read(info)
+        elif ruta.lower().endswith('.pdf'):
+            with open(ruta, 'rb') as f:
+                yield ruta, f.read()
+
+
+def consultar_cuentas(session, consecutivos: list) -> dict:
+    """Filas de cuenta_cobro por consecutivo, en lotes."""
+    filas = {}
+    for i in range(0, len(consecutivos), TAM_LOTE):
+        lote = consecutivos[i:i + TAM_LOTE]
+        marcadores = ', '.join(f":c{j}" for j in range(len(lote)))
+        query = text(f"""SELECT consecutivo, nit_entidad, pensionado_identificacion, periodo_inicio, periodo_fin,
+                                total_capital, total_intereses, total_liquidacion, estado
+                         FROM cuenta_cobro WHERE consecutivo IN ({marcadores})""")
+        for row in session.execute(query, {f"c{j}": c for j, c in enumerate(lote)}).fetchall():
+            filas[int(row[0])] = row
+    return filas
+
+
+def _diferencias(meta: dict, row) -> list:
+    difs = []
+    esperados = [
+        ('nit', str(row[1])),
+        ('identificacion', str(row[2])),
+        ('periodo_inicio', str(row[3])[:10] if row[3] else None),
+        ('periodo_fin', str(row[4])[:10] if row[4] else None),
+    ]
+    for campo, valor in esperados:
+        if meta.get(campo) is not None and meta.get(campo) != valor:
+            difs.append(f"{campo}: PDF={meta.get(campo)} BD={valor}")
+    for campo, valor in (('total_capital', row[5]), ('total_intereses', row[6]), ('total', row[7])):
+        if valor is None:
+            continue
+        if abs(Decimal(str(meta[campo])) - Decimal(str(valor))) > TOLERANCIA:
+            difs.append(f"{campo}: PDF={meta[campo]:,.2f} BD={float(valor):,.2f}")
+    return difs
+
+
+def verificar(rutas: list, detalle: bool = False) -> int:
+    inicio = time.perf_counter()
+    cuentas = []      # (origen, meta)
+    sin_metadatos = []
+    n_pdfs = 0
+    for origen, contenido in recorrer_pdfs(rutas):
+        n_pdfs += 1
+        carga = leer_metadatos(contenido)
+        if not carga:
+            sin_metadatos.append(origen)
+            continue
+        for meta in carga['cuentas']:
+            cuentas.append((origen, meta))
+    t_lectura = time.perf_counter() - inicio
+
+    session = get_session()
+    try:
+        filas = consultar_cuentas(session, sorted({m['consecutivo'] for _, m in cuentas}))
+    finally:
+        session.close()
+
+    no_registradas = []
+    con_diferencias = []
+    for origen, meta in cuentas:
+        row = filas.get(meta['consecutivo'])
+        if row is None:
+            no_registradas.append((origen, meta))
+            continue
+        difs = _diferencias(meta, row)
+        if difs:
+            con_diferencias.append((origen, meta, difs))
+
+    print("=" * 80)
+    print("VERIFICACIÓN DE METADATOS DE PDFs CONTRA cuenta_cobro")
+    print("=" * 80)
+    print(f"📄 PDFs leídos: {n_pdfs:,} ({t_lectura:.2f}s)")
+    print(f"🧾 Cuentas en metadatos: {len(cuentas):,}")
+    print(f"✅ Coinciden con la BD: {len(cuentas) - len(no_registradas) - len(con_diferencias):,}")
+    print(f"❓ Sin metadatos (PDF anterior o externo): {len(sin_metadatos):,}")
+    print(f"❌ Consecutivo no registrado en BD: {len(no_registradas):,}")
+    print(f"⚠️ Con diferencias: {len(con_diferencias):,}")
+
+    limite = None if detalle else 10
+    if con_diferencias:
+        print("\nDiferencias:")
+        for origen, meta, difs in con_diferencias[:limite]:
+            print(f"   Nro. {meta['consecutivo']} ({origen}): " + "; ".join(difs))
+    if no_registradas:
+        print("\nNo registradas:")
+        for origen, meta in no_registradas[:limite]:
+            print(f"   Nro. {meta['consecutivo']} ({origen})")
+    if sin_metadatos and detalle:
+        print("\nSin metadatos:")
+        for origen in sin_metadatos:
+            print(f"   {origen}")
+    print(f"\n⏱️ Tiempo total: {time.perf_counter() - inicio:.2f}s")
+    return 1 if (no_registradas or con_diferencias) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificar PDFs generados (metadatos incrustados) contra cuenta_cobro')
+    parser.add_argument('rutas', nargs='+', help='PDFs, carpetas o ZIPs a verificar')
+    parser.add_argument('--detalle', action='store_true', help='Listar todas las diferencias y los PDFs sin metadatos')
+    args = parser.parse_args()
+    sys.exit(verificar(args.rutas, detalle=args.detalle))
+
+
+if __name__ == '__main__':
+    main()